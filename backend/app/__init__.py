@@ -7,22 +7,51 @@ from dotenv import load_dotenv
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from flask_marshmallow import Marshmallow
+from .db_engine import RoutingSession, configure_database
 
 load_dotenv()
 
-db = SQLAlchemy()
+# Session dengan routing SELECT ke replika baca (lihat db_engine.read_replica)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 bcrypt = Bcrypt()
 jwt = JWTManager()
-ma = Marshmallow()
+_ma = None
+
+def get_marshmallow():
+    """Flask-Marshmallow dibuat saat pertama dibutuhkan (schema di routes admin), bukan saat import."""
+    global _ma
+    if _ma is None:
+        from flask_marshmallow import Marshmallow
+        _ma = Marshmallow()
+    return _ma
+
+def __getattr__(name):
+    # Kompatibel dengan `from app import ma`
+    if name == 'ma':
+        return get_marshmallow()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def create_app(minimal=None):
+    """
+    minimal=True (default dari env APP_MINIMAL) untuk skrip & CLI (run_seeds.py,
+    cleanup.py, `APP_MINIMAL=true flask db upgrade`): config, extension database/auth
+    dan listener integritas data saja, tanpa blueprint, CORS, kompresi, serializer
+    response dan process pool laporan.
+    """
+    if minimal is None:
+        minimal = os.getenv('APP_MINIMAL', 'false').lower() in ('1', 'true', 'yes')
 
-def create_app():
     app = Flask(__name__)
-    CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}}, allow_headers=["Authorization", "Content-Type"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+    # Serialisasi JSON cepat (orjson jika ada) + Decimal/date native
+    from .json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    if not minimal:
+        CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}}, allow_headers=["Authorization", "Content-Type"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
     
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    # URI + pool/pre-ping/statement timeout dari env, replika opsional (DATABASE_REPLICA_URL)
+    configure_database(app)
     UPLOAD_FOLDER = os.path.join(app.root_path, '..', 'uploads')
     if not os.path.isabs(app.config.get('UPLOAD_FOLDER', 'uploads')):
          app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads') # Gunakan current working directory
@@ -33,16 +62,51 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
+    # Fan-out paralel untuk analisis AI (set AI_FANOUT_ENABLED=false untuk mode satu request)
+    app.config['AI_FANOUT_ENABLED'] = os.getenv('AI_FANOUT_ENABLED', 'true').lower() != 'false'
+    # Ingestion berita horizon terjadwal (menit, 0 = nonaktif)
+    app.config['HORIZON_INGEST_INTERVAL_MINUTES'] = int(os.getenv('HORIZON_INGEST_INTERVAL_MINUTES', 60))
+    app.config['HORIZON_NEWS_MAX_AGE_HOURS'] = int(os.getenv('HORIZON_NEWS_MAX_AGE_HOURS', 24))
+    app.config['HORIZON_BRIEFING_WINDOW_HOURS'] = int(os.getenv('HORIZON_BRIEFING_WINDOW_HOURS', 12))
+    # Kompresi response (gzip/brotli) untuk payload di atas COMPRESS_MIN_SIZE byte
+    app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'true').lower() != 'false'
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
 
-    print(f"!!! DEBUG: Kunci JWT yang sedang digunakan: {app.config['JWT_SECRET_KEY']}")
-     
     db.init_app(app)
     migrate.init_app(app, db)
     bcrypt.init_app(app)
     jwt.init_app(app)
-    ma.init_app(app)
+
+    from .http_cache import init_http_cache
+    init_http_cache(app)
+
+    from .tenancy import init_tenancy
+    init_tenancy(app)
+
+    if minimal:
+        with app.app_context():
+            # Skrip tooling tetap menulis DB: stempel export & counter kuota harus ikut terjaga
+            from .excel_export import init_excel_export
+            init_excel_export(app)
+            from .quota import init_quota
+            init_quota(app)
+            # CLI `flask horizon-ingest` (scheduler sendiri baru jalan saat request pertama)
+            from .horizon_ingest import init_horizon_ingest
+            init_horizon_ingest(app)
+            # CLI `flask rescoring-resume` untuk job rescoring yang tertunda
+            from .rescoring import init_rescoring
+            init_rescoring(app)
+            # CLI `flask regulation-ingest` untuk ingestion regulasi yang tertunda
+            from .regulation_ingest import init_regulation_ingest
+            init_regulation_ingest(app)
+        return app
+
+    get_marshmallow().init_app(app)
     CORS(app)
 
+    from .compression import init_compression
+    init_compression(app)
+
     with app.app_context():
         # Import blueprint dari setiap file di folder routes
         from .routes.auth import auth_bp
@@ -57,6 +121,7 @@ def create_app():
         from .routes.admin import admin_bp
         from .routes.horizon import horizon_bp
         from app.routes.qrc import qrc_bp
+        from .routes.search import search_bp
 
         # Daftarkan semua blueprint ke aplikasi
         app.register_blueprint(auth_bp, url_prefix='/api')
@@ -71,9 +136,42 @@ def create_app():
         app.register_blueprint(admin_bp, url_prefix='/api/admin')
         app.register_blueprint(horizon_bp, url_prefix='/api')
         app.register_blueprint(qrc_bp, url_prefix='/api/qrc')
+        app.register_blueprint(search_bp, url_prefix='/api')
+
+        from .horizon_ingest import init_horizon_ingest
+        init_horizon_ingest(app)
+
+        # Serializer baris per model dikompilasi sekali di sini, bukan per request
+        from .serializers import init_serializers
+        init_serializers(app)
+
+        # Cache file export Excel + stempel perubahan asesmen
+        from .excel_export import init_excel_export
+        init_excel_export(app)
+
+        # Laporan HTML/PDF asesmen AI (process pool + cache berbasis hash isi)
+        from .assessment_report import init_reports
+        init_reports(app)
+
+        # Kuota pembuatan data: counter atomik per (user, resource)
+        from .quota import init_quota
+        init_quota(app)
+
+        # Job rescoring yang tertunda (worker restart) dilanjutkan saat request pertama
+        from .rescoring import init_rescoring
+        init_rescoring(app)
+
+        # Ingestion regulasi yang tertunda (antrian in-memory hilang saat restart)
+        from .regulation_ingest import init_regulation_ingest
+        init_regulation_ingest(app)
         
     @app.route('/uploads/<path:filename>')
     def serve_uploaded_file(filename):
+        from .image_pipeline import is_content_addressed, IMMUTABLE_MAX_AGE
+        if is_content_addressed(filename):
+            response = send_from_directory(app.config['UPLOAD_FOLDER'], filename, max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+            return response
         return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
         # Kita tidak perlu lagi mengimpor dari routes.py yang lama
@@ -1,9 +1,33 @@
-import google.generativeai as genai
+import importlib
 import re
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from app.models.master import MasterData
 
+
+class _LazyModule:
+    """Proxy modul yang baru diimpor saat atribut pertama kali dipakai."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# google.generativeai (~0.8 detik import) hanya dimuat saat panggilan AI pertama,
+# bukan saat create_app / worker start
+genai = _LazyModule('google.generativeai')
+
+# Pool bersama untuk fan-out sub-request AI (membatasi konkurensi lintas request)
+AI_FANOUT_WORKERS = int(os.getenv('AI_FANOUT_WORKERS', 8))
+AI_SUBREQUEST_TIMEOUT = 180  # detik
+_ai_executor = ThreadPoolExecutor(max_workers=AI_FANOUT_WORKERS, thread_name_prefix='gemini-fanout')
+
 def configure_genai():
     """
     [BARU] Fungsi Helper untuk konfigurasi API Key.
@@ -182,16 +206,10 @@ def analyze_bia_with_gemini(failed_asset_name: str, downtime: int, impacted_asse
         print(f"Error saat menganalisis BIA dengan Gemini API: {e}")
         return None
     
-def analyze_assessment_with_gemini(form_data: dict) -> list | None:
-    """
-    Menganalisis data lengkap dari form asesmen untuk menghasilkan Risk Register yang detail.
-    """
-    try:
-        configure_genai()
-        json_config = genai.GenerationConfig(response_mime_type="application/json")
-        model = genai.GenerativeModel('gemini-2.5-flash', generation_config=json_config)
-
-        konteks = f"""
+def _build_assessment_prompt(form_data: dict, regulation_passages: list | None = None,
+                             risk_count: int = 10, focus_category: str | None = None) -> str:
+    """Menyusun prompt identifikasi risiko (dipakai mode tunggal maupun fan-out per kategori)."""
+    konteks = f"""
         **Nama Proyek:** {form_data.get('nama_asesmen')}
         **Info Perusahaan:** Industri: {form_data.get('company_industry')}, Tipe: {form_data.get('company_type')}
         **Regulasi Terkait:** {form_data.get('relevant_regulations')}
@@ -199,8 +217,20 @@ def analyze_assessment_with_gemini(form_data: dict) -> list | None:
         **Konteks Tambahan:** {form_data.get('additional_risk_context')}
         """
 
-        prompt = f"""
-        Anda adalah seorang Chief Risk Officer (CRO) profesional. Berdasarkan konteks proyek di bawah ini, identifikasi 10 potensi risiko paling signifikan.
+    if regulation_passages:
+        kutipan = "\n".join(
+            f"[{i}] {p.get('regulation')} (hal. {p.get('page')}): {p.get('text')}"
+            for i, p in enumerate(regulation_passages, start=1)
+        )
+        konteks += f"""
+        **Kutipan Regulasi Relevan (gunakan sebagai dasar, terutama untuk risiko kepatuhan):**
+        {kutipan}
+        """
+
+    fokus = f" dengan FOKUS pada kategori risiko '{focus_category}'" if focus_category else ""
+
+    return f"""
+        Anda adalah seorang Chief Risk Officer (CRO) profesional. Berdasarkan konteks proyek di bawah ini, identifikasi {risk_count} potensi risiko paling signifikan{fokus}.
         Jawaban Anda HARUS berupa array JSON yang valid. Setiap objek dalam array harus memiliki kunci-kunci berikut: "title", "objective", "risk_type", "risk_description", "potential_cause", "potential_impact", "existing_control", "control_effectiveness", "inherent_likelihood", "inherent_impact", "mitigation_plan", "residual_likelihood", "residual_impact".
 
         - "title": (WAJIB) Buat judul risiko yang singkat dan deskriptif, maksimal 5-7 kata.
@@ -218,92 +248,223 @@ def analyze_assessment_with_gemini(form_data: dict) -> list | None:
         ---
         """
 
-        response = model.generate_content(prompt)
-        
-        print("--- RAW AI RESPONSE ---"); print(response.text); print("-----------------------")
-        
-        # cleaned_text = response.text.strip().replace('```json', '').replace('```', '')
-        
-        parsed_risks = json.loads(response.text)
-
-        risks_for_db = []
-        # Gunakan enumerate untuk mendapatkan 'i' (index)
-        for i, risk in enumerate(parsed_risks): 
-            risk_type_prefix = risk.get('risk_type', 'XX').upper()
-            
-            risks_for_db.append({
-                "title": risk.get('title'),
-                # "kode_risiko": kode_risiko,
-                "objective": risk.get('objective'),
-                "risk_type": risk.get('risk_type'),
-                "deskripsi_risiko": risk.get('risk_description'),
-                "risk_causes": risk.get('potential_cause'),
-                "risk_impacts": risk.get('potential_impact'),
-                "existing_controls": risk.get('existing_control'),
-                "control_effectiveness": risk.get('control_effectiveness'),
-                "inherent_likelihood": risk.get('inherent_likelihood'),
-                "inherent_impact": risk.get('inherent_impact'),
-                "mitigation_plan": risk.get('mitigation_plan'),
-                "residual_likelihood": risk.get('residual_likelihood'),
-                "residual_impact": risk.get('residual_impact'),
-            })
-        return risks_for_db
+def _parse_identified_risks(response_text: str) -> list:
+    """Mengubah output JSON AI menjadi dict siap simpan ke RiskRegister."""
+    parsed_risks = json.loads(response_text)
+
+    risks_for_db = []
+    for risk in parsed_risks:
+        risks_for_db.append({
+            "title": risk.get('title'),
+            # "kode_risiko": kode_risiko,
+            "objective": risk.get('objective'),
+            "risk_type": risk.get('risk_type'),
+            "deskripsi_risiko": risk.get('risk_description'),
+            "risk_causes": risk.get('potential_cause'),
+            "risk_impacts": risk.get('potential_impact'),
+            "existing_controls": risk.get('existing_control'),
+            "control_effectiveness": risk.get('control_effectiveness'),
+            "inherent_likelihood": risk.get('inherent_likelihood'),
+            "inherent_impact": risk.get('inherent_impact'),
+            "mitigation_plan": risk.get('mitigation_plan'),
+            "residual_likelihood": risk.get('residual_likelihood'),
+            "residual_impact": risk.get('residual_impact'),
+        })
+    return risks_for_db
+
+def _generate_identified_risks(prompt: str) -> list:
+    """Satu panggilan gemini-2.5-flash (JSON mode). Aman dijalankan di thread worker."""
+    json_config = genai.GenerationConfig(response_mime_type="application/json")
+    model = genai.GenerativeModel('gemini-2.5-flash', generation_config=json_config)
+    response = model.generate_content(prompt)
+    print("--- RAW AI RESPONSE ---"); print(response.text); print("-----------------------")
+    return _parse_identified_risks(response.text)
+
+def analyze_assessment_with_gemini(form_data: dict, regulation_passages: list | None = None) -> list | None:
+    """
+    Menganalisis data lengkap dari form asesmen untuk menghasilkan Risk Register yang detail.
+    regulation_passages: (opsional) kutipan regulasi hasil retrieval BM25 untuk grounding.
+    """
+    try:
+        configure_genai()
+        return _generate_identified_risks(_build_assessment_prompt(form_data, regulation_passages))
 
     except Exception as e:
         print(f"Error saat menganalisis asesmen dengan Gemini API: {e}")
         return None
-    
-def generate_detailed_risk_analysis_with_gemini(risks: list) -> dict | None:
+
+def _split_risk_quota(total: int, parts: int) -> list:
+    """Membagi jumlah risiko ke beberapa sub-request secara merata (sisa ke bagian awal)."""
+    base, remainder = divmod(total, parts)
+    return [base + (1 if i < remainder else 0) for i in range(parts)]
+
+def analyze_assessment_parallel(form_data: dict, regulation_passages: list | None = None,
+                                total_risks: int = 10) -> list | None:
     """
-    Menganalisis daftar risiko dan menghasilkan laporan multi-bagian yang mendalam.
+    Versi fan-out dari analyze_assessment_with_gemini: satu sub-request per kategori risiko
+    dijalankan paralel, lalu hasilnya digabung secara deterministik (urutan kategori dari form,
+    lalu urutan dari AI) dengan de-duplikasi judul. Jatuh kembali ke mode tunggal jika
+    hanya ada satu kategori atau semua sub-request gagal.
     """
+    categories = form_data.get('risk_categories') or []
+    if isinstance(categories, str):
+        categories = [c.strip() for c in categories.split(',') if c.strip()]
+    categories = list(dict.fromkeys(categories))[:total_risks]
+
+    if len(categories) < 2:
+        return analyze_assessment_with_gemini(form_data, regulation_passages)
+
     try:
-        configure_genai()
-        model = genai.GenerativeModel('gemini-2.5-pro')
+        configure_genai()  # Baca API key dari DB di thread request, bukan di worker
+    except Exception as e:
+        print(f"Error saat menganalisis asesmen dengan Gemini API: {e}")
+        return None
 
-        risk_details = ""
-        for r in risks:
-            likelihood = r.get('inherent_likelihood') or 0
-            impact = r.get('inherent_impact') or 0
-            risk_level_score = likelihood * impact
-            risk_details += f"- Kode: {r.get('kode_risiko')}, Deskripsi: {r.get('deskripsi_risiko')} (Level Inherent: {risk_level_score}, Tipe: {r.get('risk_type')})\n"
+    quotas = _split_risk_quota(total_risks, len(categories))
+    futures = [
+        _ai_executor.submit(_generate_identified_risks,
+                            _build_assessment_prompt(form_data, regulation_passages, quota, category))
+        for category, quota in zip(categories, quotas)
+    ]
 
-        prompt = f"""
+    merged, seen_titles = [], set()
+    failed = 0
+    for category, quota, future in zip(categories, quotas, futures):
+        try:
+            risks = future.result(timeout=AI_SUBREQUEST_TIMEOUT)
+        except Exception as e:
+            failed += 1
+            print(f"Sub-analisis kategori '{category}' gagal: {e}")
+            continue
+        for risk in risks[:quota]:
+            title_key = (risk.get('title') or risk.get('deskripsi_risiko') or '').strip().lower()
+            if title_key and title_key in seen_titles:
+                continue
+            seen_titles.add(title_key)
+            merged.append(risk)
+
+    if failed == len(categories):
+        return analyze_assessment_with_gemini(form_data, regulation_passages)
+    return merged or None
+
+def _format_risk_details(risks: list) -> str:
+    risk_details = ""
+    for r in risks:
+        likelihood = r.get('inherent_likelihood') or 0
+        impact = r.get('inherent_impact') or 0
+        risk_level_score = likelihood * impact
+        risk_details += f"- Kode: {r.get('kode_risiko')}, Deskripsi: {r.get('deskripsi_risiko')} (Level Inherent: {risk_level_score}, Tipe: {r.get('risk_type')})\n"
+    return risk_details
+
+def _extract_json_object(text: str) -> dict | None:
+    try:
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        if match:
+            return json.loads(match.group(0))
+        return None
+    except (json.JSONDecodeError, TypeError):
+        print("Peringatan: Gagal mem-parse output dari AI untuk analisis detail. Output mentah:")
+        print(text)
+        return None
+
+# Instruksi per bagian laporan; dipakai bersama oleh mode tunggal dan mode paralel
+DETAILED_ANALYSIS_SECTIONS = {
+    "executive_summary": '(string) Tulis paragraf kesimpulan umum (4-5 kalimat) tentang lanskap risiko proyek ini.',
+    "risk_profile_analysis": '(object) Buat objek dengan dua kunci: "summary" (sebuah paragraf string yang menganalisis distribusi risiko) dan "distribution" (sebuah objek yang berisi jumlah risiko untuk setiap level, contoh: {"High": 2, "Moderate to High": 3, ...}).',
+    "immediate_priorities": '(array of strings) Identifikasi 3 area prioritas teratas yang memerlukan tindakan segera, sajikan sebagai array string.',
+    "critical_risks_discussion": '(array of objects) Pilih 2 risiko paling kritis dari daftar. Untuk setiap risiko, buat objek dengan kunci: "risk_code" (string), "discussion" (paragraf string yang membahas mengapa risiko ini kritis), dan "mitigation_target" (string, contoh: "Target mitigasi ini adalah Q2 2026.").',
+    "implementation_plan": '(array of strings) Buat daftar 4 langkah implementasi mitigasi yang paling penting, beri target kuartal (contoh: "Q1 2026: Lakukan audit keamanan siber menyeluruh.").',
+    "next_steps": '(string) Tulis satu paragraf berisi rekomendasi langkah selanjutnya yang lebih bersifat umum dan strategis.',
+}
+
+# Pengelompokan bagian untuk mode paralel (bagian yang saling terkait tetap satu request)
+DETAILED_ANALYSIS_GROUPS = (
+    ("executive_summary", "next_steps"),
+    ("risk_profile_analysis",),
+    ("immediate_priorities", "critical_risks_discussion"),
+    ("implementation_plan",),
+)
+
+def _build_detailed_analysis_prompt(risk_details: str, section_keys) -> str:
+    keys = ", ".join(f'"{key}"' for key in section_keys)
+    instructions = "\n".join(
+        f"        {i}. \"{key}\": {DETAILED_ANALYSIS_SECTIONS[key]}"
+        for i, key in enumerate(section_keys, start=1)
+    )
+    return f"""
         Anda adalah seorang Chief Risk Officer (CRO) virtual kelas dunia. Anda sedang menyiapkan laporan analisis risiko untuk dewan direksi.
         Berdasarkan daftar risiko yang telah diidentifikasi berikut ini:
         ---
         {risk_details}
         ---
         Buatlah laporan analisis yang komprehensif. Jawaban Anda HARUS berupa sebuah objek JSON tunggal yang valid tanpa markdown.
-        Objek JSON tersebut harus memiliki kunci-kunci berikut: "executive_summary", "risk_profile_analysis", "immediate_priorities", "critical_risks_discussion", "implementation_plan", "next_steps".
+        Objek JSON tersebut harus memiliki kunci-kunci berikut: {keys}.
 
         Ikuti instruksi detail untuk setiap kunci:
-        1. "executive_summary": (string) Tulis paragraf kesimpulan umum (4-5 kalimat) tentang lanskap risiko proyek ini.
-        2. "risk_profile_analysis": (object) Buat objek dengan dua kunci: "summary" (sebuah paragraf string yang menganalisis distribusi risiko) dan "distribution" (sebuah objek yang berisi jumlah risiko untuk setiap level, contoh: {{"High": 2, "Moderate to High": 3, ...}}).
-        3. "immediate_priorities": (array of strings) Identifikasi 3 area prioritas teratas yang memerlukan tindakan segera, sajikan sebagai array string.
-        4. "critical_risks_discussion": (array of objects) Pilih 2 risiko paling kritis dari daftar. Untuk setiap risiko, buat objek dengan kunci: "risk_code" (string), "discussion" (paragraf string yang membahas mengapa risiko ini kritis), dan "mitigation_target" (string, contoh: "Target mitigasi ini adalah Q2 2026.").
-        5. "implementation_plan": (array of strings) Buat daftar 4 langkah implementasi mitigasi yang paling penting, beri target kuartal (contoh: "Q1 2026: Lakukan audit keamanan siber menyeluruh.").
-        6. "next_steps": (string) Tulis satu paragraf berisi rekomendasi langkah selanjutnya yang lebih bersifat umum dan strategis.
+{instructions}
         """
 
+def _generate_detailed_sections(risk_details: str, section_keys) -> dict | None:
+    """Satu panggilan gemini-2.5-pro untuk sekelompok bagian laporan. Aman di thread worker."""
+    model = genai.GenerativeModel('gemini-2.5-pro')
+    response = model.generate_content(_build_detailed_analysis_prompt(risk_details, section_keys))
+    result = _extract_json_object(response.text)
+    if not result or any(key not in result for key in section_keys):
+        return None
+    return {key: result[key] for key in section_keys}
+
+def generate_detailed_risk_analysis_with_gemini(risks: list) -> dict | None:
+    """
+    Menganalisis daftar risiko dan menghasilkan laporan multi-bagian yang mendalam.
+    """
+    try:
+        configure_genai()
+        model = genai.GenerativeModel('gemini-2.5-pro')
+        prompt = _build_detailed_analysis_prompt(_format_risk_details(risks), list(DETAILED_ANALYSIS_SECTIONS))
+
         response = model.generate_content(prompt)
-        
-        try:
-            match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if match:
-                json_string = match.group(0)
-                analysis_result = json.loads(json_string)
-                return analysis_result
-            else:
-                return None
-        except (json.JSONDecodeError, TypeError):
-            print("Peringatan: Gagal mem-parse output dari AI untuk analisis detail. Output mentah:")
-            print(response.text)
-            return None
+        return _extract_json_object(response.text)
+
+    except Exception as e:
+        print(f"Error saat membuat analisis detail dengan Gemini API: {e}")
+        return None
 
+def generate_detailed_risk_analysis_parallel(risks: list) -> dict | None:
+    """
+    Versi paralel dari generate_detailed_risk_analysis_with_gemini: kelompok bagian laporan
+    (DETAILED_ANALYSIS_GROUPS) dibuat bersamaan lalu digabung dengan urutan kunci yang tetap.
+    Kelompok yang gagal dicoba ulang sekali; jika tetap gagal, seluruh hasil dianggap gagal
+    agar field yang tersimpan di RiskAssessment selalu lengkap.
+    """
+    try:
+        configure_genai()
     except Exception as e:
         print(f"Error saat membuat analisis detail dengan Gemini API: {e}")
         return None
+
+    risk_details = _format_risk_details(risks)
+    futures = {group: _ai_executor.submit(_generate_detailed_sections, risk_details, group)
+               for group in DETAILED_ANALYSIS_GROUPS}
+
+    sections = {}
+    for group, future in futures.items():
+        result = None
+        for attempt in range(2):
+            try:
+                if attempt == 0:
+                    result = future.result(timeout=AI_SUBREQUEST_TIMEOUT)
+                else:
+                    result = _generate_detailed_sections(risk_details, group)
+            except Exception as e:
+                print(f"Sub-analisis {group} gagal (percobaan {attempt + 1}): {e}")
+                result = None
+            if result:
+                break
+        if not result:
+            return None
+        sections.update(result)
+
+    return {key: sections.get(key) for key in DETAILED_ANALYSIS_SECTIONS}
     
 def summarize_horizon_scan(scan_params, news_list):
     """
@@ -427,6 +588,141 @@ def summarize_horizon_scan(scan_params, news_list):
     except Exception as e:
         print(f"AI Horizon Scan Error: {e}")
         return f"Laporan Horizon Scan: {industry}", f"<p>Maaf, terjadi kesalahan pemrosesan AI (Timeout/Limit). Mohon kurangi jumlah kategori yang dipilih atau coba lagi. Detail: {str(e)}</p>"
+
+
+def _format_news_context(news_list, limit=15, with_summary=True):
+    news_context = ""
+    for idx, news in enumerate(news_list[:limit]):
+        line = f"{idx+1}. [{news.get('source', 'N/A')}] {news.get('title', '')}"
+        if with_summary:
+            line += f": {news.get('summary', '')}"
+        news_context += line + "\n"
+    return news_context
+
+def summarize_sector_briefing(sector, news_list):
+    """
+    Laporan intelijen dasar satu sektor (tanpa konteks organisasi tertentu).
+    Dibagikan ke semua user di sektor yang sama dalam satu jendela waktu.
+    Mengembalikan (title, report_html) atau None jika gagal (jangan disimpan).
+    """
+    try:
+        configure_genai()
+        generation_config = {"temperature": 0.3, "top_p": 0.8, "top_k": 40, "max_output_tokens": 8192}
+        model = genai.GenerativeModel('gemini-2.5-pro', generation_config=generation_config)
+
+        prompt = f"""
+        BERTINDAK SEBAGAI:
+        Chief Risk Officer (CRO) dan analis intelijen pasar untuk sektor {sector}.
+        Anda menyusun 'Sector Intelligence Brief' yang akan dibaca banyak perusahaan di sektor ini.
+
+        DATA BERITA (NEWS FEED):
+        {_format_news_context(news_list)}
+
+        INSTRUKSI PENULISAN (STRICT):
+        1. Gunakan Bahasa Indonesia Bisnis Formal (C-Level Executive Style).
+        2. Jangan mengasumsikan nama perusahaan, kompetitor, atau strategi tertentu; fokus pada dinamika sektor.
+        3. Identifikasi dan bahas HANYA 3-5 area dengan dampak paling signifikan.
+        4. Gunakan struktur HTML di bawah ini (Hanya body, tanpa head/html tag).
+
+        FORMAT OUTPUT JSON:
+        {{
+            "title": "Judul Laporan (Max 8 kata, Tajam & Strategis)",
+            "report_html": "HTML Content..."
+        }}
+
+        STRUKTUR HTML:
+
+        <h3>1. Executive Intelligence Summary</h3>
+        <p>[Sintesis level tinggi situasi sektor saat ini dalam 1-2 paragraf padat.]</p>
+
+        <h3>2. Market Dynamics</h3>
+        <p>[Tren pasar, regulasi, dan pergerakan pelaku utama yang muncul di berita.]</p>
+
+        <h3>3. Key Risks Analysis (Prioritized)</h3>
+        <ul>
+            <li><strong>Critical Threats:</strong> [Risiko dengan dampak terbesar saat ini]</li>
+            <li><strong>Emerging Risks:</strong> [Sinyal risiko baru yang perlu diwaspadai]</li>
+        </ul>
+
+        <h3>4. Value Chain Vulnerabilities</h3>
+        <p>[Titik lemah rantai nilai sektor yang paling tertekan.]</p>
+
+        <h3>5. Strategic Opportunities (Upside Risk)</h3>
+        <ul>
+            <li>[Peluang 1]</li>
+            <li>[Peluang 2]</li>
+        </ul>
+
+        <h3>6. Priority Mitigation & Action Plan</h3>
+        <ol>
+            <li><strong>Strategic Response:</strong> [Keputusan level direksi]</li>
+            <li><strong>Operational Action:</strong> [Tindakan taktis segera]</li>
+            <li><strong>Monitoring Focus:</strong> [Indikator yang harus dipantau ketat]</li>
+        </ol>
+        """
+
+        response = model.generate_content(prompt)
+        data = _extract_json_object(response.text)
+        if not data or not data.get('report_html'):
+            return None
+        return data.get('title') or f"Sector Brief: {sector}", data['report_html']
+    except Exception as e:
+        print(f"AI Sector Briefing Error ({sector}): {e}")
+        return None
+
+def summarize_horizon_delta(scan_params, base_report_html, news_list):
+    """
+    Prompt kecil per user di atas briefing sektor bersama: hanya membahas
+    kompetitor/topik spesifik dan konteks organisasi user.
+    Mengembalikan (title, delta_html) atau None jika gagal.
+    """
+    try:
+        configure_genai()
+        json_config = {"temperature": 0.3, "max_output_tokens": 4096, "response_mime_type": "application/json"}
+        model = genai.GenerativeModel('gemini-2.5-flash', generation_config=json_config)
+
+        # Ringkasan briefing dasar cukup teks polosnya (tanpa tag) dan dipotong
+        base_text = re.sub(r'<[^>]+>', ' ', base_report_html or '')
+        base_text = re.sub(r'\s+', ' ', base_text).strip()[:4000]
+
+        competitors = (scan_params.get('input_competitors') or '').strip() or '-'
+        topics = (scan_params.get('input_topics') or scan_params.get('specific_topics') or '').strip() or '-'
+
+        prompt = f"""
+        Anda adalah CRO yang melengkapi 'Sector Intelligence Brief' berikut untuk organisasi tertentu.
+
+        RINGKASAN BRIEFING SEKTOR (SUDAH DIBACA USER, JANGAN DIULANG):
+        {base_text}
+
+        KONTEKS ORGANISASI:
+        • Perusahaan: {scan_params.get('company_name')}
+        • Perspektif Laporan: {scan_params.get('report_perspective', 'Board of Directors')}
+        • Selera Risiko: {scan_params.get('risk_appetite')}
+        • Strategi: {scan_params.get('strategic_driver')}
+        • KOMPETITOR: {competitors}
+        • TOPIK SPESIFIK: {topics}
+
+        BERITA TERKAIT TOPIK/KOMPETITOR:
+        {_format_news_context(news_list, limit=10, with_summary=False)}
+
+        Tulis HANYA analisis tambahan (maks. 3 paragraf/poin) tentang implikasi kompetitor dan topik
+        spesifik di atas bagi organisasi ini. Bahasa Indonesia Bisnis Formal.
+
+        FORMAT OUTPUT JSON:
+        {{
+            "title": "Judul Laporan (Max 8 kata, mencerminkan fokus organisasi)",
+            "delta_html": "<h3>7. Organization-Specific Focus</h3>..."
+        }}
+        """
+
+        response = model.generate_content(prompt)
+        data = _extract_json_object(response.text)
+        if not data or not data.get('delta_html'):
+            return None
+        return data.get('title'), data['delta_html']
+    except Exception as e:
+        print(f"AI Horizon Delta Error: {e}")
+        return None
   
 # Quick Risk Check (QRC)  
 def analyze_qrc_assessment(assessment_type, answers_data, client_name, institution):
@@ -0,0 +1,603 @@
+# backend/app/assessment_report.py
+"""
+Laporan ringkasan asesmen AI (HTML / PDF) yang dirender di server.
+
+1. Route menyusun *payload* laporan (dict biasa: data asesmen, bagian ringkasan
+   AI yang sudah di-parse, dan entri RiskRegister). Hanya langkah ini yang
+   menyentuh database.
+2. Key cache = hash SHA-256 dari payload + format + versi renderer. Laporan
+   dengan isi yang sama tidak pernah dirender dua kali (disk cache LRU).
+3. Cache miss dirender di process pool (`REPORT_WORKERS`, default jumlah core)
+   sehingga rendering yang CPU-bound tidak menahan GIL worker web. Worker
+   menulis file hasil langsung ke direktori cache secara atomik.
+4. Export massal per institusi menyebar semua cache miss ke pool sekaligus,
+   lalu hasilnya dikemas menjadi satu ZIP.
+
+PDF dirender dengan reportlab (platypus: word-wrap, tabel lintas halaman,
+footer nomor halaman); HTML memakai Jinja2 bawaan Flask dengan pemisah halaman
+untuk cetak.
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from jinja2 import Environment
+
+from app.excel_export import evict_lru_files
+
+RENDERER_VERSION = 2
+REPORT_FORMATS = {'pdf': 'application/pdf', 'html': 'text/html; charset=utf-8'}
+RISKS_PER_HTML_PAGE = 12
+DEFAULT_CACHE_MAX_FILES = 500
+DEFAULT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_RENDER_TIMEOUT = 120
+# Bukan 'fork': worker gunicorn punya thread lain (scheduler horizon, executor AI) dan fork
+# dari proses multi-thread bisa mewarisi lock yang sedang terkunci (deadlock di child)
+DEFAULT_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def safe_json_loads(json_string):
+    if not json_string:
+        return None
+    try:
+        return json.loads(json_string)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+# =========================================================================
+# Payload (satu-satunya bagian yang membaca database)
+# =========================================================================
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _score(likelihood, impact):
+    return likelihood * impact if likelihood and impact else None
+
+
+def build_report_payload(assessment, creator=None):
+    """Asesmen AI + RiskRegister -> dict yang bisa di-pickle & di-hash."""
+    return {
+        "assessment": {
+            "id": assessment.id,
+            "nama_asesmen": assessment.nama_asesmen,
+            "tanggal_mulai": _iso(assessment.tanggal_mulai),
+            "tanggal_selesai": _iso(assessment.tanggal_selesai),
+            "created_by": creator.nama_lengkap if creator else None,
+            "institution": creator.institution if creator else None,
+            "company_industry": assessment.company_industry,
+            "company_type": assessment.company_type,
+            "company_assets": assessment.company_assets,
+            "currency": assessment.currency,
+            "risk_limit": assessment.risk_limit,
+            "risk_categories": assessment.risk_categories,
+            "project_objective": assessment.project_objective,
+        },
+        "summary": {
+            "executive_summary": assessment.ai_executive_summary,
+            "risk_profile_analysis": safe_json_loads(assessment.ai_risk_profile_analysis),
+            "immediate_priorities": safe_json_loads(assessment.ai_immediate_priorities),
+            "critical_risks_discussion": safe_json_loads(assessment.ai_critical_risks_discussion),
+            "implementation_plan": safe_json_loads(assessment.ai_implementation_plan),
+            "next_steps": assessment.ai_next_steps,
+        },
+        "risks": [{
+            "kode_risiko": r.kode_risiko,
+            "title": r.title,
+            "risk_type": r.risk_type,
+            "deskripsi_risiko": r.deskripsi_risiko,
+            "existing_controls": r.existing_controls,
+            "control_effectiveness": r.control_effectiveness,
+            "mitigation_plan": r.mitigation_plan,
+            "inherent_likelihood": r.inherent_likelihood,
+            "inherent_impact": r.inherent_impact,
+            "inherent_score": _score(r.inherent_likelihood, r.inherent_impact),
+            "residual_likelihood": r.residual_likelihood,
+            "residual_impact": r.residual_impact,
+            "residual_score": _score(r.residual_likelihood, r.residual_impact),
+        } for r in sorted(assessment.risk_register_entries, key=lambda r: r.id)],
+    }
+
+
+def report_hash(payload, fmt):
+    body = json.dumps([RENDERER_VERSION, fmt, payload], sort_keys=True, ensure_ascii=False,
+                      separators=(',', ':'), default=str)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def report_filename(payload, fmt):
+    name = payload['assessment']['nama_asesmen'] or str(payload['assessment']['id'])
+    safe = "".join(ch if ch.isalnum() or ch in '-_' else '_' for ch in name).strip('_')[:60]
+    return f"Laporan_Asesmen_AI_{payload['assessment']['id']}_{safe or 'asesmen'}.{fmt}"
+
+
+# =========================================================================
+# Bagian laporan (dipakai renderer HTML & PDF)
+# =========================================================================
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _risk_level(score):
+    """Level risiko AI (ambang sama dengan dashboard asesmen AI)."""
+    if not score:
+        return "-"
+    if score >= 15:
+        return "5 - High"
+    if score >= 8:
+        return "4 - Moderate to High"
+    if score >= 4:
+        return "3 - Moderate"
+    if score >= 2:
+        return "2 - Low to Moderate"
+    return "1 - Low"
+
+
+def report_sections(payload):
+    """Urutan bagian laporan: list (judul, jenis, isi) dengan jenis 'paragraph'|'list'|'pairs'|'critical'."""
+    summary = payload['summary']
+    sections = []
+    if summary.get('executive_summary'):
+        sections.append(("Ringkasan Eksekutif", 'paragraph', _text(summary['executive_summary'])))
+
+    profile = summary.get('risk_profile_analysis')
+    if isinstance(profile, dict):
+        if profile.get('summary'):
+            sections.append(("Analisis Profil Risiko", 'paragraph', _text(profile['summary'])))
+        distribution = profile.get('distribution')
+        if isinstance(distribution, dict) and distribution:
+            sections.append(("Distribusi Level Risiko", 'pairs',
+                             [(_text(k), _text(v)) for k, v in distribution.items()]))
+    elif profile:
+        sections.append(("Analisis Profil Risiko", 'paragraph', _text(profile)))
+
+    for key, title in (('immediate_priorities', "Prioritas Segera"), ('implementation_plan', "Rencana Implementasi")):
+        items = summary.get(key)
+        if isinstance(items, list) and items:
+            sections.append((title, 'list', [_text(item) for item in items]))
+        elif items:
+            sections.append((title, 'paragraph', _text(items)))
+        if key == 'immediate_priorities':
+            critical = summary.get('critical_risks_discussion')
+            if isinstance(critical, list) and critical:
+                sections.append(("Pembahasan Risiko Kritis", 'critical', [{
+                    "risk_code": _text(item.get('risk_code')) if isinstance(item, dict) else "",
+                    "discussion": _text(item.get('discussion')) if isinstance(item, dict) else _text(item),
+                    "mitigation_target": _text(item.get('mitigation_target')) if isinstance(item, dict) else "",
+                } for item in critical]))
+
+    if summary.get('next_steps'):
+        sections.append(("Langkah Selanjutnya", 'paragraph', _text(summary['next_steps'])))
+    return sections
+
+
+def info_rows(payload):
+    a = payload['assessment']
+    rows = [
+        ("Nama Asesmen", a['nama_asesmen']),
+        ("Tanggal Mulai", a['tanggal_mulai']),
+        ("Tanggal Selesai", a['tanggal_selesai']),
+        ("Dibuat Oleh", a['created_by']),
+        ("Institusi", a['institution']),
+        ("Industri", a['company_industry']),
+        ("Tipe Perusahaan", a['company_type']),
+        ("Aset Perusahaan", a['company_assets']),
+        ("Batas Risiko", f"{a['currency'] or ''} {a['risk_limit']:,.0f}".strip() if a['risk_limit'] is not None else None),
+        ("Kategori Risiko", a['risk_categories']),
+        ("Tujuan Proyek", a['project_objective']),
+    ]
+    return [(label, _text(value)) for label, value in rows if value not in (None, "")]
+
+
+# =========================================================================
+# Renderer HTML
+# =========================================================================
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<title>Laporan Asesmen AI - {{ a.nama_asesmen }}</title>
+<style>
+  @page { size: A4; margin: 18mm 16mm; }
+  body { font-family: Arial, Helvetica, sans-serif; font-size: 11px; color: #1f2937; margin: 0; }
+  .page { page-break-after: always; padding: 24px; }
+  .page:last-child { page-break-after: auto; }
+  h1 { font-size: 20px; margin: 0 0 4px; }
+  h2 { font-size: 14px; margin: 18px 0 6px; color: #1e3a8a; border-bottom: 1px solid #cbd5e1; padding-bottom: 2px; }
+  table { width: 100%; border-collapse: collapse; }
+  th, td { border: 1px solid #cbd5e1; padding: 4px 6px; vertical-align: top; text-align: left; }
+  th { background: #1e3a8a; color: #fff; }
+  .info td:first-child { width: 30%; font-weight: bold; background: #f1f5f9; }
+  .num { text-align: center; white-space: nowrap; }
+  .footer { margin-top: 16px; font-size: 9px; color: #64748b; text-align: right; }
+  .critical { margin-bottom: 8px; }
+</style>
+</head>
+<body>
+{% for page in pages %}
+<div class="page">
+  {% if page.kind == 'summary' %}
+  <h1>Laporan Asesmen Risiko AI</h1>
+  <div>{{ a.nama_asesmen }}</div>
+  <h2>Informasi Asesmen</h2>
+  <table class="info">
+    {% for label, value in info %}<tr><td>{{ label }}</td><td>{{ value }}</td></tr>{% endfor %}
+  </table>
+  {% for title, kind, content in sections %}
+  <h2>{{ title }}</h2>
+  {% if kind == 'paragraph' %}<p>{{ content }}</p>
+  {% elif kind == 'list' %}<ol>{% for item in content %}<li>{{ item }}</li>{% endfor %}</ol>
+  {% elif kind == 'pairs' %}<table class="info">{% for k, v in content %}<tr><td>{{ k }}</td><td>{{ v }}</td></tr>{% endfor %}</table>
+  {% elif kind == 'critical' %}{% for item in content %}
+    <div class="critical"><strong>{{ item.risk_code }}</strong> {{ item.discussion }}{% if item.mitigation_target %}<br><em>{{ item.mitigation_target }}</em>{% endif %}</div>
+  {% endfor %}{% endif %}
+  {% endfor %}
+  {% if not sections %}<p><em>Ringkasan AI belum dibuat untuk asesmen ini.</em></p>{% endif %}
+  {% else %}
+  <h2>Risk Register ({{ page.first }}-{{ page.last }} dari {{ risk_count }})</h2>
+  <table>
+    <tr><th>No</th><th>Kode</th><th>Risiko</th><th>Tipe</th><th class="num">Inheren (L x I)</th><th class="num">Residual (L x I)</th><th>Rencana Mitigasi</th></tr>
+    {% for r in page.risks %}
+    <tr>
+      <td class="num">{{ page.first + loop.index0 }}</td>
+      <td>{{ r.kode_risiko }}</td>
+      <td>{% if r.title %}<strong>{{ r.title }}</strong><br>{% endif %}{{ r.deskripsi_risiko or '' }}</td>
+      <td>{{ r.risk_type or '-' }}</td>
+      <td class="num">{{ r.inherent_score if r.inherent_score is not none else '-' }}{% if r.inherent_score is not none %} ({{ r.inherent_likelihood }} x {{ r.inherent_impact }})<br>{{ level(r.inherent_score) }}{% endif %}</td>
+      <td class="num">{{ r.residual_score if r.residual_score is not none else '-' }}{% if r.residual_score is not none %} ({{ r.residual_likelihood }} x {{ r.residual_impact }})<br>{{ level(r.residual_score) }}{% endif %}</td>
+      <td>{{ r.mitigation_plan or '-' }}</td>
+    </tr>
+    {% endfor %}
+  </table>
+  {% endif %}
+  <div class="footer">{{ a.nama_asesmen }} &middot; Halaman {{ loop.index }} dari {{ pages|length }}</div>
+</div>
+{% endfor %}
+</body>
+</html>
+"""
+
+_jinja = Environment(autoescape=True, trim_blocks=True, lstrip_blocks=True)
+_html_template = None
+
+
+def render_html(payload):
+    global _html_template
+    if _html_template is None:
+        _html_template = _jinja.from_string(_HTML_TEMPLATE)
+    risks = payload['risks']
+    pages = [{"kind": 'summary'}]
+    for start in range(0, len(risks), RISKS_PER_HTML_PAGE):
+        chunk = risks[start:start + RISKS_PER_HTML_PAGE]
+        pages.append({"kind": 'risks', "risks": chunk, "first": start + 1, "last": start + len(chunk)})
+    return _html_template.render(
+        a=payload['assessment'], info=info_rows(payload), sections=report_sections(payload),
+        pages=pages, risk_count=len(risks), level=_risk_level
+    ).encode('utf-8')
+
+
+# =========================================================================
+# Renderer PDF (A4, reportlab)
+# =========================================================================
+PDF_MARGIN = 50.0
+HEADER_BLUE = '#1e3a8a'
+HEADER_SLATE = '#64748b'
+GRID_COLOR = '#cbd5e1'
+
+
+def _pdf_text(value):
+    """Teks biasa -> markup Paragraph reportlab (escape XML, baris baru jadi <br/>)."""
+    from xml.sax.saxutils import escape
+    return escape(_text(value)).replace('\r', '').replace('\n', '<br/>')
+
+
+def _pdf_styles():
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+
+    base = getSampleStyleSheet()
+    body = ParagraphStyle('ReportBody', parent=base['Normal'], fontName='Helvetica', fontSize=10, leading=13.5,
+                          spaceAfter=4)
+    return {
+        "title": ParagraphStyle('ReportTitle', parent=body, fontName='Helvetica-Bold', fontSize=18, leading=22),
+        "subtitle": ParagraphStyle('ReportSubtitle', parent=body, fontSize=12, leading=16, spaceAfter=6),
+        "heading": ParagraphStyle('ReportHeading', parent=body, fontName='Helvetica-Bold', fontSize=13, leading=16,
+                                  textColor=colors.HexColor(HEADER_BLUE), spaceBefore=10, spaceAfter=6),
+        "body": body,
+        "bold": ParagraphStyle('ReportBold', parent=body, fontName='Helvetica-Bold'),
+        "small": ParagraphStyle('ReportSmall', parent=body, fontSize=9, leading=12),
+        "cell": ParagraphStyle('ReportCell', parent=body, fontSize=8, leading=10.4, spaceAfter=0),
+        "cell_header": ParagraphStyle('ReportCellHeader', parent=body, fontName='Helvetica-Bold', fontSize=8,
+                                      leading=10.4, spaceAfter=0, textColor=colors.white),
+    }
+
+
+def _pdf_table(headers, widths, rows, styles, header_color, cell_style='cell'):
+    """Tabel dengan sel ter-wrap; baris header diulang di setiap halaman (repeatRows)."""
+    from reportlab.lib import colors
+    from reportlab.platypus import Paragraph, Table, TableStyle
+
+    data = [[Paragraph(_pdf_text(h), styles['cell_header']) for h in headers]]
+    data += [[Paragraph(_pdf_text(cell), styles[cell_style]) for cell in row] for row in rows]
+    table = Table(data, colWidths=widths, repeatRows=1, hAlign='LEFT')
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor(GRID_COLOR)),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 3), ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+        ('TOPPADDING', (0, 0), (-1, -1), 3), ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    return table
+
+
+def _numbered_canvas(footer_text):
+    """Canvas yang menunda penulisan halaman agar footer bisa memuat 'Halaman X dari Y'."""
+    from reportlab.lib import colors
+    from reportlab.pdfgen.canvas import Canvas
+
+    class NumberedCanvas(Canvas):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._page_states = []
+
+        def showPage(self):
+            self._page_states.append(dict(self.__dict__))
+            self._startPage()
+
+        def save(self):
+            total = len(self._page_states)
+            for number, state in enumerate(self._page_states, 1):
+                self.__dict__.update(state)
+                self.setFont('Helvetica', 8)
+                self.setFillColor(colors.HexColor(HEADER_SLATE))
+                self.drawRightString(self._pagesize[0] - PDF_MARGIN, 30, f"{footer_text} - Halaman {number} dari {total}")
+                super().showPage()
+            super().save()
+
+    return NumberedCanvas
+
+
+def render_pdf(payload):
+    # reportlab di-import di dalam worker render, bukan saat startup aplikasi
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import ListFlowable, PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+    a = payload['assessment']
+    styles = _pdf_styles()
+    content_width = A4[0] - 2 * PDF_MARGIN
+    story = [
+        Spacer(1, 10),
+        Paragraph("Laporan Asesmen Risiko AI", styles['title']),
+        Paragraph(_pdf_text(a['nama_asesmen']), styles['subtitle']),
+        Paragraph("Informasi Asesmen", styles['heading']),
+        _pdf_table(["Keterangan", "Nilai"], [150, content_width - 150], info_rows(payload), styles,
+                   HEADER_SLATE, 'small'),
+    ]
+
+    sections = report_sections(payload)
+    for title, kind, content in sections:
+        story.append(Paragraph(_pdf_text(title), styles['heading']))
+        if kind == 'paragraph':
+            story.append(Paragraph(_pdf_text(content), styles['body']))
+        elif kind == 'list':
+            story.append(ListFlowable([Paragraph(_pdf_text(item), styles['body']) for item in content],
+                                      bulletType='1', bulletFormat='%s.', leftIndent=18))
+        elif kind == 'pairs':
+            story.append(_pdf_table(["Level", "Jumlah"], [200, 80], content, styles, HEADER_SLATE, 'small'))
+        elif kind == 'critical':
+            for item in content:
+                story.append(Paragraph(_pdf_text(item['risk_code']), styles['bold']))
+                story.append(Paragraph(_pdf_text(item['discussion']), styles['body']))
+                if item['mitigation_target']:
+                    story.append(Paragraph(_pdf_text(item['mitigation_target']), styles['small']))
+    if not sections:
+        story.append(Paragraph("Ringkasan AI belum dibuat untuk asesmen ini.", styles['body']))
+
+    risks = payload['risks']
+    if risks:
+        def score_text(score, likelihood, impact):
+            return "-" if score is None else f"{score} ({likelihood} x {impact})\n{_risk_level(score)}"
+
+        story += [PageBreak(), Paragraph(f"Risk Register ({len(risks)} risiko)", styles['heading'])]
+        story.append(_pdf_table(
+            ["No", "Kode", "Risiko", "Tipe", "Inheren", "Residual", "Rencana Mitigasi"],
+            [22, 50, 150, 55, 58, 58, content_width - 393],
+            [[
+                str(index), _text(r['kode_risiko']),
+                "\n".join(filter(None, [_text(r['title']), _text(r['deskripsi_risiko'])])),
+                _text(r['risk_type']) or "-",
+                score_text(r['inherent_score'], r['inherent_likelihood'], r['inherent_impact']),
+                score_text(r['residual_score'], r['residual_likelihood'], r['residual_impact']),
+                _text(r['mitigation_plan']) or "-",
+            ] for index, r in enumerate(risks, 1)],
+            styles, HEADER_BLUE
+        ))
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=PDF_MARGIN, rightMargin=PDF_MARGIN,
+                            topMargin=PDF_MARGIN, bottomMargin=PDF_MARGIN,
+                            title=f"Laporan Asesmen AI - {_text(a['nama_asesmen'])}")
+    doc.build(story, canvasmaker=_numbered_canvas(_text(a['nama_asesmen'])))
+    return buffer.getvalue()
+
+
+RENDERERS = {'pdf': render_pdf, 'html': render_html}
+
+
+def render_report_to_file(fmt, payload, path):
+    """Dijalankan di process pool: render lalu tulis atomik ke path cache."""
+    data = RENDERERS[fmt](payload)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+# =========================================================================
+# Process pool & cache
+# =========================================================================
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = current_app.config.get('REPORT_WORKERS') or os.cpu_count() or 1
+            method = current_app.config.get('REPORT_POOL_START_METHOD') or DEFAULT_START_METHOD
+            context = multiprocessing.get_context(method)
+            if method == 'forkserver':
+                # Server fork (proses satu-thread) hanya memuat modul renderer; worker di-fork
+                # dari sana, bukan dari worker web. Seperti spawn, worker baru tetap meng-import
+                # __main__ sekali (gunicorn: no-op; `python run.py`: create_app tanpa scheduler,
+                # yang baru berjalan saat request pertama).
+                context.set_forkserver_preload(['app.assessment_report'])
+            # Entry point render_report_to_file ada di level modul -> bisa di-pickle
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool
+
+
+def _reset_pool(terminate=False):
+    """Membuang pool; terminate=True juga menghentikan worker yang masih merender (render macet)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    if terminate:
+        # Future yang sudah berjalan tidak bisa di-cancel; satu-satunya cara membebaskan slot
+        # adalah menghentikan prosesnya. Request lain yang memakai pool ini jatuh ke BrokenProcessPool.
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _cache_dir():
+    directory = current_app.config['REPORT_CACHE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def report_cache_path(digest, fmt):
+    return os.path.join(_cache_dir(), f"{digest}.{fmt}")
+
+
+def _render_many(jobs):
+    """jobs: list (fmt, payload, path). Dirender paralel di pool (atau inline jika REPORT_WORKERS=0)."""
+    if not jobs:
+        return
+    timeout = current_app.config.get('REPORT_RENDER_TIMEOUT', DEFAULT_RENDER_TIMEOUT)
+    if current_app.config.get('REPORT_WORKERS') == 0:
+        for job in jobs:
+            render_report_to_file(*job)
+        return
+    futures = []
+    try:
+        futures = [_get_pool().submit(render_report_to_file, *job) for job in jobs]
+        for future in futures:
+            future.result(timeout=timeout)
+    except TimeoutError:
+        # Render macet tetap menahan slot worker walau request sudah menyerah -> daur ulang pool
+        for future in futures:
+            future.cancel()
+        print(f"Render laporan melebihi {timeout} detik, process pool laporan didaur ulang.")
+        _reset_pool(terminate=True)
+        raise
+    except BrokenProcessPool as e:
+        # Worker mati (mis. OOM): pool dibuat ulang pada request berikutnya, job ini dirender inline
+        print(f"Process pool laporan rusak, render inline: {e}")
+        _reset_pool()
+        for job in jobs:
+            if not os.path.exists(job[2]):
+                render_report_to_file(*job)
+
+
+def get_or_render_report(payload, fmt):
+    """(path, hash, hit) untuk satu laporan; render di pool hanya jika isi belum pernah dirender."""
+    digest = report_hash(payload, fmt)
+    path = report_cache_path(digest, fmt)
+    if os.path.exists(path):
+        try:
+            os.utime(path)  # Tandai baru dipakai (LRU)
+            return path, digest, True
+        except OSError:
+            pass
+    _render_many([(fmt, payload, path)])
+    _evict()
+    return path, digest, False
+
+
+def build_report_bundle(payloads, fmt):
+    """
+    ZIP semua laporan (file sementara; pemanggil menghapusnya).
+    Cache miss dirender serentak di pool. Mengembalikan (path zip, jumlah hit, jumlah miss).
+
+    Bundle bisa lebih besar dari kapasitas cache, jadi file hasil render boleh saja
+    sudah di-evict request lain saat dikemas; laporan itu dirender langsung ke ZIP.
+    """
+    entries, jobs = [], []
+    for payload in payloads:
+        digest = report_hash(payload, fmt)
+        path = report_cache_path(digest, fmt)
+        if not os.path.exists(path) and all(job[2] != path for job in jobs):
+            jobs.append((fmt, payload, path))
+        entries.append((report_filename(payload, fmt), path, payload))
+    _render_many(jobs)
+
+    fd, zip_path = tempfile.mkstemp(suffix='.zip')
+    try:
+        with os.fdopen(fd, 'wb') as fp, zipfile.ZipFile(fp, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for name, path, payload in entries:
+                try:
+                    # write() membuka file sebelum menulis entri ZIP; file yang sudah terbuka
+                    # tetap utuh walau di-unlink oleh eviction setelahnya
+                    bundle.write(path, arcname=name)
+                except FileNotFoundError:
+                    bundle.writestr(name, RENDERERS[fmt](payload))
+                    continue
+                try:
+                    os.utime(path)  # Tandai baru dipakai (LRU)
+                except OSError:
+                    pass
+    except Exception:
+        os.remove(zip_path)
+        raise
+    _evict()
+    return zip_path, len(entries) - len(jobs), len(jobs)
+
+
+def _evict():
+    evict_lru_files(
+        _cache_dir(), tuple(f'.{fmt}' for fmt in REPORT_FORMATS),
+        current_app.config.get('REPORT_CACHE_MAX_FILES', DEFAULT_CACHE_MAX_FILES),
+        current_app.config.get('REPORT_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+    )
+
+
+def init_reports(app):
+    app.config.setdefault('REPORT_CACHE_DIR', os.path.join(app.instance_path, 'report_cache'))
+    if os.environ.get('REPORT_WORKERS') is not None:
+        app.config.setdefault('REPORT_WORKERS', int(os.environ['REPORT_WORKERS']))
+    app.config.setdefault('REPORT_CACHE_MAX_FILES', DEFAULT_CACHE_MAX_FILES)
+    app.config.setdefault('REPORT_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+    app.config.setdefault('REPORT_RENDER_TIMEOUT', DEFAULT_RENDER_TIMEOUT)
+    app.config.setdefault('REPORT_POOL_START_METHOD', os.getenv('REPORT_POOL_START_METHOD'))
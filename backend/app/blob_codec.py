@@ -0,0 +1,40 @@
+# backend/app/blob_codec.py
+"""
+Kompresi payload JSON besar yang disimpan sebagai blob biner.
+
+zstd dipakai jika paket `zstandard` terpasang (ada di requirements.txt), selain
+itu gzip (stdlib). Format dikenali dari magic bytes saat dekompresi, jadi blob lama tetap
+terbaca walaupun codec default berubah.
+"""
+import gzip
+import json
+
+try:
+    import zstandard
+except ImportError:  # Opsional: fallback ke gzip
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def compress_json(value, level=None):
+    raw = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=level or 10).compress(raw)
+    return gzip.compress(raw, compresslevel=level or 6)
+
+
+def decompress_json(blob):
+    if not blob:
+        return None
+    blob = bytes(blob)
+    if blob.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Blob terkompresi zstd tetapi paket 'zstandard' tidak terpasang.")
+        raw = zstandard.ZstdDecompressor().decompress(blob)
+    elif blob.startswith(GZIP_MAGIC):
+        raw = gzip.decompress(blob)
+    else:
+        raw = blob  # JSON polos (tidak terkompresi)
+    return json.loads(raw.decode('utf-8'))
@@ -0,0 +1,90 @@
+# backend/app/compression.py
+"""
+Kompresi response API (gzip / brotli) berdasarkan header Accept-Encoding.
+
+Hanya response teks (JSON, HTML, CSV, JS, SVG) dengan ukuran di atas
+COMPRESS_MIN_SIZE yang dikompres; file biner (Excel, gambar, PDF) dan
+response streaming dilewati karena sudah terkompresi / tidak bisa dibuffer.
+
+Konfigurasi (env / app.config):
+- COMPRESS_ENABLED   : 'false' untuk menonaktifkan (default aktif)
+- COMPRESS_MIN_SIZE  : ukuran minimum body dalam byte (default 1024)
+- COMPRESS_LEVEL     : level gzip 1-9 (default 6)
+- COMPRESS_BR_QUALITY: kualitas brotli 0-11 (default 5)
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli opsional
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BR_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+def _is_compressible(mimetype):
+    return bool(mimetype) and (mimetype in COMPRESSIBLE_MIMETYPES or mimetype.startswith('text/'))
+
+
+def choose_encoding(accept_encodings):
+    """Memilih encoding terbaik yang didukung server & klien ('br', 'gzip', atau None)."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_body(body, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(body, quality=config.get('COMPRESS_BR_QUALITY', DEFAULT_BR_QUALITY))
+    return gzip.compress(body, compresslevel=config.get('COMPRESS_LEVEL', DEFAULT_GZIP_LEVEL), mtime=0)
+
+
+def init_compression(app):
+    """Mendaftarkan hook after_request untuk kompresi response."""
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+
+    @app.after_request
+    def _compress_response(response):
+        if not app.config.get('COMPRESS_ENABLED', True):
+            return response
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not _is_compressible(response.mimetype)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        body = response.get_data()
+        if len(body) < app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+
+        compressed = compress_body(body, encoding, app.config)
+        if len(compressed) >= len(body):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # Representasi berbeda dari body asli -> ETag menjadi weak (304 tetap berlaku)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,112 @@
+# backend/app/db_engine.py
+"""
+Konfigurasi engine database dari environment + routing ke replika baca.
+
+Pool (dipakai engine utama & replika, hanya untuk server DB, bukan SQLite):
+    DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT detik (30),
+    DB_POOL_RECYCLE detik (1800), DB_POOL_PRE_PING (true)
+PostgreSQL:
+    DB_STATEMENT_TIMEOUT_MS (30000, 0 = tanpa batas)
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS (0 = nonaktif)
+Replika:
+    DATABASE_REPLICA_URL -> endpoint yang ditandai @read_replica membaca dari
+    replika. Flush/INSERT/UPDATE/DELETE/SELECT FOR UPDATE dan session.connection()
+    tetap ke primary, jadi endpoint yang tidak sengaja menulis tetap aman
+    (hanya data yang baru ditulisnya belum tentu terbaca dari replika).
+"""
+import os
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    return default if value in (None, '') else value.lower() not in ('0', 'false', 'no')
+
+
+def engine_options_for(url):
+    """SQLALCHEMY_ENGINE_OPTIONS untuk URL database (dict kosong jika URL belum diset)."""
+    if not url:
+        return {}
+    backend = make_url(url).get_backend_name()
+    if backend == 'sqlite':
+        # SQLite lokal (dev/test): pool bawaan Flask-SQLAlchemy sudah sesuai
+        return {}
+
+    options = {
+        "pool_size": _env_int('DB_POOL_SIZE', 5),
+        "max_overflow": _env_int('DB_MAX_OVERFLOW', 10),
+        "pool_timeout": _env_int('DB_POOL_TIMEOUT', 30),
+        "pool_recycle": _env_int('DB_POOL_RECYCLE', 1800),
+        "pool_pre_ping": _env_bool('DB_POOL_PRE_PING', True),
+    }
+    if backend == 'postgresql':
+        settings = []
+        statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+        if statement_timeout:
+            settings.append(f"-c statement_timeout={statement_timeout}")
+        idle_timeout = _env_int('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 0)
+        if idle_timeout:
+            settings.append(f"-c idle_in_transaction_session_timeout={idle_timeout}")
+        if settings:
+            options["connect_args"] = {"options": " ".join(settings)}
+    return options
+
+
+def configure_database(app):
+    """Mengisi URI, opsi engine & bind replika di app.config (dipanggil sebelum db.init_app)."""
+    url = os.getenv('DATABASE_URL')
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_for(url)
+
+    replica_url = os.getenv('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = {
+            REPLICA_BIND: {"url": replica_url, **engine_options_for(replica_url)}
+        }
+
+
+def read_replica(view):
+    """Menandai endpoint read-only (dashboard, list, export) agar SELECT-nya ke replika."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _is_plain_select(clause):
+    return bool(getattr(clause, 'is_select', False)) and getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy yang mengarahkan SELECT endpoint @read_replica ke replika."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and _is_plain_select(clause)
+                and has_request_context() and g.get('db_read_replica')):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def release_db_connection():
+    """
+    Mengakhiri transaksi berjalan agar koneksi kembali ke pool sebelum panggilan
+    lambat (model AI, scraping). Objek ORM tetap terpasang di session dan dimuat
+    ulang otomatis saat diakses lagi. Panggil hanya saat tidak ada perubahan yang
+    belum siap di-commit.
+    """
+    from app import db
+    db.session.commit()
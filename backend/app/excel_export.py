@@ -0,0 +1,474 @@
+# backend/app/excel_export.py
+"""
+Engine export Excel bersama untuk Asesmen Dasar, Madya, AI & Main Risk Register.
+
+- Isi workbook dideskripsikan secara deklaratif (`WorkbookSpec` -> `SheetSpec`
+  -> blok `Title`/`Fields`/`Merged`/`Table`/`Custom`), bukan ratusan baris
+  styling openpyxl per endpoint. Spesifikasi tiap jenis export ada di
+  `app.export_specs`.
+- Objek style (Font/Fill/Border/Alignment) dibuat sekali per proses dan dipakai
+  ulang untuk semua sel & workbook. openpyxl baru diimpor saat export pertama,
+  bukan saat startup (modul ini juga memuat listener stempel yang selalu aktif).
+- File hasil di-cache di disk dengan key (jenis export, id, stempel perubahan,
+  versi template). Download berulang untuk data yang sama langsung dikirim
+  sebagai file statis; cache dibatasi jumlah file & total byte (LRU via mtime).
+- Stempel perubahan = kolom `updated_at` objek induk. Perubahan baris anak lewat
+  ORM otomatis menyentuh `updated_at` induknya (listener after_flush); jalur
+  bulk SQL memanggil `touch_export_stamps` secara eksplisit.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, send_file
+from sqlalchemy import event
+
+from app import db
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+DEFAULT_CACHE_MAX_FILES = 200
+DEFAULT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+_evict_lock = threading.Lock()
+_stamp_parents = {}  # model anak -> (model induk, atribut FK ke induk)
+_stamp_roots = set()  # model induk dengan kolom updated_at
+
+
+# --- Style bersama (objek openpyxl dibuat saat pertama dipakai, lalu di-cache) ---
+FONT_SPECS = {
+    'bold': dict(bold=True),
+    'white_bold': dict(bold=True, color="FFFFFF"),
+    'black_bold': dict(bold=True, color="000000"),
+    'small_bold': dict(bold=True, color="000000", size=9),
+}
+
+ALIGNMENT_SPECS = {
+    'center': dict(horizontal='center', vertical='center', wrap_text=True),
+    'center_nowrap': dict(horizontal='center', vertical='center'),
+    'center_top': dict(horizontal='center', vertical='top', wrap_text=True),
+    'header': dict(wrap_text=True, horizontal='center'),
+    'left': dict(horizontal='left', vertical='top', wrap_text=True),
+    'right': dict(horizontal='right', vertical='center'),
+    'right_top': dict(horizontal='right', vertical='top'),
+    'vertical': dict(horizontal='center', vertical='center', text_rotation=90),
+}
+
+
+@lru_cache(maxsize=None)
+def font(name):
+    from openpyxl.styles import Font
+    return Font(**FONT_SPECS[name])
+
+
+@lru_cache(maxsize=None)
+def alignment(name):
+    from openpyxl.styles import Alignment
+    return Alignment(**ALIGNMENT_SPECS[name])
+
+
+@lru_cache(maxsize=1)
+def thin_border():
+    from openpyxl.styles import Border, Side
+    side = Side(style='thin')
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+@lru_cache(maxsize=128)
+def solid_fill(color):
+    """PatternFill solid per warna (hex RRGGBB / AARRGGBB), di-cache per proses."""
+    from openpyxl.styles import PatternFill
+    color = (color or 'FFFFFF').lstrip('#')
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def column_letter(col_idx):
+    from openpyxl.utils import get_column_letter
+    return get_column_letter(col_idx)
+
+
+class CellStyle:
+    """
+    Kombinasi style sel yang dipakai ulang (semua atribut opsional).
+    font/fill/align boleh nama (str) atau objek openpyxl; nama di-resolve saat apply pertama.
+    """
+
+    def __init__(self, font=None, fill=None, align=None, border=True, number_format=None):
+        self._spec = (font, fill, align, border)
+        self._resolved = None
+        self.number_format = number_format
+
+    def _resolve(self):
+        font_, fill, align, border = self._spec
+        self._resolved = (
+            font(font_) if isinstance(font_, str) else font_,
+            solid_fill(fill) if isinstance(fill, str) else fill,
+            alignment(align) if isinstance(align, str) else align,
+            thin_border() if border is True else (border or None),
+        )
+        return self._resolved
+
+    def apply(self, cell):
+        font_, fill, align, border = self._resolved or self._resolve()
+        if font_ is not None:
+            cell.font = font_
+        if fill is not None:
+            cell.fill = fill
+        if align is not None:
+            cell.alignment = align
+        if border is not None:
+            cell.border = border
+        if self.number_format:
+            cell.number_format = self.number_format
+
+
+STYLES = {
+    'title': CellStyle(font='bold', border=False),
+    'label': CellStyle(font='bold', border=False),
+    'header': CellStyle(font='white_bold', fill='4F81BD', align='center'),
+    'cell': CellStyle(align='left'),
+    'cell_center': CellStyle(align='center'),
+    'cell_right': CellStyle(align='right_top'),
+    'plain': CellStyle(border=False),
+}
+
+CURRENCY_FORMAT = '"Rp"#,##0'
+CURRENCY_SIGNED_FORMAT = '"Rp"#,##0_);[Red]("-Rp"#,##0)'
+PERCENT_FORMAT = '#,##0.0"%"'
+
+
+def format_date(value, fmt='%d %B %Y'):
+    return value.strftime(fmt) if value else ""
+
+
+# --- Spesifikasi deklaratif ---
+class Column:
+    """
+    Satu kolom tabel.
+
+    value: nama atribut / key dict, atau fungsi (row, index) -> nilai.
+    style: nama di STYLES, CellStyle, atau fungsi nilai -> CellStyle (mis. warna skala).
+    """
+
+    def __init__(self, header, value, width=None, style='cell', number_format=None):
+        self.header = header
+        self.width = width
+        self.number_format = number_format
+        if callable(value):
+            self.getter = value
+        else:
+            self.getter = lambda row, index, key=value: row.get(key) if isinstance(row, dict) else getattr(row, key)
+        self._style = style
+
+    def style_for(self, value):
+        style = self._style(value) if callable(self._style) and not isinstance(self._style, CellStyle) else self._style
+        return STYLES[style] if isinstance(style, str) else style
+
+
+def row_number(row, index):
+    return index + 1
+
+
+class Title:
+    """Judul di kolom A (opsional dengan nilai di kolom B), lalu baris kosong."""
+
+    def __init__(self, text, value=None, blank_after=1):
+        self.text = text
+        self.value = value
+        self.blank_after = blank_after
+
+    def render(self, ws, ctx, row):
+        cell = ws.cell(row=row, column=1, value=self.text)
+        STYLES['title'].apply(cell)
+        if self.value is not None:
+            ws.cell(row=row, column=2, value=self.value(ctx) if callable(self.value) else self.value)
+        return row + 1 + self.blank_after
+
+
+class Fields:
+    """Pasangan label (tebal) & nilai, satu per baris."""
+
+    def __init__(self, items, value_fill=None, blank_after=0):
+        self.items = items
+        self.value_style = CellStyle(fill=value_fill, border=False) if value_fill else STYLES['plain']
+        self.blank_after = blank_after
+
+    def render(self, ws, ctx, row):
+        for label, value in self.items:
+            STYLES['label'].apply(ws.cell(row=row, column=1, value=label))
+            self.value_style.apply(ws.cell(row=row, column=2, value=value(ctx) if callable(value) else value))
+            row += 1
+        return row + self.blank_after
+
+
+class Merged:
+    """Sel gabungan di posisi absolut (tidak menggeser baris berikutnya)."""
+
+    def __init__(self, cell_range, text, style):
+        self.cell_range = cell_range
+        self.text = text
+        self.style = STYLES[style] if isinstance(style, str) else style
+
+    def render(self, ws, ctx, row):
+        ws.merge_cells(self.cell_range)
+        cell = ws[self.cell_range.split(':')[0]]
+        cell.value = self.text
+        self.style.apply(cell)
+        return row
+
+
+class Blank:
+    def __init__(self, count=1):
+        self.count = count
+
+    def render(self, ws, ctx, row):
+        return row + self.count
+
+
+class Table:
+    """Header + baris data; rows: fungsi ctx -> iterable objek/dict."""
+
+    def __init__(self, columns, rows, header_style='header', row_height=None, start_column=1):
+        self.columns = columns
+        self.rows = rows
+        self.header_style = STYLES[header_style] if isinstance(header_style, str) else header_style
+        self.row_height = row_height
+        self.start_column = start_column
+
+    def render(self, ws, ctx, row):
+        first_col = self.start_column
+        for offset, column in enumerate(self.columns):
+            col_idx = first_col + offset
+            self.header_style.apply(ws.cell(row=row, column=col_idx, value=column.header))
+            if column.width:
+                ws.column_dimensions[column_letter(col_idx)].width = column.width
+        row += 1
+
+        getters = [column.getter for column in self.columns]
+        for index, item in enumerate(self.rows(ctx)):
+            for offset, (column, getter) in enumerate(zip(self.columns, getters)):
+                value = getter(item, index)
+                cell = ws.cell(row=row, column=first_col + offset, value=value)
+                style = column.style_for(value)
+                if style is not None:
+                    style.apply(cell)
+                if column.number_format:
+                    cell.number_format = column.number_format
+            if self.row_height:
+                ws.row_dimensions[row].height = self.row_height
+            row += 1
+        return row
+
+
+class Custom:
+    """Blok bebas untuk layout yang tidak tabular: fn(ws, ctx, row) -> baris berikutnya."""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def render(self, ws, ctx, row):
+        next_row = self.fn(ws, ctx, row)
+        return row if next_row is None else next_row
+
+
+class SheetSpec:
+    def __init__(self, title, blocks, landscape=False, widths=None):
+        self.title = title
+        self.blocks = blocks
+        self.landscape = landscape
+        self.widths = widths or {}
+
+    def render(self, wb, ctx):
+        ws = wb.create_sheet(title=self.title)
+        if self.landscape:
+            ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
+        row = 1
+        for block in self.blocks:
+            row = block.render(ws, ctx, row)
+        for col_letter, width in self.widths.items():
+            ws.column_dimensions[col_letter].width = width
+        return ws
+
+
+class WorkbookSpec:
+    """
+    name: nama jenis export (bagian key cache & nama file cache).
+    sheets: daftar SheetSpec; fungsi ctx -> SheetSpec juga diterima.
+    """
+
+    def __init__(self, name, sheets):
+        self.name = name
+        self.sheets = sheets
+
+    def build(self, ctx):
+        import openpyxl
+        wb = openpyxl.Workbook()
+        wb.remove(wb.active)
+        for sheet in self.sheets:
+            (sheet(ctx) if callable(sheet) else sheet).render(wb, ctx)
+        return wb
+
+
+# --- Cache file di disk ---
+def _cache_dir():
+    path = current_app.config.get('EXPORT_CACHE_DIR')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def export_cache_path(spec_name, key_parts):
+    digest = hashlib.sha1(repr((spec_name, tuple(key_parts))).encode('utf-8')).hexdigest()
+    return os.path.join(_cache_dir(), f"{spec_name}-{digest}.xlsx")
+
+
+def evict_lru_files(directory, extensions, max_files, max_bytes):
+    """Menghapus file paling lama tidak dipakai (mtime) sampai batas jumlah & ukuran terpenuhi."""
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(extensions):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > max_files or total > max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def _evict(directory):
+    evict_lru_files(
+        directory, ('.xlsx',),
+        current_app.config.get('EXPORT_CACHE_MAX_FILES', DEFAULT_CACHE_MAX_FILES),
+        current_app.config.get('EXPORT_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+    )
+
+
+def get_or_build_export(spec, ctx, key_parts):
+    """
+    Path file xlsx untuk (spec, key); dibuat & disimpan ke cache jika belum ada.
+    ctx boleh berupa fungsi tanpa argumen agar data hanya dimuat saat cache miss.
+    """
+    if callable(ctx):
+        ctx_factory = ctx
+    else:
+        ctx_factory = lambda: ctx
+
+    if not current_app.config.get('EXPORT_CACHE_ENABLED', True):
+        buffer = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        spec.build(ctx_factory()).save(buffer)
+        buffer.close()
+        return buffer.name, False
+
+    path = export_cache_path(spec.name, key_parts)
+    if os.path.exists(path):
+        try:
+            os.utime(path)  # Tandai baru dipakai (LRU)
+            return path, True
+        except OSError:
+            pass  # Baru saja di-evict worker lain -> buat ulang
+
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            spec.build(ctx_factory()).save(fp)
+        os.replace(tmp_path, path)  # Atomik: worker lain tidak pernah melihat file setengah jadi
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _evict(directory)
+    return path, False
+
+
+def send_export(spec, ctx, key_parts, download_name):
+    """Response download xlsx (dari cache jika tersedia)."""
+    path, hit = get_or_build_export(spec, ctx, key_parts)
+    response = send_file(path, as_attachment=True, download_name=download_name,
+                         mimetype=XLSX_MIMETYPE, max_age=0)
+    response.headers['X-Export-Cache'] = 'HIT' if hit else 'MISS'
+    if not current_app.config.get('EXPORT_CACHE_ENABLED', True):
+        response.call_on_close(lambda: os.remove(path) if os.path.exists(path) else None)
+    return response
+
+
+def clear_export_cache():
+    directory = _cache_dir()
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith('.xlsx'):
+            os.remove(entry.path)
+
+
+# --- Stempel perubahan (updated_at induk) ---
+def stamp_of(obj):
+    """Nilai stempel untuk key cache (ISO string agar stabil di repr)."""
+    value = getattr(obj, 'updated_at', None) or getattr(obj, 'created_at', None)
+    return value.isoformat() if value else None
+
+
+def register_stamp_parent(child_model, parent_model, foreign_key='assessment_id'):
+    """Perubahan baris `child_model` menyentuh `updated_at` baris `parent_model` induknya."""
+    _stamp_parents[child_model] = (parent_model, foreign_key)
+    _stamp_roots.add(parent_model)
+
+
+def touch_export_stamps(parent_model, ids, session=None):
+    """Menyentuh `updated_at` induk secara eksplisit (dipakai jalur bulk SQL)."""
+    ids = sorted({i for i in ids if i is not None})
+    if not ids:
+        return
+    table = parent_model.__table__
+    (session or db.session).connection().execute(
+        table.update().where(table.c.id.in_(ids)).values(updated_at=datetime.utcnow())
+    )
+
+
+def _after_flush(session, flush_context):
+    touched = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        mapping = _stamp_parents.get(type(obj))
+        if mapping is not None:
+            parent_model, foreign_key = mapping
+            # __dict__: objek terhapus tidak boleh memicu lazy load
+            touched.setdefault(parent_model, set()).add(obj.__dict__.get(foreign_key))
+        elif type(obj) in _stamp_roots and obj in session.dirty and obj not in session.deleted \
+                and not session.is_modified(obj, include_collections=False) \
+                and session.is_modified(obj, include_collections=True):
+            # Hanya koleksi (mis. many-to-many) yang berubah -> onupdate kolom tidak terpicu
+            touched.setdefault(type(obj), set()).add(obj.__dict__.get('id'))
+    for parent_model, ids in touched.items():
+        touch_export_stamps(parent_model, ids, session=session)
+
+
+def _register_defaults():
+    from app.models import (
+        BasicAssessment, BasicRiskIdentification, BasicRiskAnalysis,
+        MadyaAssessment, OrganizationalStructureEntry, SasaranOrganisasiKPI, RiskInputMadya,
+        MadyaCriteriaProbability, MadyaCriteriaImpact, RiskAssessment, RiskRegister
+    )
+    for child in (BasicRiskIdentification, BasicRiskAnalysis):
+        register_stamp_parent(child, BasicAssessment)
+    for child in (OrganizationalStructureEntry, SasaranOrganisasiKPI, RiskInputMadya,
+                  MadyaCriteriaProbability, MadyaCriteriaImpact):
+        register_stamp_parent(child, MadyaAssessment)
+    register_stamp_parent(RiskRegister, RiskAssessment)
+
+
+def init_excel_export(app):
+    """Konfigurasi cache export & listener stempel perubahan."""
+    app.config.setdefault('EXPORT_CACHE_ENABLED', True)
+    app.config.setdefault('EXPORT_CACHE_DIR', os.path.join(app.instance_path, 'export_cache'))
+    app.config.setdefault('EXPORT_CACHE_MAX_FILES', DEFAULT_CACHE_MAX_FILES)
+    app.config.setdefault('EXPORT_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+
+    if not _stamp_parents:
+        _register_defaults()
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
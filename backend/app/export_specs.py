@@ -0,0 +1,456 @@
+# backend/app/export_specs.py
+"""
+Spesifikasi export Excel per jenis dokumen (dirender oleh `app.excel_export`).
+
+Context (`ctx`) berisi objek yang sudah dimuat route: `assessment` plus data
+turunan yang dibutuhkan sheet tertentu (kriteria efektif, versi peta risiko,
+folder upload, dsb).
+"""
+import os
+
+from app.excel_export import (
+    WorkbookSpec, SheetSpec, Title, Fields, Merged, Blank, Table, Custom, Column, CellStyle,
+    STYLES, alignment, solid_fill, column_letter, row_number, format_date,
+    CURRENCY_FORMAT, CURRENCY_SIGNED_FORMAT, PERCENT_FORMAT
+)
+from app.risk_map_render import build_render_table, get_render_table, risk_positions
+
+# --- Style khusus dokumen ---
+STYLES.update({
+    'basic_context_header': CellStyle(font='white_bold', fill='4DB6AC', align='center_nowrap'),
+    'basic_table_header': CellStyle(font='white_bold', fill='A90200', align='header', border=False),
+    'basic_analysis_header': CellStyle(font='white_bold', fill='A90200', align='center', border=False),
+    'bordered': CellStyle(),
+    'subheader': CellStyle(font='bold', align='center'),
+})
+
+SCALE_STYLES = {
+    1: CellStyle(font='white_bold', fill='00B050', align='center'),
+    2: CellStyle(font='black_bold', fill='92D050', align='center'),
+    3: CellStyle(font='black_bold', fill='FFFF00', align='center'),
+    4: CellStyle(font='white_bold', fill='FFC000', align='center'),
+    5: CellStyle(font='white_bold', fill='FF0000', align='center'),
+}
+
+IMPACT_HEADER_FILL_1 = 'DDEBF7'  # Biru sangat muda
+IMPACT_HEADER_FILL_2 = 'B4C6E7'  # Biru muda
+
+
+def scale_style(value):
+    return SCALE_STYLES.get(value, STYLES['cell_center'])
+
+
+# =========================================================================
+# Asesmen Dasar
+# =========================================================================
+def _basic_fields():
+    return Fields([
+        ("Nama Unit Kerja:", lambda ctx: ctx['assessment'].nama_unit_kerja),
+        ("Nama Perusahaan:", lambda ctx: ctx['assessment'].nama_perusahaan),
+    ], value_fill='B4C6E7')
+
+
+def _basic_analysis_rows(ctx):
+    for analysis in ctx['assessment'].risk_analyses:
+        skor = (analysis.probabilitas or 0) * (analysis.dampak or 0)
+        nilai_bersih = (analysis.dampak_finansial or 0) * ((analysis.probabilitas_kualitatif or 0) / 100)
+        yield (analysis.risk_identification.deskripsi_risiko, analysis.probabilitas, analysis.dampak,
+               skor, analysis.probabilitas_kualitatif, analysis.dampak_finansial, nilai_bersih)
+
+
+def _tuple_column(header, position, **kwargs):
+    return Column(header, lambda row, index: row[position], **kwargs)
+
+
+BASIC_ASSESSMENT_EXPORT = WorkbookSpec('basic', [
+    SheetSpec("Tugas 1 - Konteks", landscape=True, widths={'A': 80, 'B': 80}, blocks=[
+        Title("Tugas 1 - Penetapan Konteks Organisasi"),
+        Table([
+            Column("Konteks Eksternal", 'external_context', style='bordered'),
+            Column("Konteks Internal", 'internal_context', style='bordered'),
+        ], rows=lambda ctx: ctx['assessment'].contexts, header_style='basic_context_header'),
+    ]),
+    SheetSpec("Tugas 2 - Identifikasi", landscape=True, blocks=[
+        Title("Tugas 2 - Identifikasi Risiko"),
+        _basic_fields(),
+        Merged('C3:K4', 'IDENTIFIKASI RISIKO', CellStyle(font='bold', fill='D9E1F2', align='center_nowrap', border=False)),
+        Blank(),
+        Table([
+            Column("Kode Risiko", 'kode_risiko', width=25, style=None),
+            Column("No.", row_number, width=25, style=None),
+            Column("Kategori Risiko", 'kategori_risiko', width=25, style=None),
+            Column("Unit Kerja / Fungsi", 'unit_kerja', width=25, style=None),
+            Column("Sasaran", 'sasaran', width=25, style=None),
+            Column("Tanggal Identifikasi Risiko", lambda risk, index: format_date(risk.tanggal_identifikasi), width=25, style=None),
+            Column("Deskripsi atau Kejadian Risiko", 'deskripsi_risiko', width=25, style=None),
+            Column("Akar Penyebab", 'akar_penyebab', width=25, style=None),
+            Column("Indikator Risiko", 'indikator_risiko', width=25, style=None),
+            Column("Faktor Positif / Internal Control Yang Ada Saat Ini", 'internal_control', width=25, style=None),
+            Column("Deskripsi Dampak", 'deskripsi_dampak', width=25, style=None),
+        ], rows=lambda ctx: ctx['assessment'].risks, header_style='basic_table_header'),
+    ]),
+    SheetSpec("Tugas 3 - Analisis", landscape=True, blocks=[
+        Title("Tugas 3 - Analisis Risiko"),
+        _basic_fields(),
+        Merged('C3:G3', 'ANALISIS RISIKO', CellStyle(font='bold', fill='FCE4D6', align='center_nowrap', border=False)),
+        Merged('C4:G4', 'RISIKO INHERENT', CellStyle(font='white_bold', fill='FF0000', align='center_nowrap', border=False)),
+        Blank(),
+        Table([
+            _tuple_column("Deskripsi atau Kejadian Risiko", 0, width=25, style=None),
+            _tuple_column("Probabilitas (P)", 1, width=25, style=None),
+            _tuple_column("Dampak (I)", 2, width=25, style=None),
+            _tuple_column("Skor Risiko Inherent (W)", 3, width=25, style=None),
+            _tuple_column("Probabilitas Risiko Inherent Kualitatif (%)", 4, width=25, style=None),
+            _tuple_column("Dampak Finansial Risiko Inherent (Rp)", 5, width=25, style=None, number_format=CURRENCY_FORMAT),
+            _tuple_column("Nilai Bersih Risiko Inherent", 6, width=25, style=None, number_format=CURRENCY_FORMAT),
+        ], rows=_basic_analysis_rows, header_style='basic_analysis_header'),
+    ]),
+])
+
+
+# =========================================================================
+# Asesmen Madya
+# =========================================================================
+def _structure_image(ws, ctx, row):
+    """Gambar struktur organisasi di kolom E baris data pertama."""
+    assessment = ctx['assessment']
+    if not assessment.structure_image_filename:
+        return row
+    try:
+        img_path = os.path.join(ctx['upload_folder'], assessment.structure_image_filename)
+        if os.path.exists(img_path):
+            from openpyxl.drawing.image import Image
+            img = Image(img_path)
+            img.height = 150
+            img.width = 200
+            ws.add_image(img, 'E4')
+            ws.row_dimensions[4].height = 120  # Tinggi baris agar gambar muat
+        else:
+            print(f"File gambar tidak ditemukan: {img_path}")
+    except Exception as e:
+        print(f"Gagal menambahkan gambar struktur: {e}")
+    return row
+
+
+# Header kualitatif kriteria dampak: (judul, jumlah kolom, warna)
+IMPACT_QUALITATIVE_GROUPS = [
+    ("Risiko Strategis", 1, IMPACT_HEADER_FILL_1),
+    ("Risiko Hukum", 1, IMPACT_HEADER_FILL_2),
+    ("Risiko Kepatuhan", 1, IMPACT_HEADER_FILL_1),
+    ("Risiko Reputasi", 3, IMPACT_HEADER_FILL_2),
+    ("Risiko Sumber Daya Manusia", 3, IMPACT_HEADER_FILL_1),
+    ("Risiko Sistem Infrastruktur...", 3, IMPACT_HEADER_FILL_2),
+    ("Risiko Operasional", 1, IMPACT_HEADER_FILL_1),
+    ("Risiko HSSE dan Sosial", 5, IMPACT_HEADER_FILL_2),
+    ("Risiko PMN", 1, IMPACT_HEADER_FILL_1),
+    ("Risiko Operasional Bank", 1, IMPACT_HEADER_FILL_2),
+    ("Risiko Investasi Asuransi", 2, IMPACT_HEADER_FILL_1),
+    ("Risiko Aktuarial", 1, IMPACT_HEADER_FILL_2),
+]
+
+# Sub-kategori kualitatif: (judul, key kriteria)
+IMPACT_QUALITATIVE_COLUMNS = [
+    ("Dampak keterlambatan pencapaian program strategis", 'stra_dampak'),
+    ("Pelanggaran hukum", 'hukum_pelanggaran'),
+    ("Pelanggaran ketentuan kepatuhan", 'kepat_pelanggaran'),
+    ("Keluhan pelanggan / nasabah / pembeli / supplier", 'reput_keluhan'),
+    ("Pemberitaan negatif di media", 'reput_berita'),
+    ("Kehilangan daya saing", 'reput_saing'),
+    ("Keluhan karyawan", 'sdm_keluhan'),
+    ("Turn over karyawan bertalenta", 'sdm_turnover'),
+    ("regretted turnover", 'sdm_regretted_turnover'),
+    ("Gangguan aplikasi infrastruktur pendukung", 'sistem_gangguan'),
+    ("Serangan siber", 'sistem_siber'),
+    ("Hasil penilaian platform security", 'sistem_platform'),
+    ("Pelampauan pemenuhan SLA (Service Level Agreement)", 'ops_sla'),
+    ("Fatality 1", 'hsse_fatality_1'),
+    ("Fatality 2", 'hsse_fatality_2'),
+    ("Fatality 3", 'hsse_fatality_3'),
+    ("Kerusakan Lingkungan", 'hsse_kerusakan_lingkungan'),
+    ("Penurunan ESG rating Sustainalytic", 'hsse_penurunan_esg'),
+    ("Penundaan pencairan PMN", 'pmn_tunda'),
+    ("Total jumlah fraud internal dan eksternal", 'bank_fraud'),
+    ("Penurunan aset... (Rating)", 'asuransi_aset_rating'),
+    ("Penurunan aset... (Peringkat)", 'asuransi_aset_peringkat'),
+    ("Rasio Klaim", 'aktu_rasio'),
+]
+IMPACT_QUANTITATIVE_KEYS = ('kriteriaDampak', 'rangeFinansial', 'deskripsiDampak1')
+# Kolom sub-kategori yang memakai warna pertama (selang-seling)
+IMPACT_FILL_1_COLUMNS = {5, 7, 11, 12, 13, 17, 23, 25, 26}
+
+
+def _impact_criteria(ws, ctx, row):
+    """Tabel kriteria dampak dengan header bertingkat (4 baris, sel gabungan)."""
+    start = row + 2
+    STYLES['title'].apply(ws.cell(row=start, column=1, value="Kriteria Dampak"))
+    start += 2
+
+    header = STYLES['header']
+    subheader = STYLES['subheader']
+
+    header.apply(ws.cell(row=start, column=1, value="Skala"))
+    ws.merge_cells(start_row=start, start_column=1, end_row=start + 3, end_column=1)
+    subheader.apply(ws.cell(row=start, column=2, value="DAMPAK KUANTITATIF"))
+    ws.merge_cells(start_row=start, start_column=2, end_row=start, end_column=4)
+    subheader.apply(ws.cell(row=start, column=5, value="DAMPAK KUALITATIF"))
+    ws.merge_cells(start_row=start, start_column=5, end_row=start, end_column=27)
+
+    # Baris 2: kategori kuantitatif (span 3 baris) & kelompok kualitatif (span 2 baris)
+    for offset, text in enumerate(["Kriteria Dampak", "Range Dampak Finansial", "Deskripsi Dampak"]):
+        header.apply(ws.cell(row=start + 1, column=offset + 2, value=text))
+        ws.merge_cells(start_row=start + 1, start_column=offset + 2, end_row=start + 3, end_column=offset + 2)
+    col_idx = 5
+    for text, span, fill in IMPACT_QUALITATIVE_GROUPS:
+        CellStyle(font='bold', fill=fill, align='center').apply(ws.cell(row=start + 1, column=col_idx, value=text))
+        ws.merge_cells(start_row=start + 1, start_column=col_idx, end_row=start + 2, end_column=col_idx + span - 1)
+        col_idx += span
+
+    # Baris 4: sub-kategori kualitatif
+    for offset, (text, _) in enumerate(IMPACT_QUALITATIVE_COLUMNS):
+        col_idx = offset + 5
+        fill = IMPACT_HEADER_FILL_1 if col_idx in IMPACT_FILL_1_COLUMNS else IMPACT_HEADER_FILL_2
+        CellStyle(font='bold', fill=fill, align='center').apply(ws.cell(row=start + 3, column=col_idx, value=text))
+        ws.column_dimensions[column_letter(col_idx)].width = 25
+
+    keys = IMPACT_QUANTITATIVE_KEYS + tuple(key for _, key in IMPACT_QUALITATIVE_COLUMNS)
+    range_style = CellStyle(align='center_top')
+    row_idx = start + 4
+    for item in sorted(ctx['impact_criteria'], key=lambda x: x['level'], reverse=True):
+        scale_style(item['level']).apply(ws.cell(row=row_idx, column=1, value=item['level']))
+        for offset, key in enumerate(keys):
+            style = range_style if key == 'rangeFinansial' else STYLES['cell']
+            style.apply(ws.cell(row=row_idx, column=offset + 2, value=item.get(key)))
+        row_idx += 1
+
+    ws.column_dimensions['B'].width = 25
+    ws.column_dimensions['C'].width = 25
+    ws.column_dimensions['D'].width = 30
+    return row_idx
+
+
+def _sasaran_text(entry, index):
+    # Many-to-one: Sasaran asesmen sudah dimuat sheet sebelumnya (identity map, tanpa query)
+    return entry.sasaran_organisasi.sasaran_kpi if entry.sasaran_organisasi else "-"
+
+
+def _kategori_display(entry, index):
+    return entry.kategori_risiko_lainnya if entry.kategori_risiko == 'Lainnya' else entry.kategori_risiko
+
+
+def _date_column(header, attr, width):
+    return Column(header, lambda entry, index: format_date(getattr(entry, attr)), width=width, style='cell_center')
+
+
+MADYA_RISK_INPUT_COLUMNS = [
+    Column("No", row_number, width=5, style='cell_center'),
+    Column("Kode Risiko", 'kode_risiko', width=15),
+    Column("Status Risiko", 'status_risiko', width=12),
+    Column("Peluang/ Ancaman", 'peluang_ancaman', width=15),
+    Column("Kategori Risiko", _kategori_display, width=20),
+    Column("Unit/Fungsi Kerja", 'unit_kerja', width=25),
+    Column("Sasaran", _sasaran_text, width=30),
+    _date_column("Tanggal Identifikasi Risiko", 'tanggal_identifikasi', 15),
+    Column("Deskripsi atau Kejadian Risiko", 'deskripsi_risiko', width=40),
+    Column("Akar Penyebab", 'akar_penyebab', width=30),
+    Column("Indikator Risiko", 'indikator_risiko', width=30),
+    Column("Faktor Positif / Internal Control Yang Ada Saat Ini", 'internal_control', width=30),
+    Column("Deskripsi Dampak", 'deskripsi_dampak', width=30),
+    Column("Probabilitas (P)", 'inherent_probabilitas', width=8, style='cell_center'),
+    Column("Dampak (I)", 'inherent_dampak', width=8, style='cell_center'),
+    Column("Skor Risiko Inherent", 'inherent_skor', width=8, style='cell_center'),
+    Column("Probabilitas Risiko Inherent Kualitatif (%)", 'inherent_prob_kualitatif', width=12, style='cell_center', number_format=PERCENT_FORMAT),
+    Column("Dampak Finansial Risiko Inherent (Rp)", 'inherent_dampak_finansial', width=18, style='cell_right', number_format=CURRENCY_FORMAT),
+    Column("Nilai Bersih Risiko Inheren", 'inherent_nilai_bersih', width=18, style='cell_right', number_format=CURRENCY_FORMAT),
+    Column("Pemilik Risiko", 'pemilik_risiko', width=20),
+    Column("Jabatan Pemilik Risiko", 'jabatan_pemilik', width=20),
+    Column("No. HP Pemilik Risiko", 'kontak_pemilik_hp', width=15),
+    Column("E-mail Pemilik Risiko", 'kontak_pemilik_email', width=20),
+    Column("Strategi", 'strategi', width=20),
+    Column("Penanganan Risiko (Risk Treatment)", 'rencana_penanganan', width=40),
+    Column("Biaya Penanganan Risiko (Rp)", 'biaya_penanganan', width=18, style='cell_right', number_format=CURRENCY_FORMAT),
+    Column("Penanganan Yang Telah Dilakukan", 'penanganan_dilakukan', width=30),
+    Column("Status Penanganan", 'status_penanganan', width=15),
+    _date_column("Jadwal Mulai Penanganan", 'jadwal_mulai_penanganan', 15),
+    _date_column("Jadwal Selesai Penanganan", 'jadwal_selesai_penanganan', 15),
+    Column("PIC Penanganan", 'pic_penanganan', width=20),
+    Column("Probabilitas Risiko Residual (P)", 'residual_probabilitas', width=8, style='cell_center'),
+    Column("Dampak Risiko Residual (I)", 'residual_dampak', width=8, style='cell_center'),
+    Column("Skor Risiko Residual", 'residual_skor', width=8, style='cell_center'),
+    Column("Probabilitas Risiko Residual Kualitatif (%)", 'residual_prob_kualitatif', width=12, style='cell_center', number_format=PERCENT_FORMAT),
+    Column("Dampak Finansial Risiko Residual (Rp)", 'residual_dampak_finansial', width=18, style='cell_right', number_format=CURRENCY_SIGNED_FORMAT),
+    Column("Nilai Bersih Risiko Residual", 'residual_nilai_bersih', width=18, style='cell_right', number_format=CURRENCY_SIGNED_FORMAT),
+    _date_column("Tanggal Review", 'tanggal_review', 15),
+]
+
+
+def _risk_map_sheet(ws, ctx, row):
+    """Peta risiko inheren & residual dari versi template yang dipakai asesmen."""
+    template = ctx['assessment'].risk_map_template
+    version_data = ctx.get('risk_map_version') or {}
+    ws.cell(row=2, column=1, value="Template:")
+    ws.cell(row=2, column=2, value=template.name if template else "Tidak ada template")
+
+    # Tabel skor/warna per sel dihitung sekali per versi (di-cache), bukan scan level per sel
+    if ctx.get('risk_map_version_id'):
+        table = get_render_table(ctx['risk_map_version_id'])
+    else:
+        table = build_render_table(version_data, score_fallback=template is not None)
+    likelihood_labels, impact_labels = table.likelihood_labels, table.impact_labels
+
+    inherent_positions = risk_positions(ctx['assessment'].risk_inputs, 'inherent')
+    residual_positions = risk_positions(ctx['assessment'].risk_inputs, 'residual')
+
+    score_style = CellStyle(align='right_top')
+    numbered_style = CellStyle(font='small_bold', align='center')
+
+    def draw(start_row, title, positions):
+        ws.merge_cells(start_row=start_row, start_column=2, end_row=start_row, end_column=6)
+        CellStyle(font='bold', align='center', border=False).apply(ws.cell(row=start_row, column=2, value=title))
+        start_row += 1
+
+        ws.cell(row=start_row, column=2, value="PROBABILITAS").alignment = alignment('vertical')
+        ws.merge_cells(start_row=start_row, start_column=2, end_row=start_row + 4, end_column=2)
+        for i in range(1, 6):
+            ws.cell(row=start_row, column=i + 2, value=impact_labels.get(i, f"Impact {i}")).alignment = alignment('center')
+            ws.cell(row=start_row + 6, column=i + 2, value=i).alignment = alignment('center')
+        ws.cell(row=start_row + 6, column=3, value="DAMPAK").alignment = alignment('center')
+        ws.merge_cells(start_row=start_row + 6, start_column=3, end_row=start_row + 6, end_column=7)
+
+        for p in range(5, 0, -1):
+            row_idx = start_row + (5 - p) + 1
+            ws.cell(row=row_idx, column=1, value=f"{likelihood_labels.get(p, f'L {p}')}\n({p})").alignment = alignment('center')
+            for i in range(1, 6):
+                col_idx = i + 2
+                render_cell = table.cells[(p, i)]
+                score = render_cell.score
+                cell = ws.cell(row=row_idx, column=col_idx, value=score)
+                cell.fill = solid_fill(render_cell.argb)
+                risk_numbers = positions.get((p, i), [])
+                if risk_numbers:
+                    cell.value = f"{score}\n\n({', '.join(risk_numbers)})"
+                    numbered_style.apply(cell)
+                else:
+                    score_style.apply(cell)
+                ws.column_dimensions[column_letter(col_idx)].width = 15
+            ws.row_dimensions[row_idx].height = 40
+        ws.column_dimensions['A'].width = 25
+        ws.column_dimensions['B'].width = 5
+
+    draw(4, "PETA RISIKO INHEREN", inherent_positions)
+    draw(15, "PETA RISIKO RESIDUAL", residual_positions)
+    return 22
+
+
+MADYA_ASSESSMENT_EXPORT = WorkbookSpec('madya', [
+    SheetSpec("Struktur Organisasi", widths={'B': 30, 'C': 30, 'D': 30, 'E': 30}, blocks=[
+        Title("Struktur Organisasi - Asesmen:", lambda ctx: ctx['assessment'].nama_asesmen),
+        Custom(_structure_image),
+        Table([
+            Column("No", row_number, style='cell_center'),
+            Column("Direktorat", 'direktorat'),
+            Column("Divisi", 'divisi'),
+            Column("Unit Kerja", 'unit_kerja'),
+            Column("Struktur Organisasi", lambda entry, index: "", style='bordered'),
+        ], rows=lambda ctx: ctx['assessment'].structure_entries),
+    ]),
+    SheetSpec("Kriteria Risiko", landscape=True, blocks=[
+        Title("Kriteria Probabilitas"),
+        Table([
+            Column("Skala", 'level', width=10, style=scale_style),
+            Column("Parameter", 'parameter', width=30),
+            Column("Kemungkinan terjadi", 'kemungkinan', width=40),
+            Column("Frekuensi kejadian", 'frekuensi', width=40),
+            Column("Persentase", 'persentase', width=40),
+        ], rows=lambda ctx: sorted(ctx['probability_criteria'], key=lambda x: x['level'], reverse=True)),
+        Custom(_impact_criteria),
+    ]),
+    SheetSpec("Sasaran KPI Appetite", widths={'B': 60, 'C': 15, 'D': 20, 'E': 20}, blocks=[
+        Title("Sasaran Organisasi / KPI & Risk Appetite - Asesmen:", lambda ctx: ctx['assessment'].nama_asesmen),
+        Table([
+            Column("No", row_number, style='cell_center'),
+            Column("Sasaran Organisasi / KPI", 'sasaran_kpi'),
+            Column("Target Appetite", 'target_level', style='cell_center'),
+            Column("Skor Risiko Inheren", 'inherent_risk_score', style='cell_center'),
+            Column("Skor Risiko Residual", 'residual_risk_score', style='cell_center'),
+        ], rows=lambda ctx: ctx['assessment'].sasaran_kpi_entries),
+    ]),
+    SheetSpec("Risk Input", landscape=True, blocks=[
+        Title("Detail Risk Input - Asesmen:", lambda ctx: ctx['assessment'].nama_asesmen),
+        Table(MADYA_RISK_INPUT_COLUMNS, rows=lambda ctx: ctx['assessment'].risk_inputs, row_height=45),
+    ]),
+    SheetSpec("Peta Risiko", blocks=[
+        Title("Peta Risiko - Asesmen:", lambda ctx: ctx['assessment'].nama_asesmen, blank_after=0),
+        Custom(_risk_map_sheet),
+    ]),
+])
+
+
+# =========================================================================
+# Asesmen AI & Main Risk Register
+# =========================================================================
+def _score(likelihood_attr, impact_attr):
+    def getter(row, index):
+        likelihood, impact = getattr(row, likelihood_attr), getattr(row, impact_attr)
+        return likelihood * impact if likelihood and impact else None
+    return getter
+
+
+RISK_REGISTER_COLUMNS = [
+    Column("No", row_number, width=5, style='cell_center'),
+    Column("Kode Risiko", 'kode_risiko', width=15),
+    Column("Judul Risiko", 'title', width=30),
+    Column("Sasaran", 'objective', width=30),
+    Column("Tipe Risiko", 'risk_type', width=15),
+    Column("Deskripsi Risiko", 'deskripsi_risiko', width=40),
+    Column("Penyebab", 'risk_causes', width=30),
+    Column("Dampak", 'risk_impacts', width=30),
+    Column("Kontrol Yang Ada", 'existing_controls', width=30),
+    Column("Efektivitas Kontrol", 'control_effectiveness', width=15, style='cell_center'),
+    Column("Inherent Likelihood", 'inherent_likelihood', width=10, style='cell_center'),
+    Column("Inherent Impact", 'inherent_impact', width=10, style='cell_center'),
+    Column("Skor Inherent", _score('inherent_likelihood', 'inherent_impact'), width=10, style='cell_center'),
+    Column("Rencana Mitigasi", 'mitigation_plan', width=40),
+    Column("Residual Likelihood", 'residual_likelihood', width=10, style='cell_center'),
+    Column("Residual Impact", 'residual_impact', width=10, style='cell_center'),
+    Column("Skor Residual", _score('residual_likelihood', 'residual_impact'), width=10, style='cell_center'),
+]
+
+
+RISK_ASSESSMENT_EXPORT = WorkbookSpec('ai', [
+    SheetSpec("Ringkasan", widths={'A': 30, 'B': 100}, blocks=[
+        Title("Asesmen Risiko AI:", lambda ctx: ctx['assessment'].nama_asesmen),
+        Fields([
+            ("Tanggal Mulai", lambda ctx: format_date(ctx['assessment'].tanggal_mulai)),
+            ("Tanggal Selesai", lambda ctx: format_date(ctx['assessment'].tanggal_selesai)),
+            ("Industri", lambda ctx: ctx['assessment'].company_industry),
+            ("Tipe Perusahaan", lambda ctx: ctx['assessment'].company_type),
+            ("Aset Perusahaan", lambda ctx: ctx['assessment'].company_assets),
+            ("Mata Uang", lambda ctx: ctx['assessment'].currency),
+            ("Batas Risiko", lambda ctx: ctx['assessment'].risk_limit),
+            ("Kategori Risiko", lambda ctx: ctx['assessment'].risk_categories),
+            ("Tujuan Proyek", lambda ctx: ctx['assessment'].project_objective),
+            ("Regulasi Terkait", lambda ctx: ctx['assessment'].relevant_regulations),
+            ("Departemen Terlibat", lambda ctx: ctx['assessment'].involved_departments),
+            ("Tindakan Yang Sudah Dilakukan", lambda ctx: ctx['assessment'].completed_actions),
+            ("Konteks Tambahan", lambda ctx: ctx['assessment'].additional_risk_context),
+            ("Ringkasan Eksekutif (AI)", lambda ctx: ctx['assessment'].ai_executive_summary),
+            ("Langkah Selanjutnya (AI)", lambda ctx: ctx['assessment'].ai_next_steps),
+        ]),
+    ]),
+    SheetSpec("Risk Register", landscape=True, blocks=[
+        Title("Risk Register - Asesmen:", lambda ctx: ctx['assessment'].nama_asesmen),
+        Table(RISK_REGISTER_COLUMNS, rows=lambda ctx: ctx['assessment'].risk_register_entries, header_style='header'),
+    ]),
+])
+
+
+MAIN_RISK_REGISTER_EXPORT = WorkbookSpec('main-register', [
+    SheetSpec("Main Risk Register", landscape=True, blocks=[
+        Title("Main Risk Register"),
+        Table(RISK_REGISTER_COLUMNS + [
+            Column("Status", 'status', width=12, style='cell_center'),
+            Column("Opsi Penanganan", 'treatment_option', width=15, style='cell_center'),
+            Column("Tanggal Dibuat", lambda risk, index: format_date(risk.created_at), width=15, style='cell_center'),
+        ], rows=lambda ctx: ctx['risks']),
+    ]),
+])
@@ -0,0 +1,129 @@
+# backend/app/horizon_briefing.py
+"""
+Briefing AI sektor yang dibagikan antar user.
+
+Satu laporan dasar (gemini-2.5-pro) dibuat per sektor per jendela waktu
+(HORIZON_BRIEFING_WINDOW_HOURS) dari berita hasil ingestion. Scan user di
+sektor yang sama memakai laporan tersebut; hanya kompetitor/topik spesifik
+yang diproses lewat prompt delta kecil (gemini-2.5-flash).
+"""
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import HorizonSectorBriefing, HorizonScanResult
+from app.ai_services import summarize_sector_briefing, summarize_horizon_delta, summarize_horizon_scan
+
+DEFAULT_WINDOW_HOURS = 12
+PRECOMPUTE_LOOKBACK_DAYS = 7
+
+_sector_locks = {}
+_sector_locks_guard = threading.Lock()
+
+
+def _window_hours():
+    return max(1, int(current_app.config.get('HORIZON_BRIEFING_WINDOW_HOURS', DEFAULT_WINDOW_HOURS)))
+
+
+def current_window_start(now=None):
+    """Awal jendela waktu briefing (dibulatkan ke bawah dari epoch, UTC)."""
+    now = now or datetime.utcnow()
+    window_seconds = _window_hours() * 3600
+    epoch = datetime(1970, 1, 1)
+    elapsed = int((now - epoch).total_seconds())
+    return epoch + timedelta(seconds=elapsed - elapsed % window_seconds)
+
+
+def _sector_lock(sector):
+    with _sector_locks_guard:
+        return _sector_locks.setdefault(sector, threading.Lock())
+
+
+def _find_briefing(sector, window_start):
+    return HorizonSectorBriefing.query.filter_by(sector=sector, window_start=window_start).first()
+
+
+def get_or_create_sector_briefing(sector, news_list):
+    """
+    Mengambil briefing sektor untuk jendela waktu aktif, membuatnya jika belum ada.
+    Request paralel di proses yang sama menunggu satu generasi; antar worker
+    dijaga unique constraint (sector, window_start). None jika AI gagal.
+    """
+    window_start = current_window_start()
+    briefing = _find_briefing(sector, window_start)
+    if briefing or not news_list:
+        return briefing
+
+    with _sector_lock(sector):
+        db.session.rollback()  # Lihat commit dari thread lain & lepas koneksi selama panggilan AI
+        briefing = _find_briefing(sector, window_start)
+        if briefing:
+            return briefing
+        db.session.rollback()
+
+        generated = summarize_sector_briefing(sector, news_list)
+        if not generated:
+            return None
+        title, report_html = generated
+
+        briefing = HorizonSectorBriefing(
+            sector=sector,
+            window_start=window_start,
+            title=(title or '')[:200],
+            report_html=report_html,
+            news_count=len(news_list),
+        )
+        db.session.add(briefing)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Worker lain sudah menyimpan briefing untuk jendela ini
+            db.session.rollback()
+            briefing = _find_briefing(sector, window_start)
+        return briefing
+
+
+def has_custom_focus(scan_params):
+    return any((scan_params.get(key) or '').strip()
+               for key in ('input_competitors', 'input_topics', 'specific_topics'))
+
+
+def build_horizon_report(scan_params, sector_news, focus_news=None):
+    """
+    Menyusun (title, report_html) untuk satu scan user:
+    briefing sektor bersama + delta kompetitor/topik (jika ada).
+    Fallback ke laporan penuh per user jika briefing tidak tersedia.
+    """
+    focus_news = focus_news if focus_news is not None else sector_news
+    briefing = get_or_create_sector_briefing(scan_params['industry'], sector_news)
+    if briefing is None:
+        return summarize_horizon_scan(scan_params, focus_news or sector_news)
+
+    if not has_custom_focus(scan_params):
+        return briefing.title, briefing.report_html
+
+    delta = summarize_horizon_delta(scan_params, briefing.report_html, focus_news)
+    if not delta:
+        return briefing.title, briefing.report_html
+    delta_title, delta_html = delta
+    return delta_title or briefing.title, briefing.report_html + delta_html
+
+
+def precompute_active_briefings(get_news):
+    """
+    Dipanggil scheduler setelah ingestion: membuat briefing jendela aktif hanya
+    untuk sektor yang dipakai user dalam PRECOMPUTE_LOOKBACK_DAYS terakhir,
+    supaya token AI tidak terbuang untuk sektor yang tidak pernah di-scan.
+    """
+    since = datetime.utcnow() - timedelta(days=PRECOMPUTE_LOOKBACK_DAYS)
+    sectors = [row.sector for row in db.session.query(HorizonScanResult.sector)
+               .filter(HorizonScanResult.created_at >= since).distinct().all()]
+    created = 0
+    for sector in sectors:
+        news = get_news(sector)
+        if news and get_or_create_sector_briefing(sector, news) is not None:
+            created += 1
+    return created
@@ -0,0 +1,333 @@
+# backend/app/horizon_ingest.py
+"""
+Ingestion berita Horizon Scanner terjadwal ke penyimpanan bersama.
+
+Worker background mengambil berita setiap sektor di `SECTOR_KEYWORDS` secara
+berkala lalu menyimpannya di `horizon_scan_entries` (unik per URL). Scan user
+untuk sektor standar cukup membaca penyimpanan lokal ini; scraping live hanya
+dilakukan untuk topik/kompetitor kustom atau saat penyimpanan masih kosong.
+
+Konfigurasi (env / app.config):
+- HORIZON_INGEST_INTERVAL_MINUTES : interval ingestion (default 60, 0 = nonaktif)
+- HORIZON_NEWS_MAX_AGE_HOURS      : umur maksimal berita yang dianggap segar (default 24)
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+from flask import current_app
+from sqlalchemy import func, text
+
+from app import db
+from app.models import HorizonScanEntry, HorizonScanArticle
+from app.blob_codec import compress_json, decompress_json
+from horizon_scanner import run_horizon_scan, SECTOR_KEYWORDS
+
+DEFAULT_INTERVAL_MINUTES = 60
+DEFAULT_MAX_AGE_HOURS = 24
+STORED_NEWS_LIMIT = 25
+STARTUP_DELAY_SECONDS = 15
+
+_scheduler_thread = None
+_scheduler_lock = threading.Lock()
+_stop_event = threading.Event()
+
+
+def _parse_published(value):
+    """Tanggal RSS (RFC 822) -> datetime UTC naive; fallback ke waktu sekarang."""
+    if isinstance(value, datetime):
+        return value
+    try:
+        parsed = parsedate_to_datetime(value)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    except (TypeError, ValueError, IndexError):
+        return datetime.utcnow()
+
+
+def _try_sector_lock(sector):
+    """Lock antar worker (PostgreSQL) agar satu sektor tidak ditulis bersamaan."""
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        return True
+    key = int(hashlib.sha1(f"horizon:{sector}".encode('utf-8')).hexdigest()[:15], 16)
+    return bool(connection.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}).scalar())
+
+
+def url_hash(url):
+    """Kunci artikel bersama: SHA-256 dari URL (panjang tetap, aman untuk index unik)."""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _normalized_url(item):
+    url = (item.get('url') or '').strip()
+    if url and url != '#' and len(url) <= 500:
+        return url
+    return None
+
+
+def upsert_news_entries(news_items, sector=None, touch_existing=True):
+    """
+    Menyimpan list berita (format run_horizon_scan) ke penyimpanan bersama (unik per hash URL).
+    Mengembalikan (dict url_hash -> entry_id, jumlah berita baru).
+    """
+    now = datetime.utcnow()
+    by_hash = {}
+    for item in news_items or []:
+        url = _normalized_url(item)
+        if url:
+            by_hash.setdefault(url_hash(url), (url, item))
+    if not by_hash:
+        return {}, 0
+
+    existing = {
+        row.url_hash: row.id for row in db.session.query(HorizonScanEntry.id, HorizonScanEntry.url_hash)
+        .filter(HorizonScanEntry.url_hash.in_(list(by_hash.keys()))).all()
+    }
+    if existing and touch_existing:
+        db.session.bulk_update_mappings(HorizonScanEntry, [
+            {"id": entry_id, "last_seen_at": now} for entry_id in existing.values()
+        ])
+
+    new_rows = [{
+        "title": (item.get('title') or 'No Title')[:300],
+        "source_url": url,
+        "url_hash": digest,
+        "published_date": _parse_published(item.get('published_at')),
+        "original_summary": item.get('summary') or '',
+        "sector": sector,
+        "source_name": (item.get('source') or '')[:150] or None,
+        "original_title": (item.get('original_title') or '')[:300] or None,
+        "language": item.get('language'),
+        "created_at": now,
+        "last_seen_at": now,
+    } for digest, (url, item) in by_hash.items() if digest not in existing]
+    inserted = 0
+    if new_rows:
+        inserted = _insert_missing_entries(new_rows)
+        # Termasuk baris yang baru saja dimasukkan ingestion/scan lain (konflik -> DO NOTHING)
+        existing.update({
+            url_hash(row.source_url): row.id for row in db.session.query(HorizonScanEntry.id, HorizonScanEntry.source_url)
+            .filter(HorizonScanEntry.source_url.in_([row["source_url"] for row in new_rows])).all()
+        })
+    return existing, inserted
+
+
+def _insert_missing_entries(rows):
+    """
+    INSERT ... ON CONFLICT DO NOTHING untuk artikel baru; mengembalikan jumlah baris yang masuk.
+    Scan pengguna dan ingestion terjadwal bisa menyimpan URL yang sama bersamaan, jadi
+    pelanggaran unik (source_url / url_hash) dilewati, bukan IntegrityError.
+    """
+    dialect = db.session.connection().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        db.session.bulk_insert_mappings(HorizonScanEntry, rows)
+        return len(rows)
+    stmt = insert(HorizonScanEntry).values(rows).on_conflict_do_nothing().returning(HorizonScanEntry.id)
+    return len(db.session.execute(stmt).all())
+
+
+def store_news_items(news_items, sector=None):
+    """
+    Menyimpan list berita ke penyimpanan bersama.
+    URL yang sudah ada hanya diperbarui `last_seen_at`-nya. Mengembalikan jumlah berita baru.
+    """
+    return upsert_news_entries(news_items, sector=sector)[1]
+
+
+def entry_to_news_item(entry):
+    """HorizonScanEntry -> dict berita dengan format yang sama seperti run_horizon_scan."""
+    return {
+        "source": entry.source_name,
+        "title": entry.title,
+        "original_title": entry.original_title,
+        "url": entry.source_url,
+        "image": None,
+        "summary": entry.original_summary,
+        "published_at": entry.published_date.isoformat() if entry.published_date else None,
+        "language": entry.language or "id"
+    }
+
+
+def link_scan_articles(scan, news_items):
+    """
+    Menyimpan berita satu scan sebagai referensi ke artikel bersama (scan -> artikel).
+    Item tanpa URL valid (tidak bisa dinormalisasi) disimpan sebagai blob terkompresi.
+    Dipanggil setelah `scan` di-flush (punya id), sebelum commit.
+    """
+    ids_by_hash, _ = upsert_news_entries(news_items, touch_existing=False)
+    links = []
+    leftovers = []
+    seen = set()
+    for position, item in enumerate(news_items or []):
+        url = _normalized_url(item)
+        entry_id = ids_by_hash.get(url_hash(url)) if url else None
+        if entry_id is None:
+            leftovers.append(item)
+        elif entry_id not in seen:
+            seen.add(entry_id)
+            links.append({"scan_id": scan.id, "entry_id": entry_id, "position": position})
+    if links:
+        db.session.bulk_insert_mappings(HorizonScanArticle, links)
+    scan.raw_news_blob = compress_json(leftovers) if leftovers else None
+    scan.raw_news_data = None
+
+
+def load_scan_news(scan):
+    """Berita satu scan: artikel bersama (urut sesuai posisi) + sisa blob; fallback ke JSON lama."""
+    rows = db.session.query(HorizonScanArticle.position, HorizonScanEntry)\
+        .join(HorizonScanEntry, HorizonScanEntry.id == HorizonScanArticle.entry_id)\
+        .filter(HorizonScanArticle.scan_id == scan.id)\
+        .order_by(HorizonScanArticle.position).all()
+    news = [entry_to_news_item(entry) for _, entry in rows]
+    if scan.raw_news_blob:
+        news.extend(decompress_json(scan.raw_news_blob) or [])
+    if not news and scan.raw_news_data:
+        try:
+            news = json.loads(scan.raw_news_data)
+        except (TypeError, ValueError):
+            news = []
+    return news
+
+
+def _is_fresh(sector, min_age):
+    last_seen = db.session.query(func.max(HorizonScanEntry.last_seen_at))\
+        .filter(HorizonScanEntry.sector == sector).scalar()
+    return last_seen is not None and datetime.utcnow() - last_seen < min_age
+
+
+def ingest_sector(sector, force=False):
+    """Mengambil berita satu sektor dan menyimpannya. Dipanggil di dalam app context."""
+    interval = current_app.config.get('HORIZON_INGEST_INTERVAL_MINUTES', DEFAULT_INTERVAL_MINUTES) or DEFAULT_INTERVAL_MINUTES
+    min_age = timedelta(minutes=interval / 2)
+    if not force and _is_fresh(sector, min_age):
+        db.session.rollback()
+        return 0
+
+    # Jangan tahan transaksi/koneksi DB selama scraping jaringan
+    db.session.rollback()
+    news_items = run_horizon_scan(sector=sector)
+    if not news_items:
+        return 0
+
+    try:
+        if not _try_sector_lock(sector) or (not force and _is_fresh(sector, min_age)):
+            db.session.rollback()  # Worker lain sudah/masih menulis sektor ini
+            return 0
+        inserted = store_news_items(news_items, sector=sector)
+        db.session.commit()
+        return inserted
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saat menyimpan berita horizon sektor {sector}: {e}")
+        return 0
+
+
+def ingest_all_sectors(force=False):
+    """Ingestion seluruh sektor standar. Mengembalikan dict sektor -> jumlah berita baru."""
+    summary = {}
+    for sector in SECTOR_KEYWORDS.keys():
+        if _stop_event.is_set():
+            break
+        try:
+            summary[sector] = ingest_sector(sector, force=force)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error ingestion horizon sektor {sector}: {e}")
+            summary[sector] = 0
+    print(f"Ingestion horizon selesai: {sum(summary.values())} berita baru dari {len(summary)} sektor")
+    return summary
+
+
+def get_stored_news(sector, limit=STORED_NEWS_LIMIT):
+    """
+    Membaca berita segar satu sektor dari penyimpanan lokal dalam format
+    yang sama dengan `run_horizon_scan`. List kosong jika belum ada data segar.
+    """
+    max_age = current_app.config.get('HORIZON_NEWS_MAX_AGE_HOURS', DEFAULT_MAX_AGE_HOURS)
+    threshold = datetime.utcnow() - timedelta(hours=max_age)
+    entries = HorizonScanEntry.query.filter(
+        HorizonScanEntry.sector == sector,
+        HorizonScanEntry.last_seen_at >= threshold
+    ).order_by(HorizonScanEntry.published_date.desc(), HorizonScanEntry.id.desc()).limit(limit).all()
+
+    return [entry_to_news_item(entry) for entry in entries]
+
+
+def is_standard_sector(sector):
+    return sector in SECTOR_KEYWORDS
+
+
+def precompute_sector_briefings():
+    """Menyiapkan briefing AI sektor (jendela aktif) untuk sektor yang aktif dipakai."""
+    from app.horizon_briefing import precompute_active_briefings  # Import lokal: modul AI berat
+    return precompute_active_briefings(
+        lambda sector: get_stored_news(sector) if is_standard_sector(sector) else []
+    )
+
+
+def _scheduler_loop(app, interval_minutes):
+    if _stop_event.wait(STARTUP_DELAY_SECONDS):
+        return
+    while not _stop_event.is_set():
+        with app.app_context():
+            try:
+                ingest_all_sectors()
+                precompute_sector_briefings()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error pada scheduler horizon: {e}")
+            finally:
+                db.session.remove()
+        if _stop_event.wait(interval_minutes * 60):
+            return
+
+
+def start_horizon_scheduler(app):
+    """Menjalankan loop ingestion di thread daemon (sekali per proses)."""
+    global _scheduler_thread
+    interval = app.config.get('HORIZON_INGEST_INTERVAL_MINUTES', DEFAULT_INTERVAL_MINUTES)
+    if not interval or interval <= 0:
+        return None
+    with _scheduler_lock:
+        if _scheduler_thread is not None and _scheduler_thread.is_alive():
+            return _scheduler_thread
+        _stop_event.clear()
+        _scheduler_thread = threading.Thread(
+            target=_scheduler_loop, args=(app, interval), name='horizon-ingest', daemon=True
+        )
+        _scheduler_thread.start()
+        return _scheduler_thread
+
+
+def stop_horizon_scheduler():
+    _stop_event.set()
+
+
+def init_horizon_ingest(app):
+    """
+    Scheduler dijalankan saat request pertama (bukan saat import/CLI seperti
+    `flask db upgrade`). Ingestion manual: `flask horizon-ingest [--force]`.
+    """
+    import click
+
+    app.config.setdefault('HORIZON_INGEST_INTERVAL_MINUTES', DEFAULT_INTERVAL_MINUTES)
+    app.config.setdefault('HORIZON_NEWS_MAX_AGE_HOURS', DEFAULT_MAX_AGE_HOURS)
+
+    @app.before_request
+    def _ensure_horizon_scheduler():
+        if _scheduler_thread is None:
+            start_horizon_scheduler(app)
+
+    @app.cli.command('horizon-ingest')
+    @click.option('--force', is_flag=True, help='Abaikan cek kesegaran data per sektor.')
+    def horizon_ingest_command(force):
+        """Menjalankan ingestion berita horizon untuk semua sektor sekali."""
+        ingest_all_sectors(force=force)
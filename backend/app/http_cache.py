@@ -0,0 +1,325 @@
+# backend/app/http_cache.py
+"""
+Cache response JSON + ETag untuk endpoint yang jarang berubah (read-mostly).
+
+- Setiap tabel yang dipantau punya counter versi di tabel `cache_versions`.
+  Counter dinaikkan otomatis dalam transaksi yang sama dengan perubahan data
+  (flush ORM maupun bulk UPDATE/DELETE), sehingga semua worker melihat versi yang sama.
+- ETag dihitung dari endpoint + parameter + versi tabel-tabel sumbernya (strong ETag).
+- Body JSON yang sudah diserialisasi disimpan di memori proses (LRU), jadi request
+  berulang tidak memicu query data maupun serialisasi ulang.
+- Versi tabel dibaca dari DB paling sering sekali per HTTP_CACHE_VERSION_TTL detik;
+  perubahan dari worker yang sama langsung terlihat setelah commit.
+- Tabel tenant (TenantScopedMixin) juga punya counter per institusi
+  (`<tabel>@<institution>`), jadi perubahan di satu institusi tidak membatalkan
+  cache institusi lain. Bulk UPDATE/DELETE menaikkan `<tabel>@*` (semua tenant).
+- Tabel yang sering ditulis tidak dipantau utuh; response yang hanya bergantung
+  pada satu kolomnya memakai `register_column_source` (mis. jumlah asesmen per
+  versi peta risiko hanya bergantung pada `madya_assessments.risk_map_version_id`).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, make_response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+
+from app import db
+from app.tenancy import TenantScopedMixin, is_tenant_scoped, current_tenant_name
+
+DEFAULT_VERSION_TTL = 5  # detik
+DEFAULT_MAX_ENTRIES = 512
+
+_tracked_tables = set()
+_tenant_tables = set()  # subset _tracked_tables yang dipartisi per institusi
+_column_sources = {}  # model -> [(nama atribut, counter tabel yang dinaikkan)]
+_version_memo = {}  # table_name -> (version, fetched_at)
+_response_cache = OrderedDict()  # cache_key -> (etag, body_bytes)
+_lock = threading.Lock()
+
+
+def _table_name(model_or_name):
+    if isinstance(model_or_name, str):
+        return model_or_name
+    return model_or_name.__table__.name
+
+
+def tenant_namespace(table_name, institution):
+    """Nama counter versi untuk satu tabel di satu institusi ('*' = semua institusi)."""
+    return f"{table_name}@{institution}"
+
+
+def bump_table_versions(*tables, session=None):
+    """
+    Menaikkan versi tabel secara eksplisit (mis. setelah raw SQL di luar ORM).
+    Menerima juga namespace tenant hasil `tenant_namespace()`.
+    """
+    names = {n for n in (_table_name(t) for t in tables) if n.split('@', 1)[0] in _tracked_tables}
+    if not names:
+        return
+    session = session or db.session
+    _increment_versions(session.connection(), names)
+    session.info.setdefault('http_cache_bumped', set()).update(names)
+
+
+def _increment_versions(connection, names):
+    from app.models import CacheVersion
+    table = CacheVersion.__table__
+
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values([{"table_name": n, "version": 1} for n in sorted(names)])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.table_name],
+            set_={"version": table.c.version + 1, "updated_at": db.func.now()}
+        )
+        connection.execute(stmt)
+        return
+
+    for name in sorted(names):
+        result = connection.execute(
+            table.update().where(table.c.table_name == name)
+            .values(version=table.c.version + 1, updated_at=db.func.now())
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(table_name=name, version=1))
+
+
+def _tenant_values(obj):
+    """Institusi lama & baru objek tenant (keduanya perlu di-bump saat institusi berubah)."""
+    history = db.inspect(obj).attrs.institution.history
+    values = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+    return values or {'*'}  # Atribut tidak dimuat -> anggap semua tenant terdampak
+
+
+def _after_flush(session, flush_context):
+    names = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        for key, counter in _column_sources.get(type(obj), ()):
+            if obj in session.new or obj in session.deleted or db.inspect(obj).attrs[key].history.has_changes():
+                names.add(counter)
+        table = getattr(obj, '__table__', None)
+        if table is None or table.name not in _tracked_tables:
+            continue
+        names.add(table.name)
+        if isinstance(obj, TenantScopedMixin):
+            names.update(tenant_namespace(table.name, value) for value in _tenant_values(obj))
+    if names:
+        bump_table_versions(*names, session=session)
+
+
+def _do_orm_execute(orm_execute_state):
+    # Query(...).delete() / .update() tidak melewati unit-of-work flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _column_sources:
+        # Kolom yang diubah tidak diperiksa; bulk UPDATE/DELETE tabel ini jarang
+        bump_table_versions(*{counter for _, counter in _column_sources[mapper.class_]},
+                            session=orm_execute_state.session)
+    if mapper is not None and mapper.local_table.name in _tracked_tables:
+        name = mapper.local_table.name
+        names = [name]
+        if issubclass(mapper.class_, TenantScopedMixin):
+            # Baris yang terdampak tidak diketahui -> batalkan cache semua tenant
+            names.append(tenant_namespace(name, '*'))
+        bump_table_versions(*names, session=orm_execute_state.session)
+
+
+def _after_commit(session):
+    bumped = session.info.pop('http_cache_bumped', None)
+    if bumped:
+        with _lock:
+            for name in bumped:
+                _version_memo.pop(name, None)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop('http_cache_bumped', None)
+
+
+def register_tracked_tables(*sources):
+    """Mendaftarkan model (atau nama tabel) yang perubahannya menaikkan counter versi."""
+    table_names = tuple(sorted({_table_name(s) for s in sources}))
+    _tracked_tables.update(table_names)
+    _tenant_tables.update(
+        s.__table__.name for s in sources
+        if isinstance(s, type) and issubclass(s, TenantScopedMixin)
+    )
+    return table_names
+
+
+def register_column_source(attribute, source):
+    """
+    Perubahan satu kolom model (INSERT/DELETE baris, atau UPDATE kolom tersebut)
+    ikut menaikkan counter `source`, tanpa memantau seluruh tabel model itu.
+    """
+    source_name = register_tracked_tables(source)[0]
+    entries = _column_sources.setdefault(attribute.class_, [])
+    if (attribute.key, source_name) not in entries:
+        entries.append((attribute.key, source_name))
+
+
+def _register_defaults():
+    # Sumber semua endpoint @cached_json_response. Didaftarkan di sini (bukan hanya
+    # saat modul routes di-import) agar app minimal (cleanup.py, run_seeds.py)
+    # tetap menaikkan versi saat menulis tabel-tabel ini.
+    from app.models import (
+        RiskMapTemplate, RiskMapTemplateVersion, MadyaAssessment, MasterData,
+        Permission, Department, QrcQuestion
+    )
+    register_tracked_tables(
+        RiskMapTemplate, RiskMapTemplateVersion, MasterData, Permission, Department, QrcQuestion
+    )
+    # Jumlah asesmen per versi (GET /risk-maps/<id>/versions)
+    register_column_source(MadyaAssessment.risk_map_version_id, RiskMapTemplateVersion)
+
+
+def init_http_cache(app):
+    """Mendaftarkan tabel sumber cache & listener SQLAlchemy untuk counter versi tabel."""
+    app.config.setdefault('HTTP_CACHE_VERSION_TTL', DEFAULT_VERSION_TTL)
+    app.config.setdefault('HTTP_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+
+    _register_defaults()
+
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_rollback)
+
+
+def get_table_versions(names):
+    """Mengembalikan dict versi tabel, hanya query DB untuk entri yang sudah kedaluwarsa."""
+    from app.models import CacheVersion
+    ttl = current_app.config.get('HTTP_CACHE_VERSION_TTL', DEFAULT_VERSION_TTL)
+    now = time.monotonic()
+
+    versions = {}
+    stale = []
+    with _lock:
+        for name in names:
+            memo = _version_memo.get(name)
+            if memo and now - memo[1] < ttl:
+                versions[name] = memo[0]
+            else:
+                stale.append(name)
+
+    if stale:
+        rows = db.session.query(CacheVersion.table_name, CacheVersion.version)\
+            .filter(CacheVersion.table_name.in_(stale)).all()
+        fetched = {name: 0 for name in stale}
+        fetched.update({row.table_name: row.version for row in rows})
+        with _lock:
+            for name, version in fetched.items():
+                _version_memo[name] = (version, now)
+        versions.update(fetched)
+
+    return versions
+
+
+def clear_response_cache():
+    with _lock:
+        _response_cache.clear()
+        _version_memo.clear()
+
+
+def _cache_key(vary_on_user, tenant_key=None, vary_on=None):
+    key = [request.endpoint, tuple(sorted(request.view_args.items()))]
+    key.append(tuple(sorted(request.args.items(multi=True))))
+    if vary_on_user:
+        key.append(get_jwt_identity())
+    if tenant_key is not None:
+        key.append(tenant_key)
+    if vary_on is not None:
+        key.append(vary_on())
+    return tuple(key)
+
+
+def _version_names(table_names, vary_on_tenant):
+    """Counter yang menentukan ETag; tabel tenant memakai namespace institusi aktif."""
+    if not vary_on_tenant or not is_tenant_scoped():
+        return table_names, None
+    tenant = current_tenant_name()
+    names = []
+    for name in table_names:
+        if name in _tenant_tables:
+            names.extend([tenant_namespace(name, tenant), tenant_namespace(name, '*')])
+        else:
+            names.append(name)
+    return tuple(names), ('tenant', tenant)
+
+
+def _json_response(body, etag, status=200):
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    response.set_etag(etag)
+    # Klien wajib revalidasi; 304 murah karena tidak menyentuh data
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_json_response(*sources, vary_on_user=False, vary_on_tenant=False, vary_on=None):
+    """
+    Decorator untuk endpoint GET yang mengembalikan JSON jarang berubah.
+
+    sources: model (atau nama tabel) yang menjadi sumber data response.
+    vary_on_user: True jika isi response bergantung pada user yang login.
+    vary_on_tenant: True jika isi response hanya bergantung pada institusi aktif
+        (pasang di bawah @tenant_required()); cache dibagi per institusi.
+    vary_on: fungsi tanpa argumen yang hasilnya (hashable) ikut kunci cache, untuk
+        data kecil yang memengaruhi response tanpa perlu memantau tabelnya.
+    Pasang di bawah decorator otentikasi/otorisasi agar pengecekan akses tetap berjalan.
+    """
+    table_names = register_tracked_tables(*sources)
+
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if request.method != 'GET':
+                return fn(*args, **kwargs)
+
+            version_names, tenant_key = _version_names(table_names, vary_on_tenant)
+            try:
+                versions = get_table_versions(version_names)
+            except Exception as e:
+                # Tabel cache_versions belum dimigrasi / DB error -> tanpa cache
+                db.session.rollback()
+                print(f"HTTP cache dilewati untuk {request.endpoint}: {e}")
+                return fn(*args, **kwargs)
+
+            cache_key = _cache_key(vary_on_user, tenant_key, vary_on)
+            digest = hashlib.sha1(repr((cache_key, sorted(versions.items()))).encode('utf-8'))
+            etag = digest.hexdigest()
+
+            # contains_weak: ETag menjadi weak setelah response dikompres
+            if request.if_none_match.contains_weak(etag):
+                response = _json_response(b'', etag, status=304)
+                response.headers.pop('Content-Type', None)
+                return response
+
+            with _lock:
+                cached = _response_cache.get(cache_key)
+                if cached and cached[0] == etag:
+                    _response_cache.move_to_end(cache_key)
+                    return _json_response(cached[1], etag)
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code != 200 or not response.is_json:
+                return response
+
+            body = response.get_data()
+            max_entries = current_app.config.get('HTTP_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+            with _lock:
+                _response_cache[cache_key] = (etag, body)
+                _response_cache.move_to_end(cache_key)
+                while len(_response_cache) > max_entries:
+                    _response_cache.popitem(last=False)
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorator
+    return wrapper
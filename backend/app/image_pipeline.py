@@ -0,0 +1,203 @@
+# backend/app/image_pipeline.py
+"""
+Pipeline upload gambar (struktur organisasi).
+
+1. Upload dibaca per blok ke file sementara dengan batas ukuran yang benar-benar
+   ditegakkan (tidak bergantung pada `content_length` part multipart yang sering 0).
+2. Gambar di-decode dengan Pillow (dengan batas piksel), orientasi EXIF dinormalkan,
+   lalu di-encode ulang:
+     - master  : PNG teroptimasi (dipakai export Excel & unduhan)
+     - preview : WebP lebar maks. PREVIEW_SIZE (tampilan dashboard)
+     - thumb   : WebP lebar maks. THUMB_SIZE (daftar / kartu)
+3. Nama file berbasis hash konten -> file identik tidak disimpan dua kali dan
+   bisa di-cache browser sebagai immutable.
+4. Karena satu file bisa dipakai beberapa baris, penulisan file + commit referensi
+   (upload) dan pengecekan referensi + hapus file (release) dijalankan di dalam
+   `image_reference_lock` agar keduanya tidak saling menyela.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+CHUNK_SIZE = 64 * 1024
+MASTER_MAX_SIZE = 2400
+PREVIEW_SIZE = 1200
+THUMB_SIZE = 320
+MAX_PIXELS = 40_000_000  # Perlindungan decompression bomb
+ALLOWED_FORMATS = {'PNG', 'JPEG', 'WEBP', 'GIF', 'BMP'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_CONTENT_ADDRESSED_RE = re.compile(r'^[a-z]+_[0-9a-f]{32}(_preview|_thumb)?\.(png|webp)$')
+_local_reference_lock = threading.Lock()
+
+
+class ImageUploadError(Exception):
+    """Upload gambar ditolak; `status_code` mengikuti respons HTTP yang sesuai."""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def variant_filenames(master_filename):
+    """Nama file preview & thumbnail yang diturunkan dari nama file master."""
+    base = os.path.splitext(master_filename)[0]
+    return {
+        "preview": f"{base}_preview.webp",
+        "thumb": f"{base}_thumb.webp",
+    }
+
+
+def is_content_addressed(filename):
+    """True jika nama file berbasis hash konten (aman di-cache sebagai immutable)."""
+    return bool(_CONTENT_ADDRESSED_RE.match(os.path.basename(filename)))
+
+
+def _spool_with_limit(stream, max_bytes):
+    """Menyalin stream upload ke file sementara, gagal segera jika melewati batas."""
+    spool = tempfile.SpooledTemporaryFile(max_size=2 * 1024 * 1024)
+    total = 0
+    while True:
+        block = stream.read(CHUNK_SIZE)
+        if not block:
+            break
+        total += len(block)
+        if total > max_bytes:
+            spool.close()
+            raise ImageUploadError(f"Ukuran file melebihi {max_bytes / (1024 * 1024):g}MB.", 413)
+        spool.write(block)
+    if total == 0:
+        spool.close()
+        raise ImageUploadError("File gambar kosong.")
+    spool.seek(0)
+    return spool
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def _resized(image, max_size):
+    copy = image.copy()
+    copy.thumbnail((max_size, max_size), Image.LANCZOS)
+    return copy
+
+
+def _atomic_write(path, data):
+    """Menulis file via rename atomik; dilewati jika file dengan hash sama sudah ada."""
+    if os.path.exists(path):
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def prepare_image_upload(file_storage, prefix='img', max_bytes=1024 * 1024):
+    """
+    Memvalidasi & meng-encode upload gambar tanpa menulis ke disk.
+    Mengembalikan dict {"master"|"preview"|"thumb": (nama_file, bytes)}.
+    """
+    spool = _spool_with_limit(file_storage.stream, max_bytes)
+    try:
+        try:
+            with Image.open(spool) as probe:
+                if probe.format not in ALLOWED_FORMATS:
+                    raise ImageUploadError("Format gambar tidak didukung.")
+                if probe.width * probe.height > MAX_PIXELS:
+                    raise ImageUploadError("Dimensi gambar terlalu besar.", 413)
+                probe.verify()
+            spool.seek(0)
+            with Image.open(spool) as source:
+                image = ImageOps.exif_transpose(source)
+                image.load()
+        except Image.DecompressionBombError:
+            # Pillow menolak sendiri gambar di atas 2x Image.MAX_IMAGE_PIXELS (bukan OSError)
+            raise ImageUploadError("Dimensi gambar terlalu besar.", 413)
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            raise ImageUploadError("File bukan gambar yang valid.")
+    finally:
+        spool.close()
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    master = _resized(image, MASTER_MAX_SIZE)
+    master_bytes = _encode(master, 'PNG', optimize=True)
+    digest = hashlib.sha256(master_bytes).hexdigest()[:32]
+
+    master_filename = f"{prefix}_{digest}.png"
+    variants = variant_filenames(master_filename)
+    return {
+        "master": (master_filename, master_bytes),
+        "preview": (variants["preview"], _encode(_resized(image, PREVIEW_SIZE), 'WEBP', quality=82, method=6)),
+        "thumb": (variants["thumb"], _encode(_resized(image, THUMB_SIZE), 'WEBP', quality=75, method=6)),
+    }
+
+
+def store_image_variants(prepared, upload_folder):
+    """
+    Menulis hasil prepare_image_upload ke upload_folder (file yang sudah ada dilewati).
+    Mengembalikan dict nama file {"master", "preview", "thumb"}.
+    """
+    os.makedirs(upload_folder, exist_ok=True)
+    for filename, data in prepared.values():
+        _atomic_write(os.path.join(upload_folder, filename), data)
+    return {key: filename for key, (filename, _) in prepared.items()}
+
+
+@contextmanager
+def image_reference_lock(session, master_filename):
+    """
+    Lock per file gambar selama sisa transaksi `session`; commit di dalam blok.
+
+    PostgreSQL: advisory lock transaksi (berlaku antar worker/host, lepas saat
+    commit/rollback). Database lain (SQLite dev): lock proses.
+    """
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        key = int(hashlib.sha1(f"image:{master_filename}".encode('utf-8')).hexdigest()[:15], 16)
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": key})
+        yield
+        return
+    with _local_reference_lock:
+        yield
+
+
+def remove_image_files(upload_folder, master_filename):
+    """Menghapus file master beserta varian turunannya (jika ada)."""
+    names = [master_filename]
+    if is_content_addressed(master_filename):
+        names.extend(variant_filenames(master_filename).values())
+    for name in names:
+        try:
+            os.remove(os.path.join(upload_folder, name))
+        except OSError:
+            pass  # Abaikan jika file tidak ditemukan
+
+
+def image_urls(master_filename, url_prefix='api/uploads'):
+    """URL relatif untuk master/preview/thumb (preview & thumb None untuk file lama)."""
+    if not master_filename:
+        return {"image_url": None, "preview_url": None, "thumbnail_url": None}
+    urls = {"image_url": f"{url_prefix}/{master_filename}", "preview_url": None, "thumbnail_url": None}
+    if is_content_addressed(master_filename):
+        variants = variant_filenames(master_filename)
+        urls["preview_url"] = f"{url_prefix}/{variants['preview']}"
+        urls["thumbnail_url"] = f"{url_prefix}/{variants['thumb']}"
+    return urls
@@ -0,0 +1,85 @@
+# backend/app/json_provider.py
+"""
+JSON provider aplikasi (dipasang di create_app sebagai `app.json`).
+
+- Memakai orjson jika terpasang (serialisasi jauh lebih cepat, output bytes
+  langsung tanpa encode ulang); fallback ke modul json standar.
+- Menangani tipe yang sering keluar dari query secara native:
+  `Decimal` -> float, `date`/`datetime` -> ISO 8601, UUID, dataclass.
+  Route tidak perlu lagi mengonversi field satu per satu sebelum jsonify.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson opsional
+    orjson = None
+
+
+def _default(obj):
+    """Konversi tipe non-JSON (dipakai oleh orjson maupun json standar)."""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider Flask dengan backend orjson (jika ada) dan konversi tipe DB native."""
+
+    default = staticmethod(_default)
+    # Output UTF-8 apa adanya (sama seperti orjson) agar kedua backend konsisten
+    ensure_ascii = False
+
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+
+    def _orjson_options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        """Serialisasi ke bytes UTF-8 (jalur cepat untuk response)."""
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=self._orjson_options(indent))
+            except TypeError:
+                pass  # Mis. integer > 64 bit: serahkan ke json standar
+        kwargs = {"indent": 2} if indent else {"separators": (',', ':')}
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # Biarkan json standar yang melempar error (pesan & tipe error sama seperti sebelumnya)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,167 @@
+# backend/app/madya_criteria.py
+"""
+Kriteria probabilitas & dampak Asesmen Madya (copy-on-write).
+
+Isi kriteria default disimpan sekali sebagai set bersama berversi
+(`madya_criteria_sets`); asesmen baru hanya menyimpan `criteria_set_id`.
+Baris `madya_criteria_probability` / `madya_criteria_impact` per asesmen
+hanya dibuat (di-materialisasi) saat user mengedit satu level, dan saat
+dibaca di-overlay di atas set dasar.
+
+Set tidak pernah diubah setelah dibuat: perubahan DEFAULT_* di bawah
+menghasilkan checksum baru -> versi set baru untuk asesmen berikutnya,
+asesmen lama tetap menunjuk versi lamanya.
+
+Asesmen lama (sebelum set bersama) tidak punya `criteria_set_id` dan
+masih menyimpan salinan lengkap; barisnya dibaca apa adanya.
+"""
+import hashlib
+import json
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import (
+    MadyaCriteriaSet, MadyaCriteriaSetProbability, MadyaCriteriaSetImpact,
+    MadyaCriteriaProbability, MadyaCriteriaImpact
+)
+from app.serializers import get_serializer
+
+DEFAULT_SET_NAME = 'Kriteria Default Madya'
+
+DEFAULT_PROBABILITY_CRITERIA = [
+  { "level": 5, "parameter": "Hampir Pasti Terjadi", "kemungkinan": "Risiko pernah terjadi sekali dalam 1 bulan", "frekuensi": "> 10% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 80% sampai dengan 100%" },
+  { "level": 4, "parameter": "Sangat Mungkin Terjadi", "kemungkinan": "Risiko pernah terjadi sekali dalam 2 bulan", "frekuensi": "Diatas 5 s/d 10% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 60% sampai dengan 80%" },
+  { "level": 3, "parameter": "Bisa Terjadi", "kemungkinan": "Risiko pernah terjadi namun tidak sering, sekali dalam 4 bulan", "frekuensi": "Diatas 1% s/d 5% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 40% sampai dengan 60%" },
+  { "level": 2, "parameter": "Jarang Terjadi", "kemungkinan": "Risiko mungkin terjadi hanya sekali dalam 6 bulan", "frekuensi": "Dari 1 permil s/d 1% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko dari 20% sampai dengan 40%" },
+  { "level": 1, "parameter": "Sangat Jarang Terjadi", "kemungkinan": "Risiko mungkin terjadi sangat jarang, paling banyak satu kali dalam setahun", "frekuensi": "< 1 permil dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko lebih kecil dari 20%" },
+]
+
+DEFAULT_IMPACT_CRITERIA = [
+  { "level": 5, "kriteriaDampak": "Sangat Tinggi", "rangeFinansial": "X > 80%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak katastrofe yang dapat mengakibatkan kerusakan/ kerugian/ penurunan > 80% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda lebih dari 9 bulan", "hukum_pelanggaran": "Perusahaan diputuskan kalah di pengadilan tingkat selanjutnya.", "kepat_pelanggaran": "Regulator memberlaku-kan sanksi signifikan (misalkan delisting saham, tidak diperkenan-kan mengikuti kliring, menarik produk yang beredar, dan lain-lain)", "reput_keluhan": "Keluhan yang menyebar ke skala nasional / internasional dan / atau diajukan secara kolektif yang diselesaikan melebihi 10 hari kerja dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_berita": "Publikasi negatif mencapai skala internasional yang tersebar di sosial media dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_saing": "Penurunan pangsa pasar lebih dari 20%", "sdm_keluhan": "Demonstrasi terkoordinasi, terjadinya kematian karyawan saat kerja", "sdm_turnover": "Turn over pegawai bertalenta >15% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta >15% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama lebih dari 6 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu lebih dari 500 kali", "sistem_platform": "X ≤ 60%", "ops_sla": ">20% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus kematian jamak", "hsse_fatality_2": "Wabah ke lingkungan", "hsse_fatality_3": "Potensi menyebabkan banyak kematian misalnya bahan kimia beracun berbahaya", "hsse_kerusakan_lingkungan": "Sangat serius kerusakan jangka panjang (>5 tahun) dan fungsi ekosistem", "hsse_penurunan_esg": "X < 60% atau memperoleh rating '40+ (severe)'", "pmn_tunda": "Tertunda > 4 bulan dari target RKAP", "bank_fraud": "X > 1.400", "asuransi_aset_rating": "Instrumen pada Investment grade < 70%", "asuransi_aset_peringkat": "atau Peringkat di bawah BBB (yang setara atau tidak diperingkat)", "aktu_rasio": "Rasio klaim > 100%" },
+  # SKALA 4
+  { "level": 4, "kriteriaDampak": "Tinggi", "rangeFinansial": "60% < X ≤ 80%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak signifikan yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 60% - 80% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda 6 s/d 9 bulan", "hukum_pelanggaran": "Perusahaan diputuskan kalah di pengadilan tingkat pertama.", "kepat_pelanggaran": "Regulator memberlaku-kan pembatasan dan / atau pembekuan terhadap aktivitas operasional / produk / jasa tertentu.", "reput_keluhan": "Terdapat keluhan pelanggan/ nasabah/ pembeli/ supplier yang signifikan dan dipublikasikan di media massa nasional/ internasional", "reput_berita": "Pemberitaan negatif di media massa nasional dan media sosial yang signifikan, menjadi isu utama, dan mudah ditangani", "reput_saing": "Kehilangan daya saing signifikan yang ditunjukkan dengan penurunan pangsa pasar 5% - 10%", "sdm_keluhan": "Terdapat keluhan karyawan yang menimbulkan gangguan operasional ringan di satu unit", "sdm_turnover": "Turn over karyawan bertalenta (regretted turnover) 5% - 7%", "sdm_regretted_turnover": "Turn over pegawai bertalenta antara 10% sampai dengan 15% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama 2 s/d 6 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 200-500 kali", "sistem_platform": "70% ≥ X > 60%", "ops_sla": "Antara 10% s/d 20% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus kematian tunggal / Cacat tetap / Ketidakhadir-an kerja yang lama", "hsse_fatality_2": "Efek ireversibel yang menyebabkan kematian", "hsse_fatality_3": "[Data L4F3]", "hsse_kerusakan_lingkungan": "Efek lingkungan jangka menengah (3-5 tahun) yang serius", "hsse_penurunan_esg": "70% ≥ X > 60% atau memperoleh rating '30-40 (high)'", "pmn_tunda": "Tertunda 3 bulan dari target RKAP", "bank_fraud": "1.201 < X ≤ 1.400", "asuransi_aset_rating": "70% ≤ Instrumen pada Investment grade < 80%", "asuransi_aset_peringkat": "atau Peringkat BBB (yang setara)", "aktu_rasio": "90% < Rasio klaim ≤ 100%" },
+  # SKALA 3
+  { "level": 3, "kriteriaDampak": "Sedang", "rangeFinansial": "40% < X ≤ 60%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak sedang yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 40% - 60% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda 3 s/d 6 bulan", "hukum_pelanggaran": "Perusahaan mendapat tuntutan hukum.", "kepat_pelanggaran": "Peringatan tertulis / formal, terkena denda.", "reput_keluhan": "Terdapat keluhan pelanggan/ nasabah/ pembeli/ supplier yang cukup signifikan dan dipublikasikan di media massa lokal", "reput_berita": "Pemberitaan negatif di media massa lokal dan media sosial yang cukup signifikan, namun tidak menjadi isu utama", "reput_saing": "Kehilangan daya saing cukup signifikan yang ditunjukkan dengan penurunan pangsa pasar 1% - 5%", "sdm_keluhan": "Terdapat keluhan karyawan yang memerlukan eskalasi luas (sampai tingkat Direksi) untuk penyelesaian", "sdm_turnover": "Turn over karyawan bertalenta (regretted turnover) 3% - 5%", "sdm_regretted_turnover": "Turn over pegawai bertalenta antara 5% sampai dengan 10% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama < 1 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 100-199 kali", "sistem_platform": "80 % ≥ X > 70%", "ops_sla": "Antara 2,5% s/d 10% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Cacat tidak tetap / Ketidakhadir-an kerja yang terbatas", "hsse_fatality_2": "Efek ireversibel tanpa kehilangan nyawa tetapi dengan cacat serius dan rawat inap berkepanjangan", "hsse_fatality_3": "[Data L3F3]", "hsse_kerusakan_lingkungan": "Efek jangka pendek (1-2 tahun) tetapi tidak mempengaruhi fungsi ekosistem", "hsse_penurunan_esg": "80 % ≥ X > 70% atau memperoleh rating '20-30 (medium)'", "pmn_tunda": "Tertunda 2 bulan dari target RKAP", "bank_fraud": "1.001 < X ≤ 1.200", "asuransi_aset_rating": "80% ≤ Instrumen pada Investment grade < 90%", "asuransi_aset_peringkat": "atau Peringkat A (yang setara)", "aktu_rasio": "82,5% < Rasio klaim ≤ 90%" },
+  # SKALA 2
+  { "level": 2, "kriteriaDampak": "Kecil", "rangeFinansial": "20% < X ≤ 40%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak kecil yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 20% - 40% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda antara 2 - 3 bulan ", "hukum_pelanggaran": "Perusahaan mendapat somasi.", "kepat_pelanggaran": "Diminta bertemu dengan pihak Regulator (misalkan OJK, Bank Indonesia, IDX, Kementerian terkait, Dirjen Pajak, dan lain-lain)", "reput_keluhan": "Terdapat keluhan pelanggan/ nasabah/ pembeli/ supplier yang tidak signifikan dan tidak dipublikasikan di media massa", "reput_berita": "Pemberitaan negatif yg terisolasi di wilayah sektoral melalui media konvensional (misalkan Radio lokal, TV lokal, Surat Kabar daerah)", "reput_saing": "Kehilangan daya saing tidak signifikan yang ditunjukkan dengan penurunan pangsa pasar < 1%", "sdm_keluhan": "Terdapat keluhan karyawan yang memerlukan eskalasi terbatas (sampai tingkat unit SDM) untuk penyelesaian", "sdm_turnover": "Turn over karyawan bertalenta (regretted turnover) 1% - 3%", "sdm_regretted_turnover": "Turn over pegawai bertalenta dari 1% sampai dengan 5% setahun", "sistem_gangguan": "Aplikasi dan Infrastruktur pendukung yang kurang penting tidak berfungsi selama lebih dari 1 hari s/d 3 hari", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 50-99 kali", "sistem_platform": "90% ≥ X > 80%", "ops_sla": "Dari 1% s/d 2,5% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus Perawatan Medis", "hsse_fatality_2": "Efek kesehatan minor dan reversibel (tanpa rawat inap)", "hsse_fatality_3": "[Data L2F3]", "hsse_kerusakan_lingkungan": "Efek minor pada lingkungan biologis atau fisik", "hsse_penurunan_esg": "90% ≥ X > 80% atau memperoleh rating '10-20 (low)'", "pmn_tunda": "Tertunda 1 bulan dari target RKAP", "bank_fraud": "800 ≤ X ≤ 1.000", "asuransi_aset_rating": "90% ≤ Instrumen pada Investment grade < 100%", "asuransi_aset_peringkat": "atau Peringkat AA (yang setara)", "aktu_rasio": "75% < Rasio klaim ≤ 82,5%" },
+  # SKALA 1
+  { "level": 1, "kriteriaDampak": "Sangat Kecil", "rangeFinansial": "X ≤ 20%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak sangat rendah yang dapat mengakibatkan kerusakan/ kerugian/ penurunan kurang dari 20% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter target strategis yang harus selesai pada tahun ini tertunda kurang dari 1 bulan", "hukum_pelanggaran": "Tidak ada somasi/ tuntutan hukum", "kepat_pelanggaran": "Teguran informal / verbal.", "reput_keluhan": "Tidak ada keluhan pelanggan/ nasabah/ pembeli/ supplier", "reput_berita": "Publikasi negatif yg terisolasi dan dapat ditangani dalam 1 hari kerja", "reput_saing": "Penurunan pangsa pasar sampai dengan 5%", "sdm_keluhan": "Terdapat keluhan karyawan yang disalurkan sampai tingkat SP Unit namun dapat diisolir dan diselesaikan oleh Pemimpin Unit", "sdm_turnover": "Turn over pegawai bertalenta kurang dari 1% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta kurang dari 1% setahun", "sistem_gangguan": "Aplikasi & Infrastruktur pendukung yang kurang penting tidak berfungsi selama 1 hari", "sistem_siber": "Jumlah rata-rata serangan siber per minggu di bawah 50 kali", "sistem_platform": "X > 90%", "ops_sla": "<1% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus Pertolongan Pertama", "hsse_fatality_2": "Tidak berpengaruh pada Kinerja Kerja", "hsse_fatality_3": "[Data L1F3]", "hsse_kerusakan_lingkungan": "Kerusakan terbatas pada area minimal dengan signifikansi rendah", "hsse_penurunan_esg": "X > 90% atau memperoleh rating '0-10 (negligible)'", "pmn_tunda": "Diterima tepat waktu sesuai dengan RKAP", "bank_fraud": "X < 800", "asuransi_aset_rating": "Instrumen pada investment grade 100%,", "asuransi_aset_peringkat": "atau Peringkat AAA (yang setara)", "aktu_rasio": "Rasio klaim ≤ 75%" }
+]
+
+
+CRITERIA_KINDS = {
+    'probability': (MadyaCriteriaProbability, MadyaCriteriaSetProbability),
+    'impact': (MadyaCriteriaImpact, MadyaCriteriaSetImpact),
+}
+
+_default_set_id = None
+_base_cache = {}  # set_id -> {'probability': [dict], 'impact': [dict]} (set tidak berubah)
+_cache_lock = threading.Lock()
+
+
+def default_criteria_checksum():
+    payload = json.dumps([DEFAULT_PROBABILITY_CRITERIA, DEFAULT_IMPACT_CRITERIA], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_default_criteria_set():
+    """Set kriteria untuk isi DEFAULT_* saat ini; dibuat (versi baru) jika belum ada."""
+    global _default_set_id
+    if _default_set_id is not None:
+        criteria_set = db.session.get(MadyaCriteriaSet, _default_set_id)
+        if criteria_set is not None:
+            return criteria_set
+
+    checksum = default_criteria_checksum()
+    criteria_set = MadyaCriteriaSet.query.filter_by(checksum=checksum).first()
+    if criteria_set is None:
+        latest = db.session.query(func.max(MadyaCriteriaSet.version))\
+            .filter(MadyaCriteriaSet.name == DEFAULT_SET_NAME).scalar() or 0
+        try:
+            with db.session.begin_nested():
+                criteria_set = MadyaCriteriaSet(name=DEFAULT_SET_NAME, version=latest + 1, checksum=checksum)
+                criteria_set.probability_levels = [MadyaCriteriaSetProbability(**data) for data in DEFAULT_PROBABILITY_CRITERIA]
+                criteria_set.impact_levels = [MadyaCriteriaSetImpact(**data) for data in DEFAULT_IMPACT_CRITERIA]
+                db.session.add(criteria_set)
+        except IntegrityError:
+            # Worker lain sudah membuat set dengan isi yang sama
+            criteria_set = MadyaCriteriaSet.query.filter_by(checksum=checksum).first()
+
+    _default_set_id = criteria_set.id
+    return criteria_set
+
+
+def _base_levels(set_id):
+    """Isi set (list dict per level, urut seperti set) dari cache proses."""
+    cached = _base_cache.get(set_id)
+    if cached is not None:
+        return cached
+    base = {}
+    for kind, (_, set_model) in CRITERIA_KINDS.items():
+        serializer = get_serializer(set_model)
+        rows = serializer.query(set_model.query).filter(set_model.set_id == set_id).order_by(set_model.id).all()
+        base[kind] = serializer.many_rows(rows)
+    with _cache_lock:
+        _base_cache[set_id] = base
+    return base
+
+
+def _overrides(assessment, kind):
+    return assessment.probability_criteria if kind == 'probability' else assessment.impact_criteria
+
+
+def resolve_criteria(assessment, kind):
+    """
+    Kriteria efektif satu asesmen: level set dasar, diganti override per level.
+    Item tanpa override punya `id` None (edit lewat endpoint per level).
+    """
+    override_model, _ = CRITERIA_KINDS[kind]
+    serializer = get_serializer(override_model)
+    overrides = _overrides(assessment, kind)
+    if assessment.criteria_set_id is None:
+        # Asesmen lama: salinan lengkap tersimpan per asesmen
+        return [dict(serializer.from_object(row), is_override=True) for row in overrides]
+
+    by_level = {row.level: row for row in overrides}
+    result = []
+    for base in _base_levels(assessment.criteria_set_id)[kind]:
+        row = by_level.pop(base['level'], None)
+        if row is not None:
+            result.append(dict(serializer.from_object(row), is_override=True))
+        else:
+            result.append(dict(base, id=None, is_override=False))
+    result.extend(dict(serializer.from_object(row), is_override=True) for row in by_level.values())
+    return result
+
+
+def resolve_assessment_criteria(assessment):
+    """(kriteria probabilitas, kriteria dampak) efektif untuk satu asesmen."""
+    return resolve_criteria(assessment, 'probability'), resolve_criteria(assessment, 'impact')
+
+
+def materialize_criteria_override(assessment, kind, level):
+    """
+    Baris override (dapat diedit) untuk satu level, disalin dari set dasar
+    jika belum ada. None jika level tidak dikenal. Sudah di-flush, belum di-commit.
+    """
+    override_model, _ = CRITERIA_KINDS[kind]
+    row = override_model.query.filter_by(assessment_id=assessment.id, level=level).first()
+    if row is not None:
+        return row
+    if assessment.criteria_set_id is None:
+        return None
+
+    base = next((item for item in _base_levels(assessment.criteria_set_id)[kind] if item['level'] == level), None)
+    if base is None:
+        return None
+    try:
+        with db.session.begin_nested():
+            row = override_model(assessment_id=assessment.id, **base)
+            db.session.add(row)
+    except IntegrityError:
+        # Request lain (mis. double submit) sudah membuat override level ini
+        row = override_model.query.filter_by(assessment_id=assessment.id, level=level).first()
+    return row
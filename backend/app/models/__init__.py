@@ -1,10 +1,11 @@
 # backend/app/models/__init__.py
 
 # Import semua model dari file-file terpisah
-from .user import User, Role, Permission, Department, user_roles, role_permissions
+from .user import User, Role, Permission, Department, UsageCounter, user_roles, role_permissions
 from .master import (
-    MasterData, Regulation, HorizonScanEntry, KRI, 
-    CriticalAsset, Dependency, ImpactScenario, HorizonScanResult
+    MasterData, Regulation, RegulationChunk, HorizonScanEntry, KRI, 
+    CriticalAsset, Dependency, ImpactScenario, HorizonScanResult, CacheVersion,
+    HorizonSectorBriefing, HorizonScanArticle
 )
 from .rsca import (
     RscaCycle, RscaQuestionnaire, RscaAnswer, SubmittedRisk, ActionPlan,
@@ -16,9 +17,10 @@ from .basic import (
     OrganizationalContext, basic_assessment_contexts
 )
 from .madya import (
-    RiskMapTemplate, RiskMapLikelihoodLabel, RiskMapImpactLabel, 
+    RiskMapTemplate, RiskMapTemplateVersion, RiskRescoringJob, RiskMapLikelihoodLabel, RiskMapImpactLabel, 
     RiskMapLevelDefinition, RiskMapScore, MadyaAssessment, 
     MadyaCriteriaProbability, MadyaCriteriaImpact, 
+    MadyaCriteriaSet, MadyaCriteriaSetProbability, MadyaCriteriaSetImpact,
     OrganizationalStructureEntry, SasaranOrganisasiKPI, RiskInputMadya
 )
 
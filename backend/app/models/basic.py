@@ -25,6 +25,8 @@ class BasicAssessment(db.Model):
     nama_unit_kerja = db.Column(db.String(200), nullable=False)
     nama_perusahaan = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Stempel perubahan (juga disentuh saat baris anak berubah) untuk cache export
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     contexts = db.relationship('OrganizationalContext', secondary=basic_assessment_contexts, lazy='subquery',
@@ -16,6 +16,46 @@ class RiskMapTemplate(db.Model):
     level_definitions = db.relationship('RiskMapLevelDefinition', backref='template', lazy=True, cascade="all, delete-orphan")
     scores = db.relationship('RiskMapScore', backref='template', lazy=True, cascade="all, delete-orphan")
     madya_assessments = db.relationship('MadyaAssessment', back_populates='risk_map_template', lazy=True)
+    # Nomor versi aktif (lihat RiskMapTemplateVersion); tabel anak di atas = cermin versi aktif
+    current_version = db.Column(db.Integer, nullable=True)
+    versions = db.relationship('RiskMapTemplateVersion', back_populates='template', lazy=True, cascade="all, delete-orphan", order_by='RiskMapTemplateVersion.version')
+
+class RiskMapTemplateVersion(db.Model):
+    """Snapshot template yang tidak berubah; matriks skor disimpan sebagai satu kolom JSON."""
+    __tablename__ = 'risk_map_template_versions'
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('risk_map_templates.id'), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    likelihood_labels = db.Column(db.JSON, nullable=False)  # [{"level", "label"}]
+    impact_labels = db.Column(db.JSON, nullable=False)      # [{"level", "label"}]
+    level_definitions = db.Column(db.JSON, nullable=False)  # [{"level_name", "color_hex", "min_score", "max_score"}]
+    score_matrix = db.Column(db.JSON, nullable=False)       # matrix[likelihood-1][impact-1] -> skor / null
+    checksum = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+
+    template = db.relationship('RiskMapTemplate', back_populates='versions')
+
+    __table_args__ = (db.UniqueConstraint('template_id', 'version', name='uq_risk_map_template_version'),)
+
+class RiskRescoringJob(db.Model):
+    """Job rescoring massal risk input Madya setelah versi template berubah."""
+    __tablename__ = 'risk_rescoring_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('risk_map_templates.id', ondelete='CASCADE'), nullable=False, index=True)
+    version_id = db.Column(db.Integer, db.ForeignKey('risk_map_template_versions.id', ondelete='CASCADE'), nullable=False)
+    assessment_ids = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    total_inputs = db.Column(db.Integer, nullable=True)
+    processed_inputs = db.Column(db.Integer, nullable=False, default=0)
+    updated_inputs = db.Column(db.Integer, nullable=False, default=0)
+    updated_sasaran = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Diperbarui per chunk; job 'running' basi dilanjutkan worker lain
+    finished_at = db.Column(db.DateTime, nullable=True)
 
 class RiskMapLikelihoodLabel(db.Model):
     __tablename__ = 'risk_map_likelihood_labels'
@@ -54,10 +94,16 @@ class MadyaAssessment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nama_asesmen = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Stempel perubahan (juga disentuh saat baris anak berubah) untuk cache export
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     risk_map_template_id = db.Column(db.Integer, db.ForeignKey('risk_map_templates.id'), nullable=True)
     risk_map_template = db.relationship('RiskMapTemplate', back_populates='madya_assessments')
+    # Versi template yang dipakai untuk skor tersimpan; pindah versi hanya jika user opt-in
+    risk_map_version_id = db.Column(db.Integer, db.ForeignKey('risk_map_template_versions.id'), nullable=True)
+    risk_map_version = db.relationship('RiskMapTemplateVersion', lazy=True)
+    risk_map_auto_upgrade = db.Column(db.Boolean, default=False, nullable=False, server_default=db.false())
     
     structure_image_filename = db.Column(db.String(300), nullable=True)
     structure_entries = db.relationship('OrganizationalStructureEntry', backref='assessment', lazy=True, cascade="all, delete-orphan")
@@ -66,6 +112,8 @@ class MadyaAssessment(db.Model):
     
     probability_criteria = db.relationship('MadyaCriteriaProbability', backref='assessment', lazy=True, cascade="all, delete-orphan")
     impact_criteria = db.relationship('MadyaCriteriaImpact', backref='assessment', lazy=True, cascade="all, delete-orphan")
+    # Set kriteria bersama; baris probability/impact_criteria di atas hanya berisi override
+    criteria_set_id = db.Column(db.Integer, db.ForeignKey('madya_criteria_sets.id'), nullable=True)
     
     filter_organisasi = db.Column(db.String(200), nullable=True)
     filter_direktorat = db.Column(db.String(200), nullable=True)
@@ -75,20 +123,16 @@ class MadyaAssessment(db.Model):
     def __repr__(self):
         return f'<MadyaAssessment {self.id} - {self.nama_asesmen}>'
 
-class MadyaCriteriaProbability(db.Model):
-    __tablename__ = 'madya_criteria_probability'
-    id = db.Column(db.Integer, primary_key=True)
-    assessment_id = db.Column(db.Integer, db.ForeignKey('madya_assessments.id'), nullable=False)
+class _ProbabilityCriteriaFields:
+    """Kolom isi kriteria probabilitas (dipakai set bersama & override per asesmen)."""
     level = db.Column(db.Integer, nullable=False)
     parameter = db.Column(db.String(255), nullable=True)
     kemungkinan = db.Column(db.Text, nullable=True)
     frekuensi = db.Column(db.Text, nullable=True)
     persentase = db.Column(db.Text, nullable=True)
 
-class MadyaCriteriaImpact(db.Model):
-    __tablename__ = 'madya_criteria_impact'
-    id = db.Column(db.Integer, primary_key=True)
-    assessment_id = db.Column(db.Integer, db.ForeignKey('madya_assessments.id'), nullable=False)
+class _ImpactCriteriaFields:
+    """Kolom isi kriteria dampak (dipakai set bersama & override per asesmen)."""
     level = db.Column(db.Integer, nullable=False)
     kriteriaDampak = db.Column(db.String(255), nullable=True)
     rangeFinansial = db.Column(db.Text, nullable=True)
@@ -117,6 +161,45 @@ class MadyaCriteriaImpact(db.Model):
     asuransi_aset_peringkat = db.Column(db.Text, nullable=True)
     aktu_rasio = db.Column(db.Text, nullable=True)
 
+# --- Set kriteria default bersama (versi tidak berubah setelah dibuat) ---
+class MadyaCriteriaSet(db.Model):
+    __tablename__ = 'madya_criteria_sets'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    checksum = db.Column(db.String(64), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    probability_levels = db.relationship('MadyaCriteriaSetProbability', lazy=True, cascade="all, delete-orphan", order_by='MadyaCriteriaSetProbability.id')
+    impact_levels = db.relationship('MadyaCriteriaSetImpact', lazy=True, cascade="all, delete-orphan", order_by='MadyaCriteriaSetImpact.id')
+
+    __table_args__ = (db.UniqueConstraint('name', 'version', name='uq_madya_criteria_set_version'),)
+
+class MadyaCriteriaSetProbability(_ProbabilityCriteriaFields, db.Model):
+    __tablename__ = 'madya_criteria_set_probability'
+    id = db.Column(db.Integer, primary_key=True)
+    set_id = db.Column(db.Integer, db.ForeignKey('madya_criteria_sets.id'), nullable=False, index=True)
+
+class MadyaCriteriaSetImpact(_ImpactCriteriaFields, db.Model):
+    __tablename__ = 'madya_criteria_set_impact'
+    id = db.Column(db.Integer, primary_key=True)
+    set_id = db.Column(db.Integer, db.ForeignKey('madya_criteria_sets.id'), nullable=False, index=True)
+
+# --- Override kriteria per asesmen (hanya level yang diedit user) ---
+class MadyaCriteriaProbability(_ProbabilityCriteriaFields, db.Model):
+    __tablename__ = 'madya_criteria_probability'
+    id = db.Column(db.Integer, primary_key=True)
+    assessment_id = db.Column(db.Integer, db.ForeignKey('madya_assessments.id'), nullable=False)
+
+    __table_args__ = (db.Index('ix_madya_criteria_probability_assessment_level', 'assessment_id', 'level', unique=True),)
+
+class MadyaCriteriaImpact(_ImpactCriteriaFields, db.Model):
+    __tablename__ = 'madya_criteria_impact'
+    id = db.Column(db.Integer, primary_key=True)
+    assessment_id = db.Column(db.Integer, db.ForeignKey('madya_assessments.id'), nullable=False)
+
+    __table_args__ = (db.Index('ix_madya_criteria_impact_assessment_level', 'assessment_id', 'level', unique=True),)
+
 class OrganizationalStructureEntry(db.Model):
     __tablename__ = 'organizational_structure_entries'
     id = db.Column(db.Integer, primary_key=True)
@@ -21,19 +21,53 @@ class Regulation(db.Model):
     filename = db.Column(db.String(300), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Status ingestion teks dokumen (pending, processing, ready, failed, unsupported)
+    ingest_status = db.Column(db.String(20), nullable=True, index=True)
+    ingest_error = db.Column(db.Text, nullable=True)
+    chunk_count = db.Column(db.Integer, default=0)
+    ingested_at = db.Column(db.DateTime, nullable=True)
+    ingest_started_at = db.Column(db.DateTime, nullable=True)  # 'processing' lama = worker mati
+
+    chunks = db.relationship('RegulationChunk', backref='regulation', lazy=True, cascade="all, delete-orphan")
+
     def __repr__(self):
         return f'<Regulation {self.name}>'
 
+class RegulationChunk(db.Model):
+    """Potongan teks dokumen regulasi + statistik term untuk retrieval BM25."""
+    __tablename__ = 'regulation_chunks'
+    id = db.Column(db.Integer, primary_key=True)
+    regulation_id = db.Column(db.Integer, db.ForeignKey('regulations.id'), nullable=False, index=True)
+    chunk_index = db.Column(db.Integer, nullable=False)
+    page_number = db.Column(db.Integer, nullable=True)
+    content = db.Column(db.Text, nullable=False)
+    term_freqs = db.Column(db.JSON, nullable=False) # {term: frekuensi}
+    length = db.Column(db.Integer, nullable=False) # Jumlah term (panjang dokumen BM25)
+
+    def __repr__(self):
+        return f'<RegulationChunk {self.regulation_id}#{self.chunk_index}>'
+
 class HorizonScanEntry(db.Model):
+    """Penyimpanan berita bersama hasil ingestion terjadwal per sektor (lihat app/horizon_ingest.py)."""
     __tablename__ = 'horizon_scan_entries'
+    __table_args__ = (
+        db.Index('ix_horizon_scan_entries_sector_seen', 'sector', 'last_seen_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300), nullable=False)
     source_url = db.Column(db.String(500), nullable=False, unique=True)
+    url_hash = db.Column(db.String(64), nullable=True, unique=True)  # SHA-256 source_url, kunci artikel bersama
     published_date = db.Column(db.DateTime, nullable=False)
     original_summary = db.Column(db.Text, nullable=False)
     ai_summary = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    sector = db.Column(db.String(100), nullable=True)
+    source_name = db.Column(db.String(150), nullable=True)
+    original_title = db.Column(db.String(300), nullable=True)
+    language = db.Column(db.String(20), nullable=True)
+    last_seen_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+
     def __repr__(self):
         return f'<HorizonScanEntry {self.title}>'
 
@@ -46,15 +80,48 @@ class HorizonScanResult(db.Model):
     sector = db.Column(db.String(100), nullable=False)
     
     generated_title = db.Column(db.String(200), nullable=True) 
-    executive_summary = db.Column(db.Text, nullable=True) 
-    raw_news_data = db.Column(db.Text, nullable=True) 
+    # Isi laporan (grup 'report', deferred): riwayat/dashboard cukup judul & tanggal
+    executive_summary = db.deferred(db.Column(db.Text, nullable=True), group='report')
+    raw_news_data = db.deferred(db.Column(db.Text, nullable=True), group='report')  # Format lama (JSON polos), diganti articles + raw_news_blob
+    raw_news_blob = db.deferred(db.Column(db.LargeBinary, nullable=True), group='report')  # Sisa berita tanpa URL valid, JSON terkompresi
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship('User', backref=db.backref('horizon_scans', lazy=True))
+    articles = db.relationship('HorizonScanArticle', lazy=True, cascade="all, delete-orphan",
+                               order_by='HorizonScanArticle.position')
 
     def __repr__(self):
         return f'<HorizonScanResult {self.generated_title}>'
 
+class HorizonScanArticle(db.Model):
+    """Referensi scan -> artikel bersama (horizon_scan_entries), menggantikan salinan JSON per scan."""
+    __tablename__ = 'horizon_scan_articles'
+    scan_id = db.Column(db.Integer, db.ForeignKey('horizon_scan_results.id', ondelete='CASCADE'), primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('horizon_scan_entries.id'), primary_key=True, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+    entry = db.relationship('HorizonScanEntry')
+
+    def __repr__(self):
+        return f'<HorizonScanArticle {self.scan_id}->{self.entry_id}>'
+
+class HorizonSectorBriefing(db.Model):
+    """Laporan intelijen dasar per sektor per jendela waktu, dipakai bersama oleh semua scan user."""
+    __tablename__ = 'horizon_sector_briefings'
+    __table_args__ = (
+        db.UniqueConstraint('sector', 'window_start', name='uq_horizon_briefing_sector_window'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    sector = db.Column(db.String(100), nullable=False)
+    window_start = db.Column(db.DateTime, nullable=False)
+    title = db.Column(db.String(200), nullable=True)
+    report_html = db.Column(db.Text, nullable=False)
+    news_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<HorizonSectorBriefing {self.sector} @ {self.window_start}>'
+
 class KRI(db.Model):
     __tablename__ = 'kri'
     id = db.Column(db.Integer, primary_key=True)
@@ -99,4 +166,14 @@ class ImpactScenario(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     def __repr__(self):
-        return f'<ImpactScenario {self.nama_skenario}>'
\ No newline at end of file
+        return f'<ImpactScenario {self.nama_skenario}>'
+
+class CacheVersion(db.Model):
+    """Counter versi per tabel, dipakai untuk ETag & invalidasi cache response."""
+    __tablename__ = 'cache_versions'
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.table_name}={self.version}>'
@@ -6,6 +6,11 @@ from sqlalchemy.dialects.postgresql import JSONB
 
 class QrcAssessment(db.Model):
     __tablename__ = 'qrc_assessments'
+    __table_args__ = (
+        # Kuota per user (my-limits / submit) & statistik konsultan
+        db.Index('ix_qrc_assessments_user_type', 'user_id', 'assessment_type'),
+        db.Index('ix_qrc_assessments_status_type_archived', 'status', 'assessment_type', 'is_archived'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     
@@ -22,15 +27,16 @@ class QrcAssessment(db.Model):
     risk_score = db.Column(db.Float, default=0.0) 
     risk_level = db.Column(db.String(50))
     
-    answers_data = db.Column(JSONB, default={})
+    # Kolom berat di grup 'content' (deferred): list memakai proyeksi, detail undefer_group('content')
+    answers_data = db.deferred(db.Column(JSONB, default={}), group='content')
     
     # --- Bagian Consultant (Reviewer) ---
     reviewed_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     reviewed_at = db.Column(db.DateTime, nullable=True)
     
-    consultant_notes = db.Column(db.Text, nullable=True)
-    ai_generated_analysis = db.Column(db.Text, nullable=True)
-    final_report_content = db.Column(db.Text, nullable=True)
+    consultant_notes = db.deferred(db.Column(db.Text, nullable=True), group='content')
+    ai_generated_analysis = db.deferred(db.Column(db.Text, nullable=True), group='content')
+    final_report_content = db.deferred(db.Column(db.Text, nullable=True), group='content')
     
     is_archived = db.Column(db.Boolean, default=False, index=True)
 
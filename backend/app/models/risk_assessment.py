@@ -10,6 +10,8 @@ class RiskAssessment(db.Model):
     nama_asesmen = db.Column(db.String(200), nullable=False)
     tanggal_mulai = db.Column(db.Date, nullable=False)
     tanggal_selesai = db.Column(db.Date, nullable=True)
+    # Stempel perubahan (juga disentuh saat baris anak berubah) untuk cache export
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Company Information
     company_industry = db.Column(db.String(100))
@@ -21,12 +23,12 @@ class RiskAssessment(db.Model):
     # Risk Categories
     risk_categories = db.Column(db.Text)
     
-    # Project Context
-    project_objective = db.Column(db.Text)
-    relevant_regulations = db.Column(db.Text)
-    involved_departments = db.Column(db.Text)
-    completed_actions = db.Column(db.Text)
-    additional_risk_context = db.Column(db.Text)
+    # Project Context (teks panjang: deferred, dimuat sekaligus per grup saat dibutuhkan)
+    project_objective = db.deferred(db.Column(db.Text), group='context')
+    relevant_regulations = db.deferred(db.Column(db.Text), group='context')
+    involved_departments = db.deferred(db.Column(db.Text), group='context')
+    completed_actions = db.deferred(db.Column(db.Text), group='context')
+    additional_risk_context = db.deferred(db.Column(db.Text), group='context')
     
     # Foreign Key ke User
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -34,13 +36,13 @@ class RiskAssessment(db.Model):
     # Relasi
     risk_register_entries = db.relationship('RiskRegister', backref='assessment', lazy=True, cascade="all, delete-orphan")
     
-    # AI Analysis Fields
-    ai_executive_summary = db.Column(db.Text, nullable=True)
-    ai_risk_profile_analysis = db.Column(db.Text, nullable=True)
-    ai_immediate_priorities = db.Column(db.Text, nullable=True)
-    ai_critical_risks_discussion = db.Column(db.Text, nullable=True)
-    ai_implementation_plan = db.Column(db.Text, nullable=True)
-    ai_next_steps = db.Column(db.Text, nullable=True)
+    # AI Analysis Fields (deferred: list tidak memuatnya, detail memakai undefer_group('ai_analysis'))
+    ai_executive_summary = db.deferred(db.Column(db.Text, nullable=True), group='ai_analysis')
+    ai_risk_profile_analysis = db.deferred(db.Column(db.Text, nullable=True), group='ai_analysis')
+    ai_immediate_priorities = db.deferred(db.Column(db.Text, nullable=True), group='ai_analysis')
+    ai_critical_risks_discussion = db.deferred(db.Column(db.Text, nullable=True), group='ai_analysis')
+    ai_implementation_plan = db.deferred(db.Column(db.Text, nullable=True), group='ai_analysis')
+    ai_next_steps = db.deferred(db.Column(db.Text, nullable=True), group='ai_analysis')
     
     def __repr__(self):
         return f'<RiskAssessment {self.nama_asesmen}>'
@@ -80,6 +82,7 @@ class MainRiskRegister(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     title = db.Column(db.Text, nullable=True)
     
     kode_risiko = db.Column(db.String(50))
@@ -1,6 +1,7 @@
 # backend/app/models/rsca.py
 from app import db
 from datetime import datetime
+from app.tenancy import TenantScopedMixin
 
 # Tabel Asosiasi Many-to-Many antara Cycle dan Department
 rsca_cycle_departments = db.Table('rsca_cycle_departments',
@@ -8,8 +9,11 @@ rsca_cycle_departments = db.Table('rsca_cycle_departments',
     db.Column('department_id', db.Integer, db.ForeignKey('departments.id'), primary_key=True)
 )
 
-class RscaCycle(db.Model):
+class RscaCycle(TenantScopedMixin, db.Model):
     __tablename__ = 'rsca_cycles'
+    __table_args__ = (
+        db.Index('ix_rsca_cycles_institution_status', 'institution', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     nama_siklus = db.Column(db.String(200), nullable=False)
     tanggal_mulai = db.Column(db.Date, nullable=False)
@@ -40,6 +44,10 @@ class RscaQuestionnaire(db.Model):
 
 class RscaAnswer(db.Model):
     __tablename__ = 'rsca_answers'
+    # Satu jawaban per pertanyaan per departemen dalam satu siklus (basis upsert ON CONFLICT)
+    __table_args__ = (
+        db.UniqueConstraint('cycle_id', 'questionnaire_id', 'department_id', name='uq_rsca_answers_cycle_question_dept'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     jawaban = db.Column(db.Text, nullable=True)
     catatan = db.Column(db.Text, nullable=True)
@@ -58,8 +66,12 @@ class RscaAnswer(db.Model):
     def __repr__(self):
         return f'<RscaAnswer {self.id}>'
 
-class SubmittedRisk(db.Model):
+class SubmittedRisk(TenantScopedMixin, db.Model):
     __tablename__ = 'submitted_risks'
+    __table_args__ = (
+        db.Index('ix_submitted_risks_institution_status', 'institution', 'status'),
+        db.Index('ix_submitted_risks_institution_cycle', 'institution', 'cycle_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     risk_description = db.Column(db.Text, nullable=False)
     potential_cause = db.Column(db.Text, nullable=True)
@@ -80,8 +92,11 @@ class SubmittedRisk(db.Model):
     def __repr__(self):
         return f'<SubmittedRisk {self.id} (Status: {self.status})>'
 
-class ActionPlan(db.Model):
+class ActionPlan(TenantScopedMixin, db.Model):
     __tablename__ = 'action_plans'
+    __table_args__ = (
+        db.Index('ix_action_plans_institution_department', 'institution', 'assigned_department_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     action_description = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(50), nullable=False, default='Belum Mulai')
@@ -1,6 +1,7 @@
 # backend/app/models/user.py
 from app import db
 from datetime import datetime
+from app.tenancy import TenantScopedMixin
 
 # Tabel Asosiasi
 user_roles = db.Table('user_roles',
@@ -33,9 +34,12 @@ class Permission(db.Model):
     def __repr__(self):
         return f'<Permission {self.name}>'
 
-class Department(db.Model):
+class Department(TenantScopedMixin, db.Model):
     """Model untuk departemen perusahaan."""
     __tablename__ = 'departments'
+    __table_args__ = (
+        db.Index('ix_departments_institution_name', 'institution', 'name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), unique=True, nullable=False)
     institution = db.Column(db.String(255), nullable=True)
@@ -50,6 +54,9 @@ class Department(db.Model):
 class User(db.Model):
     """Model untuk tabel pengguna (users)"""
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_institution_department', 'institution', 'department_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
@@ -99,4 +106,17 @@ class User(db.Model):
          for role in self.roles:
              if role.name == role_name:
                  return True
-         return False
\ No newline at end of file
+         return False
+
+
+class UsageCounter(db.Model):
+    """Pemakaian kuota per (user, resource); dicek & dinaikkan dengan satu UPDATE bersyarat (app.quota)."""
+    __tablename__ = 'usage_counters'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    resource = db.Column(db.String(50), primary_key=True)
+    used = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UsageCounter {self.user_id}:{self.resource}={self.used}>'
@@ -0,0 +1,214 @@
+# backend/app/quota.py
+"""
+Kuota pembuatan data per user (Asesmen Dasar/Madya/AI, template peta risiko,
+Horizon Scanner, QRC).
+
+Sebelumnya setiap create menjalankan `COUNT(*)` lalu INSERT: satu full count per
+request, dan dua request serentak sama-sama lolos pengecekan sehingga limit
+bisa terlampaui. Sekarang pemakaian disimpan di `usage_counters` (satu baris per
+(user, resource)) dan pengecekan + reservasi adalah satu UPDATE bersyarat pada
+primary key:
+
+    UPDATE usage_counters SET used = used + 1
+    WHERE user_id = :u AND resource = :r AND used + 1 <= :limit
+    RETURNING used
+
+Tidak ada baris kembali -> kuota habis. Baris counter yang belum ada diisi
+sekali dari COUNT data lama (backfill migrasi menangani data yang sudah ada).
+
+- Create biasa: reservasi ikut transaksi INSERT (rollback = reservasi batal).
+- Pekerjaan panjang (analisis AI, Horizon Scan): `call_with_quota` meng-commit
+  reservasi lebih dulu agar lock baris counter tidak ditahan selama panggilan
+  AI, lalu melepasnya jika pekerjaan gagal.
+- Hapus lewat ORM otomatis mengembalikan kuota (listener after_flush); jalur
+  bulk SQL memanggil `release_quota` secara eksplisit.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, event, func
+
+from app import db
+from app.models import (
+    UsageCounter, BasicAssessment, MadyaAssessment, RiskAssessment, RiskMapTemplate,
+    HorizonScanResult, QrcAssessment
+)
+
+
+class QuotaExceeded(Exception):
+    """Kuota resource habis; `used`/`limit` dipakai untuk pesan error route."""
+    def __init__(self, resource, used, limit):
+        super().__init__(f"Kuota {resource} habis ({used}/{limit})")
+        self.resource = resource
+        self.used = used
+        self.limit = limit
+
+
+class QuotaResource:
+    """Definisi satu jenis kuota: kolom limit di User + data yang dihitung."""
+
+    def __init__(self, limit_attr, model, criteria=None, matches=None, default_limit=None):
+        self.limit_attr = limit_attr
+        self.model = model
+        self.criteria = criteria or (lambda: [])
+        self.matches = matches or (lambda obj: True)  # Dipanggil untuk objek terhapus: baca __dict__
+        self.default_limit = default_limit
+
+    def limit_for(self, user):
+        limit = getattr(user, self.limit_attr)
+        return self.default_limit if limit is None else limit
+
+    def count(self, user_id):
+        return db.session.query(func.count(self.model.id))\
+            .filter(self.model.user_id == user_id, *self.criteria()).scalar() or 0
+
+
+def qrc_resource(assessment_type):
+    return 'qrc_essay' if assessment_type == 'essay' else 'qrc_standard'
+
+
+RESOURCES = {
+    'dasar': QuotaResource('limit_dasar', BasicAssessment),
+    'madya': QuotaResource('limit_madya', MadyaAssessment),
+    'ai': QuotaResource('limit_ai', RiskAssessment),
+    'template_peta': QuotaResource(
+        'limit_template_peta', RiskMapTemplate,
+        criteria=lambda: [RiskMapTemplate.is_default.is_(False)],
+        matches=lambda obj: not obj.__dict__.get('is_default')),
+    'horizon': QuotaResource('limit_horizon', HorizonScanResult),
+    # Default QRC (2/1) sama seperti sebelumnya saat limit user masih NULL
+    'qrc_standard': QuotaResource(
+        'limit_qrc_standard', QrcAssessment, default_limit=2,
+        criteria=lambda: [func.coalesce(QrcAssessment.assessment_type, 'standard') != 'essay'],
+        matches=lambda obj: qrc_resource(obj.__dict__.get('assessment_type')) == 'qrc_standard'),
+    'qrc_essay': QuotaResource(
+        'limit_qrc_essay', QrcAssessment, default_limit=1,
+        criteria=lambda: [QrcAssessment.assessment_type == 'essay'],
+        matches=lambda obj: qrc_resource(obj.__dict__.get('assessment_type')) == 'qrc_essay'),
+}
+_MODEL_RESOURCES = {}
+for _name, _resource in RESOURCES.items():
+    _MODEL_RESOURCES.setdefault(_resource.model, []).append((_name, _resource))
+
+_counters = UsageCounter.__table__
+
+
+def _ensure_counter(connection, user_id, resource):
+    """Membuat baris counter (diisi dari COUNT data lama) jika belum ada."""
+    used = RESOURCES[resource].count(user_id)
+    values = {"user_id": user_id, "resource": resource, "used": used, "updated_at": datetime.utcnow()}
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        connection.execute(insert(_counters).values(**values)
+                           .on_conflict_do_nothing(index_elements=['user_id', 'resource']))
+        return
+    exists = connection.execute(
+        _counters.select().where(_counters.c.user_id == user_id, _counters.c.resource == resource)
+    ).first()
+    if exists is None:
+        connection.execute(_counters.insert().values(**values))
+
+
+def _try_increment(connection, user_id, resource, amount, limit):
+    stmt = _counters.update().where(
+        _counters.c.user_id == user_id, _counters.c.resource == resource
+    ).values(used=_counters.c.used + amount, updated_at=datetime.utcnow())
+    if limit is not None:
+        stmt = stmt.where(_counters.c.used + amount <= limit)
+    return connection.execute(stmt.returning(_counters.c.used)).scalar()
+
+
+def reserve_quota(user, resource, amount=1, session=None):
+    """
+    Mereservasi `amount` slot kuota dalam transaksi aktif; mengembalikan pemakaian baru.
+    Limit None = tanpa batas (pemakaian tetap dicatat). Raise QuotaExceeded jika habis.
+    """
+    connection = (session or db.session).connection()
+    limit = RESOURCES[resource].limit_for(user)
+    used = _try_increment(connection, user.id, resource, amount, limit)
+    if used is None:
+        # Baris belum ada (user baru / resource baru) atau kuota memang habis
+        _ensure_counter(connection, user.id, resource)
+        used = _try_increment(connection, user.id, resource, amount, limit)
+    if used is None:
+        current = connection.execute(
+            _counters.select().with_only_columns(_counters.c.used)
+            .where(_counters.c.user_id == user.id, _counters.c.resource == resource)
+        ).scalar() or 0
+        raise QuotaExceeded(resource, current, limit)
+    return used
+
+
+def quota_usage(user, resource, session=None):
+    """
+    (used, limit) dari usage_counters, sumber yang sama dengan reserve_quota
+    (termasuk reservasi pekerjaan yang sedang berjalan). Baris yang belum ada
+    dibuat dari COUNT data lama; pemanggil meng-commit.
+    """
+    connection = (session or db.session).connection()
+    select_used = _counters.select().with_only_columns(_counters.c.used)\
+        .where(_counters.c.user_id == user.id, _counters.c.resource == resource)
+    used = connection.execute(select_used).scalar()
+    if used is None:
+        _ensure_counter(connection, user.id, resource)
+        used = connection.execute(select_used).scalar() or 0
+    return used, RESOURCES[resource].limit_for(user)
+
+
+def release_quota(user_id, resource, amount=1, session=None):
+    """Mengembalikan slot kuota (hapus data / pekerjaan gagal); tidak pernah di bawah 0."""
+    if not amount:
+        return
+    (session or db.session).connection().execute(
+        _counters.update().where(
+            _counters.c.user_id == user_id, _counters.c.resource == resource
+        ).values(
+            used=case((_counters.c.used > amount, _counters.c.used - amount), else_=0),
+            updated_at=datetime.utcnow()
+        )
+    )
+
+
+def call_with_quota(user, resource, fn, *args, **kwargs):
+    """
+    Menjalankan pekerjaan panjang (mis. analisis AI) dengan reservasi kuota yang sudah
+    di-commit. Jika fn melempar exception atau mengembalikan status HTTP >= 400,
+    transaksi fn dibatalkan dan reservasi dilepas. QuotaExceeded dilempar sebelum fn jalan.
+    """
+    reserve_quota(user, resource)
+    db.session.commit()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception:
+        _release_after_failure(user.id, resource)
+        raise
+    status = result[1] if isinstance(result, tuple) and len(result) > 1 else 200
+    if status >= 400:
+        _release_after_failure(user.id, resource)
+    return result
+
+
+def _release_after_failure(user_id, resource):
+    db.session.rollback()
+    try:
+        release_quota(user_id, resource)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Gagal melepas reservasi kuota {resource} user {user_id}: {e}")
+
+
+def _after_flush(session, flush_context):
+    released = {}
+    for obj in session.deleted:
+        for name, resource in _MODEL_RESOURCES.get(type(obj), ()):
+            # __dict__: objek terhapus tidak boleh memicu lazy load
+            user_id = obj.__dict__.get('user_id')
+            if user_id is not None and resource.matches(obj):
+                released[(user_id, name)] = released.get((user_id, name), 0) + 1
+    for (user_id, name), amount in released.items():
+        release_quota(user_id, name, amount, session=session)
+
+
+def init_quota(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
@@ -0,0 +1,330 @@
+# backend/app/regulation_ingest.py
+"""
+Pipeline ingestion dokumen regulasi (PDF/TXT) + retrieval lexical BM25.
+
+Upload regulasi hanya menyimpan file lalu mengantrikan ingestion ke worker
+background, sehingga request upload tidak pernah menunggu ekstraksi teks.
+Worker mengekstrak teks per halaman, memecahnya menjadi chunk yang saling
+overlap, lalu menyimpan chunk beserta frekuensi term-nya. Saat analisis AI,
+hanya top-k passage paling relevan yang disisipkan ke prompt.
+
+Antrian worker hanya ada di memori: regulasi yang masih 'pending' (atau
+'processing' terlalu lama) saat worker restart diantrikan ulang pada request
+pertama, atau manual lewat `flask regulation-ingest`.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, update
+
+from app import db
+from app.models import Regulation, RegulationChunk
+
+CHUNK_WORDS = 220
+CHUNK_OVERLAP = 40
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_PASSAGE_CHARS = 1200
+DEFAULT_STALE_MINUTES = 15  # Ingestion 'processing' selama ini dianggap yatim
+
+STOPWORDS = {
+    # Indonesia
+    'yang', 'dan', 'di', 'ke', 'dari', 'untuk', 'dengan', 'pada', 'dalam', 'atau', 'ini', 'itu',
+    'adalah', 'sebagai', 'oleh', 'akan', 'tidak', 'dapat', 'juga', 'tersebut', 'bahwa', 'serta',
+    'secara', 'agar', 'harus', 'telah', 'para', 'atas', 'bagi', 'karena', 'suatu', 'setiap',
+    # Inggris
+    'the', 'and', 'of', 'to', 'in', 'for', 'on', 'with', 'by', 'as', 'is', 'are', 'be', 'or',
+    'an', 'a', 'at', 'this', 'that', 'from', 'it', 'its', 'shall', 'should', 'may', 'which',
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='regulation-ingest')
+_index_cache = {}
+_index_lock = threading.Lock()
+_resume_started = False
+_resume_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Tokenisasi sederhana: huruf kecil, tanpa stopword dan token 1 karakter."""
+    return [t for t in (m.lower() for m in _TOKEN_RE.findall(text or '')) if len(t) > 1 and t not in STOPWORDS]
+
+
+def extract_pages(path):
+    """Mengembalikan list (nomor_halaman, teks). None jika tipe file tidak didukung."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        from pypdf import PdfReader  # Import lokal: hanya dibutuhkan oleh worker
+        reader = PdfReader(path)
+        return [(i + 1, page.extract_text() or '') for i, page in enumerate(reader.pages)]
+    if extension in ('.txt', '.md'):
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            return [(1, f.read())]
+    return None
+
+
+def chunk_pages(pages, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Memecah teks per halaman menjadi chunk berukuran tetap (dalam kata) yang overlap."""
+    step = max(1, chunk_words - overlap)
+    chunks = []
+    for page_number, text in pages:
+        words = text.split()
+        for start in range(0, len(words), step):
+            piece = words[start:start + chunk_words]
+            if len(piece) < 20 and start > 0:
+                break  # Sisa ekor sudah tercakup oleh overlap chunk sebelumnya
+            chunks.append((page_number, ' '.join(piece)))
+            if start + chunk_words >= len(words):
+                break
+    return chunks
+
+
+def _stale_before():
+    minutes = current_app.config.get('REGULATION_INGEST_STALE_MINUTES', DEFAULT_STALE_MINUTES)
+    return datetime.utcnow() - timedelta(minutes=minutes)
+
+
+def _claim_regulation(regulation_id):
+    """Menandai regulasi 'processing' secara atomik; False jika sedang dikerjakan worker lain."""
+    result = db.session.execute(
+        update(Regulation).where(
+            Regulation.id == regulation_id,
+            or_(
+                Regulation.ingest_status == 'pending',
+                and_(Regulation.ingest_status == 'processing',
+                     or_(Regulation.ingest_started_at.is_(None), Regulation.ingest_started_at < _stale_before()))
+            )
+        ).values(
+            ingest_status='processing', ingest_started_at=datetime.utcnow(), ingest_error=None
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def ingest_regulation(regulation_id):
+    """Mengekstrak, memecah dan menyimpan chunk satu regulasi. Dipanggil di dalam app context."""
+    regulation = Regulation.query.get(regulation_id)
+    if not regulation or not regulation.filename:
+        return
+    if not _claim_regulation(regulation_id):
+        return
+
+    try:
+        path = os.path.join(current_app.config['UPLOAD_FOLDER'], regulation.filename)
+        pages = extract_pages(path)
+        if pages is None:
+            regulation.ingest_status = 'unsupported'
+            regulation.chunk_count = 0
+            db.session.commit()
+            return
+
+        RegulationChunk.query.filter_by(regulation_id=regulation.id).delete()
+        rows = []
+        for index, (page_number, content) in enumerate(chunk_pages(pages)):
+            tokens = tokenize(content)
+            if not tokens:
+                continue
+            rows.append({
+                "regulation_id": regulation.id,
+                "chunk_index": index,
+                "page_number": page_number,
+                "content": content,
+                "term_freqs": dict(Counter(tokens)),
+                "length": len(tokens),
+            })
+        if rows:
+            db.session.bulk_insert_mappings(RegulationChunk, rows)
+
+        regulation.chunk_count = len(rows)
+        regulation.ingest_status = 'ready'
+        regulation.ingested_at = datetime.utcnow()
+        db.session.commit()
+        print(f"Regulasi {regulation.id} di-ingest: {len(rows)} chunk")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saat ingest regulasi {regulation_id}: {e}")
+        regulation = Regulation.query.get(regulation_id)
+        if regulation:
+            regulation.ingest_status = 'failed'
+            regulation.ingest_error = str(e)[:1000]
+            db.session.commit()
+
+
+def _run_in_app_context(app, regulation_id):
+    with app.app_context():
+        try:
+            ingest_regulation(regulation_id)
+        finally:
+            db.session.remove()
+
+
+def enqueue_regulation_ingestion(regulation_id):
+    """Mengantrikan ingestion ke worker background (non-blocking)."""
+    app = current_app._get_current_object()
+    return _executor.submit(_run_in_app_context, app, regulation_id)
+
+
+def pending_regulation_ids():
+    """Regulasi 'pending' dan 'processing' yang basi (antrian hilang saat restart), urut ID."""
+    return [row[0] for row in db.session.query(Regulation.id).filter(or_(
+        Regulation.ingest_status == 'pending',
+        and_(Regulation.ingest_status == 'processing',
+             or_(Regulation.ingest_started_at.is_(None), Regulation.ingest_started_at < _stale_before()))
+    )).order_by(Regulation.id)]
+
+
+def resume_pending_ingestion(run_async=True):
+    """Mengantrikan ulang (atau langsung menjalankan) ingestion yang tertunda. Mengembalikan jumlahnya."""
+    regulation_ids = pending_regulation_ids()
+    for regulation_id in regulation_ids:
+        if run_async:
+            enqueue_regulation_ingestion(regulation_id)
+        else:
+            ingest_regulation(regulation_id)
+    return len(regulation_ids)
+
+
+def init_regulation_ingest(app):
+    """
+    Ingestion tertunda diantrikan ulang saat request pertama (bukan saat import/CLI
+    seperti `flask db upgrade`). Manual: `flask regulation-ingest`.
+    """
+    app.config.setdefault('REGULATION_INGEST_STALE_MINUTES', DEFAULT_STALE_MINUTES)
+
+    @app.before_request
+    def _resume_regulation_ingestion():
+        global _resume_started
+        if _resume_started:
+            return
+        with _resume_lock:
+            if _resume_started:
+                return
+            _resume_started = True
+        try:
+            resumed = resume_pending_ingestion()
+            if resumed:
+                print(f"Regulasi: {resumed} ingestion tertunda diantrikan ulang.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Regulasi: gagal mengantrikan ulang ingestion tertunda: {e}")
+
+    @app.cli.command('regulation-ingest')
+    def regulation_ingest_command():
+        """Menjalankan ingestion regulasi yang tertunda (pending / processing basi)."""
+        print(f"{resume_pending_ingestion(run_async=False)} regulasi diproses.")
+
+
+class Bm25Index:
+    """Index BM25 in-memory atas sekumpulan chunk (dibangun dari term_freqs tersimpan)."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks  # list of dict: id, regulation_id, page_number, content, term_freqs, length
+        self.doc_count = len(chunks)
+        self.avg_length = (sum(c['length'] for c in chunks) / self.doc_count) if chunks else 0
+        doc_freqs = Counter()
+        for chunk in chunks:
+            doc_freqs.update(chunk['term_freqs'].keys())
+        self.idf = {
+            term: math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    def search(self, query_tokens, top_k=5):
+        terms = [t for t in set(query_tokens) if t in self.idf]
+        if not terms:
+            return []
+        scored = []
+        for chunk in self.chunks:
+            tf = chunk['term_freqs']
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk['length'] / self.avg_length)
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (BM25_K1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, chunk))
+        scored.sort(key=lambda item: (-item[0], item[1]['id']))
+        return scored[:top_k]
+
+
+def _get_index(regulation_ids):
+    """Mengambil index dari cache; dibangun ulang jika ada regulasi yang di-ingest ulang."""
+    stamps = db.session.query(Regulation.id, Regulation.ingested_at).filter(
+        Regulation.id.in_(regulation_ids), Regulation.ingest_status == 'ready'
+    ).order_by(Regulation.id).all()
+    if not stamps:
+        return None
+
+    cache_key = tuple((row.id, row.ingested_at) for row in stamps)
+    with _index_lock:
+        index = _index_cache.get(cache_key)
+    if index is not None:
+        return index
+
+    chunks = [{
+        "id": c.id, "regulation_id": c.regulation_id, "page_number": c.page_number,
+        "content": c.content, "term_freqs": c.term_freqs, "length": c.length
+    } for c in RegulationChunk.query.filter(RegulationChunk.regulation_id.in_([row.id for row in stamps])).all()]
+    index = Bm25Index(chunks)
+
+    with _index_lock:
+        if len(_index_cache) >= 32:
+            _index_cache.clear()
+        _index_cache[cache_key] = index
+    return index
+
+
+def resolve_regulation_ids(relevant_regulations):
+    """Memetakan teks 'relevant_regulations' (nama dipisah koma/baris, atau list) ke ID regulasi."""
+    if not relevant_regulations:
+        return []
+    if isinstance(relevant_regulations, (list, tuple)):
+        names = [str(n).strip() for n in relevant_regulations]
+    else:
+        names = [n.strip() for n in re.split(r'[,;\n]', str(relevant_regulations))]
+    names = [n for n in names if n]
+    if not names:
+        return []
+    rows = db.session.query(Regulation.id).filter(Regulation.name.in_(names)).all()
+    return [row.id for row in rows]
+
+
+def retrieve_regulation_passages(regulation_ids, query_text, top_k=5):
+    """Mengembalikan top-k passage [{regulation, page, text, score}] untuk disisipkan ke prompt AI."""
+    if not regulation_ids:
+        return []
+    index = _get_index(regulation_ids)
+    if index is None:
+        return []
+
+    names = dict(db.session.query(Regulation.id, Regulation.name).filter(Regulation.id.in_(regulation_ids)).all())
+    return [{
+        "regulation": names.get(chunk['regulation_id']),
+        "page": chunk['page_number'],
+        "text": chunk['content'][:MAX_PASSAGE_CHARS],
+        "score": round(score, 4),
+    } for score, chunk in index.search(tokenize(query_text), top_k=top_k)]
+
+
+def retrieve_passages_for_assessment(form_data, top_k=5):
+    """Helper untuk form asesmen AI: query BM25 dibangun dari konteks proyek."""
+    regulation_ids = resolve_regulation_ids(form_data.get('relevant_regulations'))
+    categories = form_data.get('risk_categories') or []
+    if isinstance(categories, str):
+        categories = [categories]
+    query_text = ' '.join(filter(None, [
+        form_data.get('nama_asesmen'),
+        form_data.get('company_industry'),
+        form_data.get('project_objective'),
+        form_data.get('additional_risk_context'),
+        ' '.join(categories),
+    ]))
+    return retrieve_regulation_passages(regulation_ids, query_text, top_k=top_k)
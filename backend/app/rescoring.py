@@ -0,0 +1,336 @@
+# backend/app/rescoring.py
+"""
+Engine rescoring massal risk input Madya.
+
+Dipakai saat asesmen pindah ke versi template peta risiko lain. Alih-alih
+memanggil `calculate_scores_from_template` per baris (satu query skor per
+risk input), engine ini:
+
+1. Mengubah matriks versi menjadi tabel lookup (p, i) -> skor sekali per job,
+   termasuk fallback P*I yang sama dengan perhitungan per baris.
+2. Membaca risk input terdampak per chunk (keyset pagination by id, hanya
+   kolom yang dibutuhkan).
+3. Menulis skor yang berubah saja dengan bulk UPDATE by primary key.
+4. Memperbarui maksimum skor Sasaran/KPI dengan satu query GROUP BY per
+   kelompok asesmen + bulk UPDATE.
+
+Progres disimpan di `risk_rescoring_jobs` sehingga bisa dipantau dari
+worker mana pun lewat endpoint status job.
+
+Hanya asesmen yang MASIH memakai versi job yang diproses: baris asesmen dikunci
+(FOR UPDATE) selama satu chunk, jadi job lama yang tertinggal dari dua edit
+template beruntun tidak menimpa skor hasil versi yang lebih baru. Job diklaim
+dengan UPDATE bersyarat dan mengirim heartbeat per chunk; job 'queued' atau
+'running' yang heartbeat-nya basi (worker restart) dilanjutkan saat request
+pertama worker berikutnya atau lewat `flask rescoring-resume`.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, update
+
+from app import db
+from app.excel_export import touch_export_stamps
+from app.models import MadyaAssessment, RiskInputMadya, RiskRescoringJob, SasaranOrganisasiKPI
+from app.risk_map_versions import get_version_matrix, lookup_score
+
+DEFAULT_CHUNK_SIZE = 1000
+ASSESSMENT_BATCH_SIZE = 500
+DEFAULT_STALE_MINUTES = 10  # Job 'running' tanpa heartbeat selama ini dianggap yatim
+
+_resume_started = False
+_resume_lock = threading.Lock()
+
+
+def build_score_lookup(matrix):
+    """Tabel lookup lengkap untuk semua kombinasi level yang mungkin di matriks."""
+    size_p = max(5, len(matrix or []))
+    size_i = max([5] + [len(row) for row in matrix or []])
+    return {
+        (p, i): lookup_score(matrix, p, i)
+        for p in range(1, size_p + 1) for i in range(1, size_i + 1)
+    }
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _pinned_assessment_ids(assessment_ids, version_id, lock=False):
+    """Asesmen yang masih memakai versi job; lock=True mengunci barisnya sampai commit."""
+    query = db.session.query(MadyaAssessment.id).filter(
+        MadyaAssessment.id.in_(assessment_ids), MadyaAssessment.risk_map_version_id == version_id
+    )
+    if lock:
+        query = query.order_by(MadyaAssessment.id).with_for_update()
+    return [row[0] for row in query.all()]
+
+
+def _count_inputs(assessment_ids, version_id):
+    total = 0
+    for batch in _batches(assessment_ids, ASSESSMENT_BATCH_SIZE):
+        total += db.session.query(func.count(RiskInputMadya.id)).join(
+            MadyaAssessment, MadyaAssessment.id == RiskInputMadya.assessment_id
+        ).filter(
+            RiskInputMadya.assessment_id.in_(batch), MadyaAssessment.risk_map_version_id == version_id
+        ).scalar() or 0
+    return total
+
+
+def _iter_input_chunks(assessment_ids, version_id, chunk_size):
+    """
+    Risk input terdampak per chunk: tuple (id, ip, ii, rp, ri, skor lama).
+    Sebelum setiap chunk, asesmen yang masih memakai versi job dikunci (dilepas saat
+    pemanggil commit), sehingga pindah versi di tengah job tidak bisa menyela chunk.
+    """
+    for batch in _batches(assessment_ids, ASSESSMENT_BATCH_SIZE):
+        last_id = 0
+        while True:
+            pinned = _pinned_assessment_ids(batch, version_id, lock=True)
+            if not pinned:
+                break
+            rows = db.session.query(
+                RiskInputMadya.id,
+                RiskInputMadya.inherent_probabilitas, RiskInputMadya.inherent_dampak,
+                RiskInputMadya.residual_probabilitas, RiskInputMadya.residual_dampak,
+                RiskInputMadya.inherent_skor, RiskInputMadya.residual_skor
+            ).filter(
+                RiskInputMadya.assessment_id.in_(pinned),
+                RiskInputMadya.id > last_id
+            ).order_by(RiskInputMadya.id).limit(chunk_size).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield rows
+
+
+def rescore_chunk(rows, score_lookup):
+    """Skor baru untuk satu chunk; hanya baris yang berubah yang dikembalikan."""
+    get = score_lookup.get
+    changes = []
+    for row_id, ip, ii, rp, ri, old_inherent, old_residual in rows:
+        inherent = get((ip, ii))
+        residual = get((rp, ri))
+        if inherent != old_inherent or residual != old_residual:
+            changes.append({"id": row_id, "inherent_skor": inherent, "residual_skor": residual})
+    return changes
+
+
+def refresh_sasaran_maxima(assessment_ids, version_id=None):
+    """
+    Maksimum skor semua Sasaran/KPI milik asesmen terdampak (GROUP BY + bulk UPDATE).
+    Dengan version_id, hanya asesmen yang masih memakai versi tersebut (dikunci per batch).
+    """
+    updated = 0
+    for batch in _batches(assessment_ids, ASSESSMENT_BATCH_SIZE):
+        if version_id is not None:
+            batch = _pinned_assessment_ids(batch, version_id, lock=True)
+            if not batch:
+                continue
+        maxima = {
+            sasaran_id: (inherent, residual) for sasaran_id, inherent, residual in db.session.query(
+                RiskInputMadya.sasaran_id,
+                func.max(RiskInputMadya.inherent_skor),
+                func.max(RiskInputMadya.residual_skor)
+            ).filter(
+                RiskInputMadya.assessment_id.in_(batch),
+                RiskInputMadya.sasaran_id.isnot(None)
+            ).group_by(RiskInputMadya.sasaran_id)
+        }
+        mappings = [{
+            "id": row.id,
+            "inherent_risk_score": maxima.get(row.id, (None, None))[0],
+            "residual_risk_score": maxima.get(row.id, (None, None))[1],
+        } for row in db.session.query(
+            SasaranOrganisasiKPI.id, SasaranOrganisasiKPI.inherent_risk_score, SasaranOrganisasiKPI.residual_risk_score
+        ).filter(SasaranOrganisasiKPI.assessment_id.in_(batch))
+          if (row.inherent_risk_score, row.residual_risk_score) != maxima.get(row.id, (None, None))]
+        if mappings:
+            db.session.bulk_update_mappings(SasaranOrganisasiKPI, mappings)
+        updated += len(mappings)
+    return updated
+
+
+def _stale_before():
+    minutes = current_app.config.get('RESCORING_STALE_MINUTES', DEFAULT_STALE_MINUTES)
+    return datetime.utcnow() - timedelta(minutes=minutes)
+
+
+def _claim_job(job_id):
+    """Menandai job 'running' secara atomik; False jika job sedang dipegang worker lain."""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(RiskRescoringJob).where(
+            RiskRescoringJob.id == job_id,
+            or_(
+                RiskRescoringJob.status.in_(('queued', 'failed')),
+                and_(RiskRescoringJob.status == 'running',
+                     or_(RiskRescoringJob.heartbeat_at.is_(None), RiskRescoringJob.heartbeat_at < _stale_before()))
+            )
+        ).values(
+            status='running', started_at=now, heartbeat_at=now, finished_at=None, error=None,
+            processed_inputs=0, updated_inputs=0, updated_sasaran=0
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def run_rescoring_job(job_id, chunk_size=None):
+    """
+    Menjalankan satu job (di dalam app context). Commit per chunk agar progres terlihat.
+    Rescoring idempoten (skor dihitung ulang dari level), jadi job yatim aman diulang dari awal.
+    """
+    if not _claim_job(job_id):
+        return db.session.get(RiskRescoringJob, job_id)
+    job = db.session.get(RiskRescoringJob, job_id)
+    chunk_size = chunk_size or current_app.config.get('RESCORING_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    assessment_ids = list(job.assessment_ids or [])
+    version_id = job.version_id
+
+    try:
+        job.total_inputs = _count_inputs(assessment_ids, version_id)
+        db.session.commit()
+
+        score_lookup = build_score_lookup(get_version_matrix(version_id))
+        for rows in _iter_input_chunks(assessment_ids, version_id, chunk_size):
+            changes = rescore_chunk(rows, score_lookup)
+            if changes:
+                db.session.bulk_update_mappings(RiskInputMadya, changes)
+            job.processed_inputs += len(rows)
+            job.updated_inputs += len(changes)
+            job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+
+        job.updated_sasaran = refresh_sasaran_maxima(assessment_ids, version_id)
+        if job.updated_inputs or job.updated_sasaran:
+            # Bulk UPDATE tidak lewat listener ORM -> stempel export disentuh manual
+            for batch in _batches(assessment_ids, ASSESSMENT_BATCH_SIZE):
+                touch_export_stamps(MadyaAssessment, batch)
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error pada job rescoring {job_id}: {e}")
+        job = db.session.get(RiskRescoringJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)[:2000]
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    return job
+
+
+def _job_worker(app, job_id):
+    with app.app_context():
+        try:
+            run_rescoring_job(job_id)
+        finally:
+            db.session.remove()
+
+
+def _start_job_thread(app, job_id):
+    threading.Thread(
+        target=_job_worker, args=(app, job_id), name=f'risk-rescoring-{job_id}', daemon=True
+    ).start()
+
+
+def pending_job_ids():
+    """Job 'queued' dan job 'running' yang heartbeat-nya basi, urut dari yang paling lama."""
+    return [row[0] for row in db.session.query(RiskRescoringJob.id).filter(or_(
+        RiskRescoringJob.status == 'queued',
+        and_(RiskRescoringJob.status == 'running',
+             or_(RiskRescoringJob.heartbeat_at.is_(None), RiskRescoringJob.heartbeat_at < _stale_before()))
+    )).order_by(RiskRescoringJob.id)]
+
+
+def resume_pending_jobs():
+    """Menjalankan ulang job tertunda secara berurutan (di dalam app context). Mengembalikan jumlah job."""
+    job_ids = pending_job_ids()
+    for job_id in job_ids:
+        run_rescoring_job(job_id)
+    return len(job_ids)
+
+
+def _resume_worker(app):
+    with app.app_context():
+        try:
+            resumed = resume_pending_jobs()
+            if resumed:
+                print(f"Rescoring: {resumed} job tertunda dilanjutkan.")
+        except Exception as e:
+            print(f"Rescoring: gagal melanjutkan job tertunda: {e}")
+        finally:
+            db.session.remove()
+
+
+def enqueue_rescoring(template_id, version_id, assessment_ids, user_id=None, run_async=True):
+    """
+    Membuat job rescoring dan menjalankannya di thread background.
+    Dipanggil SETELAH perubahan versi asesmen di-commit. None jika tidak ada asesmen.
+    """
+    assessment_ids = sorted(set(assessment_ids or []))
+    if not assessment_ids:
+        return None
+    job = RiskRescoringJob(
+        template_id=template_id, version_id=version_id,
+        assessment_ids=assessment_ids, status='queued', created_by=user_id
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    if run_async:
+        _start_job_thread(current_app._get_current_object(), job.id)
+    else:
+        run_rescoring_job(job.id)
+    return job
+
+
+def job_to_dict(job):
+    progress = None
+    if job.total_inputs:
+        progress = round(job.processed_inputs * 100.0 / job.total_inputs, 1)
+    elif job.status == 'done':
+        progress = 100.0
+    return {
+        "id": job.id,
+        "template_id": job.template_id,
+        "version_id": job.version_id,
+        "status": job.status,
+        "assessment_count": len(job.assessment_ids or []),
+        "total_inputs": job.total_inputs,
+        "processed_inputs": job.processed_inputs,
+        "updated_inputs": job.updated_inputs,
+        "updated_sasaran": job.updated_sasaran,
+        "progress": progress,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def init_rescoring(app):
+    """
+    Job tertunda dilanjutkan di thread background saat request pertama (bukan saat
+    import/CLI seperti `flask db upgrade`). Manual: `flask rescoring-resume`.
+    """
+    app.config.setdefault('RESCORING_STALE_MINUTES', DEFAULT_STALE_MINUTES)
+
+    @app.before_request
+    def _resume_rescoring_jobs():
+        global _resume_started
+        if _resume_started:
+            return
+        with _resume_lock:
+            if _resume_started:
+                return
+            _resume_started = True
+        threading.Thread(target=_resume_worker, args=(app,), name='risk-rescoring-resume', daemon=True).start()
+
+    @app.cli.command('rescoring-resume')
+    def rescoring_resume_command():
+        """Menjalankan job rescoring yang tertunda (queued / running basi)."""
+        print(f"{resume_pending_jobs()} job rescoring diproses.")
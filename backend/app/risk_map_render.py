@@ -0,0 +1,263 @@
+# backend/app/risk_map_render.py
+"""
+Rendering peta risiko (heat map) dari versi template.
+
+Warna tiap sel sebelumnya dicari ulang per sel (scan definisi level) di export
+Excel maupun di dashboard. Karena versi template tidak pernah berubah, tabel
+render lengkap dihitung sekali per versi lalu di-cache:
+
+    (probabilitas, dampak) -> RenderCell(score, level_name, color_hex, argb)
+
+Skor memakai matriks versi dengan fallback P*I (sama seperti export lama),
+level adalah definisi pertama (urut min_score) yang rentangnya memuat skor;
+sel tanpa level berwarna putih.
+
+Tabel dipakai oleh:
+- export Excel Madya (fill sel dari `solid_fill(cell.argb)` yang di-cache),
+- endpoint `/risk-maps/<id>/render` (JSON sel siap pakai, SVG, atau PNG via Pillow).
+"""
+import io
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from app import db
+from app.models import RiskMapTemplateVersion
+
+DEFAULT_MATRIX_SIZE = 5
+RENDER_CACHE_SIZE = 256
+DEFAULT_COLOR = "#FFFFFF"
+
+RenderCell = namedtuple('RenderCell', 'score level_name color_hex argb')
+RenderTable = namedtuple('RenderTable', 'version_id likelihood_labels impact_labels size cells')
+
+_render_cache = OrderedDict()  # version_id -> RenderTable (versi tidak berubah)
+_render_cache_lock = threading.Lock()
+
+# Ukuran gambar (piksel) untuk SVG/PNG
+CELL_SIZE = 72
+LABEL_WIDTH = 130
+AXIS_WIDTH = 28
+HEADER_HEIGHT = 48
+FOOTER_HEIGHT = 48
+TITLE_HEIGHT = 32
+MARGIN = 12
+
+
+def _argb(color_hex):
+    """'#RRGGBB' -> 'FFRRGGBB' (format warna openpyxl, sama seperti export lama)."""
+    return (color_hex or DEFAULT_COLOR).replace("#", "FF")
+
+
+def build_render_table(version_data, version_id=None, score_fallback=True):
+    """
+    Tabel render dari isi versi (format `version_to_dict`).
+    score_fallback: sel tanpa skor di matriks memakai P*I.
+    """
+    likelihood_labels = {l['level']: l['label'] for l in version_data.get('likelihood_labels') or []}
+    impact_labels = {i['level']: i['label'] for i in version_data.get('impact_labels') or []}
+    matrix = version_data.get('score_matrix') or []
+    levels = sorted(
+        ((lvl['min_score'], lvl['max_score'], lvl['level_name'], lvl['color_hex'])
+         for lvl in version_data.get('level_definitions') or []),
+        key=lambda x: x[0]
+    )
+    rows = max([DEFAULT_MATRIX_SIZE, len(matrix)] + list(likelihood_labels))
+    cols = max([DEFAULT_MATRIX_SIZE] + [len(r) for r in matrix] + list(impact_labels))
+
+    cells = {}
+    for p in range(1, rows + 1):
+        for i in range(1, cols + 1):
+            score = None
+            if p <= len(matrix) and i <= len(matrix[p - 1]):
+                score = matrix[p - 1][i - 1]
+            if score is None and score_fallback:
+                score = p * i
+            level_name, color_hex = None, DEFAULT_COLOR
+            if score is not None:
+                for min_s, max_s, name, color in levels:
+                    if min_s <= score <= max_s:
+                        level_name, color_hex = name, color
+                        break
+            cells[(p, i)] = RenderCell(score, level_name, color_hex, _argb(color_hex))
+    return RenderTable(version_id, likelihood_labels, impact_labels, (rows, cols), cells)
+
+
+def get_render_table(version_id):
+    """Tabel render satu versi dari cache proses; None jika versi tidak ada."""
+    with _render_cache_lock:
+        table = _render_cache.get(version_id)
+        if table is not None:
+            _render_cache.move_to_end(version_id)
+            return table
+    version = db.session.get(RiskMapTemplateVersion, version_id)
+    if version is None:
+        return None
+    table = build_render_table({
+        "likelihood_labels": version.likelihood_labels,
+        "impact_labels": version.impact_labels,
+        "level_definitions": version.level_definitions,
+        "score_matrix": version.score_matrix,
+    }, version_id=version_id)
+    with _render_cache_lock:
+        _render_cache[version_id] = table
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return table
+
+
+def table_to_cells(table):
+    """Sel tabel render untuk response JSON (dipakai langsung oleh dashboard)."""
+    return [{
+        "likelihood_level": p,
+        "impact_level": i,
+        "score": cell.score,
+        "level_name": cell.level_name,
+        "color_hex": cell.color_hex,
+    } for (p, i), cell in sorted(table.cells.items())]
+
+
+def risk_positions(risk_inputs, kind='inherent'):
+    """Nomor urut risk input per sel (p, i), sama seperti penomoran di export."""
+    positions = {}
+    for index, risk in enumerate(risk_inputs):
+        p = getattr(risk, f'{kind}_probabilitas')
+        i = getattr(risk, f'{kind}_dampak')
+        if p and i:
+            positions.setdefault((p, i), []).append(str(index + 1))
+    return positions
+
+
+# --- Gambar ---
+def _layout(table, title):
+    rows, cols = table.size
+    top = TITLE_HEIGHT if title else 0
+    width = LABEL_WIDTH + AXIS_WIDTH + cols * CELL_SIZE + MARGIN
+    height = top + HEADER_HEIGHT + rows * CELL_SIZE + FOOTER_HEIGHT
+    return rows, cols, top, width, height
+
+
+def _cell_origin(table, p, i, top):
+    rows = table.size[0]
+    x = LABEL_WIDTH + AXIS_WIDTH + (i - 1) * CELL_SIZE
+    y = top + HEADER_HEIGHT + (rows - p) * CELL_SIZE  # Probabilitas tertinggi di atas
+    return x, y
+
+
+def _text_color(color_hex):
+    color = (color_hex or DEFAULT_COLOR).lstrip('#')
+    try:
+        r, g, b = int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16)
+    except (ValueError, IndexError):
+        return "#000000"
+    return "#000000" if (r * 299 + g * 587 + b * 114) / 1000 >= 140 else "#FFFFFF"
+
+
+def render_svg(table, positions=None, title=None):
+    """Heat map sebagai string SVG (tanpa dependensi tambahan)."""
+    positions = positions or {}
+    rows, cols, top, width, height = _layout(table, title)
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="Arial, Helvetica, sans-serif" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="#FFFFFF"/>',
+    ]
+    if title:
+        parts.append(f'<text x="{width / 2}" y="{TITLE_HEIGHT - 10}" text-anchor="middle" '
+                     f'font-size="14" font-weight="bold">{escape(title)}</text>')
+
+    grid_left = LABEL_WIDTH + AXIS_WIDTH
+    grid_top = top + HEADER_HEIGHT
+    for i in range(1, cols + 1):
+        x = grid_left + (i - 1) * CELL_SIZE + CELL_SIZE / 2
+        label = escape(table.impact_labels.get(i, f"Impact {i}"))
+        parts.append(f'<text x="{x}" y="{grid_top - 10}" text-anchor="middle">{label}</text>')
+        parts.append(f'<text x="{x}" y="{grid_top + rows * CELL_SIZE + 16}" text-anchor="middle">{i}</text>')
+    parts.append(f'<text x="{grid_left + cols * CELL_SIZE / 2}" y="{grid_top + rows * CELL_SIZE + 36}" '
+                 f'text-anchor="middle" font-weight="bold">DAMPAK</text>')
+    axis_x, axis_y = LABEL_WIDTH + AXIS_WIDTH / 2, grid_top + rows * CELL_SIZE / 2
+    parts.append(f'<text x="{axis_x}" y="{axis_y}" text-anchor="middle" font-weight="bold" '
+                 f'transform="rotate(-90 {axis_x} {axis_y})">PROBABILITAS</text>')
+
+    for p in range(rows, 0, -1):
+        _, y = _cell_origin(table, p, 1, top)
+        label = escape(f"{table.likelihood_labels.get(p, f'L {p}')} ({p})")
+        parts.append(f'<text x="{LABEL_WIDTH - 6}" y="{y + CELL_SIZE / 2 + 4}" text-anchor="end">{label}</text>')
+        for i in range(1, cols + 1):
+            cell = table.cells[(p, i)]
+            x, y = _cell_origin(table, p, i, top)
+            text_color = _text_color(cell.color_hex)
+            parts.append(f'<rect x="{x}" y="{y}" width="{CELL_SIZE}" height="{CELL_SIZE}" '
+                         f'fill="{escape(cell.color_hex)}" stroke="#000000" stroke-width="1"/>')
+            if cell.score is not None:
+                parts.append(f'<text x="{x + CELL_SIZE - 6}" y="{y + 14}" text-anchor="end" '
+                             f'fill="{text_color}">{cell.score}</text>')
+            numbers = positions.get((p, i))
+            if numbers:
+                parts.append(f'<text x="{x + CELL_SIZE / 2}" y="{y + CELL_SIZE / 2 + 8}" text-anchor="middle" '
+                             f'font-weight="bold" fill="{text_color}">{escape(", ".join(numbers))}</text>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+def render_png(table, positions=None, title=None):
+    """Heat map sebagai bytes PNG (Pillow, font bawaan)."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    positions = positions or {}
+    rows, cols, top, width, height = _layout(table, title)
+    image = Image.new('RGB', (width, height), '#FFFFFF')
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    def text(xy, value, anchor, fill="#000000"):
+        draw.text(xy, str(value), fill=fill, font=font, anchor=anchor)
+
+    if title:
+        text((width / 2, TITLE_HEIGHT / 2), title, 'mm')
+    grid_left = LABEL_WIDTH + AXIS_WIDTH
+    grid_top = top + HEADER_HEIGHT
+    for i in range(1, cols + 1):
+        x = grid_left + (i - 1) * CELL_SIZE + CELL_SIZE / 2
+        text((x, grid_top - 10), table.impact_labels.get(i, f"Impact {i}"), 'ms')
+        text((x, grid_top + rows * CELL_SIZE + 12), i, 'mm')
+    text((grid_left + cols * CELL_SIZE / 2, grid_top + rows * CELL_SIZE + 32), "DAMPAK", 'mm')
+
+    # Label sumbu vertikal: teks horizontal diputar 90 derajat
+    axis = Image.new('RGB', (rows * CELL_SIZE, AXIS_WIDTH), '#FFFFFF')
+    ImageDraw.Draw(axis).text((rows * CELL_SIZE / 2, AXIS_WIDTH / 2), "PROBABILITAS",
+                              fill="#000000", font=font, anchor='mm')
+    image.paste(axis.rotate(90, expand=True), (LABEL_WIDTH, grid_top))
+
+    for p in range(rows, 0, -1):
+        _, y = _cell_origin(table, p, 1, top)
+        text((LABEL_WIDTH - 6, y + CELL_SIZE / 2), f"{table.likelihood_labels.get(p, f'L {p}')} ({p})", 'rm')
+        for i in range(1, cols + 1):
+            cell = table.cells[(p, i)]
+            x, y = _cell_origin(table, p, i, top)
+            text_color = _text_color(cell.color_hex)
+            draw.rectangle([x, y, x + CELL_SIZE, y + CELL_SIZE], fill=_pil_color(cell.color_hex), outline="#000000")
+            if cell.score is not None:
+                text((x + CELL_SIZE - 6, y + 6), cell.score, 'ra', text_color)
+            numbers = positions.get((p, i))
+            if numbers:
+                text((x + CELL_SIZE / 2, y + CELL_SIZE / 2 + 4), ", ".join(numbers), 'mm', text_color)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _pil_color(color_hex):
+    color = (color_hex or DEFAULT_COLOR).lstrip('#')
+    return f"#{color}" if len(color) in (3, 6) else DEFAULT_COLOR
+
+
+@lru_cache(maxsize=64)
+def render_version_image(version_id, fmt, title=None):
+    """Gambar template tanpa nomor risiko: di-cache per versi karena isinya tidak berubah."""
+    table = get_render_table(version_id)
+    if table is None:
+        return None
+    return render_png(table, title=title) if fmt == 'png' else render_svg(table, title=title).encode('utf-8')
@@ -0,0 +1,292 @@
+# backend/app/risk_map_versions.py
+"""
+Versi template peta risiko.
+
+Setiap perubahan isi template (label, definisi level, matriks skor) membuat
+`RiskMapTemplateVersion` baru yang tidak pernah diubah lagi. Asesmen Madya
+menyimpan versi yang dipakai untuk menghitung skornya (`risk_map_version_id`)
+sehingga edit template tidak diam-diam mengubah arti skor tersimpan.
+Asesmen hanya pindah ke versi baru jika user opt-in (upgrade manual atau
+`risk_map_auto_upgrade`), lalu skornya dihitung ulang oleh job rescoring
+(`app.rescoring`).
+
+Tabel anak lama (label/definisi/skor) tetap dipelihara sebagai cermin versi
+aktif (diperbarui per baris yang berubah saja) untuk kode yang masih
+membacanya, mis. seed dan export.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func
+
+from app import db
+from app.models import (
+    RiskMapTemplate, RiskMapTemplateVersion, RiskMapLikelihoodLabel,
+    RiskMapImpactLabel, RiskMapLevelDefinition, RiskMapScore
+)
+
+DEFAULT_MATRIX_SIZE = 5
+MATRIX_CACHE_SIZE = 256
+CONTENT_KEYS = ('likelihood_labels', 'impact_labels', 'level_definitions', 'scores')
+
+_matrix_cache = OrderedDict()  # version_id -> score_matrix (versi tidak berubah)
+_matrix_cache_lock = threading.Lock()
+
+
+# --- Normalisasi isi template ---
+def _labels(items):
+    return sorted(
+        ({"level": int(item['level']), "label": item['label']} for item in items or []),
+        key=lambda item: item['level']
+    )
+
+
+def _definitions(items):
+    return [{
+        "level_name": item['level_name'],
+        "color_hex": item['color_hex'],
+        "min_score": int(item['min_score']),
+        "max_score": int(item['max_score']),
+    } for item in items or []]
+
+
+def build_score_matrix(scores, likelihood_labels=(), impact_labels=()):
+    """List skor [{likelihood_level, impact_level, score}] -> matrix[likelihood-1][impact-1]."""
+    scores = [(int(s['likelihood_level']), int(s['impact_level']), s['score']) for s in scores or []]
+    rows = max([DEFAULT_MATRIX_SIZE] + [l['level'] for l in likelihood_labels] + [p for p, _, _ in scores])
+    cols = max([DEFAULT_MATRIX_SIZE] + [i['level'] for i in impact_labels] + [i for _, i, _ in scores])
+    matrix = [[None] * cols for _ in range(rows)]
+    for p, i, score in scores:
+        if p >= 1 and i >= 1:
+            matrix[p - 1][i - 1] = int(score) if score is not None else None
+    return matrix
+
+
+def matrix_to_scores(matrix):
+    return [
+        {"likelihood_level": p + 1, "impact_level": i + 1, "score": score}
+        for p, row in enumerate(matrix or []) for i, score in enumerate(row) if score is not None
+    ]
+
+
+def normalize_template_content(data):
+    """Isi template dari payload API (format sama seperti POST/PUT /risk-maps)."""
+    likelihood_labels = _labels(data.get('likelihood_labels'))
+    impact_labels = _labels(data.get('impact_labels'))
+    return {
+        "likelihood_labels": likelihood_labels,
+        "impact_labels": impact_labels,
+        "level_definitions": _definitions(data.get('level_definitions')),
+        "score_matrix": build_score_matrix(data.get('scores'), likelihood_labels, impact_labels),
+    }
+
+
+def content_checksum(content):
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def content_from_rows(template):
+    """Isi template dari tabel anak (template lama / hasil seed)."""
+    return normalize_template_content({
+        "likelihood_labels": [{"level": l.level, "label": l.label} for l in template.likelihood_labels],
+        "impact_labels": [{"level": i.level, "label": i.label} for i in template.impact_labels],
+        "level_definitions": [{
+            "level_name": d.level_name, "color_hex": d.color_hex,
+            "min_score": d.min_score, "max_score": d.max_score
+        } for d in sorted(template.level_definitions, key=lambda d: d.id or 0)],
+        "scores": [{
+            "likelihood_level": s.likelihood_level, "impact_level": s.impact_level, "score": s.score
+        } for s in template.scores],
+    })
+
+
+def version_to_dict(version):
+    """Versi -> format response detail template (sama seperti sebelum ada versi)."""
+    return {
+        "version": version.version,
+        "likelihood_labels": version.likelihood_labels,
+        "impact_labels": version.impact_labels,
+        "level_definitions": version.level_definitions,
+        "scores": matrix_to_scores(version.score_matrix),
+        "score_matrix": version.score_matrix,
+    }
+
+
+# --- Versi ---
+def get_version(template, version_number):
+    return RiskMapTemplateVersion.query.filter_by(template_id=template.id, version=version_number).first()
+
+
+def find_current_version(template):
+    """Versi aktif template tanpa menulis apa pun (None jika template belum punya versi)."""
+    if template.current_version is None:
+        return None
+    return get_version(template, template.current_version)
+
+
+def lock_template(template_id):
+    """
+    Template dengan baris terkunci (FOR UPDATE) sampai commit, nilai dibaca ulang.
+    Dipakai sebelum membuat versi baru agar nomor versi (max + 1) tidak bentrok.
+    """
+    return RiskMapTemplate.query.filter_by(id=template_id)\
+        .with_for_update().populate_existing().first()
+
+
+def get_current_version(template, user_id=None):
+    """Versi aktif template; template tanpa versi (lama / seed) dibuatkan versi 1 dari tabel anak."""
+    if template.current_version is not None:
+        version = get_version(template, template.current_version)
+        if version is not None:
+            return version
+    # Request lain mungkin sedang membuat versi yang sama: kunci lalu cek ulang
+    template = lock_template(template.id)
+    if template.current_version is not None:
+        version = get_version(template, template.current_version)
+        if version is not None:
+            return version
+    content = content_from_rows(template)
+    return _add_version(template, content, user_id)
+
+
+def _add_version(template, content, user_id=None):
+    latest = db.session.query(func.max(RiskMapTemplateVersion.version))\
+        .filter(RiskMapTemplateVersion.template_id == template.id).scalar() or 0
+    version = RiskMapTemplateVersion(
+        template_id=template.id,
+        version=latest + 1,
+        checksum=content_checksum(content),
+        created_by=user_id,
+        **content
+    )
+    db.session.add(version)
+    db.session.flush()
+    template.current_version = version.version
+    return version
+
+
+def _sync_rows(model, template_id, existing, desired, key, fields):
+    """Menyamakan baris tabel anak dengan isi versi: hanya baris yang berubah yang ditulis."""
+    by_key = {}
+    for row in existing:
+        if key(row) in by_key:
+            db.session.delete(row)  # Duplikat lama
+        else:
+            by_key[key(row)] = row
+    for item in desired:
+        row = by_key.pop(key(item), None)
+        if row is None:
+            db.session.add(model(template_id=template_id, **{k: v for k, v in item.items() if not k.startswith('_')}))
+            continue
+        for field in fields:
+            if getattr(row, field) != item[field]:
+                setattr(row, field, item[field])
+    for row in by_key.values():
+        db.session.delete(row)
+
+
+def sync_template_rows(template, content):
+    _sync_rows(RiskMapLikelihoodLabel, template.id, template.likelihood_labels, content['likelihood_labels'],
+               key=lambda x: x['level'] if isinstance(x, dict) else x.level, fields=('label',))
+    _sync_rows(RiskMapImpactLabel, template.id, template.impact_labels, content['impact_labels'],
+               key=lambda x: x['level'] if isinstance(x, dict) else x.level, fields=('label',))
+    # Definisi level dicocokkan per posisi (nama level bisa ikut diubah)
+    definitions = sorted(template.level_definitions, key=lambda d: d.id or 0)
+    _sync_rows(RiskMapLevelDefinition, template.id, definitions,
+               [dict(item, _pos=pos) for pos, item in enumerate(content['level_definitions'])],
+               key=lambda x: x['_pos'] if isinstance(x, dict) else definitions.index(x),
+               fields=('level_name', 'color_hex', 'min_score', 'max_score'))
+    _sync_rows(RiskMapScore, template.id, template.scores, matrix_to_scores(content['score_matrix']),
+               key=lambda x: (x['likelihood_level'], x['impact_level']) if isinstance(x, dict) else (x.likelihood_level, x.impact_level),
+               fields=('score',))
+
+
+def save_template_content(template, data, user_id=None):
+    """
+    Menerapkan isi baru dari payload (format PUT /risk-maps). Versi baru hanya
+    dibuat jika isi berubah.
+    Mengembalikan (versi aktif, True jika versi baru dibuat).
+    """
+    current = get_current_version(template, user_id)
+    # Bagian yang tidak dikirim tetap memakai isi versi aktif
+    merged = version_to_dict(current)
+    merged.update({key: data[key] for key in CONTENT_KEYS if key in data})
+    content = normalize_template_content(merged)
+    if content_checksum(content) == current.checksum:
+        return current, False
+    version = _add_version(template, content, user_id)
+    sync_template_rows(template, content)
+    return version, True
+
+
+def create_template_version(template, data, user_id=None):
+    """Versi 1 untuk template baru (tabel anak ditulis oleh pemanggil)."""
+    return _add_version(template, normalize_template_content(data), user_id)
+
+
+# --- Skor ---
+def get_version_matrix(version_id):
+    """Matriks skor satu versi dari cache proses (aman karena versi tidak berubah)."""
+    with _matrix_cache_lock:
+        matrix = _matrix_cache.get(version_id)
+        if matrix is not None:
+            _matrix_cache.move_to_end(version_id)
+            return matrix
+    matrix = db.session.query(RiskMapTemplateVersion.score_matrix)\
+        .filter(RiskMapTemplateVersion.id == version_id).scalar()
+    if matrix is None:
+        return None
+    with _matrix_cache_lock:
+        _matrix_cache[version_id] = matrix
+        while len(_matrix_cache) > MATRIX_CACHE_SIZE:
+            _matrix_cache.popitem(last=False)
+    return matrix
+
+
+def lookup_score(matrix, p, i):
+    """Skor sel matriks; fallback P*I untuk skala 1-5 seperti perhitungan lama."""
+    if p is None or i is None:
+        return None
+    if matrix and 1 <= p <= len(matrix) and 1 <= i <= len(matrix[p - 1]):
+        score = matrix[p - 1][i - 1]
+        if score is not None:
+            return score
+    if 1 <= p <= 5 and 1 <= i <= 5:
+        return p * i
+    return None
+
+
+def find_assessment_version(assessment):
+    """Versi yang dipakai asesmen tanpa memasang apa pun (untuk endpoint baca)."""
+    if assessment.risk_map_version_id is not None:
+        return assessment.risk_map_version
+    if assessment.risk_map_template_id is None:
+        return None
+    template = db.session.get(RiskMapTemplate, assessment.risk_map_template_id)
+    return find_current_version(template) if template is not None else None
+
+
+def resolve_assessment_version(assessment):
+    """Versi yang dipakai asesmen; asesmen lama dipasang ke versi aktif templatenya."""
+    if assessment.risk_map_version_id is not None:
+        return assessment.risk_map_version
+    if assessment.risk_map_template_id is None:
+        return None
+    template = db.session.get(RiskMapTemplate, assessment.risk_map_template_id)
+    if template is None:
+        return None
+    version = get_current_version(template)
+    assessment.risk_map_version_id = version.id
+    assessment.risk_map_version = version
+    return version
+
+
+def pin_assessment_version(assessment, template):
+    """Memasang asesmen ke versi aktif template (mis. saat dibuat / ganti template)."""
+    version = get_current_version(template) if template is not None else None
+    assessment.risk_map_version_id = version.id if version else None
+    assessment.risk_map_version = version
+    return version
@@ -7,6 +7,8 @@ from .auth import admin_required, permission_required
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func, or_
 from datetime import datetime
+from app.http_cache import cached_json_response
+from app.tenancy import tenant_required
 
 class DepartmentSchema(ma.Schema):
     id = fields.Int(dump_only=True)
@@ -150,6 +152,7 @@ def delete_role(role_id):
 
 @admin_bp.route('/permissions', methods=['GET'])
 @admin_required() # Hanya admin yang perlu tahu semua permission
+@cached_json_response(Permission)
 # @permission_required('view_permissions')
 def get_permissions():
     """Mengambil daftar semua permission yang tersedia."""
@@ -480,9 +483,16 @@ def delete_user_admin(user_id):
         print(f"Error deleting user {user_id}: {e}")
         return jsonify({"msg": "Gagal menghapus user. Pastikan user tidak memiliki data terkait (misal: assessment)."}), 500
 
+def _current_user_institution():
+    # Kunci cache departments-list: response bergantung pada institusi user (bukan seluruh tabel users)
+    user = User.query.get(int(get_jwt_identity()))
+    return user.institution if user else None
+
 @admin_bp.route('/departments-list', methods=['GET'])
 @jwt_required()
 @permission_required('manage_departments')
+@tenant_required()
+@cached_json_response(Department, vary_on_user=True, vary_on_tenant=True, vary_on=_current_user_institution)
 def get_departments_list():
     """
     Mengambil daftar departemen.
@@ -520,6 +530,7 @@ def get_departments_list():
 @admin_bp.route('/departments', methods=['GET'])
 @jwt_required()
 @permission_required('manage_departments')
+@tenant_required()
 def get_departments_for_institution():
     """Mengambil daftar departemen untuk tabel manajemen."""
     current_user_id = int(get_jwt_identity())
@@ -535,6 +546,7 @@ def get_departments_for_institution():
 @admin_bp.route('/departments', methods=['POST'])
 @jwt_required()
 @permission_required('manage_departments')
+@tenant_required()
 def create_department_for_institution():
     """Membuat departemen baru untuk institusi user."""
     data = request.get_json()
@@ -567,6 +579,7 @@ def create_department_for_institution():
 @admin_bp.route('/departments/<int:dept_id>', methods=['PUT'])
 @jwt_required()
 @permission_required('manage_departments')
+@tenant_required()
 def update_department_for_institution(dept_id):
     """Update departemen (HANYA JIKA MILIK INSTITUSINYA)."""
     dept = Department.query.get_or_404(dept_id)
@@ -585,6 +598,7 @@ def update_department_for_institution(dept_id):
 @admin_bp.route('/departments/<int:dept_id>', methods=['DELETE'])
 @jwt_required()
 @permission_required('manage_departments')
+@tenant_required()
 def delete_department_for_institution(dept_id):
     """Hapus departemen."""
     dept = Department.query.get_or_404(dept_id)
@@ -602,6 +616,7 @@ def delete_department_for_institution(dept_id):
 @admin_bp.route('/rsca-cycles', methods=['GET'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def get_rsca_cycles():
     """Mengambil semua siklus RSCA untuk admin."""
     current_user_id = int(get_jwt_identity())
@@ -622,6 +637,7 @@ def get_rsca_cycles():
 @admin_bp.route('/rsca-cycles', methods=['POST'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def create_rsca_cycle():
     """Membuat siklus RSCA baru UNTUK institusi user."""
     data = request.get_json()
@@ -657,6 +673,7 @@ def create_rsca_cycle():
 @admin_bp.route('/rsca-cycles/<int:cycle_id>', methods=['PUT'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def update_rsca_cycle(cycle_id):
     """
     Update detail siklus RSCA (nama, tanggal, departemen).
@@ -706,19 +723,24 @@ def update_rsca_cycle(cycle_id):
 @admin_bp.route('/rsca-cycles/<int:cycle_id>/questionnaire', methods=['GET'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def get_cycle_questionnaire(cycle_id):
     """Mengambil semua pertanyaan untuk satu siklus (admin)."""
+    RscaCycle.query.get_or_404(cycle_id)  # 404 jika siklus milik institusi lain (filter tenant)
     questions = RscaQuestionnaire.query.filter_by(cycle_id=cycle_id).all()
     return RscaQuestionnaireSchema(many=True).jsonify(questions), 200
 
 @admin_bp.route('/rsca-cycles/<int:cycle_id>/questionnaire', methods=['POST'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def add_question_to_cycle(cycle_id):
     """Menambahkan pertanyaan baru ke siklus."""
     data = request.get_json()
     if not data or 'pertanyaan' not in data or 'question_type' not in data:
         return jsonify({"msg": "Data pertanyaan tidak lengkap"}), 400
+
+    RscaCycle.query.get_or_404(cycle_id)  # 404 jika siklus milik institusi lain (filter tenant)
         
     new_question = RscaQuestionnaire(
         pertanyaan=data['pertanyaan'],
@@ -733,9 +755,11 @@ def add_question_to_cycle(cycle_id):
 @admin_bp.route('/rsca-questionnaire/<int:question_id>', methods=['PUT'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def update_question(question_id):
     """Update pertanyaan kuesioner."""
-    question = RscaQuestionnaire.query.get_or_404(question_id)
+    # Join ke siklus -> filter tenant ikut berlaku pada RscaCycle
+    question = RscaQuestionnaire.query.join(RscaCycle).filter(RscaQuestionnaire.id == question_id).first_or_404()
     data = request.get_json()
     
     question.pertanyaan = data.get('pertanyaan', question.pertanyaan)
@@ -748,9 +772,11 @@ def update_question(question_id):
 @admin_bp.route('/rsca-questionnaire/<int:question_id>', methods=['DELETE'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def delete_question(question_id):
     """Menghapus pertanyaan kuesioner."""
-    question = RscaQuestionnaire.query.get_or_404(question_id)
+    # Join ke siklus -> filter tenant ikut berlaku pada RscaCycle
+    question = RscaQuestionnaire.query.join(RscaCycle).filter(RscaQuestionnaire.id == question_id).first_or_404()
     db.session.delete(question)
     db.session.commit()
     return jsonify({"msg": "Pertanyaan berhasil dihapus"}), 200
@@ -758,6 +784,7 @@ def delete_question(question_id):
 @admin_bp.route('/rsca-cycles/<int:cycle_id>/results', methods=['GET'])
 @jwt_required()
 @permission_required('manage_rsca_cycles') # Amankan dengan permission yang sama
+@tenant_required()
 def get_rsca_cycle_results(cycle_id):
     """
     Mengambil semua hasil (jawaban) untuk satu siklus RSCA,
@@ -786,6 +813,7 @@ def get_rsca_cycle_results(cycle_id):
 @admin_bp.route('/submitted-risks/<int:risk_id>/status', methods=['PUT'])
 @jwt_required()
 @permission_required('manage_rsca_cycles') # Amankan dengan permission yang relevan
+@tenant_required()
 def update_submitted_risk_status(risk_id):
     """
     Menyetujui atau menolak 'Ajuan Risiko' (Bottom-Up) dari Staf.
@@ -819,6 +847,7 @@ def update_submitted_risk_status(risk_id):
 @admin_bp.route('/action-plans', methods=['POST'])
 @jwt_required()
 @permission_required('manage_rsca_cycles') # Kita gunakan permission yang sama
+@tenant_required()
 def create_action_plan():
     """
     Membuat Rencana Aksi (Mitigasi) baru.
@@ -885,6 +914,7 @@ def create_action_plan():
 @admin_bp.route('/action-plans', methods=['GET'])
 @jwt_required()
 @permission_required('view_mitigation_monitor') # Amankan dengan permission baru
+@tenant_required()
 def get_all_action_plans():
     """
     Mengambil SEMUA Rencana Aksi (Mitigasi) untuk institusi Manajer Risiko.
@@ -904,6 +934,7 @@ def get_all_action_plans():
 @admin_bp.route('/action-plans/<int:plan_id>/status', methods=['PUT'])
 @jwt_required()
 @permission_required('view_mitigation_monitor') # Kita gunakan permission yang sama
+@tenant_required()
 def update_action_plan_status(plan_id):
     """
     Update status Rencana Aksi (misal: Selesai, Sedang Dikerjakan).
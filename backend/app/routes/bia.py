@@ -4,6 +4,7 @@ from flask import request, jsonify, Blueprint
 from app.models import db, CriticalAsset, Dependency, KRI, User, MasterData
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.ai_services import analyze_bia_with_gemini
+from app.db_engine import release_db_connection
 
 bia_bp = Blueprint('bia_bp', __name__)
 
@@ -130,9 +131,11 @@ def simulate_bia():
     relevant_kris = KRI.query.filter_by(user_id=current_user_id).limit(5).all()
     kri_list = [{"nama_kri": k.nama_kri, "ambang_batas_kritis": k.ambang_batas_kritis} for k in relevant_kris]
 
-    # Panggil fungsi AI
+    # Panggil fungsi AI (koneksi DB dikembalikan ke pool selama menunggu model)
+    failed_asset_name = failed_asset.nama_aset
+    release_db_connection()
     analysis_result = analyze_bia_with_gemini(
-        failed_asset_name=failed_asset.nama_aset,
+        failed_asset_name=failed_asset_name,
         downtime=duration,
         impacted_assets=list(impacted_assets_names),
         kris=kri_list
@@ -4,6 +4,7 @@ from app import db
 from app.models import User, Department, BprDocument, BprNode, BprEdge, BprRisk
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from app.tenancy import tenant_required
 import json
 
 bpr_bp = Blueprint('bpr_bp', __name__)
@@ -85,6 +86,7 @@ def create_bpr_document():
 
 @bpr_bp.route('/bpr/documents', methods=['GET'])
 @jwt_required()
+@tenant_required()
 def get_bpr_documents():
     """Mengambil daftar BPR (bisa difilter per departemen/user)."""
     current_user_id = int(get_jwt_identity())
@@ -3,6 +3,7 @@ from flask import request, jsonify, Blueprint
 from app.models import KRI, HorizonScanEntry, User
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.db_engine import read_replica
 
 # Membuat Blueprint untuk endpoint terkait dashboard
 dashboard_bp = Blueprint('dashboard_bp', __name__)
@@ -32,6 +33,7 @@ def create_kri():
 # READ: Mendapatkan semua KRI milik pengguna
 @dashboard_bp.route('/kri', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_all_kris():
     current_user_id = int(get_jwt_identity())
     kris = KRI.query.filter_by(user_id=current_user_id).all()
@@ -121,6 +123,7 @@ def delete_kri(id):
 # --- Endpoint untuk Horizon Scanner ---
 @dashboard_bp.route('/horizon-scan', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_horizon_scan_entries():
     """Mengambil 5 entri terbaru dari Horizon Scanner."""
     
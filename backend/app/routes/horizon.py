@@ -1,23 +1,40 @@
 # backend/app/routes/horizon.py
-import json
 import os
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.db_engine import read_replica, release_db_connection
+from sqlalchemy import func
+from sqlalchemy.orm import undefer_group
 from app.models import db, User, HorizonScanResult, MasterData
 from horizon_scanner import run_horizon_scan
+from app.horizon_ingest import get_stored_news, store_news_items, is_standard_sector, link_scan_articles, load_scan_news
+from app.horizon_briefing import build_horizon_report
 from app.ai_services import summarize_horizon_scan
-from sqlalchemy import func
+from app.quota import call_with_quota, QuotaExceeded
 
 horizon_bp = Blueprint('horizon_bp', __name__)
 
+def scan_history_query(user_id):
+    """
+    Proyeksi ringan riwayat scan: laporan HTML & berita mentah tidak ikut di-SELECT,
+    preview 100 karakter dipotong di database.
+    """
+    return db.session.query(
+        HorizonScanResult.id,
+        HorizonScanResult.generated_title,
+        HorizonScanResult.sector,
+        HorizonScanResult.created_at,
+        func.substr(HorizonScanResult.executive_summary, 1, 100).label('summary_preview'),
+    ).filter(HorizonScanResult.user_id == user_id).order_by(HorizonScanResult.created_at.desc())
+
 @horizon_bp.route('/horizon/history', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_scan_history():
     """Mengambil daftar riwayat scan user."""
     current_user_id = int(get_jwt_identity())
     
-    history = HorizonScanResult.query.filter_by(user_id=current_user_id)\
-        .order_by(HorizonScanResult.created_at.desc()).all()
+    history = scan_history_query(current_user_id).all()
         
     result = []
     for item in history:
@@ -26,7 +43,7 @@ def get_scan_history():
             "title": item.generated_title,
             "sector": item.sector,
             "created_at": item.created_at.isoformat(),
-            "summary_preview": item.executive_summary[:100] + "..." if item.executive_summary else ""
+            "summary_preview": item.summary_preview + "..." if item.summary_preview else ""
         })
     
     return jsonify(result), 200
@@ -36,7 +53,7 @@ def get_scan_history():
 def get_scan_detail(scan_id):
     """Mengambil detail lengkap satu scan."""
     current_user_id = int(get_jwt_identity())
-    scan = HorizonScanResult.query.get_or_404(scan_id)
+    scan = HorizonScanResult.query.options(undefer_group('report')).get_or_404(scan_id)
     
     user = User.query.get(current_user_id)
     is_admin = any(r.name == 'Admin' for r in user.roles)
@@ -44,13 +61,8 @@ def get_scan_detail(scan_id):
     if scan.user_id != current_user_id and not is_admin:
         return jsonify({"msg": "Akses ditolak."}), 403
     
-    # Parse JSON raw data kembali ke object
-    raw_news = []
-    if scan.raw_news_data:
-        try:
-            raw_news = json.loads(scan.raw_news_data)
-        except:
-            raw_news = []
+    # Artikel bersama + sisa blob terkompresi (fallback ke JSON lama untuk scan yang belum di-backfill)
+    raw_news = load_scan_news(scan)
 
     return jsonify({
         "id": scan.id,
@@ -68,16 +80,15 @@ def scan_risks():
     current_user_id = int(get_jwt_identity())
     user = User.query.get(current_user_id)
     
-    if user.limit_horizon is not None:
-        current_count = db.session.query(func.count(HorizonScanResult.id))\
-            .filter_by(user_id=current_user_id).scalar() or 0
-        
-        if current_count >= user.limit_horizon:
-            return jsonify({
-                "msg": f"Slot penyimpanan Horizon Scanner penuh ({current_count}/{user.limit_horizon}). Hapus riwayat lama untuk melakukan scan baru."
-            }), 403
+    # Slot dicadangkan (commit) sebelum scraping + AI; dilepas lagi jika scan gagal
+    try:
+        return call_with_quota(user, 'horizon', _run_scan, user, request.get_json())
+    except QuotaExceeded as e:
+        return jsonify({
+            "msg": f"Slot penyimpanan Horizon Scanner penuh ({e.used}/{e.limit}). Hapus riwayat lama untuk melakukan scan baru."
+        }), 403
 
-    data = request.get_json()
+def _run_scan(user, data):
     scan_params = {
         'industry': data.get('industry', 'General'),
         'geo_scope': data.get('geo_scope', 'Nasional'),
@@ -98,10 +109,29 @@ def scan_risks():
     
     search_query_topic = scan_params['input_topics'] if scan_params['input_topics'] else scan_params['specific_topics']
     
-    news_results = run_horizon_scan(
-        sector=scan_params['industry'], 
-        specific_topics=search_query_topic
-    )
+    # Sektor standar -> berita dibaca dari penyimpanan lokal (hasil ingestion terjadwal);
+    # topik kustom tetap di-scrape live.
+    is_standard = is_standard_sector(scan_params['industry'])
+    has_custom_topic = bool((search_query_topic or '').strip())
+    sector_news = get_stored_news(scan_params['industry']) if is_standard else []
+    
+    if sector_news and not has_custom_topic:
+        news_results = sector_news
+    else:
+        release_db_connection()  # Scraping live bisa lama
+        news_results = run_horizon_scan(
+            sector=scan_params['industry'], 
+            specific_topics=search_query_topic
+        )
+        if is_standard and not has_custom_topic and news_results:
+            # Penyimpanan belum terisi untuk sektor ini -> simpan hasil live untuk scan berikutnya
+            try:
+                store_news_items(news_results, sector=scan_params['industry'])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Gagal menyimpan berita horizon: {e}")
+            sector_news = news_results
     
     if not news_results:
          return jsonify({"msg": "Gagal mengambil data berita."}), 500
@@ -112,18 +142,24 @@ def scan_risks():
     if not gemini_key_check:
         return jsonify({"msg": "Konfigurasi API Key AI tidak ditemukan di database."}), 500
     
-    title, report_html = summarize_horizon_scan(scan_params, news_results)
+    release_db_connection()  # Tidak memegang koneksi selama ringkasan AI
+    if is_standard and sector_news:
+        # Briefing sektor bersama + delta kecil untuk kompetitor/topik user
+        title, report_html = build_horizon_report(scan_params, sector_news, focus_news=news_results)
+    else:
+        title, report_html = summarize_horizon_scan(scan_params, news_results)
 
     # 4. Simpan ke Database
     new_scan = HorizonScanResult(
         user_id=user.id,
         sector=scan_params['industry'],
         generated_title=title,
-        executive_summary=report_html,
-        raw_news_data=json.dumps(news_results)
+        executive_summary=report_html
     )
         
     db.session.add(new_scan)
+    db.session.flush()
+    link_scan_articles(new_scan, news_results)
     db.session.commit()
     
     return jsonify({
@@ -158,6 +194,7 @@ def delete_scan_history(scan_id):
     
 @horizon_bp.route('/horizon', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_horizon_dashboard():
     current_user_id = int(get_jwt_identity())
     
@@ -5,6 +5,10 @@ from app.models import db, MasterData, Regulation
 from .auth import admin_required # <-- Mengimpor decorator dari auth.py
 from flask_jwt_extended import jwt_required
 from werkzeug.utils import secure_filename
+from app.http_cache import cached_json_response
+from app.search import search_index
+from app.regulation_ingest import enqueue_regulation_ingestion
+from app.image_pipeline import is_content_addressed, IMMUTABLE_MAX_AGE
 
 master_data_bp = Blueprint('master_data_bp', __name__)
 
@@ -14,6 +18,7 @@ SENSITIVE_KEYS = ['GEMINI_API_KEY', 'DB_PASSWORD', 'SECRET_KEY', 'API_KEY']
 # === ENDPOINTS UNTUK MASTER DATA ===
 @master_data_bp.route('/master-data', methods=['GET'])
 @jwt_required()
+@cached_json_response(MasterData)
 def get_master_data():
     """(Publik) Mengambil data master berdasarkan kategori untuk dropdown."""
     category = request.args.get('category')
@@ -113,7 +118,9 @@ def get_regulations():
         "name": reg.name,
         "description": reg.description,
         "filename": reg.filename,
-        "created_at": reg.created_at.isoformat()
+        "created_at": reg.created_at.isoformat(),
+        "ingest_status": reg.ingest_status,
+        "chunk_count": reg.chunk_count or 0
     } for reg in regulations])
 
 @master_data_bp.route('/admin/regulations', methods=['POST'])
@@ -143,12 +150,30 @@ def create_regulation():
     new_regulation = Regulation(
         name=name,
         description=description,
-        filename=filename
+        filename=filename,
+        ingest_status='pending'
     )
     db.session.add(new_regulation)
     db.session.commit()
 
-    return jsonify({"msg": "Regulasi berhasil ditambahkan."}), 201
+    # Ekstraksi teks & chunking berjalan di worker background (tidak memblokir upload)
+    enqueue_regulation_ingestion(new_regulation.id)
+
+    return jsonify({"msg": "Regulasi berhasil ditambahkan.", "id": new_regulation.id}), 201
+
+@master_data_bp.route('/admin/regulations/<int:id>/ingest', methods=['POST'])
+@admin_required()
+def reingest_regulation(id):
+    """[Admin] Menjalankan ulang ingestion teks dokumen regulasi."""
+    regulation = Regulation.query.get_or_404(id)
+    if not regulation.filename:
+        return jsonify({"msg": "Regulasi ini tidak memiliki file."}), 400
+
+    regulation.ingest_status = 'pending'
+    db.session.commit()
+    enqueue_regulation_ingestion(regulation.id)
+
+    return jsonify({"msg": "Ingestion regulasi dijadwalkan.", "ingest_status": regulation.ingest_status}), 202
 
 @master_data_bp.route('/admin/regulations/<int:id>', methods=['DELETE'])
 @admin_required()
@@ -180,15 +205,16 @@ def search_regulations():
     if len(query) < 2: # Hanya cari jika user sudah mengetik minimal 2 huruf
         return jsonify([])
 
-    # Cari regulasi yang namanya mengandung query (case-insensitive)
-    search_term = f"%{query}%"
-    regulations = Regulation.query.filter(Regulation.name.ilike(search_term)).limit(10).all()
+    # Gunakan index full-text (tsvector/FTS5) alih-alih ILIKE '%q%' (sequential scan)
+    hits = search_index(query, user=None, sources=['regulation'], per_page=10)['items']
+    regulation_ids = [hit['id'] for hit in hits]
+    regulations_by_id = {reg.id: reg for reg in Regulation.query.filter(Regulation.id.in_(regulation_ids)).all()} if regulation_ids else {}
 
     return jsonify([{
         "value": reg.id,  # ID akan menjadi nilai yang disimpan
         "label": reg.name, # Nama akan menjadi teks yang ditampilkan
         "description": reg.description
-    } for reg in regulations])
+    } for reg in (regulations_by_id.get(i) for i in regulation_ids) if reg])
 
 from flask import send_from_directory
 
@@ -202,6 +228,11 @@ def uploaded_file(filename):
         file_path = os.path.join(upload_folder_path, filename)
         if not os.path.exists(file_path):
              return jsonify({"msg": "File tidak ditemukan."}), 404
+        if is_content_addressed(filename):
+            # Nama file = hash konten -> isi tidak pernah berubah, aman di-cache selamanya
+            response = send_from_directory(upload_folder_path, filename, max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+            return response
         return send_from_directory(upload_folder_path, filename)
     except Exception as e:
         # Log error jika terjadi masalah saat mengirim file
@@ -2,15 +2,21 @@
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_, desc, asc
+from app.db_engine import read_replica, release_db_connection
+from sqlalchemy import or_, desc, asc, func
+from sqlalchemy.orm import aliased, undefer_group
 from datetime import datetime
 from app import db
 from app.models.qrc import QrcAssessment, QrcQuestion
 from app.models.user import User
 from app.ai_services import analyze_qrc_assessment
+from app.http_cache import cached_json_response
+from app.quota import reserve_quota, quota_usage, qrc_resource, QuotaExceeded
 
 qrc_bp = Blueprint('qrc', __name__)
 
+MAX_LIST_PER_PAGE = 100
+
 # --- Helper Function: Hitung Skor ---
 def calculate_risk_score(answers):
     # Asumsi: frontend mengirim nilai 0, 5, atau 10 untuk setiap key q1..q20
@@ -37,6 +43,89 @@ def check_admin_permission(user_id):
         return False
     return True
 
+# Helper: Cek akses Consultant (dashboard & analitik konsultan)
+def check_consultant_permission(user_id):
+    user = User.query.get(user_id)
+    # Role QRC Consultant, permission 'view_qrc_consultant', atau Admin
+    if not user or not (user.has_role('QRC Consultant') or user.has_permission('view_qrc_consultant') or user.has_role('Admin')):
+        return False
+    return True
+
+# Helper: Proyeksi ringan untuk daftar asesmen.
+# Kolom berat (answers_data JSONB, catatan konsultan, teks AI & laporan akhir)
+# tidak ikut di-SELECT; baru dimuat saat detail dibuka (GET /consultant/<id>).
+def assessment_list_query():
+    reviewer = aliased(User)
+    return db.session.query(
+        QrcAssessment.id,
+        QrcAssessment.assessment_type,
+        QrcAssessment.status,
+        QrcAssessment.submission_date,
+        QrcAssessment.reviewed_at,
+        QrcAssessment.risk_score,
+        QrcAssessment.risk_level,
+        QrcAssessment.is_archived,
+        User.nama_lengkap.label('client_name'),
+        User.email.label('client_email'),
+        User.institution.label('institution'),
+        reviewer.nama_lengkap.label('reviewer_name'),
+    ).outerjoin(User, QrcAssessment.user_id == User.id)\
+     .outerjoin(reviewer, QrcAssessment.reviewed_by_id == reviewer.id)
+
+def assessment_summary(row):
+    return {
+        'id': row.id,
+        'client_name': row.client_name or 'Unknown',
+        'client_email': row.client_email or '-',
+        'institution': row.institution,
+        'assessment_type': row.assessment_type,
+        'status': row.status,
+        'submission_date': row.submission_date.isoformat() if row.submission_date else None,
+        'reviewed_at': row.reviewed_at.isoformat() if row.reviewed_at else None,
+        'reviewer_name': row.reviewer_name or '-',
+        'risk_score': row.risk_score,
+        'risk_level': row.risk_level,
+        'is_archived': row.is_archived
+    }
+
+def paginated_summaries(query):
+    """
+    Jika ?page= dikirim -> {data, meta} (LIMIT/OFFSET di database).
+    Tanpa ?page= -> list biasa (kompatibel dengan klien lama), tetap proyeksi ringan.
+    """
+    if 'page' not in request.args:
+        return [assessment_summary(row) for row in query.all()]
+
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), MAX_LIST_PER_PAGE))
+    total = query.order_by(None).count()
+    rows = query.limit(per_page).offset((page - 1) * per_page).all()
+    return {
+        "data": [assessment_summary(row) for row in rows],
+        "meta": {
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page,
+            "total_items": total
+        }
+    }
+
+# Helper: Satu query GROUP BY untuk semua statistik konsultan
+def grouped_assessment_counts():
+    archived = func.coalesce(QrcAssessment.is_archived, False)
+    rows = db.session.query(
+        QrcAssessment.status,
+        QrcAssessment.assessment_type,
+        archived.label('is_archived'),
+        func.count(QrcAssessment.id).label('total')
+    ).group_by(QrcAssessment.status, QrcAssessment.assessment_type, archived).all()
+    return [{
+        "status": row.status,
+        "assessment_type": row.assessment_type,
+        "is_archived": bool(row.is_archived),
+        "count": row.total
+    } for row in rows]
+
 # ==========================================
 #  CLIENT ENDPOINTS (User QRC)
 # ==========================================
@@ -51,22 +140,12 @@ def submit_assessment():
     answers = data.get('answers', {})
     assess_type = data.get('assessment_type', 'standard')
     
-    # PERBAIKAN: Handle NoneType dengan fallback default
-    # Default Limit: Standard=2, Essay=1 (Jika di DB masih NULL)
-    limit_standard = user.limit_qrc_standard if user.limit_qrc_standard is not None else 2
-    limit_essay = user.limit_qrc_essay if user.limit_qrc_essay is not None else 1
-
-    # Pilih limit sesuai tipe
-    limit = limit_essay if assess_type == 'essay' else limit_standard
-    
-    current_count = QrcAssessment.query.filter_by(
-        user_id=user_id, 
-        assessment_type=assess_type
-    ).count()
-
-    if current_count >= limit:
+    # Cek + reservasi kuota per tipe (default Standard=2, Essay=1 jika limit user masih NULL)
+    try:
+        reserve_quota(user, qrc_resource(assess_type))
+    except QuotaExceeded as e:
         return jsonify({
-            "msg": f"Batas kuota habis! Anda hanya memiliki limit {limit} x asesmen untuk tipe ini."
+            "msg": f"Batas kuota habis! Anda hanya memiliki limit {e.limit} x asesmen untuk tipe ini."
         }), 403
     
     final_score = 0
@@ -105,10 +184,12 @@ def submit_assessment():
 
 @qrc_bp.route('/my-history', methods=['GET'])
 @jwt_required()
+@read_replica
 def my_history():
     user_id = int(get_jwt_identity())
-    assessments = QrcAssessment.query.filter_by(user_id=user_id).order_by(desc(QrcAssessment.submission_date)).all()
-    return jsonify([a.to_dict() for a in assessments]), 200
+    query = assessment_list_query().filter(QrcAssessment.user_id == user_id)\
+        .order_by(desc(QrcAssessment.submission_date))
+    return jsonify(paginated_summaries(query)), 200
 
 @qrc_bp.route('/my-limits', methods=['GET'])
 @jwt_required()
@@ -116,14 +197,11 @@ def my_limits():
     user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
     
-    # Hitung penggunaan saat ini
-    used_standard = QrcAssessment.query.filter_by(user_id=user_id, assessment_type='standard').count()
-    used_essay = QrcAssessment.query.filter_by(user_id=user_id, assessment_type='essay').count()
-    
-    # PERBAIKAN UTAMA: Handle NoneType dengan fallback ke nilai default (2 dan 1)
-    # Jika user.limit_qrc_... adalah None, gunakan angka default
-    limit_std = user.limit_qrc_standard if user.limit_qrc_standard is not None else 2
-    limit_ess = user.limit_qrc_essay if user.limit_qrc_essay is not None else 1
+    # Pemakaian dari usage_counters (sama dengan yang dicek reserve_quota saat submit);
+    # limit NULL memakai default kuota QRC (2 dan 1)
+    used_standard, limit_std = quota_usage(user, 'qrc_standard')
+    used_essay, limit_ess = quota_usage(user, 'qrc_essay')
+    db.session.commit()  # Baris counter yang baru dibuat
     
     return jsonify({
         "standard": {
@@ -145,6 +223,7 @@ def my_limits():
 # 1. Get Active Questions (Untuk Wizard Client)
 @qrc_bp.route('/questions', methods=['GET'])
 @jwt_required()
+@cached_json_response(QrcQuestion)
 def get_questions():
     # Ambil parameter type (standard/essay)
     q_type = request.args.get('type', 'standard')
@@ -164,24 +243,55 @@ def get_questions():
 # 1. Dashboard Stats (Card Counter)
 @qrc_bp.route('/consultant/stats', methods=['GET'])
 @jwt_required()
+@read_replica
 def consultant_stats():
-    # TODO: Tambahkan pengecekan role di sini (pastikan user adalah Consultant/Admin)
+    if not check_consultant_permission(int(get_jwt_identity())):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    by_status = {}
+    for group in grouped_assessment_counts():
+        by_status[group['status']] = by_status.get(group['status'], 0) + group['count']
     
-    total = QrcAssessment.query.count()
-    submitted = QrcAssessment.query.filter_by(status='submitted').count()
-    in_review = QrcAssessment.query.filter_by(status='in_review').count()
-    completed = QrcAssessment.query.filter_by(status='completed').count()
+    return jsonify({
+        "total_assessments": sum(by_status.values()),
+        "pending_review": by_status.get('submitted', 0),
+        "in_progress": by_status.get('in_review', 0),
+        "completed": by_status.get('completed', 0)
+    }), 200
+
+# 1b. Analytics (breakdown status x tipe x arsip dari satu query GROUP BY)
+@qrc_bp.route('/consultant/analytics', methods=['GET'])
+@jwt_required()
+@read_replica
+def consultant_analytics():
+    if not check_consultant_permission(int(get_jwt_identity())):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    groups = grouped_assessment_counts()
+    
+    by_status, by_type = {}, {}
+    archived = active = 0
+    for group in groups:
+        by_status[group['status']] = by_status.get(group['status'], 0) + group['count']
+        by_type[group['assessment_type']] = by_type.get(group['assessment_type'], 0) + group['count']
+        if group['is_archived']:
+            archived += group['count']
+        else:
+            active += group['count']
     
     return jsonify({
-        "total_assessments": total,
-        "pending_review": submitted,
-        "in_progress": in_review,
-        "completed": completed
+        "total_assessments": archived + active,
+        "active": active,
+        "archived": archived,
+        "by_status": by_status,
+        "by_type": by_type,
+        "groups": groups
     }), 200
 
 # 2. List All Assessments (Search, Filter, Sort)
 @qrc_bp.route('/consultant/list', methods=['GET'])
 @jwt_required()
+@read_replica
 def list_assessments():
     status_filter = request.args.get('status') 
     search_query = request.args.get('search') 
@@ -189,7 +299,8 @@ def list_assessments():
     # Filter Arsip
     show_archived = request.args.get('archived', 'false') == 'true'
     
-    query = QrcAssessment.query.join(User, QrcAssessment.user_id == User.id)
+    # Proyeksi ringan (tanpa answers_data & teks AI), lihat assessment_list_query
+    query = assessment_list_query()
     
     # PERBAIKAN DISINI: Handle data legacy yang is_archived-nya NULL
     if show_archived:
@@ -213,10 +324,9 @@ def list_assessments():
             )
         )
         
-    query = query.order_by(desc(QrcAssessment.submission_date))
-    assessments = query.all()
+    query = query.order_by(desc(QrcAssessment.submission_date), desc(QrcAssessment.id))
     
-    return jsonify([a.to_dict() for a in assessments]), 200
+    return jsonify(paginated_summaries(query)), 200
 
 @qrc_bp.route('/consultant/<int:id>/archive', methods=['PUT'])
 @jwt_required()
@@ -238,7 +348,7 @@ def restore_assessment(id):
 @qrc_bp.route('/consultant/<int:id>', methods=['GET'])
 @jwt_required()
 def get_detail(id):
-    assessment = QrcAssessment.query.get_or_404(id)
+    assessment = QrcAssessment.query.options(undefer_group('content')).get_or_404(id)
     return jsonify(assessment.to_dict()), 200
 
 # 4. Update Review & Status (Flag)
@@ -293,16 +403,18 @@ def generate_ai_analysis(id):
     # Pastikan user punya permission consultant
     # (Opsional: Tambah pengecekan role/permission di sini jika perlu strict)
     
-    assessment = QrcAssessment.query.get_or_404(id)
+    assessment = QrcAssessment.query.options(undefer_group('content')).get_or_404(id)
     
-    # Panggil Service AI
+    # Panggil Service AI (input diambil dulu, koneksi DB dilepas selama panggilan model)
     try:
-        analysis_result = analyze_qrc_assessment(
+        ai_input = dict(
             assessment_type=assessment.assessment_type,
             answers_data=assessment.answers_data,
             client_name=assessment.client.nama_lengkap,
             institution=getattr(assessment.client, 'institution', '-')
         )
+        release_db_connection()
+        analysis_result = analyze_qrc_assessment(**ai_input)
         
         # Simpan hasil ke database (update field ai_generated_analysis)
         assessment.ai_generated_analysis = analysis_result
@@ -1,16 +1,43 @@
 # backend/app/routes/risk_ai.py
 import os
 import json
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, current_app, send_file
 from app.models import db, User, RiskAssessment, RiskRegister, MainRiskRegister, MasterData
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.db_engine import read_replica, release_db_connection
 from datetime import datetime
-from sqlalchemy import func
-from app.ai_services import analyze_assessment_with_gemini, generate_detailed_risk_analysis_with_gemini
+from sqlalchemy.orm import selectinload, load_only, undefer_group
+from app.ai_services import (
+    analyze_assessment_with_gemini, generate_detailed_risk_analysis_with_gemini,
+    analyze_assessment_parallel, generate_detailed_risk_analysis_parallel
+)
+from app.regulation_ingest import retrieve_passages_for_assessment
+from app.excel_export import send_export, stamp_of
+from app.quota import reserve_quota, release_quota, call_with_quota, QuotaExceeded
+from app.export_specs import RISK_ASSESSMENT_EXPORT
+from app.assessment_report import (
+    REPORT_FORMATS, safe_json_loads, build_report_payload, get_or_render_report,
+    build_report_bundle, report_filename
+)
 
 # Membuat Blueprint untuk fitur Risk Management AI
 risk_ai_bp = Blueprint('risk_ai_bp', __name__)
 
+# Detail/export/laporan butuh semua teks; list cukup kolom ringkas (lihat assessment_list_query)
+FULL_ASSESSMENT = (undefer_group('context'), undefer_group('ai_analysis'))
+
+def assessment_list_query(user_id):
+    """
+    Proyeksi ringan untuk daftar asesmen: hanya kolom ringkas + skor inherent risiko
+    (satu SELECT IN untuk semua risk register, bukan satu query per asesmen).
+    """
+    return RiskAssessment.query.options(
+        load_only(RiskAssessment.id, RiskAssessment.nama_asesmen, RiskAssessment.tanggal_mulai,
+                  RiskAssessment.tanggal_selesai, RiskAssessment.company_industry),
+        selectinload(RiskAssessment.risk_register_entries)
+            .load_only(RiskRegister.inherent_likelihood, RiskRegister.inherent_impact)
+    ).filter_by(user_id=user_id).order_by(RiskAssessment.tanggal_mulai.desc())
+
 # --- Endpoint untuk Risk Assessment ---
 
 @risk_ai_bp.route('/assessments', methods=['POST'])
@@ -20,11 +47,6 @@ def create_assessment():
     current_user_id = int(get_jwt_identity())
     
     user = User.query.get(current_user_id)
-    if user.limit_ai is not None:
-        current_count = db.session.query(func.count(RiskAssessment.id)).filter_by(user_id=current_user_id).scalar() or 0
-        if current_count >= user.limit_ai:
-            return jsonify({"msg": f"Kuota Asesmen AI penuh ({current_count}/{user.limit_ai})."}), 403
-    
     data = request.get_json()
 
     # Validasi input
@@ -35,6 +57,11 @@ def create_assessment():
     if not data.get('risk_categories') or len(data.get('risk_categories')) == 0:
         return jsonify({"msg": "Pilih minimal satu Kategori Risiko."}), 400
 
+    try:
+        reserve_quota(user, 'ai')
+    except QuotaExceeded as e:
+        return jsonify({"msg": f"Kuota Asesmen AI penuh ({e.used}/{e.limit})."}), 403
+
     # Coba konversi risk_limit ke float, default ke 0 jika gagal atau tidak ada
     try:
         risk_limit_val = float(data.get('risk_limit', 0))
@@ -69,10 +96,11 @@ def create_assessment():
     
 @risk_ai_bp.route('/assessments', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_all_assessments():
     """Mengambil semua proyek asesmen milik pengguna (hanya data ringkas)."""
     current_user_id = int(get_jwt_identity())
-    assessments = RiskAssessment.query.filter_by(user_id=current_user_id).order_by(RiskAssessment.tanggal_mulai.desc()).all()
+    assessments = assessment_list_query(current_user_id).all()
     
     assessment_list = []
     for a in assessments:
@@ -96,7 +124,7 @@ def get_all_assessments():
 def get_assessment_details(assessment_id):
     """Mengambil data detail dari satu asesmen, termasuk risk register-nya."""
     current_user_id = int(get_jwt_identity())
-    assessment = RiskAssessment.query.get_or_404(assessment_id)
+    assessment = RiskAssessment.query.options(*FULL_ASSESSMENT).get_or_404(assessment_id)
     
     user = User.query.get(current_user_id)
     is_admin = any(r.name == 'Admin' for r in user.roles)
@@ -125,13 +153,6 @@ def get_assessment_details(assessment_id):
         "residual_impact": r.residual_impact,
     } for r in assessment.risk_register_entries]
     
-    def safe_json_loads(json_string):
-        if not json_string: return None
-        try:
-            return json.loads(json_string)
-        except (json.JSONDecodeError, TypeError):
-            return None
-    
     return jsonify({
         "id": assessment.id,
         "nama_asesmen": assessment.nama_asesmen,
@@ -158,6 +179,104 @@ def get_assessment_details(assessment_id):
         "ai_next_steps": assessment.ai_next_steps,
     })
 
+@risk_ai_bp.route('/assessments/<int:assessment_id>/export', methods=['GET'])
+@jwt_required()
+@read_replica
+def export_assessment_to_excel(assessment_id):
+    """Mengirim file Excel asesmen AI beserta risk register-nya (dari cache jika belum berubah)."""
+    current_user_id = int(get_jwt_identity())
+    assessment = RiskAssessment.query.options(*FULL_ASSESSMENT).get_or_404(assessment_id)
+
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    if assessment.user_id != current_user_id and not is_admin:
+        return jsonify({"msg": "Akses ditolak."}), 403
+
+    return send_export(
+        RISK_ASSESSMENT_EXPORT, {"assessment": assessment},
+        key_parts=(assessment.id, stamp_of(assessment)),
+        download_name=f"Asesmen_AI_{assessment.nama_asesmen or assessment.id}.xlsx"
+    )
+
+@risk_ai_bp.route('/assessments/<int:assessment_id>/report', methods=['GET'])
+@jwt_required()
+def get_assessment_report(assessment_id):
+    """Laporan ringkasan asesmen AI (?format=pdf|html), dirender di process pool & di-cache per isi."""
+    current_user_id = int(get_jwt_identity())
+    assessment = RiskAssessment.query.options(*FULL_ASSESSMENT).get_or_404(assessment_id)
+
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    if assessment.user_id != current_user_id and not is_admin:
+        return jsonify({"msg": "Akses ditolak."}), 403
+
+    fmt = (request.args.get('format') or 'pdf').lower()
+    if fmt not in REPORT_FORMATS:
+        return jsonify({"msg": "Format harus 'pdf' atau 'html'."}), 400
+
+    payload = build_report_payload(assessment, User.query.get(assessment.user_id))
+    try:
+        path, digest, hit = get_or_render_report(payload, fmt)
+    except Exception as e:
+        print(f"Error saat membuat laporan asesmen {assessment_id}: {e}")
+        return jsonify({"msg": "Gagal membuat laporan."}), 500
+
+    response = send_file(path, mimetype=REPORT_FORMATS[fmt], max_age=0, etag=digest,
+                         as_attachment=fmt == 'pdf' or request.args.get('download') == '1',
+                         download_name=report_filename(payload, fmt))
+    response.headers['X-Report-Cache'] = 'HIT' if hit else 'MISS'
+    return response.make_conditional(request)
+
+@risk_ai_bp.route('/assessments/reports/bulk', methods=['GET'])
+@jwt_required()
+def export_assessment_reports_bulk():
+    """
+    ZIP laporan semua asesmen AI satu institusi (?format=pdf|html).
+    Admin memilih institusi lewat ?institution=; user lain hanya asesmen miliknya sendiri.
+    """
+    current_user_id = int(get_jwt_identity())
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    fmt = (request.args.get('format') or 'pdf').lower()
+    if fmt not in REPORT_FORMATS:
+        return jsonify({"msg": "Format harus 'pdf' atau 'html'."}), 400
+
+    query = RiskAssessment.query.options(selectinload(RiskAssessment.risk_register_entries), *FULL_ASSESSMENT)
+    if is_admin:
+        institution = request.args.get('institution') or user.institution
+        if not institution:
+            return jsonify({"msg": "Parameter institution wajib diisi."}), 400
+        owners = {u.id: u for u in User.query.filter_by(institution=institution).all()}
+        query = query.filter(RiskAssessment.user_id.in_(list(owners)))
+    else:
+        institution = user.institution
+        owners = {user.id: user}
+        query = query.filter(RiskAssessment.user_id == current_user_id)
+
+    assessments = query.order_by(RiskAssessment.id).all()
+    if not assessments:
+        return jsonify({"msg": "Tidak ada asesmen untuk diekspor."}), 404
+    max_items = current_app.config.get('REPORT_BUNDLE_MAX', 500)
+    if len(assessments) > max_items:
+        return jsonify({"msg": f"Terlalu banyak asesmen ({len(assessments)}); maksimal {max_items} per export."}), 400
+
+    payloads = [build_report_payload(a, owners.get(a.user_id)) for a in assessments]
+    try:
+        zip_path, hits, misses = build_report_bundle(payloads, fmt)
+    except Exception as e:
+        print(f"Error saat membuat bundel laporan: {e}")
+        return jsonify({"msg": "Gagal membuat laporan."}), 500
+
+    safe_name = "".join(ch if ch.isalnum() else '_' for ch in (institution or 'Saya'))
+    response = send_file(zip_path, mimetype='application/zip', as_attachment=True, max_age=0,
+                         download_name=f"Laporan_Asesmen_AI_{safe_name}.zip")
+    response.headers['X-Report-Cache'] = f"HIT={hits}; MISS={misses}"
+    response.call_on_close(lambda: os.remove(zip_path) if os.path.exists(zip_path) else None)
+    return response
+
 @risk_ai_bp.route('/assessments/<int:assessment_id>', methods=['DELETE'])
 @jwt_required()
 def delete_assessment(assessment_id):
@@ -223,6 +342,8 @@ def bulk_delete_assessments():
         RiskAssessment.query.filter(
             RiskAssessment.id.in_(valid_ids)
         ).delete(synchronize_session=False)
+        # Bulk DELETE tidak lewat listener ORM -> kuota dikembalikan manual
+        release_quota(current_user_id, 'ai', num_deleted)
         
         db.session.commit()
         
@@ -243,16 +364,6 @@ def analyze_assessment():
     user = User.query.get(current_user_id)
     if not user:
         return jsonify({"msg": "User tidak ditemukan"}), 404
-        
-    # Cek jika limit AI di-set (bukan None)
-    if user.limit_ai is not None:
-        # Hitung jumlah asesmen AI yang sudah dibuat user
-        current_ai_count = db.session.query(func.count(RiskAssessment.id)).filter_by(user_id=current_user_id).scalar() or 0
-        
-        if current_ai_count >= user.limit_ai:
-            return jsonify({
-                "msg": f"Batas pembuatan Asesmen AI Anda telah tercapai ({current_ai_count}/{user.limit_ai}). Hubungi admin untuk menambah kuota."
-            }), 403 #
 
     # --- Validasi Input ---
     if not form_data or not form_data.get('nama_asesmen'):
@@ -260,7 +371,42 @@ def analyze_assessment():
     if not form_data.get('risk_categories'):
         return jsonify({"msg": "Pilih minimal satu Kategori Risiko."}), 400
 
-    # 1. Buat Asesmen Terlebih Dahulu
+    # Reservasi kuota di-commit sebelum panggilan AI; dilepas lagi jika analisis gagal
+    try:
+        return call_with_quota(user, 'ai', _run_assessment_analysis, current_user_id, form_data)
+    except QuotaExceeded as e:
+        return jsonify({
+            "msg": f"Batas pembuatan Asesmen AI Anda telah tercapai ({e.used}/{e.limit}). Hubungi admin untuk menambah kuota."
+        }), 403
+
+def _run_assessment_analysis(current_user_id, form_data):
+    """Menjalankan analisis AI, lalu menyimpan asesmen beserta risk register hasilnya."""
+    # 1. Siapkan konteks AI (API key + kutipan regulasi) dari database
+    key_entry = MasterData.query.filter_by(category='SYSTEM_CONFIG', key='GEMINI_API_KEY').first()
+    gemini_api_key = key_entry.value if key_entry else None
+    
+    if not gemini_api_key:
+        return jsonify({"msg": "Konfigurasi API Key AI tidak ditemukan."}), 500
+        
+    # Hanya top-k kutipan regulasi yang relevan yang ikut dikirim ke prompt
+    try:
+        regulation_passages = retrieve_passages_for_assessment(form_data)
+    except Exception as e:
+        print(f"Warning: Gagal mengambil kutipan regulasi: {e}")
+        regulation_passages = []
+
+    # 2. Panggil Layanan AI tanpa memegang koneksi database
+    release_db_connection()
+    # Mode fan-out: satu sub-request per kategori risiko, dijalankan paralel
+    if current_app.config.get('AI_FANOUT_ENABLED', True):
+        identified_risks = analyze_assessment_parallel(form_data, regulation_passages=regulation_passages)
+    else:
+        identified_risks = analyze_assessment_with_gemini(form_data, regulation_passages=regulation_passages)
+
+    if not identified_risks:
+        return jsonify({"msg": "Asesmen gagal dibuat, analisis AI tidak mengembalikan risiko."}), 500
+
+    # 3. Buat asesmen & simpan hasil identifikasi ke RiskRegister
     new_assessment = RiskAssessment(
         nama_asesmen=form_data.get('nama_asesmen'),
         tanggal_mulai=datetime.utcnow().date(),
@@ -281,55 +427,40 @@ def analyze_assessment():
     db.session.flush()
     assessment_id = new_assessment.id
 
-    # 2. Panggil Layanan AI  ---
-    key_entry = MasterData.query.filter_by(category='SYSTEM_CONFIG', key='GEMINI_API_KEY').first()
-    gemini_api_key = key_entry.value if key_entry else None
-    
-    if not gemini_api_key:
-        db.session.rollback()
-        return jsonify({"msg": "Konfigurasi API Key AI tidak ditemukan."}), 500
+    for i, risk in enumerate(identified_risks):
+        def safe_int(value):
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                return None
         
-    identified_risks = analyze_assessment_with_gemini(form_data)
-
-    # 3. Simpan hasil identifikasi ke RiskRegister
-    if identified_risks:
-        for i, risk in enumerate(identified_risks):
-            def safe_int(value):
-                try:
-                    return int(value)
-                except (ValueError, TypeError):
-                    return None
-            
-            risk_type_prefix = risk.get('risk_type', 'XX').upper()
-            kode_risiko_unik = f"A{assessment_id}-{risk_type_prefix}{str(i+1).zfill(2)}"
+        risk_type_prefix = risk.get('risk_type', 'XX').upper()
+        kode_risiko_unik = f"A{assessment_id}-{risk_type_prefix}{str(i+1).zfill(2)}"
+        
+        generated_title = risk.get('title')
+        if not generated_title or generated_title.strip() == "":
+            deskripsi = risk.get('deskripsi_risiko', 'Risiko Tanpa Judul')
+            generated_title = ' '.join(deskripsi.split()[:7]) + '...'
+
+        new_risk_entry = RiskRegister(
+            kode_risiko=kode_risiko_unik,
+            title=generated_title,
+            objective=risk.get('objective'),
+            risk_type=risk.get('risk_type'),
+            deskripsi_risiko=risk.get('deskripsi_risiko'),
+            risk_causes=risk.get('risk_causes'),
+            risk_impacts=risk.get('risk_impacts'),
+            existing_controls=risk.get('existing_controls'),
+            control_effectiveness=risk.get('control_effectiveness'),
+            mitigation_plan=risk.get('mitigation_plan'),
+            assessment_id=assessment_id,
             
-            generated_title = risk.get('title')
-            if not generated_title or generated_title.strip() == "":
-                deskripsi = risk.get('deskripsi_risiko', 'Risiko Tanpa Judul')
-                generated_title = ' '.join(deskripsi.split()[:7]) + '...'
-
-            new_risk_entry = RiskRegister(
-                kode_risiko=kode_risiko_unik,
-                title=generated_title,
-                objective=risk.get('objective'),
-                risk_type=risk.get('risk_type'),
-                deskripsi_risiko=risk.get('deskripsi_risiko'),
-                risk_causes=risk.get('risk_causes'),
-                risk_impacts=risk.get('risk_impacts'),
-                existing_controls=risk.get('existing_controls'),
-                control_effectiveness=risk.get('control_effectiveness'),
-                mitigation_plan=risk.get('mitigation_plan'),
-                assessment_id=assessment_id,
-                
-                inherent_likelihood=safe_int(risk.get('inherent_likelihood')),
-                inherent_impact=safe_int(risk.get('inherent_impact')),
-                residual_likelihood=safe_int(risk.get('residual_likelihood')),
-                residual_impact=safe_int(risk.get('residual_impact')),
-            )
-            db.session.add(new_risk_entry)
-    else:
-        db.session.rollback() # Batalkan jika AI gagal membuat risiko
-        return jsonify({"msg": "Asesmen gagal dibuat, analisis AI tidak mengembalikan risiko.", "assessment_id": assessment_id}), 500
+            inherent_likelihood=safe_int(risk.get('inherent_likelihood')),
+            inherent_impact=safe_int(risk.get('inherent_impact')),
+            residual_likelihood=safe_int(risk.get('residual_likelihood')),
+            residual_impact=safe_int(risk.get('residual_impact')),
+        )
+        db.session.add(new_risk_entry)
 
     db.session.commit()
     return jsonify({"msg": "Analisis risiko AI berhasil dan disimpan.", "assessment_id": assessment_id}), 201
@@ -338,17 +469,13 @@ def analyze_assessment():
 @jwt_required()
 def generate_summary_for_assessment(assessment_id):
     current_user_id = int(get_jwt_identity())
-    assessment = RiskAssessment.query.filter_by(id=assessment_id, user_id=current_user_id).first_or_404()
+    assessment = RiskAssessment.query.options(undefer_group('ai_analysis'))\
+        .filter_by(id=assessment_id, user_id=current_user_id).first_or_404()
 
     # Cek apakah summary sudah ada (jangan generate ulang jika tidak perlu)
     if assessment.ai_executive_summary:
         print(f"Summary untuk Asesmen {assessment_id} sudah ada. Mengembalikan data lama.")
         # Kita perlu memuat ulang data yang sudah di-JSON-kan
-        def safe_json_loads(json_string):
-            if not json_string: return None
-            try: return json.loads(json_string)
-            except (json.JSONDecodeError, TypeError): return None
-            
         return jsonify({
             "ai_executive_summary": assessment.ai_executive_summary,
             "ai_risk_profile_analysis": safe_json_loads(assessment.ai_risk_profile_analysis),
@@ -378,7 +505,11 @@ def generate_summary_for_assessment(assessment_id):
     ]
 
     print(f"Membuat ringkasan untuk Asesmen {assessment_id}...")
-    analysis_content = generate_detailed_risk_analysis_with_gemini(risk_list_for_ai)
+    release_db_connection()  # Asesmen dimuat ulang otomatis saat hasil disimpan
+    if current_app.config.get('AI_FANOUT_ENABLED', True):
+        analysis_content = generate_detailed_risk_analysis_parallel(risk_list_for_ai)
+    else:
+        analysis_content = generate_detailed_risk_analysis_with_gemini(risk_list_for_ai)
     
     if analysis_content:
         # Simpan hasil ke asesmen yang ada
@@ -1,47 +1,204 @@
 # backend/app/routes/risk_management_levels.py
-import os
-import decimal
-import openpyxl
-from sqlalchemy import func
-from flask import request, jsonify, Blueprint, send_file, current_app
+import hashlib
+from sqlalchemy import func, insert, update, delete
+from flask import request, jsonify, Blueprint, current_app
 from app.models import (
     db, BasicAssessment, OrganizationalContext, 
     BasicRiskIdentification, BasicRiskAnalysis, RiskMapTemplate, RiskMapLikelihoodLabel, 
-    RiskMapImpactLabel, RiskMapLevelDefinition, RiskMapScore, MadyaAssessment, OrganizationalStructureEntry, SasaranOrganisasiKPI, RiskInputMadya, basic_assessment_contexts, MadyaCriteriaProbability, MadyaCriteriaImpact, User
+    RiskMapImpactLabel, RiskMapLevelDefinition, RiskMapScore, RiskMapTemplateVersion, RiskRescoringJob, MadyaAssessment, OrganizationalStructureEntry, SasaranOrganisasiKPI, RiskInputMadya, basic_assessment_contexts, MadyaCriteriaProbability, MadyaCriteriaImpact, User
 )
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.db_engine import read_replica
 from datetime import datetime
-from io import BytesIO
-from werkzeug.utils import secure_filename
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.drawing.image import Image
-from openpyxl.utils import get_column_letter
-from collections import defaultdict
-
-DEFAULT_PROBABILITY_CRITERIA = [
-  { "level": 5, "parameter": "Hampir Pasti Terjadi", "kemungkinan": "Risiko pernah terjadi sekali dalam 1 bulan", "frekuensi": "> 10% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 80% sampai dengan 100%" },
-  { "level": 4, "parameter": "Sangat Mungkin Terjadi", "kemungkinan": "Risiko pernah terjadi sekali dalam 2 bulan", "frekuensi": "Diatas 5 s/d 10% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 60% sampai dengan 80%" },
-  { "level": 3, "parameter": "Bisa Terjadi", "kemungkinan": "Risiko pernah terjadi namun tidak sering, sekali dalam 4 bulan", "frekuensi": "Diatas 1% s/d 5% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 40% sampai dengan 60%" },
-  { "level": 2, "parameter": "Jarang Terjadi", "kemungkinan": "Risiko mungkin terjadi hanya sekali dalam 6 bulan", "frekuensi": "Dari 1 permil s/d 1% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko dari 20% sampai dengan 40%" },
-  { "level": 1, "parameter": "Sangat Jarang Terjadi", "kemungkinan": "Risiko mungkin terjadi sangat jarang, paling banyak satu kali dalam setahun", "frekuensi": "< 1 permil dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko lebih kecil dari 20%" },
-]
-
-# (Saya singkat data dampak defaultnya, tapi Anda harus memasukkan SEMUA field)
-DEFAULT_IMPACT_CRITERIA = [
-  { "level": 5, "kriteriaDampak": "Sangat Tinggi", "rangeFinansial": "X > 80%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak katastrofe yang dapat mengakibatkan kerusakan/ kerugian/ penurunan > 80% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda lebih dari 9 bulan", "hukum_pelanggaran": "Perusahaan diputuskan kalah di pengadilan tingkat selanjutnya.", "kepat_pelanggaran": "Regulator memberlaku-kan sanksi signifikan (misalkan delisting saham, tidak diperkenan-kan mengikuti kliring, menarik produk yang beredar, dan lain-lain)", "reput_keluhan": "Keluhan yang menyebar ke skala nasional / internasional dan / atau diajukan secara kolektif yang diselesaikan melebihi 10 hari kerja dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_berita": "Publikasi negatif mencapai skala internasional yang tersebar di sosial media dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_saing": "Penurunan pangsa pasar lebih dari 20%", "sdm_keluhan": "Demonstrasi terkoordinasi, terjadinya kematian karyawan saat kerja", "sdm_turnover": "Turn over pegawai bertalenta >15% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta >15% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama lebih dari 6 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu lebih dari 500 kali", "sistem_platform": "X ≤ 60%", "ops_sla": ">20% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus kematian jamak", "hsse_fatality_2": "Wabah ke lingkungan", "hsse_fatality_3": "Potensi menyebabkan banyak kematian misalnya bahan kimia beracun berbahaya", "hsse_kerusakan_lingkungan": "Sangat serius kerusakan jangka panjang (>5 tahun) dan fungsi ekosistem", "hsse_penurunan_esg": "X < 60% atau memperoleh rating '40+ (severe)'", "pmn_tunda": "Tertunda > 4 bulan dari target RKAP", "bank_fraud": "X > 1.400", "asuransi_aset_rating": "Instrumen pada Investment grade < 70%", "asuransi_aset_peringkat": "atau Peringkat di bawah BBB (yang setara atau tidak diperingkat)", "aktu_rasio": "Rasio klaim > 100%" },
-  # SKALA 4
-  { "level": 4, "kriteriaDampak": "Tinggi", "rangeFinansial": "60% < X ≤ 80%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak signifikan yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 60% - 80% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda 6 s/d 9 bulan", "hukum_pelanggaran": "Perusahaan diputuskan kalah di pengadilan tingkat pertama.", "kepat_pelanggaran": "Regulator memberlaku-kan pembatasan dan / atau pembekuan terhadap aktivitas operasional / produk / jasa tertentu.", "reput_keluhan": "Terdapat keluhan pelanggan/ nasabah/ pembeli/ supplier yang signifikan dan dipublikasikan di media massa nasional/ internasional", "reput_berita": "Pemberitaan negatif di media massa nasional dan media sosial yang signifikan, menjadi isu utama, dan mudah ditangani", "reput_saing": "Kehilangan daya saing signifikan yang ditunjukkan dengan penurunan pangsa pasar 5% - 10%", "sdm_keluhan": "Terdapat keluhan karyawan yang menimbulkan gangguan operasional ringan di satu unit", "sdm_turnover": "Turn over karyawan bertalenta (regretted turnover) 5% - 7%", "sdm_regretted_turnover": "Turn over pegawai bertalenta antara 10% sampai dengan 15% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama 2 s/d 6 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 200-500 kali", "sistem_platform": "70% ≥ X > 60%", "ops_sla": "Antara 10% s/d 20% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus kematian tunggal / Cacat tetap / Ketidakhadir-an kerja yang lama", "hsse_fatality_2": "Efek ireversibel yang menyebabkan kematian", "hsse_fatality_3": "[Data L4F3]", "hsse_kerusakan_lingkungan": "Efek lingkungan jangka menengah (3-5 tahun) yang serius", "hsse_penurunan_esg": "70% ≥ X > 60% atau memperoleh rating '30-40 (high)'", "pmn_tunda": "Tertunda 3 bulan dari target RKAP", "bank_fraud": "1.201 < X ≤ 1.400", "asuransi_aset_rating": "70% ≤ Instrumen pada Investment grade < 80%", "asuransi_aset_peringkat": "atau Peringkat BBB (yang setara)", "aktu_rasio": "90% < Rasio klaim ≤ 100%" },
-  # SKALA 3
-  { "level": 3, "kriteriaDampak": "Sedang", "rangeFinansial": "40% < X ≤ 60%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak sedang yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 40% - 60% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda 3 s/d 6 bulan", "hukum_pelanggaran": "Perusahaan mendapat tuntutan hukum.", "kepat_pelanggaran": "Peringatan tertulis / formal, terkena denda.", "reput_keluhan": "Terdapat keluhan pelanggan/ nasabah/ pembeli/ supplier yang cukup signifikan dan dipublikasikan di media massa lokal", "reput_berita": "Pemberitaan negatif di media massa lokal dan media sosial yang cukup signifikan, namun tidak menjadi isu utama", "reput_saing": "Kehilangan daya saing cukup signifikan yang ditunjukkan dengan penurunan pangsa pasar 1% - 5%", "sdm_keluhan": "Terdapat keluhan karyawan yang memerlukan eskalasi luas (sampai tingkat Direksi) untuk penyelesaian", "sdm_turnover": "Turn over karyawan bertalenta (regretted turnover) 3% - 5%", "sdm_regretted_turnover": "Turn over pegawai bertalenta antara 5% sampai dengan 10% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama < 1 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 100-199 kali", "sistem_platform": "80 % ≥ X > 70%", "ops_sla": "Antara 2,5% s/d 10% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Cacat tidak tetap / Ketidakhadir-an kerja yang terbatas", "hsse_fatality_2": "Efek ireversibel tanpa kehilangan nyawa tetapi dengan cacat serius dan rawat inap berkepanjangan", "hsse_fatality_3": "[Data L3F3]", "hsse_kerusakan_lingkungan": "Efek jangka pendek (1-2 tahun) tetapi tidak mempengaruhi fungsi ekosistem", "hsse_penurunan_esg": "80 % ≥ X > 70% atau memperoleh rating '20-30 (medium)'", "pmn_tunda": "Tertunda 2 bulan dari target RKAP", "bank_fraud": "1.001 < X ≤ 1.200", "asuransi_aset_rating": "80% ≤ Instrumen pada Investment grade < 90%", "asuransi_aset_peringkat": "atau Peringkat A (yang setara)", "aktu_rasio": "82,5% < Rasio klaim ≤ 90%" },
-  # SKALA 2
-  { "level": 2, "kriteriaDampak": "Kecil", "rangeFinansial": "20% < X ≤ 40%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak kecil yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 20% - 40% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda antara 2 - 3 bulan ", "hukum_pelanggaran": "Perusahaan mendapat somasi.", "kepat_pelanggaran": "Diminta bertemu dengan pihak Regulator (misalkan OJK, Bank Indonesia, IDX, Kementerian terkait, Dirjen Pajak, dan lain-lain)", "reput_keluhan": "Terdapat keluhan pelanggan/ nasabah/ pembeli/ supplier yang tidak signifikan dan tidak dipublikasikan di media massa", "reput_berita": "Pemberitaan negatif yg terisolasi di wilayah sektoral melalui media konvensional (misalkan Radio lokal, TV lokal, Surat Kabar daerah)", "reput_saing": "Kehilangan daya saing tidak signifikan yang ditunjukkan dengan penurunan pangsa pasar < 1%", "sdm_keluhan": "Terdapat keluhan karyawan yang memerlukan eskalasi terbatas (sampai tingkat unit SDM) untuk penyelesaian", "sdm_turnover": "Turn over karyawan bertalenta (regretted turnover) 1% - 3%", "sdm_regretted_turnover": "Turn over pegawai bertalenta dari 1% sampai dengan 5% setahun", "sistem_gangguan": "Aplikasi dan Infrastruktur pendukung yang kurang penting tidak berfungsi selama lebih dari 1 hari s/d 3 hari", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 50-99 kali", "sistem_platform": "90% ≥ X > 80%", "ops_sla": "Dari 1% s/d 2,5% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus Perawatan Medis", "hsse_fatality_2": "Efek kesehatan minor dan reversibel (tanpa rawat inap)", "hsse_fatality_3": "[Data L2F3]", "hsse_kerusakan_lingkungan": "Efek minor pada lingkungan biologis atau fisik", "hsse_penurunan_esg": "90% ≥ X > 80% atau memperoleh rating '10-20 (low)'", "pmn_tunda": "Tertunda 1 bulan dari target RKAP", "bank_fraud": "800 ≤ X ≤ 1.000", "asuransi_aset_rating": "90% ≤ Instrumen pada Investment grade < 100%", "asuransi_aset_peringkat": "atau Peringkat AA (yang setara)", "aktu_rasio": "75% < Rasio klaim ≤ 82,5%" },
-  # SKALA 1
-  { "level": 1, "kriteriaDampak": "Sangat Kecil", "rangeFinansial": "X ≤ 20%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak sangat rendah yang dapat mengakibatkan kerusakan/ kerugian/ penurunan kurang dari 20% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter target strategis yang harus selesai pada tahun ini tertunda kurang dari 1 bulan", "hukum_pelanggaran": "Tidak ada somasi/ tuntutan hukum", "kepat_pelanggaran": "Teguran informal / verbal.", "reput_keluhan": "Tidak ada keluhan pelanggan/ nasabah/ pembeli/ supplier", "reput_berita": "Publikasi negatif yg terisolasi dan dapat ditangani dalam 1 hari kerja", "reput_saing": "Penurunan pangsa pasar sampai dengan 5%", "sdm_keluhan": "Terdapat keluhan karyawan yang disalurkan sampai tingkat SP Unit namun dapat diisolir dan diselesaikan oleh Pemimpin Unit", "sdm_turnover": "Turn over pegawai bertalenta kurang dari 1% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta kurang dari 1% setahun", "sistem_gangguan": "Aplikasi & Infrastruktur pendukung yang kurang penting tidak berfungsi selama 1 hari", "sistem_siber": "Jumlah rata-rata serangan siber per minggu di bawah 50 kali", "sistem_platform": "X > 90%", "ops_sla": "<1% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus Pertolongan Pertama", "hsse_fatality_2": "Tidak berpengaruh pada Kinerja Kerja", "hsse_fatality_3": "[Data L1F3]", "hsse_kerusakan_lingkungan": "Kerusakan terbatas pada area minimal dengan signifikansi rendah", "hsse_penurunan_esg": "X > 90% atau memperoleh rating '0-10 (negligible)'", "pmn_tunda": "Diterima tepat waktu sesuai dengan RKAP", "bank_fraud": "X < 800", "asuransi_aset_rating": "Instrumen pada investment grade 100%,", "asuransi_aset_peringkat": "atau Peringkat AAA (yang setara)", "aktu_rasio": "Rasio klaim ≤ 75%" }
-]
+from app.http_cache import cached_json_response
+from app.image_pipeline import (
+    ImageUploadError, prepare_image_upload, store_image_variants, image_reference_lock,
+    remove_image_files, image_urls
+)
+from app.serializers import get_serializer
+from app.madya_criteria import (
+    get_default_criteria_set, resolve_assessment_criteria, materialize_criteria_override
+)
+from app.risk_map_versions import (
+    create_template_version, save_template_content, get_current_version, get_version, find_current_version,
+    version_to_dict, lookup_score, get_version_matrix, resolve_assessment_version,
+    find_assessment_version, pin_assessment_version
+)
+from app.rescoring import enqueue_rescoring, job_to_dict
+from app.quota import reserve_quota, QuotaExceeded
+from app.risk_map_render import (
+    get_render_table, table_to_cells, risk_positions, render_svg, render_png, render_version_image
+)
+from app.excel_export import send_export, stamp_of, touch_export_stamps
+from app.export_specs import BASIC_ASSESSMENT_EXPORT, MADYA_ASSESSMENT_EXPORT
 
 # Membuat Blueprint untuk Risk Management Levels
 risk_management_levels_bp = Blueprint('risk_management_levels_bp', __name__)
 
+RENDER_MIMETYPES = {'svg': 'image/svg+xml', 'png': 'image/png', 'json': 'application/json'}
+
+# --- Sinkronisasi Asesmen Dasar (keyed upsert) ---
+BASIC_RISK_FIELDS = (
+    'kode_risiko', 'kategori_risiko', 'unit_kerja', 'sasaran', 'tanggal_identifikasi', 'deskripsi_risiko',
+    'akar_penyebab', 'indikator_risiko', 'internal_control', 'deskripsi_dampak'
+)
+BASIC_ANALYSIS_FIELDS = ('probabilitas', 'dampak', 'probabilitas_kualitatif', 'dampak_finansial')
+
+def _basic_risk_values(risk_item):
+    try:
+        tanggal_obj = datetime.strptime(risk_item.get('tanggal_identifikasi'), '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        tanggal_obj = datetime.utcnow().date()
+    values = {field: risk_item.get(field) for field in BASIC_RISK_FIELDS}
+    values['tanggal_identifikasi'] = tanggal_obj
+    return values
+
+def _parse_client_id(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+def _sync_basic_contexts(assessment, contexts_data, user_id):
+    """
+    Sinkronisasi konteks berdasarkan 'id': update yang berubah, tambah yang baru, hapus yang hilang.
+    Mengembalikan ID database per index array 'contexts'.
+    """
+    existing = {ctx.id: ctx for ctx in assessment.contexts}
+    seen_ids = set()
+    ordered = []
+
+    for context_item in contexts_data:
+        context_id = _parse_client_id(context_item.get('id'))
+        ctx = existing.get(context_id)
+        if ctx and ctx.id not in seen_ids:
+            seen_ids.add(ctx.id)
+            # Setter ORM hanya menghasilkan UPDATE jika nilainya benar-benar berubah
+            ctx.external_context = context_item.get('external')
+            ctx.internal_context = context_item.get('internal')
+        else:
+            ctx = OrganizationalContext(
+                external_context=context_item.get('external'),
+                internal_context=context_item.get('internal'),
+                user_id=user_id
+            )
+            assessment.contexts.append(ctx)
+        ordered.append(ctx)
+
+    removed = [ctx for ctx_id, ctx in existing.items() if ctx_id not in seen_ids]
+    for ctx in removed:
+        assessment.contexts.remove(ctx)
+    db.session.flush()
+
+    # Hapus konteks yang kini tidak tertaut ke asesmen mana pun (mencegah baris yatim)
+    removed_ids = [ctx.id for ctx in removed]
+    if removed_ids:
+        still_linked = {row[0] for row in db.session.query(basic_assessment_contexts.c.organizational_context_id)
+                        .filter(basic_assessment_contexts.c.organizational_context_id.in_(removed_ids)).distinct()}
+        for ctx in removed:
+            if ctx.id not in still_linked:
+                db.session.delete(ctx)
+    return [ctx.id for ctx in ordered]
+
+def sync_basic_assessment_children(assessment, data, user_id):
+    """
+    Menyinkronkan konteks, identifikasi risiko dan analisis risiko Asesmen Dasar.
+
+    Konteks & risiko dicocokkan berdasarkan 'id' (ID database yang dikirim balik oleh frontend);
+    analisis dicocokkan berdasarkan risiko induknya ('risk_identification_id' = index risiko
+    di array 'risks'). Hanya baris yang berubah yang di-UPDATE; baris baru dibuat dengan
+    satu INSERT multi-baris ... RETURNING, dan baris yang hilang dihapus dengan satu DELETE.
+    """
+    context_ids = _sync_basic_contexts(assessment, data.get('contexts', []), user_id)
+
+    # 1. Identifikasi risiko
+    existing_risks = {
+        row.id: row for row in db.session.query(BasicRiskIdentification.__table__)
+        .filter(BasicRiskIdentification.assessment_id == assessment.id).all()
+    }
+    risks_data = data.get('risks', [])
+    index_to_db_id = {}
+    claimed_risk_ids = set()
+    risk_updates, risk_inserts, insert_indexes = [], [], []
+
+    for index, risk_item in enumerate(risks_data):
+        values = _basic_risk_values(risk_item)
+        risk_id = _parse_client_id(risk_item.get('id'))
+        current = existing_risks.get(risk_id)
+        if current is not None and risk_id not in claimed_risk_ids:
+            claimed_risk_ids.add(risk_id)
+            index_to_db_id[index] = risk_id
+            if any(getattr(current, field) != value for field, value in values.items()):
+                risk_updates.append({"id": risk_id, **values})
+        else:
+            risk_inserts.append({"assessment_id": assessment.id, **values})
+            insert_indexes.append(index)
+
+    removed_risk_ids = set(existing_risks) - claimed_risk_ids
+    if removed_risk_ids:
+        db.session.execute(
+            delete(BasicRiskAnalysis).where(BasicRiskAnalysis.risk_identification_id.in_(removed_risk_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            delete(BasicRiskIdentification).where(BasicRiskIdentification.id.in_(removed_risk_ids))
+            .execution_options(synchronize_session=False)
+        )
+    if risk_updates:
+        db.session.execute(update(BasicRiskIdentification), risk_updates)
+    if risk_inserts:
+        new_ids = db.session.scalars(
+            insert(BasicRiskIdentification).returning(BasicRiskIdentification.id, sort_by_parameter_order=True),
+            risk_inserts
+        ).all()
+        index_to_db_id.update(zip(insert_indexes, new_ids))
+
+    # 2. Analisis risiko (maksimal satu per risiko; duplikat data lama ikut dihapus)
+    existing_analyses, duplicate_analysis_ids = {}, []  # duplikat: (risk_id, id)
+    for row in db.session.query(BasicRiskAnalysis.__table__)\
+            .filter(BasicRiskAnalysis.assessment_id == assessment.id).order_by(BasicRiskAnalysis.id):
+        if row.risk_identification_id in existing_analyses:
+            duplicate_analysis_ids.append((row.risk_identification_id, row.id))
+        else:
+            existing_analyses[row.risk_identification_id] = row
+    analysis_updates, analysis_inserts = [], []
+    kept_risk_ids = set()
+
+    for analysis_item in data.get('analyses', []):
+        db_risk_id = index_to_db_id.get(_parse_client_id(analysis_item.get('risk_identification_id')))
+        if not db_risk_id or db_risk_id in kept_risk_ids:
+            continue
+        kept_risk_ids.add(db_risk_id)
+        values = {field: analysis_item.get(field) for field in BASIC_ANALYSIS_FIELDS}
+        current = existing_analyses.get(db_risk_id)
+        if current is not None:
+            if any(getattr(current, field) != value for field, value in values.items()):
+                analysis_updates.append({"id": current.id, **values})
+        else:
+            analysis_inserts.append({"assessment_id": assessment.id, "risk_identification_id": db_risk_id, **values})
+
+    removed_analysis_ids = [row.id for risk_id, row in existing_analyses.items()
+                            if risk_id not in kept_risk_ids and risk_id not in removed_risk_ids]
+    removed_analysis_ids += [analysis_id for risk_id, analysis_id in duplicate_analysis_ids
+                             if risk_id not in removed_risk_ids]
+    if removed_analysis_ids:
+        db.session.execute(
+            delete(BasicRiskAnalysis).where(BasicRiskAnalysis.id.in_(removed_analysis_ids))
+            .execution_options(synchronize_session=False)
+        )
+    if analysis_updates:
+        db.session.execute(update(BasicRiskAnalysis), analysis_updates)
+    if analysis_inserts:
+        db.session.execute(insert(BasicRiskAnalysis), analysis_inserts)
+
+    return {
+        "risks": {"inserted": len(risk_inserts), "updated": len(risk_updates), "deleted": len(removed_risk_ids)},
+        "analyses": {"inserted": len(analysis_inserts), "updated": len(analysis_updates), "deleted": len(removed_analysis_ids)},
+        # ID database per index array 'contexts'/'risks' agar frontend bisa menyimpan ID stabil tanpa reload
+        "context_ids": context_ids,
+        "risk_ids": [index_to_db_id.get(index) for index in range(len(risks_data))],
+    }
+
 @risk_management_levels_bp.route('/basic-assessments', methods=['POST'])
 @jwt_required()
 def create_basic_assessment():
@@ -53,17 +210,17 @@ def create_basic_assessment():
     if not user:
         return jsonify({"msg": "User tidak ditemukan"}), 404
         
-    if user.limit_dasar is not None:
-        current_dasar_count = db.session.query(func.count(BasicAssessment.id)).filter_by(user_id=current_user_id).scalar() or 0
-        
-        if current_dasar_count >= user.limit_dasar:
-            return jsonify({
-                "msg": f"Batas pembuatan Asesmen Dasar Anda telah tercapai ({current_dasar_count}/{user.limit_dasar}). Hubungi admin untuk menambah kuota."
-            }), 403
-
     if not data or not data.get('nama_unit_kerja') or not data.get('nama_perusahaan'):
         return jsonify({"msg": "Nama Unit Kerja dan Nama Perusahaan wajib diisi."}), 400
 
+    # Cek + reservasi kuota dalam satu UPDATE (ikut transaksi INSERT di bawah)
+    try:
+        reserve_quota(user, 'dasar')
+    except QuotaExceeded as e:
+        return jsonify({
+            "msg": f"Batas pembuatan Asesmen Dasar Anda telah tercapai ({e.used}/{e.limit}). Hubungi admin untuk menambah kuota."
+        }), 403
+
     new_assessment = BasicAssessment(
         nama_unit_kerja=data['nama_unit_kerja'],
         nama_perusahaan=data['nama_perusahaan'],
@@ -72,69 +229,16 @@ def create_basic_assessment():
     db.session.add(new_assessment)
     db.session.flush()
 
-    # Proses data konteks jika ada
-    contexts_data = data.get('contexts', [])
-    for context_item in contexts_data:
-        new_context = OrganizationalContext(
-            external_context=context_item.get('external'),
-            internal_context=context_item.get('internal'),
-            user_id=current_user_id
-        )
-        db.session.add(new_context)
-        # Flush untuk mendapatkan ID sebelum di-commit
-        db.session.flush()
-        new_assessment.contexts.append(new_context)
-
-    # Proses data identifikasi risiko jika ada
-    risks_data = data.get('risks', [])
-    frontend_to_db_risk_id_map = {} 
-    
-    for index, risk_item in enumerate(risks_data):
-        try:
-            tanggal_obj = datetime.strptime(risk_item.get('tanggal_identifikasi'), '%Y-%m-%d').date()
-        except (ValueError, TypeError):
-            tanggal_obj = datetime.utcnow().date()
-            
-        new_risk = BasicRiskIdentification(
-            kode_risiko=risk_item.get('kode_risiko'),
-            kategori_risiko=risk_item.get('kategori_risiko'),
-            unit_kerja=risk_item.get('unit_kerja'),
-            sasaran=risk_item.get('sasaran'),
-            tanggal_identifikasi=tanggal_obj,
-            deskripsi_risiko=risk_item.get('deskripsi_risiko'),
-            akar_penyebab=risk_item.get('akar_penyebab'),
-            indikator_risiko=risk_item.get('indikator_risiko'),
-            internal_control=risk_item.get('internal_control'),
-            deskripsi_dampak=risk_item.get('deskripsi_dampak'),
-            assessment_id=new_assessment.id
-        )
-        db.session.add(new_risk)
-        db.session.flush()
-        frontend_to_db_risk_id_map[index] = new_risk.id
-
-    analyses_data = data.get('analyses', [])
-    for analysis_item in analyses_data:
-        frontend_risk_id = analysis_item.get('risk_identification_id')
-        db_risk_id = frontend_to_db_risk_id_map.get(frontend_risk_id)
-
-        if db_risk_id:
-            new_analysis = BasicRiskAnalysis(
-                risk_identification_id=db_risk_id,
-                probabilitas=analysis_item.get('probabilitas'),
-                dampak=analysis_item.get('dampak'),
-                probabilitas_kualitatif=analysis_item.get('probabilitas_kualitatif'),
-                dampak_finansial=analysis_item.get('dampak_finansial'),
-                assessment_id=new_assessment.id
-            )
-            db.session.add(new_analysis)
-
+    # Konteks, risiko & analisis dibuat lewat sync engine yang sama dengan PUT (insert massal)
+    sync_stats = sync_basic_assessment_children(new_assessment, data, current_user_id)
     db.session.commit()
 
-    return jsonify({"msg": "Asesmen Dasar berhasil dibuat.", "id": new_assessment.id}), 201
+    return jsonify({"msg": "Asesmen Dasar berhasil dibuat.", "id": new_assessment.id, "changes": sync_stats}), 201
 
 
 @risk_management_levels_bp.route('/basic-assessments', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_all_basic_assessments():
     """Mengambil semua Asesmen Dasar milik pengguna."""
     current_user_id = int(get_jwt_identity())
@@ -178,6 +282,7 @@ def get_basic_assessment_detail(assessment_id):
         "nama_unit_kerja": assessment.nama_unit_kerja,
         "nama_perusahaan": assessment.nama_perusahaan,
         "contexts": [{
+            "id": ctx.id,
             "external": ctx.external_context,
             "internal": ctx.internal_context
         } for ctx in assessment.contexts],
@@ -209,67 +314,12 @@ def update_basic_assessment(assessment_id):
     assessment.nama_unit_kerja = data.get('nama_unit_kerja', assessment.nama_unit_kerja)
     assessment.nama_perusahaan = data.get('nama_perusahaan', assessment.nama_perusahaan)
 
-    # Strategi "Delete-and-Recreate" untuk data terkait
-    assessment.contexts.clear()
-    BasicRiskAnalysis.query.filter_by(assessment_id=assessment.id).delete()
-    BasicRiskIdentification.query.filter_by(assessment_id=assessment.id).delete()
-    db.session.flush()
-
-    # Tambahkan kembali data yang diperbarui (Logika ini sama persis dengan POST)
-    contexts_data = data.get('contexts', [])
-    for context_item in contexts_data:
-        new_context = OrganizationalContext(
-            external_context=context_item.get('external'),
-            internal_context=context_item.get('internal'),
-            user_id=current_user_id
-        )
-        db.session.add(new_context)
-        db.session.flush()
-        assessment.contexts.append(new_context)
-    
-    risks_data = data.get('risks', [])
-    frontend_to_db_risk_id_map = {}
-    for index, risk_item in enumerate(risks_data):
-        try:
-            tanggal_obj = datetime.strptime(risk_item.get('tanggal_identifikasi'), '%Y-%m-%d').date()
-        except (ValueError, TypeError):
-            tanggal_obj = datetime.utcnow().date()
-            
-        new_risk = BasicRiskIdentification(
-            assessment_id=assessment.id,
-            kode_risiko=risk_item.get('kode_risiko'),
-            kategori_risiko=risk_item.get('kategori_risiko'),
-            unit_kerja=risk_item.get('unit_kerja'),
-            sasaran=risk_item.get('sasaran'),
-            tanggal_identifikasi=tanggal_obj,
-            deskripsi_risiko=risk_item.get('deskripsi_risiko'),
-            akar_penyebab=risk_item.get('akar_penyebab'),
-            indikator_risiko=risk_item.get('indikator_risiko'),
-            internal_control=risk_item.get('internal_control'),
-            deskripsi_dampak=risk_item.get('deskripsi_dampak')
-        )
-        db.session.add(new_risk)
-        db.session.flush()
-        frontend_to_db_risk_id_map[index] = new_risk.id
-
-    analyses_data = data.get('analyses', [])
-    for analysis_item in analyses_data:
-        frontend_risk_id_index = analysis_item.get('risk_identification_id')
-        db_risk_id = frontend_to_db_risk_id_map.get(frontend_risk_id_index)
-
-        if db_risk_id:
-            new_analysis = BasicRiskAnalysis(
-                assessment_id=assessment.id,
-                risk_identification_id=db_risk_id,
-                probabilitas=analysis_item.get('probabilitas'),
-                dampak=analysis_item.get('dampak'),
-                probabilitas_kualitatif=analysis_item.get('probabilitas_kualitatif'),
-                dampak_finansial=analysis_item.get('dampak_finansial')
-            )
-            db.session.add(new_analysis)
-
+    # Sinkronisasi per baris berdasarkan ID (bukan delete-and-recreate)
+    sync_stats = sync_basic_assessment_children(assessment, data, current_user_id)
+    # Sync memakai bulk SQL (tidak lewat listener ORM) -> tandai asesmen berubah untuk cache export
+    assessment.updated_at = datetime.utcnow()
     db.session.commit()
-    return jsonify({"msg": "Asesmen Dasar berhasil diperbarui."}), 200
+    return jsonify({"msg": "Asesmen Dasar berhasil diperbarui.", "changes": sync_stats}), 200
 
 @risk_management_levels_bp.route('/basic-assessments/<int:assessment_id>', methods=['DELETE'])
 @jwt_required()
@@ -295,715 +345,43 @@ def delete_basic_assessment(assessment_id):
 
 @risk_management_levels_bp.route('/basic-assessments/<int:assessment_id>/export', methods=['GET'])
 @jwt_required()
+@read_replica
 def export_basic_assessment_to_excel(assessment_id):
-    """Membuat dan mengirim file Excel dari data Asesmen Dasar dengan styling lengkap."""
+    """Mengirim file Excel Asesmen Dasar (dari cache jika asesmen belum berubah)."""
     current_user_id = int(get_jwt_identity())
     assessment = BasicAssessment.query.filter_by(id=assessment_id, user_id=current_user_id).first_or_404()
 
-    wb = openpyxl.Workbook()
-    
-    # Hapus sheet default yang dibuat otomatis
-    if "Sheet" in wb.sheetnames:
-        wb.remove(wb["Sheet"])
-
-    # --- DEFINISI GAYA (STYLES) ---
-    bold_font = Font(bold=True)
-    white_bold_font = Font(bold=True, color="FFFFFF")
-    center_align = Alignment(horizontal='center', vertical='center')
-    
-    teal_fill = PatternFill(start_color="4DB6AC", end_color="4DB6AC", fill_type="solid") # Warna Teal
-    light_blue_fill = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
-    dark_red_fill = PatternFill(start_color="A90200", end_color="A90200", fill_type="solid")
-    bright_red_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-    peach_fill = PatternFill(start_color="FCE4D6", end_color="FCE4D6", fill_type="solid")
-    header_light_blue_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-    value_light_blue_fill = PatternFill(start_color="B4C6E7", end_color="B4C6E7", fill_type="solid")
-
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    # --- Sheet 1: Konteks Organisasi ---
-    ws1 = wb.create_sheet(title="Tugas 1 - Konteks")
-    ws1.page_setup.orientation = ws1.ORIENTATION_LANDSCAPE
-    
-    ws1.append(["Tugas 1 - Penetapan Konteks Organisasi"])
-    ws1['A1'].font = bold_font
-    ws1.append([])
-    ws1.append(["Konteks Eksternal", "Konteks Internal"])
-    
-    for cell in ws1["3:3"]:
-        cell.font = white_bold_font
-        cell.fill = teal_fill
-        cell.alignment = center_align
-        cell.border = thin_border
-
-    for ctx in assessment.contexts:
-        ws1.append([ctx.external_context, ctx.internal_context])
-    
-    for row in ws1.iter_rows(min_row=4, max_row=ws1.max_row, min_col=1, max_col=2):
-        for cell in row:
-            cell.border = thin_border
-    
-    ws1.column_dimensions['A'].width = 80
-    ws1.column_dimensions['B'].width = 80
-
-    # --- Sheet 2: Identifikasi Risiko ---
-    ws2 = wb.create_sheet(title="Tugas 2 - Identifikasi")
-    ws2.page_setup.orientation = ws2.ORIENTATION_LANDSCAPE
-    
-    ws2['A1'] = "Tugas 2 - Identifikasi Risiko"
-    ws2['A1'].font = bold_font
-    ws2.append([]) # Baris kosong
-    
-    # Header Kompleks (Baris 3 dan 4)
-    ws2['A3'] = "Nama Unit Kerja:"
-    ws2['A3'].font = bold_font
-    ws2['B3'] = assessment.nama_unit_kerja
-    ws2['B3'].fill = value_light_blue_fill
-    
-    ws2['A4'] = "Nama Perusahaan:"
-    ws2['A4'].font = bold_font
-    ws2['B4'] = assessment.nama_perusahaan
-    ws2['B4'].fill = value_light_blue_fill
-
-    # Menggabungkan sel untuk "IDENTIFIKASI RISIKO"
-    ws2.merge_cells('C3:K4')
-    merged_cell_c3 = ws2['C3']
-    merged_cell_c3.value = 'IDENTIFIKASI RISIKO'
-    merged_cell_c3.alignment = center_align
-    merged_cell_c3.font = bold_font
-    merged_cell_c3.fill = header_light_blue_fill
-
-    ws2.append([]) # Baris kosong
-    
-    # Header Tabel (Baris 6)
-    headers2 = ["Kode Risiko", "No.", "Kategori Risiko", "Unit Kerja / Fungsi", "Sasaran", "Tanggal Identifikasi Risiko", "Deskripsi atau Kejadian Risiko", "Akar Penyebab", "Indikator Risiko", "Faktor Positif / Internal Control Yang Ada Saat Ini", "Deskripsi Dampak"]
-    ws2.append(headers2)
-    for cell in ws2[6:6]: # Target baris ke-6
-        cell.font = white_bold_font
-        cell.fill = dark_red_fill
-        cell.alignment = Alignment(wrap_text=True, horizontal='center')
-
-    # Data
-    for i, risk in enumerate(assessment.risks):
-        ws2.append([
-            risk.kode_risiko, i + 1, risk.kategori_risiko, risk.unit_kerja, 
-            risk.sasaran, risk.tanggal_identifikasi.strftime('%d %B %Y'), 
-            risk.deskripsi_risiko, risk.akar_penyebab, risk.indikator_risiko, 
-            risk.internal_control, risk.deskripsi_dampak
-        ])
-
-    # Atur lebar kolom
-    for col_letter in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K']:
-        ws2.column_dimensions[col_letter].width = 25
-
-    # --- Sheet 3: Analisis Risiko ---
-    ws3 = wb.create_sheet(title="Tugas 3 - Analisis")
-    ws3.page_setup.orientation = ws3.ORIENTATION_LANDSCAPE
-
-    ws3['A1'] = "Tugas 3 - Analisis Risiko"
-    ws3['A1'].font = bold_font
-
-    ws3['A3'] = "Nama Unit Kerja:"
-    ws3['A3'].font = bold_font
-    ws3['B3'] = assessment.nama_unit_kerja
-    ws3['B3'].fill = value_light_blue_fill
-
-    ws3['A4'] = "Nama Perusahaan:"
-    ws3['A4'].font = bold_font
-    ws3['B4'] = assessment.nama_perusahaan
-    ws3['B4'].fill = value_light_blue_fill
-
-    ws3.merge_cells('C3:G3')
-    ws3['C3'].value = 'ANALISIS RISIKO'
-    ws3['C3'].alignment = center_align
-    ws3['C3'].font = bold_font
-    ws3['C3'].fill = peach_fill
-
-    ws3.merge_cells('C4:G4')
-    ws3['C4'].value = 'RISIKO INHERENT'
-    ws3['C4'].alignment = center_align
-    ws3['C4'].font = white_bold_font
-    ws3['C4'].fill = bright_red_fill
-    
-    ws3.append([]) # Baris kosong (baris 5)
-    
-    headers3 = ["Deskripsi atau Kejadian Risiko", "Probabilitas (P)", "Dampak (I)", "Skor Risiko Inherent (W)", "Probabilitas Risiko Inherent Kualitatif (%)", "Dampak Finansial Risiko Inherent (Rp)", "Nilai Bersih Risiko Inherent"]
-    ws3.append(headers3) # Menambahkan headers ke baris 6
-    for cell in ws3[6:6]: # Menargetkan baris ke-6 untuk styling
-        cell.font = white_bold_font
-        cell.fill = dark_red_fill
-        cell.alignment = Alignment(wrap_text=True, horizontal='center', vertical='center')
-
-    for analysis in assessment.risk_analyses:
-        skor = (analysis.probabilitas or 0) * (analysis.dampak or 0)
-        nilai_bersih = (analysis.dampak_finansial or 0) * ((analysis.probabilitas_kualitatif or 0) / 100)
-        ws3.append([analysis.risk_identification.deskripsi_risiko, analysis.probabilitas, analysis.dampak, skor, analysis.probabilitas_kualitatif, analysis.dampak_finansial, nilai_bersih])
-        last_row = ws3.max_row
-        ws3.cell(row=last_row, column=6).number_format = '"Rp"#,##0'
-        ws3.cell(row=last_row, column=7).number_format = '"Rp"#,##0'
-    
-    for col_letter in ['A','B', 'C', 'D', 'E', 'F', 'G']:
-        ws3.column_dimensions[col_letter].width = 25
-
-    # Simpan ke memori
-    in_memory_fp = BytesIO()
-    wb.save(in_memory_fp)
-    in_memory_fp.seek(0)
-
-    return send_file(
-        in_memory_fp,
-        as_attachment=True,
-        download_name=f"Asesmen_Dasar_{assessment.nama_unit_kerja}.xlsx",
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return send_export(
+        BASIC_ASSESSMENT_EXPORT, {"assessment": assessment},
+        key_parts=(assessment.id, stamp_of(assessment)),
+        download_name=f"Asesmen_Dasar_{assessment.nama_unit_kerja}.xlsx"
     )
 
 @risk_management_levels_bp.route('/madya-assessments/<int:assessment_id>/export', methods=['GET'])
 @jwt_required()
 def export_madya_assessment_to_excel(assessment_id):
-    """Membuat dan mengirim file Excel dari data Asesmen Madya."""
+    """Mengirim file Excel Asesmen Madya (dari cache jika asesmen & versi template belum berubah)."""
     current_user_id = int(get_jwt_identity())
     assessment = MadyaAssessment.query.filter_by(id=assessment_id, user_id=current_user_id).first_or_404()
-    template = assessment.risk_map_template # Ambil template terkait
-    
-    risk_inputs = assessment.risk_inputs
-
-    wb = openpyxl.Workbook()
-
-    if "Sheet" in wb.sheetnames:
-        wb.remove(wb["Sheet"])
-
-    # --- DEFINISI GAYA (mirip export Dasar) ---
-    bold_font = Font(bold=True)
-    white_bold_font = Font(bold=True, color="FFFFFF")
-    center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    left_align_wrap = Alignment(horizontal='left', vertical='top', wrap_text=True)
-    right_align = Alignment(horizontal='right', vertical='center')
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid") # Biru tua
-    subheader_fill = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid") # Biru muda
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-    risk_num_font = Font(bold=True, color="000000", size=9) # Hitam, tebal, kecil
-    risk_num_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    score_align = Alignment(horizontal='right', vertical='top')
-    
-    green_fill = PatternFill(start_color="00B050", end_color="00B050", fill_type="solid")
-    lime_fill = PatternFill(start_color="92D050", end_color="92D050", fill_type="solid")
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    orange_fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
-    red_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-    
-    black_bold_font = Font(bold=True, color="000000")
-
-    scale_styles = {
-        1: {"fill": green_fill, "font": white_bold_font},
-        2: {"fill": lime_fill, "font": black_bold_font},
-        3: {"fill": yellow_fill, "font": black_bold_font},
-        4: {"fill": orange_fill, "font": white_bold_font},
-        5: {"fill": red_fill, "font": white_bold_font}
-    }
-    
-    impact_header_fill_1 = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid") # Biru Sangat Muda
-    impact_header_fill_2 = PatternFill(start_color="B4C6E7", end_color="B4C6E7", fill_type="solid") # Biru Muda
-
-    # --- Sheet 1: Struktur Organisasi ---
-    ws1 = wb.create_sheet(title="Struktur Organisasi")
-    ws1.append(["Struktur Organisasi - Asesmen:", assessment.nama_asesmen])
-    ws1['A1'].font = bold_font
-    ws1.append([])
-    headers1 = ["No", "Direktorat", "Divisi", "Unit Kerja", "Struktur Organisasi"]
-    ws1.append(headers1)
-    for cell in ws1[3:3]:
-        cell.font = white_bold_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-        cell.border = thin_border
-
-    for i, entry in enumerate(assessment.structure_entries):
-        ws1.append([i + 1, entry.direktorat, entry.divisi, entry.unit_kerja, ""])
-        
-    if assessment.structure_image_filename:
-        try:
-            img_path = os.path.join(current_app.config['UPLOAD_FOLDER'], assessment.structure_image_filename)
-            if os.path.exists(img_path):
-                img = Image(img_path)
-                # Sesuaikan ukuran gambar (opsional, atur sesuai preferensi)
-                img.height = 150 # Contoh tinggi 150 pixel
-                img.width = 200  # Contoh lebar 200 pixel
-                # Tambahkan gambar ke sel E4 (baris data pertama, kolom ke-5)
-                ws1.add_image(img, 'E4')
-                # Atur tinggi baris agar gambar muat (sesuaikan jika perlu)
-                ws1.row_dimensions[4].height = 120 # Contoh tinggi 120 point
-            else:
-                print(f"File gambar tidak ditemukan: {img_path}")
-        except Exception as e:
-            print(f"Gagal menambahkan gambar struktur: {e}")
-
-    # Apply border and alignment to data rows
-    for row in ws1.iter_rows(min_row=4, max_col=5):
-        for cell in row:
-            cell.border = thin_border
-            if cell.column != 5:
-                 cell.alignment = left_align_wrap if cell.column > 1 else center_align
-
-    ws1.column_dimensions['B'].width = 30
-    ws1.column_dimensions['C'].width = 30
-    ws1.column_dimensions['D'].width = 30
-    ws1.column_dimensions['E'].width = 30
-    
-    # --- Sheet 2: Kriteria Risiko ---
-    # probability_data = [
-    #     {"level": 5, "parameter": "Hampir Pasti Terjadi", "kemungkinan": "Risiko pernah terjadi sekali dalam 1 bulan", "frekuensi": "> 10% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 80% sampai dengan 100%"},
-    #     {"level": 4, "parameter": "Sangat Mungkin Terjadi", "kemungkinan": "Risiko pernah terjadi sekali dalam 2 bulan", "frekuensi": "Diatas 5 s/d 10% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 60% sampai dengan 80%"},
-    #     {"level": 3, "parameter": "Bisa Terjadi", "kemungkinan": "Risiko pernah terjadi namun tidak sering, sekali dalam 4 bulan", "frekuensi": "Diatas 1% s/d 5% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko antara 40% sampai dengan 60%"},
-    #     {"level": 2, "parameter": "Jarang Terjadi", "kemungkinan": "Risiko mungkin terjadi hanya sekali dalam 6 bulan", "frekuensi": "Dari 1 permil s/d 1% dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko dari 20% sampai dengan 40%"},
-    #     {"level": 1, "parameter": "Sangat Jarang Terjadi", "kemungkinan": "Risiko mungkin terjadi sangat jarang, paling banyak satu kali dalam setahun", "frekuensi": "< 1 permil dari frekuensi kejadian / jumlah transaksi", "persentase": "Probabilitas kejadian Risiko lebih kecil dari 20%"},
-    # ]
-    # impact_data = [
-    #     {"level": 5, "kriteriaDampak": "Sangat Tinggi", "rangeFinansial": "X > 80%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak katastrofe yang dapat mengakibatkan kerusakan/ kerugian/ penurunan > 80% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda lebih dari 9 bulan", "hukum_pelanggaran": "Perusahaan diputuskan kalah di pengadilan tingkat selanjutnya.", "kepat_pelanggaran": "Regulator memberlaku-kan sanksi signifikan (misalkan delisting saham, tidak diperkenan-kan mengikuti kliring, menarik produk yang beredar, dan lain-lain)", "reput_keluhan": "Keluhan yang menyebar ke skala nasional / internasional dan / atau diajukan secara kolektif yang diselesaikan melebihi 10 hari kerja dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_berita": "Publikasi negatif mencapai skala internasional yang tersebar di sosial media dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_saing": "Penurunan pangsa pasar lebih dari 20%", "sdm_keluhan": "Demonstrasi terkoordinasi, terjadinya kematian karyawan saat kerja", "sdm_turnover": "Turn over pegawai bertalenta >15% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta >15% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama lebih dari 6 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu > 500 kali", "sistem_platform": "X ≤ 60%", "ops_sla": ">20% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus kematian jamak", "hsse_fatality_2": "Wabah ke lingkungan", "hsse_fatality_3": "Potensi menyebabkan banyak kematian misalnya bahan kimia beracun berbahaya", "hsse_kerusakan_lingkungan": "Sangat serius kerusakan jangka panjang (>5 tahun) dan fungsi ekosistem", "hsse_penurunan_esg": "X < 60% atau memperoleh rating '40+ (severe)'", "pmn_tunda": "Tertunda > 4 bulan dari target RKAP", "bank_fraud": "X > 1.400", "asuransi_aset_rating": "Instrumen pada Investment grade < 70%", "asuransi_aset_peringkat": "atau Peringkat di bawah BBB (yang setara atau tidak diperingkat)", "aktu_rasio": "Rasio klaim > 100%"},
-    #     {"level": 4, "kriteriaDampak": "Tinggi", "rangeFinansial": "60% < X ≤ 80%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak disruptif yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 40% < X ≤ 60% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda 6 s/d 9 bulan", "hukum_pelanggaran": "Perusahaan diputuskan kalah di pengadilan tingkat pertama.", "kepat_pelanggaran": "Regulator memberlaku-kan pembatasan dan / atau pembekuan terhadap aktivitas operasional / produk / jasa tertentu.", "reput_keluhan": "Keluhan yang menyebar ke skala nasional dan / atau diajukan secara kolektif yang dapat diselesaikan dalam waktu 10 hari kerja dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_berita": "Publikasi negatif mencapai skala nasional yang tersebar di sosial media dan / atau memerlukan penanganan kewenangan Kantor Pusat", "reput_saing": "Penurunan pangsa pasar antara 15% sampai dengan 20%", "sdm_keluhan": "Unjuk rasa karyawan yang mengganggu aktivitas perusahaan dan / atau disertai terjadinya cedera serius / cacat permanen", "sdm_turnover": "Turn over pegawai bertalenta antara 10% sampai dengan 15% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta antara 10% sampai dengan 15% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama 2 s/d 6 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 200-500 kali", "sistem_platform": "70% ≥ X > 60%", "ops_sla": "Antara 10% s/d 20% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus kematian tunggal / Cacat tetap / Ketidakhadir-an kerja yang lama", "hsse_fatality_2": "Efek ireversibel yang menyebabkan kematian", "hsse_fatality_3": "-", "hsse_kerusakan_lingkungan": "Efek lingkungan jangka menengah (3-5 tahun) yang serius", "hsse_penurunan_esg": "70% ≥ X > 60% atau memperoleh rating '30-40 (high)'", "pmn_tunda": "Tertunda 3 bulan dari target RKAP", "bank_fraud": "1.201 < X ≤ 1.400", "asuransi_aset_rating": "70% ≤ Instrumen pada Investment grade < 80%", "asuransi_aset_peringkat": "atau Peringkat BBB (yang setara)", "aktu_rasio": "90% < Rasio klaim ≤ 100%"},
-    #     {"level": 3, "kriteriaDampak": "Sedang", "rangeFinansial": "40% < X ≤ 60%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak sedang yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 40% - 60% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda 3 s/d 6 bulan", "hukum_pelanggaran": "Perusahaan mendapat tuntutan hukum.", "kepat_pelanggaran": "Peringatan tertulis / formal, terkena denda.", "reput_keluhan": "Keluhan yang menyebar ke skala sektoral dan / atau diajukan secara kolektif yang dapat diselesaikan dalam waktu 7 hari kerja dan masih berada dalam kewenangan Pimpinan Cabang / Wilayah", "reput_berita": "Publikasi negatif skala nasional yang tersebar di media konvensional", "reput_saing": "Penurunan pangsa pasar antara 10% sampai dengan 15%", "sdm_keluhan": "Terdapat keluhan yang disalurkan mencapai tingkat sektoral / wilayah / provinsi.", "sdm_turnover": "Turn over pegawai bertalenta antara 5% sampai dengan 10% setahun ", "sdm_regretted_turnover": "Turn over pegawai bertalenta antara 5% sampai dengan 10% setahun", "sistem_gangguan": "Infrastruktur vital yang penting tidak berfungsi selama < 1 jam (misalkan Listrik, air, jaringan komunikasi & online system)", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 100-199 kali", "sistem_platform": "80 % ≥ X > 70%", "ops_sla": "Antara 2,5% s/d 10% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Cacat tidak tetap / Ketidakhadir-an kerja yang terbatas", "hsse_fatality_2": "Efek ireversibel tanpa kehilangan nyawa tetapi dengan cacat serius dan rawat inap berkepanjangan", "hsse_fatality_3": "-", "hsse_kerusakan_lingkungan": "Efek jangka pendek (1-2 tahun) tetapi tidak mempengaruhi fungsi ekosistem", "hsse_penurunan_esg": "80 % ≥ X > 70% atau memperoleh rating '20-30 (medium)'", "pmn_tunda": "Tertunda 2 bulan dari target RKAP", "bank_fraud": "1.001 < X ≤ 1.200", "asuransi_aset_rating": "80% ≤ Instrumen pada Investment grade < 90%", "asuransi_aset_peringkat": "atau Peringkat A (yang setara)", "aktu_rasio": "82,5% < Rasio klaim ≤ 90%"},
-    #     {"level": 2, "kriteriaDampak": "Kecil", "rangeFinansial": "20% < X ≤ 40%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak kecil yang dapat mengakibatkan kerusakan/ kerugian/ penurunan 20% - 40% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter tujuan strategis yang harus selesai pada tahun ini tertunda antara 2 - 3 bulan", "hukum_pelanggaran": "Perusahaan mendapat somasi.", "kepat_pelanggaran": "Diminta bertemu dengan pihak Regulator (misalkan OJK, Bank Indonesia, IDX, Kementerian terkait, Dirjen Pajak, dan lain-lain)", "reput_keluhan": "Keluhan yang terisolasi dan dapat diselesaikan dalam 3 hari kerja", "reput_berita": "Publikasi negatif yang lintas sektoral / wilayah / provinsi namun masih tersebar media konvensional.", "reput_saing": "Penurunan pangsa pasar antara 5% sampai dengan 10%", "sdm_keluhan": "Terdapat keluhan karyawan yang perlu diselesaikan oleh Penyelia Pemimpin Unit", "sdm_turnover": "Turn over pegawai bertalenta dari 1% sampai dengan 5% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta dari 1% sampai dengan 5% setahun", "sistem_gangguan": "Aplikasi dan Infrastruktur pendukung yang kurang penting tidak berfungsi selama lebih dari 1 hari s/d 3 hari", "sistem_siber": "Jumlah rata-rata serangan siber per minggu 50-99 kali", "sistem_platform": "90% ≥ X > 80%", "ops_sla": "Dari 1% s/d 2,5% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus Perawatan Medis", "hsse_fatality_2": "Efek kesehatan minor dan reversibel (tanpa rawat inap)", "hsse_fatality_3": "-", "hsse_kerusakan_lingkungan": "Efek minor pada lingkungan biologis atau fisik", "hsse_penurunan_esg": "90% ≥ X > 80% atau memperoleh rating '10-20 (low)'", "pmn_tunda": "Tertunda 1 bulan dari target RKAP", "bank_fraud": "800 ≤ X ≤ 1.000", "asuransi_aset_rating": "90% ≤ Instrumen pada Investment grade < 100%", "asuransi_aset_peringkat": "atau Peringkat AA (yang setara)", "aktu_rasio": "75% < Rasio klaim ≤ 82,5%"},
-    #     {"level": 1, "kriteriaDampak": "Sangat Kecil", "rangeFinansial": "X ≤ 20%\ndari Batasan Risiko", "deskripsiDampak1": "Dampak sangat rendah yang dapat mengakibatkan kerusakan/ kerugian/ penurunan kurang dari 20% dari nilai Batasan Risiko", "stra_dampak": "Minimal 1 parameter target strategis yang harus selesai pada tahun ini tertunda kurang dari 1 bulan", "hukum_pelanggaran": "Tidak ada somasi/ tuntutan hukum", "kepat_pelanggaran": "Teguran informal / verbal.", "reput_keluhan": "Keluhan yang terisolasi dan dapat ditangani dalam 1 hari kerja", "reput_berita": "Publikasi negatif yg terisolasi di wilayah sektoral melalui media konvensional (misalkan Radio lokal, TV lokal, Surat Kabar daerah)", "reput_saing": "Penurunan pangsa pasar sampai dengan 5%", "sdm_keluhan": "Terdapat keluhan karyawan yang disalurkan sampai tingkat SP Unit namun dapat diisolir dan diselesaikan oleh Pemimpin Unit", "sdm_turnover": "Turn over pegawai bertalenta kurang dari 1% setahun", "sdm_regretted_turnover": "Turn over pegawai bertalenta kurang dari 1% setahun", "sistem_gangguan": "Aplikasi & Infrastruktur pendukung yang kurang penting tidak berfungsi selama 1 hari", "sistem_siber": "Jumlah rata-rata serangan siber per minggu di bawah 50 kali", "sistem_platform": "X > 90%", "ops_sla": "<1% dari standard SLA yang telah ditetapkan (diukur dari waktu kekosongan atau ketidaksedia-an layanan produk atau tambahan biaya / ongkos)", "hsse_fatality_1": "Kasus Pertolongan Pertama", "hsse_fatality_2": "Tidak berpengaruh pada Kinerja Kerja", "hsse_fatality_3": "[Data L1F3]", "hsse_kerusakan_lingkungan": "Kerusakan terbatas pada area minimal dengan signifikansi rendah", "hsse_penurunan_esg": "X > 90% atau memperoleh rating '0-10 (negligible)'", "pmn_tunda": "Diterima tepat waktu sesuai dengan RKAP", "bank_fraud": "X < 800", "asuransi_aset_rating": "Instrumen pada investment grade 100%,", "asuransi_aset_peringkat": "atau Peringkat AAA (yang setara)", "aktu_rasio": "Rasio klaim ≤ 75%"},
-    # ]
-    
-    probability_data = [
-        {
-            "level": c.level, 
-            "parameter": c.parameter, 
-            "kemungkinan": c.kemungkinan, 
-            "frekuensi": c.frekuensi, 
-            "persentase": c.persentase
-        } 
-        for c in assessment.probability_criteria # <-- Mengambil dari database
-    ]
-    
-    # Ambil data dampak yang SUDAH DIEDIT dari relasi 'assessment'
-    impact_data = []
-    for c in assessment.impact_criteria: # <-- Mengambil dari database
-        # Kita perlu mengonversi objek model menjadi dictionary
-        # agar sisa kode (item['kriteriaDampak']) tetap berfungsi
-        impact_data.append({
-            "level": c.level,
-            "kriteriaDampak": c.kriteriaDampak, 
-            "rangeFinansial": c.rangeFinansial, 
-            "deskripsiDampak1": c.deskripsiDampak1,
-            "stra_dampak": c.stra_dampak, 
-            "hukum_pelanggaran": c.hukum_pelanggaran, 
-            "kepat_pelanggaran": c.kepat_pelanggaran,
-            "reput_keluhan": c.reput_keluhan, 
-            "reput_berita": c.reput_berita, 
-            "reput_saing": c.reput_saing,
-            "sdm_keluhan": c.sdm_keluhan, 
-            "sdm_turnover": c.sdm_turnover, 
-            "sdm_regretted_turnover": c.sdm_regretted_turnover,
-            "sistem_gangguan": c.sistem_gangguan, 
-            "sistem_siber": c.sistem_siber, 
-            "sistem_platform": c.sistem_platform,
-            "ops_sla": c.ops_sla,
-            "hsse_fatality_1": c.hsse_fatality_1, 
-            "hsse_fatality_2": c.hsse_fatality_2, 
-            "hsse_fatality_3": c.hsse_fatality_3,
-            "hsse_kerusakan_lingkungan": c.hsse_kerusakan_lingkungan, 
-            "hsse_penurunan_esg": c.hsse_penurunan_esg,
-            "pmn_tunda": c.pmn_tunda, 
-            "bank_fraud": c.bank_fraud,
-            "asuransi_aset_rating": c.asuransi_aset_rating, 
-            "asuransi_aset_peringkat": c.asuransi_aset_peringkat,
-            "aktu_rasio": c.aktu_rasio
-        })
-        
-    ws2 = wb.create_sheet(title="Kriteria Risiko")
-    ws2.page_setup.orientation = ws2.ORIENTATION_LANDSCAPE
-    
-    ws2.append(["Kriteria Probabilitas"])
-    ws2['A1'].font = bold_font
-    ws2.append([]) # Baris kosong
-    
-    # Headers Probabilitas
-    headers_prob = ["Skala", "Parameter", "Kemungkinan terjadi", "Frekuensi kejadian", "Persentase"]
-    ws2.append(headers_prob)
-    for cell in ws2[3:3]: # Baris 3
-        cell.font = white_bold_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-        cell.border = thin_border
-        
-    # Data Probabilitas
-    prob_data_sorted = sorted(probability_data, key=lambda x: x['level'], reverse=True)
-    for item in prob_data_sorted:
-        ws2.append([
-            item['level'], item['parameter'], item['kemungkinan'],
-            item['frekuensi'], item['persentase']
-        ])
-        
-    # Style Data Probabilitas
-    for row in ws2.iter_rows(min_row=4, max_row=len(prob_data_sorted) + 3, min_col=1, max_col=5):
-        for i, cell in enumerate(row):
-            cell.border = thin_border
-            if i == 0: # Kolom Skala
-                style = scale_styles.get(cell.value)
-                if style:
-                    cell.fill = style['fill']
-                    cell.font = style['font']
-                cell.alignment = center_align
-            else:
-                cell.alignment = left_align_wrap # Rata kiri atas wrap
-    
-    # Atur lebar kolom probabilitas
-    ws2.column_dimensions[get_column_letter(1)].width = 10 # Skala
-    ws2.column_dimensions[get_column_letter(2)].width = 30 # Parameter
-    ws2.column_dimensions[get_column_letter(3)].width = 40 # Kemungkinan
-    ws2.column_dimensions[get_column_letter(4)].width = 40 # Frekuensi
-    ws2.column_dimensions[get_column_letter(5)].width = 40 # Persentase
-
-    # --- Bagian Kriteria Dampak ---
-    start_row_impact = ws2.max_row + 3
-    ws2.cell(row=start_row_impact, column=1, value="Kriteria Dampak").font = bold_font
-    start_row_impact += 2 # Lompat 2 baris
-    
-    # Header Dampak Row 1
-    # Sel A<row> (Skala)
-    cell_A = ws2.cell(row=start_row_impact, column=1, value="Skala")
-    cell_A.border = thin_border
-    cell_A.font = white_bold_font
-    cell_A.fill = header_fill
-    cell_A.alignment = center_align
-    ws2.merge_cells(start_row=start_row_impact, start_column=1, end_row=start_row_impact+3, end_column=1)
-    
-    # Sel B<row> (Kuantitatif)
-    cell_B = ws2.cell(row=start_row_impact, column=2, value="DAMPAK KUANTITATIF")
-    cell_B.border = thin_border
-    cell_B.font = bold_font
-    cell_B.alignment = center_align
-    ws2.merge_cells(start_row=start_row_impact, start_column=2, end_row=start_row_impact, end_column=4)
-    
-    # Sel E<row> (Kualitatif)
-    cell_E = ws2.cell(row=start_row_impact, column=5, value="DAMPAK KUALITATIF")
-    cell_E.border = thin_border
-    cell_E.font = bold_font
-    cell_E.alignment = center_align
-    ws2.merge_cells(start_row=start_row_impact, start_column=5, end_row=start_row_impact, end_column=27)
-
-    # Header Dampak Row 2 (Kategori Utama)
-    row_idx_2 = start_row_impact + 1
-    
-    # Kuantitatif (Kolom B, C, D)
-    headers_kuantitatif_row_2 = ["Kriteria Dampak", "Range Dampak Finansial", "Deskripsi Dampak"]
-    for i, text in enumerate(headers_kuantitatif_row_2):
-        cell = ws2.cell(row=row_idx_2, column=i+2, value=text) # Mulai dari kolom 2 (B)
-        cell.border = thin_border
-        cell.font = white_bold_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-        ws2.merge_cells(start_row=row_idx_2, start_column=i+2, end_row=row_idx_2+2, end_column=i+2) # Span 3 baris ke bawah
-    
-    # Kualitatif (Kolom E dst)
-    headers_kualitatif_row_2 = [
-        ("Risiko Strategis", 1, impact_header_fill_1),
-        ("Risiko Hukum", 1, impact_header_fill_2),
-        ("Risiko Kepatuhan", 1, impact_header_fill_1),
-        ("Risiko Reputasi", 3, impact_header_fill_2),
-        ("Risiko Sumber Daya Manusia", 3, impact_header_fill_1),
-        ("Risiko Sistem Infrastruktur...", 3, impact_header_fill_2),
-        ("Risiko Operasional", 1, impact_header_fill_1),
-        ("Risiko HSSE dan Sosial", 5, impact_header_fill_2),
-        ("Risiko PMN", 1, impact_header_fill_1),
-        ("Risiko Operasional Bank", 1, impact_header_fill_2),
-        ("Risiko Investasi Asuransi", 2, impact_header_fill_1),
-        ("Risiko Aktuarial", 1, impact_header_fill_2),
-    ]
-    
-    col_idx = 5 # Mulai dari kolom E
-    for text, span, fill in headers_kualitatif_row_2:
-        cell = ws2.cell(row=row_idx_2, column=col_idx, value=text)
-        ws2.merge_cells(start_row=row_idx_2, start_column=col_idx, end_row=row_idx_2+1, end_column=col_idx+span-1) # Span 2 baris ke bawah
-        cell.alignment = center_align
-        cell.font = bold_font
-        cell.fill = fill
-        cell.border = thin_border
-        col_idx += span
-            
-    # Header Dampak Row 4 (Sub-Kategori Kualitatif)
-    row_idx_4 = start_row_impact + 3
-    headers_row_4 = [
-        "Dampak keterlambatan pencapaian program strategis", "Pelanggaran hukum", "Pelanggaran ketentuan kepatuhan",
-        "Keluhan pelanggan / nasabah / pembeli / supplier", "Pemberitaan negatif di media", "Kehilangan daya saing",
-        "Keluhan karyawan", "Turn over karyawan bertalenta", "regretted turnover",
-        "Gangguan aplikasi infrastruktur pendukung", "Serangan siber", "Hasil penilaian platform security",
-        "Pelampauan pemenuhan SLA (Service Level Agreement)",
-        "Fatality 1", "Fatality 2", "Fatality 3", "Kerusakan Lingkungan", "Penurunan ESG rating Sustainalytic",
-        "Penundaan pencairan PMN", "Total jumlah fraud internal dan eksternal",
-        "Penurunan aset... (Rating)", "Penurunan aset... (Peringkat)",
-        "Rasio Klaim"
-    ]
-    
-    for i, text in enumerate(headers_row_4):
-        cell = ws2.cell(row=row_idx_4, column=i+5, value=text) # Mulai dari kolom 5 (E)
-        cell.alignment = center_align
-        cell.font = bold_font
-        cell.fill = impact_header_fill_1 if (i+5) in [5, 7, 11, 12, 13, 17, 23, 25, 26] else impact_header_fill_2 # Ganti warna selang-seling
-        cell.border = thin_border
-        ws2.column_dimensions[get_column_letter(i+5)].width = 25 # Set width
-
-    # Data Dampak
-    data_start_row = start_row_impact + 4
-    impact_data_sorted = sorted(impact_data, key=lambda x: x['level'], reverse=True)
-    
-    for i, item in enumerate(impact_data_sorted):
-        row_idx = data_start_row + i
-        data_row = [
-            item['level'],
-            item['kriteriaDampak'], item['rangeFinansial'], item['deskripsiDampak1'],
-            item['stra_dampak'], item['hukum_pelanggaran'], item['kepat_pelanggaran'],
-            item['reput_keluhan'], item['reput_berita'], item['reput_saing'],
-            item['sdm_keluhan'], item['sdm_turnover'], item['sdm_regretted_turnover'],
-            item['sistem_gangguan'], item['sistem_siber'], item['sistem_platform'],
-            item['ops_sla'],
-            item['hsse_fatality_1'], item['hsse_fatality_2'], item['hsse_fatality_3'],
-            item['hsse_kerusakan_lingkungan'], item['hsse_penurunan_esg'],
-            item['pmn_tunda'], item['bank_fraud'],
-            item['asuransi_aset_rating'], item['asuransi_aset_peringkat'],
-            item['aktu_rasio']
-        ]
-        
-        # ws2.append(data_row) # Jangan pakai append, tapi tulis manual ke sel
-        for col_idx, cell_value in enumerate(data_row):
-            cell = ws2.cell(row=row_idx, column=col_idx + 1)
-            cell.value = cell_value
-            cell.border = thin_border
-            cell.alignment = left_align_wrap
-            if col_idx == 0: # Kolom Skala
-                style = scale_styles.get(cell.value)
-                if style:
-                    cell.fill = style['fill']
-                    cell.font = style['font']
-                cell.alignment = center_align
-            elif col_idx == 2: # Kolom Range Finansial
-                cell.alignment = Alignment(horizontal='center', vertical='top', wrap_text=True)
-
-    # Atur lebar kolom kuantitatif (B, C, D)
-    ws2.column_dimensions['B'].width = 25
-    ws2.column_dimensions['C'].width = 25
-    ws2.column_dimensions['D'].width = 30
-
-
-    ws3 = wb.create_sheet(title="Sasaran KPI Appetite") # Ganti nama dari ws2 ke ws3
-    ws3.append(["Sasaran Organisasi / KPI & Risk Appetite - Asesmen:", assessment.nama_asesmen])
-    ws3['A1'].font = bold_font
-    ws3.append([])
-    headers2 = ["No", "Sasaran Organisasi / KPI", "Target Appetite", "Skor Risiko Inheren", "Skor Risiko Residual"]
-    ws3.append(headers2)
-    for cell in ws3[3:3]:
-        cell.font = white_bold_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-        cell.border = thin_border
-
-    for i, entry in enumerate(assessment.sasaran_kpi_entries):
-        ws3.append([
-            i + 1,
-            entry.sasaran_kpi,
-            entry.target_level,
-            entry.inherent_risk_score,
-            entry.residual_risk_score
-        ])
-
-    for row in ws3.iter_rows(min_row=4, max_col=5):
-        for cell in row:
-            cell.border = thin_border
-            if cell.column == 2: cell.alignment = left_align_wrap
-            else: cell.alignment = center_align
-
-    ws3.column_dimensions['B'].width = 60
-    ws3.column_dimensions['C'].width = 15
-    ws3.column_dimensions['D'].width = 20
-    ws3.column_dimensions['E'].width = 20
-
-    # --- Sheet 4: Risk Input (Sebelumnya ws3) ---
-    ws4 = wb.create_sheet(title="Risk Input") # Ganti nama dari ws3 ke ws4
-    ws4.page_setup.orientation = ws4.ORIENTATION_LANDSCAPE
-    ws4.append(["Detail Risk Input - Asesmen:", assessment.nama_asesmen])
-    ws4['A1'].font = bold_font
-    ws4.append([])
-    headers3 = [
-        "No", "Kode Risiko", "Status Risiko", "Peluang/ Ancaman", "Kategori Risiko", "Unit/Fungsi Kerja",
-        "Sasaran", "Tanggal Identifikasi Risiko", "Deskripsi atau Kejadian Risiko", "Akar Penyebab",
-        "Indikator Risiko", "Faktor Positif / Internal Control Yang Ada Saat Ini", "Deskripsi Dampak",
-        "Probabilitas (P)", "Dampak (I)", "Skor Risiko Inherent", "Probabilitas Risiko Inherent Kualitatif (%)",
-        "Dampak Finansial Risiko Inherent (Rp)", "Nilai Bersih Risiko Inheren",
-        "Pemilik Risiko", "Jabatan Pemilik Risiko", "No. HP Pemilik Risiko", "E-mail Pemilik Risiko",
-        "Strategi", "Penanganan Risiko (Risk Treatment)", "Biaya Penanganan Risiko (Rp)",
-        "Penanganan Yang Telah Dilakukan", "Status Penanganan", "Jadwal Mulai Penanganan",
-        "Jadwal Selesai Penanganan", "PIC Penanganan",
-        "Probabilitas Risiko Residual (P)", "Dampak Risiko Residual (I)", "Skor Risiko Residual",
-        "Probabilitas Risiko Residual Kualitatif (%)", "Dampak Finansial Risiko Residual (Rp)",
-        "Nilai Bersih Risiko Residual", "Tanggal Review"
-    ]
-    ws4.append(headers3)
-    header_row = ws4[3:3]
-    for cell in header_row:
-        cell.font = white_bold_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-        cell.border = thin_border
-
-    sasaran_map = {s.id: s.sasaran_kpi for s in assessment.sasaran_kpi_entries}
-
-    for i, entry in enumerate(assessment.risk_inputs):
-        sasaran_text = sasaran_map.get(entry.sasaran_id, "-")
-        kategori_display = entry.kategori_risiko_lainnya if entry.kategori_risiko == 'Lainnya' else entry.kategori_risiko
-        tgl_identifikasi_str = entry.tanggal_identifikasi.strftime('%d %B %Y') if entry.tanggal_identifikasi else ""
-        tgl_mulai_str = entry.jadwal_mulai_penanganan.strftime('%d %B %Y') if entry.jadwal_mulai_penanganan else ""
-        tgl_selesai_str = entry.jadwal_selesai_penanganan.strftime('%d %B %Y') if entry.jadwal_selesai_penanganan else ""
-        tgl_review_str = entry.tanggal_review.strftime('%d %B %Y') if entry.tanggal_review else ""
-
-        ws4.append([
-            i + 1, entry.kode_risiko, entry.status_risiko, entry.peluang_ancaman, kategori_display, entry.unit_kerja,
-            sasaran_text, tgl_identifikasi_str, entry.deskripsi_risiko, entry.akar_penyebab,
-            entry.indikator_risiko, entry.internal_control, entry.deskripsi_dampak,
-            entry.inherent_probabilitas, entry.inherent_dampak, entry.inherent_skor,
-            entry.inherent_prob_kualitatif, entry.inherent_dampak_finansial, entry.inherent_nilai_bersih,
-            entry.pemilik_risiko, entry.jabatan_pemilik, entry.kontak_pemilik_hp, entry.kontak_pemilik_email,
-            entry.strategi, entry.rencana_penanganan, entry.biaya_penanganan,
-            entry.penanganan_dilakukan, entry.status_penanganan, tgl_mulai_str,
-            tgl_selesai_str, entry.pic_penanganan,
-            entry.residual_probabilitas, entry.residual_dampak, entry.residual_skor,
-            entry.residual_prob_kualitatif,
-            entry.residual_dampak_finansial,
-            entry.residual_nilai_bersih,
-            tgl_review_str
-        ])
-        
-        last_row = ws4.max_row
-        ws4.cell(row=last_row, column=17).number_format = '#,##0.0"%"'
-        ws4.cell(row=last_row, column=18).number_format = '"Rp"#,##0'
-        ws4.cell(row=last_row, column=19).number_format = '"Rp"#,##0'
-        ws4.cell(row=last_row, column=26).number_format = '"Rp"#,##0'
-        ws4.cell(row=last_row, column=35).number_format = '#,##0.0"%"'
-        ws4.cell(row=last_row, column=36).number_format = '"Rp"#,##0_);[Red]("-Rp"#,##0)'
-        ws4.cell(row=last_row, column=37).number_format = '"Rp"#,##0_);[Red]("-Rp"#,##0)'
-        
-    center_cols_risk = [
-        1, 8, 14, 15, 16, 17, 29, 30, 32, 33, 34, 35, 38
-    ]
-    currency_cols_risk = [18, 19, 26, 36, 37]
-
-    for row_idx in range(4, ws4.max_row + 1):
-        ws4.row_dimensions[row_idx].height = 45
-        for col_idx in range(1, len(headers3) + 1):
-            cell = ws4.cell(row=row_idx, column=col_idx)
-            cell.border = thin_border
-            if col_idx in center_cols_risk:
-                cell.alignment = center_align
-            elif col_idx in currency_cols_risk:
-                 cell.alignment = Alignment(horizontal='right', vertical='top')
-            else:
-                cell.alignment = left_align_wrap
-
-    column_widths = {
-        'A': 5, 'B': 15, 'C': 12, 'D': 15, 'E': 20, 'F': 25, 'G': 30, 'H': 15, 'I': 40, 'J': 30,
-        'K': 30, 'L': 30, 'M': 30, 'N': 8, 'O': 8, 'P': 8, 'Q': 12, 'R': 18, 'S': 18, 'T': 20,
-        'U': 20, 'V': 15, 'W': 20, 'X': 20, 'Y': 40, 'Z': 18, 'AA': 30, 'AB': 15, 'AC': 15,
-        'AD': 15, 'AE': 20, 'AF': 8, 'AG': 8, 'AH': 8, 'AI': 12, 'AJ': 18, 'AK': 18, 'AL': 15
-    }
-    for col_letter, width in column_widths.items():
-         try: ws4.column_dimensions[col_letter].width = width
-         except KeyError: print(f"Peringatan: Kolom {col_letter} tidak ditemukan di sheet Risk Input.")
-        
-    # --- Sheet 5: Peta Risiko (Sebelumnya ws4) ---
-    ws5 = wb.create_sheet(title="Peta Risiko") # Ganti nama dari ws4 ke ws5
-    ws5.append(["Peta Risiko - Asesmen:", assessment.nama_asesmen])
-    ws5['A1'].font = bold_font
-    ws5.append(["Template:", template.name if template else "Tidak ada template"])
-    ws5.append([])
-
-    likelihood_labels = {l.level: l.label for l in (template.likelihood_labels if template else [])}
-    impact_labels = {i.level: i.label for i in (template.impact_labels if template else [])}
-    scores_map = {(s.likelihood_level, s.impact_level): s.score for s in (template.scores if template else [])}
-    levels_map = sorted(
-        [
-            (lvl.min_score, lvl.max_score, lvl.color_hex.replace("#", "FF"))
-            for lvl in (template.level_definitions if template else [])
-        ],
-        key=lambda x: x[0]
-    )
 
-    def get_color_for_score(score):
-        if score is None: return "FFFFFFFF"
-        for min_s, max_s, color in levels_map:
-            if min_s <= score <= max_s:
-                return color
-        return "FFFFFFFF"
-
-    inherent_positions = defaultdict(list)
-    residual_positions = defaultdict(list)
-    for i, risk in enumerate(risk_inputs):
-        if risk.inherent_probabilitas and risk.inherent_dampak:
-            inherent_positions[(risk.inherent_probabilitas, risk.inherent_dampak)].append(str(i + 1))
-        if risk.residual_probabilitas and risk.residual_dampak:
-            residual_positions[(risk.residual_probabilitas, risk.residual_dampak)].append(str(i + 1))
-
-    def draw_risk_map(start_row, title, positions_data):
-        ws5.merge_cells(start_row=start_row, start_column=2, end_row=start_row, end_column=6)
-        title_cell = ws5.cell(row=start_row, column=2, value=title)
-        title_cell.font = bold_font
-        title_cell.alignment = center_align
-        start_row += 1
-
-        prob_label_cell = ws5.cell(row=start_row, column=2, value="PROBABILITAS")
-        prob_label_cell.alignment = Alignment(horizontal='center', vertical='center', text_rotation=90)
-        ws5.merge_cells(start_row=start_row, start_column=2, end_row=start_row + 4, end_column=2)
-        
-        for i in range(1, 6):
-            col_idx = i + 2
-            ws5.cell(row=start_row, column=col_idx, value=impact_labels.get(i, f"Impact {i}")).alignment = center_align
-            ws5.cell(row=start_row + 6, column=col_idx, value=i).alignment = center_align
-
-        dampak_label_cell = ws5.cell(row=start_row+6, column=3, value="DAMPAK")
-        dampak_label_cell.alignment = center_align
-        ws5.merge_cells(start_row=start_row+6, start_column=3, end_row=start_row+6, end_column=7)
-
-        for p in range(5, 0, -1):
-            row_idx = start_row + (5 - p) + 1
-            cell_prob_row = ws5.cell(row=row_idx, column=1, value=f"{likelihood_labels.get(p, f'L {p}')}\n({p})")
-            cell_prob_row.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-
-            for i in range(1, 6):
-                col_idx = i + 2
-                cell = ws5.cell(row=row_idx, column=col_idx)
-                score = scores_map.get((p, i), None)
-                if score is None and template:
-                    score = p * i
-                cell.value = score
-                fill_color = get_color_for_score(score)
-                cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
-                cell.border = thin_border
-                cell.alignment = score_align
-
-                risk_numbers = positions_data.get((p, i), [])
-                if risk_numbers:
-                     cell.value = f"{score}\n\n({', '.join(risk_numbers)})"
-                     cell.alignment = risk_num_align
-                     cell.font = risk_num_font
-
-                ws5.row_dimensions[row_idx].height = 40
-                ws5.column_dimensions[get_column_letter(col_idx)].width = 15
-                
-        ws5.column_dimensions['A'].width = 25
-        ws5.column_dimensions['B'].width = 5
-
-    draw_risk_map(start_row=4, title="PETA RISIKO INHEREN", positions_data=inherent_positions)
-    draw_risk_map(start_row=15, title="PETA RISIKO RESIDUAL", positions_data=residual_positions)
-
-    # Simpan ke memori
-    in_memory_fp = BytesIO()
-    wb.save(in_memory_fp)
-    in_memory_fp.seek(0)
-
-    return send_file(
-        in_memory_fp,
-        as_attachment=True,
-        download_name=f"Asesmen_Madya_{assessment.nama_asesmen or assessment.id}.xlsx",
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    # Versi template yang dipakai asesmen (sesuai skor tersimpan)
+    risk_map_version = find_assessment_version(assessment)
+    key_parts = (assessment.id, stamp_of(assessment), risk_map_version.id if risk_map_version else None)
+
+    def context():
+        probability_data, impact_data = resolve_assessment_criteria(assessment)
+        return {
+            "assessment": assessment,
+            "probability_criteria": probability_data,
+            "impact_criteria": impact_data,
+            "risk_map_version": version_to_dict(risk_map_version) if risk_map_version else {},
+            "risk_map_version_id": risk_map_version.id if risk_map_version else None,
+            "upload_folder": current_app.config['UPLOAD_FOLDER'],
+        }
+
+    return send_export(
+        MADYA_ASSESSMENT_EXPORT, context, key_parts=key_parts,
+        download_name=f"Asesmen_Madya_{assessment.nama_asesmen or assessment.id}.xlsx"
     )
     
 # Peta Risiko
@@ -1019,10 +397,10 @@ def create_risk_map_template():
     if not user:
          return jsonify({"msg": "User tidak ditemukan"}), 404
          
-    if user.limit_template_peta is not None:
-        current_count = RiskMapTemplate.query.filter_by(user_id=current_user_id, is_default=False).count()
-        if current_count >= user.limit_template_peta:
-            return jsonify({"msg": f"Batas pembuatan Template Peta Risiko telah tercapai ({current_count}/{user.limit_template_peta}). Hubungi admin."}), 403
+    try:
+        reserve_quota(user, 'template_peta')
+    except QuotaExceeded as e:
+        return jsonify({"msg": f"Batas pembuatan Template Peta Risiko telah tercapai ({e.used}/{e.limit}). Hubungi admin."}), 403
 
     new_template = RiskMapTemplate(name=data['name'], description=data.get('description'), user_id=current_user_id)
     db.session.add(new_template)
@@ -1039,12 +417,14 @@ def create_risk_map_template():
     for score_data in data.get('scores', []):
         db.session.add(RiskMapScore(template_id=new_template.id, **score_data))
 
+    version = create_template_version(new_template, data, current_user_id)
     db.session.commit()
-    return jsonify({"msg": "Template berhasil dibuat.", "id": new_template.id}), 201
+    return jsonify({"msg": "Template berhasil dibuat.", "id": new_template.id, "version": version.version}), 201
 
 
 @risk_management_levels_bp.route('/risk-maps', methods=['GET'])
 @jwt_required()
+@cached_json_response(RiskMapTemplate, vary_on_user=True)
 def get_risk_map_templates():
     """Mengambil daftar template (default + milik pengguna)."""
     current_user_id = int(get_jwt_identity())
@@ -1069,32 +449,116 @@ def get_risk_map_templates():
 
 @risk_management_levels_bp.route('/risk-maps/<int:template_id>', methods=['GET'])
 @jwt_required()
+@cached_json_response(RiskMapTemplate, RiskMapTemplateVersion)
 def get_risk_map_template_detail(template_id):
-    """Mengambil detail lengkap satu template."""
+    """Mengambil detail lengkap satu template (versi aktif, atau ?version=N)."""
     template = RiskMapTemplate.query.get_or_404(template_id)
     # (Tambahkan otorisasi jika perlu di masa depan)
-    scores = RiskMapScore.query.filter_by(template_id=template.id).all()
+    requested_version = request.args.get('version', type=int)
+    if requested_version is not None:
+        version = get_version(template, requested_version)
+        if version is None:
+            return jsonify({"msg": f"Versi {requested_version} tidak ditemukan."}), 404
+    else:
+        version = find_current_version(template)
+        if version is None:
+            return jsonify({"msg": "Template belum memiliki versi aktif."}), 404
 
     return jsonify({
         "id": template.id,
         "name": template.name,
         "description": template.description,
         "is_default": template.is_default,
-        "likelihood_labels": [{"level": l.level, "label": l.label} for l in template.likelihood_labels],
-        "impact_labels": [{"level": i.level, "label": i.label} for i in template.impact_labels],
-        "level_definitions": [{
-            "level_name": d.level_name, "color_hex": d.color_hex,
-            "min_score": d.min_score, "max_score": d.max_score
-        } for d in template.level_definitions],
-        "scores": [{
-            "likelihood_level": s.likelihood_level, "impact_level": s.impact_level, "score": s.score
-        } for s in scores]
+        "current_version": template.current_version,
+        **version_to_dict(version),
+        # Skor + level + warna per sel sudah dihitung server (dashboard tidak perlu scan level)
+        "cells": table_to_cells(get_render_table(version.id))
     })
 
+@risk_management_levels_bp.route('/risk-maps/<int:template_id>/render', methods=['GET'])
+@jwt_required()
+def render_risk_map(template_id):
+    """
+    Heat map template (?format=svg|png|json, ?version=N).
+    Opsional ?assessment_id=X&type=inherent|residual untuk menandai nomor risk input
+    asesmen Madya (memakai versi template yang dipasang di asesmen).
+    """
+    template = RiskMapTemplate.query.get_or_404(template_id)
+    fmt = (request.args.get('format') or 'svg').lower()
+    if fmt not in RENDER_MIMETYPES:
+        return jsonify({"msg": "Format harus salah satu dari: svg, png, json."}), 400
+
+    positions, title = None, request.args.get('title')
+    assessment_id = request.args.get('assessment_id', type=int)
+    if assessment_id is not None:
+        kind = request.args.get('type', 'inherent')
+        if kind not in ('inherent', 'residual'):
+            return jsonify({"msg": "Parameter type harus 'inherent' atau 'residual'."}), 400
+        current_user_id = int(get_jwt_identity())
+        assessment = MadyaAssessment.query.filter_by(id=assessment_id, risk_map_template_id=template.id).first_or_404()
+        if assessment.user_id != current_user_id:
+            user = User.query.get(current_user_id)
+            if not any(r.name == 'Admin' for r in user.roles):
+                return jsonify({"msg": "Akses ditolak."}), 403
+        version = find_assessment_version(assessment)
+        positions = risk_positions(assessment.risk_inputs, kind)
+    elif request.args.get('version', type=int) is not None:
+        version = get_version(template, request.args.get('version', type=int))
+    else:
+        version = find_current_version(template)
+    if version is None:
+        return jsonify({"msg": "Versi tidak ditemukan."}), 404
+
+    table = get_render_table(version.id)
+    if fmt == 'json':
+        body = jsonify({
+            "template_id": template.id,
+            "version": version.version,
+            "size": {"likelihood": table.size[0], "impact": table.size[1]},
+            "cells": table_to_cells(table),
+            "positions": [
+                {"likelihood_level": p, "impact_level": i, "risk_numbers": numbers}
+                for (p, i), numbers in sorted((positions or {}).items())
+            ],
+        }).get_data()
+    elif positions is None:
+        body = render_version_image(version.id, fmt, title)
+    elif fmt == 'png':
+        body = render_png(table, positions, title)
+    else:
+        body = render_svg(table, positions, title).encode('utf-8')
+
+    response = current_app.response_class(body, mimetype=RENDER_MIMETYPES[fmt])
+    response.set_etag(hashlib.sha1(body).hexdigest())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@risk_management_levels_bp.route('/risk-maps/<int:template_id>/versions', methods=['GET'])
+@jwt_required()
+@cached_json_response(RiskMapTemplate, RiskMapTemplateVersion)
+def get_risk_map_template_versions(template_id):
+    """Daftar versi template beserta jumlah asesmen yang memakai tiap versi."""
+    template = RiskMapTemplate.query.get_or_404(template_id)
+    usage = dict(db.session.query(MadyaAssessment.risk_map_version_id, func.count(MadyaAssessment.id))
+                 .join(RiskMapTemplateVersion, RiskMapTemplateVersion.id == MadyaAssessment.risk_map_version_id)
+                 .filter(RiskMapTemplateVersion.template_id == template.id)
+                 .group_by(MadyaAssessment.risk_map_version_id).all())
+    versions = db.session.query(RiskMapTemplateVersion.id, RiskMapTemplateVersion.version, RiskMapTemplateVersion.created_at)\
+        .filter(RiskMapTemplateVersion.template_id == template.id)\
+        .order_by(RiskMapTemplateVersion.version.desc()).all()
+    return jsonify([{
+        "version": v.version,
+        "created_at": v.created_at,
+        "is_current": v.version == template.current_version,
+        "assessment_count": usage.get(v.id, 0)
+    } for v in versions])
+
 @risk_management_levels_bp.route('/risk-maps/<int:template_id>', methods=['PUT'])
 @jwt_required()
 def update_risk_map_template(template_id):
-    template = RiskMapTemplate.query.get_or_404(template_id)
+    # Dikunci sampai commit: PUT bersamaan tidak membuat nomor versi yang sama
+    # dan tidak menggabungkan edit ke versi aktif yang sudah basi
+    template = RiskMapTemplate.query.filter_by(id=template_id).with_for_update().first_or_404()
     current_user_id = int(get_jwt_identity())
     user = User.query.get(current_user_id)
     is_admin = any(r.name == 'Admin' for r in user.roles)
@@ -1112,24 +576,29 @@ def update_risk_map_template(template_id):
     template.name = data.get('name', template.name)
     template.description = data.get('description', template.description)
 
-    # Hapus dan buat ulang data anak (strategi sederhana dan efektif)
-    RiskMapLikelihoodLabel.query.filter_by(template_id=template.id).delete()
-    RiskMapImpactLabel.query.filter_by(template_id=template.id).delete()
-    RiskMapLevelDefinition.query.filter_by(template_id=template.id).delete()
-    RiskMapScore.query.filter_by(template_id=template.id).delete()
-    
-    # Buat ulang seperti di endpoint POST
-    for label_data in data.get('likelihood_labels', []):
-        db.session.add(RiskMapLikelihoodLabel(template_id=template.id, **label_data))
-    for label_data in data.get('impact_labels', []):
-        db.session.add(RiskMapImpactLabel(template_id=template.id, **label_data))
-    for definition_data in data.get('level_definitions', []):
-        db.session.add(RiskMapLevelDefinition(template_id=template.id, **definition_data))
-    for score_data in data.get('scores', []):
-        db.session.add(RiskMapScore(template_id=template.id, **score_data))
+    # Versi baru hanya jika isi berubah; tabel anak diperbarui per baris yang berubah saja.
+    # Asesmen tetap memakai versi lamanya kecuali opt-in auto-upgrade.
+    version, created = save_template_content(template, data, current_user_id)
+
+    upgraded_ids = []
+    if created:
+        upgraded_ids = [row.id for row in db.session.query(MadyaAssessment.id).filter(
+            MadyaAssessment.risk_map_template_id == template.id,
+            MadyaAssessment.risk_map_auto_upgrade.is_(True)
+        )]
+        if upgraded_ids:
+            MadyaAssessment.query.filter(MadyaAssessment.id.in_(upgraded_ids))\
+                .update({MadyaAssessment.risk_map_version_id: version.id}, synchronize_session=False)
 
     db.session.commit()
-    return jsonify({"msg": "Template berhasil diperbarui."})
+    job = enqueue_rescoring(template.id, version.id, upgraded_ids, current_user_id)
+    return jsonify({
+        "msg": "Template berhasil diperbarui.",
+        "version": version.version,
+        "version_created": created,
+        "rescoring_assessments": len(upgraded_ids),
+        "rescoring_job_id": job.id if job else None
+    })
 
 @risk_management_levels_bp.route('/risk-maps/<int:template_id>', methods=['DELETE'])
 @jwt_required()
@@ -1172,17 +641,16 @@ def create_madya_assessment():
     if not user:
         return jsonify({"msg": "User tidak ditemukan"}), 404
         
-    if user.limit_madya is not None:
-        current_madya_count = db.session.query(func.count(MadyaAssessment.id)).filter_by(user_id=current_user_id).scalar() or 0
-        
-        if current_madya_count >= user.limit_madya:
-            return jsonify({
-                "msg": f"Batas pembuatan Asesmen Madya Anda telah tercapai ({current_madya_count}/{user.limit_madya}). Hubungi admin untuk menambah kuota."
-            }), 403
-    
     assessment_name = data.get('nama_asesmen')
     if not assessment_name:
         return jsonify({"msg": "'nama_asesmen' wajib diisi."}), 400
+
+    try:
+        reserve_quota(user, 'madya')
+    except QuotaExceeded as e:
+        return jsonify({
+            "msg": f"Batas pembuatan Asesmen Madya Anda telah tercapai ({e.used}/{e.limit}). Hubungi admin untuk menambah kuota."
+        }), 403
     
     selected_template_id = data.get('risk_map_template_id')
     if not selected_template_id:
@@ -1204,40 +672,22 @@ def create_madya_assessment():
     db.session.add(new_assessment)
     db.session.flush() # Penting: untuk mendapatkan new_assessment.id
 
-    # --- HIGHLIGHT: Salin kriteria default ke asesmen baru ---
+    # --- Kriteria default: cukup referensi ke set bersama (override dibuat saat user mengedit) ---
     try:
-        # Salin Kriteria Probabilitas
-        for prob_data in DEFAULT_PROBABILITY_CRITERIA:
-            new_prob_criteria = MadyaCriteriaProbability(
-                assessment_id=new_assessment.id,
-                **prob_data # Gunakan dictionary unpacking
-            )
-            db.session.add(new_prob_criteria)
-            
-        # Salin Kriteria Dampak
-        for impact_data in DEFAULT_IMPACT_CRITERIA:
-            new_impact_criteria = MadyaCriteriaImpact(
-                assessment_id=new_assessment.id,
-                **impact_data # Gunakan dictionary unpacking
-            )
-            db.session.add(new_impact_criteria)
-            
+        new_assessment.criteria_set_id = get_default_criteria_set().id
+        if selected_template_id:
+            pin_assessment_version(new_assessment, RiskMapTemplate.query.get(selected_template_id))
         db.session.commit()
     except Exception as e:
         db.session.rollback()
-        # Hapus asesmen yang setengah jadi jika penyalinan kriteria gagal
-        try:
-            db.session.delete(new_assessment)
-            db.session.commit()
-        except:
-            pass # Abaikan jika delete gagal
-        print(f"ERROR: Gagal menyalin kriteria default untuk asesmen baru. {e}")
+        print(f"ERROR: Gagal menyiapkan kriteria default untuk asesmen baru. {e}")
         return jsonify({"msg": "Gagal membuat asesmen: Error saat inisialisasi kriteria."}), 500
 
     return jsonify({"id": new_assessment.id, "message": "Asesmen Madya baru berhasil dibuat."}), 201
 
 @risk_management_levels_bp.route('/madya-assessments', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_madya_assessments_list():
     """Mengambil daftar semua Asesmen Madya milik pengguna."""
     current_user_id = int(get_jwt_identity())
@@ -1296,6 +746,18 @@ def add_structure_entry(assessment_id):
         }
     }), 201
     
+def release_structure_image(filename):
+    """
+    Menghapus file gambar struktur jika tidak lagi direferensikan asesmen mana pun.
+    Dipanggil setelah commit; lock mencegah upload identik yang sedang berjalan
+    memakai ulang file tepat saat file dihapus.
+    """
+    with image_reference_lock(db.session, filename):
+        still_used = db.session.query(MadyaAssessment.id).filter_by(structure_image_filename=filename).first()
+        if not still_used:
+            remove_image_files(current_app.config['UPLOAD_FOLDER'], filename)
+        db.session.commit()
+
 @risk_management_levels_bp.route('/madya-assessments/<int:assessment_id>/structure-image', methods=['POST'])
 @jwt_required()
 def upload_structure_image(assessment_id):
@@ -1310,33 +772,30 @@ def upload_structure_image(assessment_id):
         return jsonify({"msg": "Nama file tidak boleh kosong."}), 400
         
     if file:
-        MAX_FILE_SIZE_BYTES = 1 * 1024 * 1024 # 1MB
-        MAX_FILE_SIZE_MB_FOR_MSG = 1
-        if file.content_length > MAX_FILE_SIZE_BYTES:
-             return jsonify({"msg": f"Ukuran file melebihi {MAX_FILE_SIZE_MB_FOR_MSG}MB."}), 413
-
-        filename = secure_filename(f"struktur_{assessment_id}_{datetime.now().timestamp()}_{file.filename}")
+        # Batas ukuran ditegakkan saat streaming (content_length part multipart sering 0)
+        max_file_size_bytes = current_app.config.get('STRUCTURE_IMAGE_MAX_BYTES', 1 * 1024 * 1024) # 1MB
         upload_folder = current_app.config['UPLOAD_FOLDER']
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-        
-        # Hapus gambar lama jika ada
-        if assessment.structure_image_filename:
-             try:
-                 os.remove(os.path.join(upload_folder, assessment.structure_image_filename))
-             except OSError:
-                 pass # Abaikan jika file tidak ditemukan
-
-        file.save(os.path.join(upload_folder, filename))
-        assessment.structure_image_filename = filename
-        db.session.commit()
-        
-        image_url_relative = f"api/uploads/{filename}"
+
+        try:
+            prepared = prepare_image_upload(file, prefix='struktur', max_bytes=max_file_size_bytes)
+        except ImageUploadError as e:
+            return jsonify({"msg": e.message}), e.status_code
+
+        old_filename = assessment.structure_image_filename
+        # File (dedup berbasis hash) ditulis ulang bila perlu & referensi di-commit dalam lock yang
+        # sama dengan release_structure_image, jadi file tidak terhapus oleh release yang bersamaan
+        with image_reference_lock(db.session, prepared["master"][0]):
+            filenames = store_image_variants(prepared, upload_folder)
+            assessment.structure_image_filename = filenames["master"]
+            db.session.commit()
+        # Hapus gambar lama jika ada (dan tidak dipakai asesmen lain karena dedup berbasis hash)
+        if old_filename and old_filename != filenames["master"]:
+            release_structure_image(old_filename)
 
         return jsonify({
             "msg": "Gambar struktur organisasi berhasil diupload.",
-            "filename": filename,
-            "image_url": image_url_relative # Konsisten pakai 'image_url'
+            "filename": filenames["master"],
+            **image_urls(filenames["master"]) # Konsisten pakai 'image_url'
         }), 200
     
     return jsonify({"msg": "Upload gagal."}), 400
@@ -1377,17 +836,10 @@ def get_madya_assessment_detail(assessment_id):
         for entry in assessment.sasaran_kpi_entries # Akses relasi langsung
     ]
     
-    image_url_relative = f"api/uploads/{assessment.structure_image_filename}" if assessment.structure_image_filename else None
+    structure_image_urls = image_urls(assessment.structure_image_filename)
     
-    prob_criteria = [{
-        "id": c.id, "level": c.level, "parameter": c.parameter, 
-        "kemungkinan": c.kemungkinan, "frekuensi": c.frekuensi, "persentase": c.persentase
-    } for c in assessment.probability_criteria] # <-- Ambil dari assessment
-
-    impact_criteria = []
-    for c in assessment.impact_criteria: # <-- Ambil dari assessment
-        c_dict = {column.name: getattr(c, column.name) for column in c.__table__.columns if column.name not in ['assessment_id']}
-        impact_criteria.append(c_dict)
+    # Set kriteria bersama + override level yang sudah diedit user
+    prob_criteria, impact_criteria = resolve_assessment_criteria(assessment)
 
     return jsonify({
         "id": assessment.id,
@@ -1395,8 +847,13 @@ def get_madya_assessment_detail(assessment_id):
         "created_at": assessment.created_at.isoformat(),
         "user_id": assessment.user_id,
         "risk_map_template_id": assessment.risk_map_template_id,
+        "risk_map_version": assessment.risk_map_version.version if assessment.risk_map_version else None,
+        "risk_map_latest_version": assessment.risk_map_template.current_version if assessment.risk_map_template else None,
+        "risk_map_auto_upgrade": assessment.risk_map_auto_upgrade,
         "structure_image_filename": assessment.structure_image_filename,
-        "structure_image_url": image_url_relative, 
+        "structure_image_url": structure_image_urls["image_url"],
+        "structure_image_preview_url": structure_image_urls["preview_url"],
+        "structure_image_thumbnail_url": structure_image_urls["thumbnail_url"],
         "structure_entries": structure_entries,
         "sasaran_kpi_entries": sasaran_entries,
         "filter_organisasi": assessment.filter_organisasi,
@@ -1455,20 +912,14 @@ def delete_madya_assessment(assessment_id):
         return jsonify({"msg": "Akses ditolak. Asesmen bukan milik Anda."}), 403
 
     try:
-        # Hapus file gambar struktur organisasi jika ada
-        if assessment.structure_image_filename:
-            try:
-                upload_folder = current_app.config['UPLOAD_FOLDER']
-                file_path = os.path.join(upload_folder, assessment.structure_image_filename)
-                if os.path.exists(file_path):
-                     os.remove(file_path)
-                else:
-                     print(f"Peringatan: File gambar tidak ditemukan saat mencoba menghapus: {file_path}")
-            except OSError as e:
-                print(f"Error saat menghapus file fisik gambar: {e.strerror}")
+        image_filename = assessment.structure_image_filename
 
         db.session.delete(assessment)
         db.session.commit()
+
+        # Hapus file gambar struktur organisasi jika sudah tidak direferensikan
+        if image_filename:
+            release_structure_image(image_filename)
         return jsonify({"msg": "Asesmen Madya berhasil dihapus."}), 200
     except Exception as e:
         db.session.rollback()
@@ -1484,22 +935,14 @@ def delete_structure_image(assessment_id):
     if not assessment.structure_image_filename:
         return jsonify({"msg": "Tidak ada gambar untuk dihapus."}), 404
 
-    # Hapus file fisik
-    try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, assessment.structure_image_filename)
-        if os.path.exists(file_path):
-             os.remove(file_path)
-        else:
-             print(f"Peringatan: File gambar tidak ditemukan saat mencoba menghapus: {file_path}")
-    except OSError as e:
-        print(f"Error saat menghapus file fisik: {e.strerror}")
-        # Kita lanjutkan saja untuk menghapus referensi di DB
-
     # Hapus referensi di database
+    image_filename = assessment.structure_image_filename
     assessment.structure_image_filename = None
     db.session.commit()
 
+    # Hapus file fisik (master + varian) jika tidak dipakai asesmen lain
+    release_structure_image(image_filename)
+
     return jsonify({"msg": "Gambar struktur organisasi berhasil dihapus."}), 200
 
 @risk_management_levels_bp.route('/madya-assessments/<int:assessment_id>/template', methods=['PUT'])
@@ -1526,10 +969,116 @@ def update_madya_assessment_template(assessment_id):
     if not template_exists:
         return jsonify({"msg": f"Template dengan ID {new_template_id} tidak ditemukan."}), 404
 
+    template_changed = assessment.risk_map_template_id != new_template_id
     assessment.risk_map_template_id = new_template_id
+    version = pin_assessment_version(assessment, template_exists)
+    db.session.commit()
+
+    # Skor tersimpan dihitung dengan template lama -> hitung ulang di background
+    job = None
+    if template_changed and version is not None:
+        job = enqueue_rescoring(template_exists.id, version.id, [assessment.id], current_user_id)
+
+    return jsonify({
+        "msg": "Template peta risiko berhasil diperbarui.",
+        "risk_map_version": version.version if version else None,
+        "rescoring_job_id": job.id if job else None
+    })
+
+@risk_management_levels_bp.route('/madya-assessments/<int:assessment_id>/risk-map-version', methods=['PUT'])
+@jwt_required()
+def update_madya_risk_map_version(assessment_id):
+    """
+    Opt-in versi template: `upgrade` memindahkan asesmen ke versi terbaru lalu
+    menghitung ulang skornya di background; `auto_upgrade` mengikuti versi
+    berikutnya secara otomatis.
+    """
+    current_user_id = int(get_jwt_identity())
+    assessment = MadyaAssessment.query.get_or_404(assessment_id)
+
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    if assessment.user_id != current_user_id and not is_admin:
+        return jsonify({"msg": "Akses ditolak. Asesmen bukan milik Anda."}), 403
+    if assessment.risk_map_template is None:
+        return jsonify({"msg": "Asesmen belum memakai template peta risiko."}), 400
+
+    data = request.get_json() or {}
+    if 'auto_upgrade' in data:
+        assessment.risk_map_auto_upgrade = bool(data['auto_upgrade'])
+
+    previous = resolve_assessment_version(assessment)
+    version = previous
+    if data.get('upgrade') or (data.get('auto_upgrade') and previous is not None
+                               and previous.version != assessment.risk_map_template.current_version):
+        version = pin_assessment_version(assessment, assessment.risk_map_template)
     db.session.commit()
 
-    return jsonify({"msg": "Template peta risiko berhasil diperbarui."})
+    rescoring = version is not None and (previous is None or version.id != previous.id)
+    job = None
+    if rescoring:
+        job = enqueue_rescoring(version.template_id, version.id, [assessment.id], current_user_id)
+
+    return jsonify({
+        "msg": "Versi template peta risiko asesmen berhasil diperbarui.",
+        "risk_map_version": version.version if version else None,
+        "latest_version": assessment.risk_map_template.current_version,
+        "risk_map_auto_upgrade": assessment.risk_map_auto_upgrade,
+        "rescoring": rescoring,
+        "rescoring_job_id": job.id if job else None
+    }), 202 if rescoring else 200
+
+@risk_management_levels_bp.route('/risk-maps/<int:template_id>/rescore', methods=['POST'])
+@jwt_required()
+def rescore_risk_map_template(template_id):
+    """Menghitung ulang skor semua asesmen yang memakai versi aktif template (misal setelah impor massal)."""
+    template = RiskMapTemplate.query.get_or_404(template_id)
+    current_user_id = int(get_jwt_identity())
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    if template.is_default and not is_admin:
+        return jsonify({"msg": "Akses ditolak. Hanya Admin yang dapat menghitung ulang template default."}), 403
+    if not template.is_default and template.user_id != current_user_id and not is_admin:
+        return jsonify({"msg": "Akses ditolak. Template bukan milik Anda."}), 403
+
+    version = get_current_version(template, current_user_id)
+    query = db.session.query(MadyaAssessment.id).filter(MadyaAssessment.risk_map_version_id == version.id)
+    if not is_admin:
+        query = query.filter(MadyaAssessment.user_id == current_user_id)
+    assessment_ids = [row.id for row in query]
+    db.session.commit()
+
+    job = enqueue_rescoring(template.id, version.id, assessment_ids, current_user_id)
+    if job is None:
+        return jsonify({"msg": "Tidak ada asesmen yang memakai versi aktif template ini.", "rescoring_job_id": None})
+    return jsonify({"msg": "Rescoring dijadwalkan.", "job": job_to_dict(job)}), 202
+
+@risk_management_levels_bp.route('/rescoring-jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_rescoring_job(job_id):
+    """Status & progres job rescoring."""
+    job = RiskRescoringJob.query.get_or_404(job_id)
+    current_user_id = int(get_jwt_identity())
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    if job.created_by != current_user_id and not is_admin:
+        return jsonify({"msg": "Akses ditolak."}), 403
+    return jsonify(job_to_dict(job))
+
+PROBABILITY_CRITERIA_FIELDS = ('parameter', 'kemungkinan', 'frekuensi', 'persentase')
+
+def apply_criteria_update(criteria_entry, kind, data):
+    """Menyalin field kriteria dari request ke baris override (id, asesmen & level tidak diubah)."""
+    if kind == 'probability':
+        for key in PROBABILITY_CRITERIA_FIELDS:
+            setattr(criteria_entry, key, data.get(key, getattr(criteria_entry, key)))
+        return
+    for key in data:
+        if key in criteria_entry.__table__.columns and key not in ['id', 'assessment_id', 'level']: # Jangan update ID
+            setattr(criteria_entry, key, data[key])
 
 @risk_management_levels_bp.route('/madya-assessments/criteria/probability/<int:criteria_id>', methods=['PUT'])
 @jwt_required()
@@ -1547,10 +1096,7 @@ def update_madya_probability_criteria_entry(criteria_id):
 
     data = request.get_json()
     
-    criteria_entry.parameter = data.get('parameter', criteria_entry.parameter)
-    criteria_entry.kemungkinan = data.get('kemungkinan', criteria_entry.kemungkinan)
-    criteria_entry.frekuensi = data.get('frekuensi', criteria_entry.frekuensi)
-    criteria_entry.persentase = data.get('persentase', criteria_entry.persentase)
+    apply_criteria_update(criteria_entry, 'probability', data)
     
     db.session.commit()
     return jsonify({"msg": "Kriteria probabilitas berhasil diperbarui."})
@@ -1573,13 +1119,40 @@ def update_madya_impact_criteria_entry(criteria_id):
     data = request.get_json()
     
     # Update semua field dampak
-    for key in data:
-        if hasattr(criteria_entry, key) and key not in ['id', 'assessment_id']: # Jangan update ID
-            setattr(criteria_entry, key, data[key])
+    apply_criteria_update(criteria_entry, 'impact', data)
             
     db.session.commit()
     return jsonify({"msg": "Kriteria dampak berhasil diperbarui."})
 
+# --- Edit kriteria per level (copy-on-write dari set kriteria bersama) ---
+@risk_management_levels_bp.route('/madya-assessments/<int:assessment_id>/criteria/<string:kind>/<int:level>', methods=['PUT'])
+@jwt_required()
+def update_madya_criteria_level(assessment_id, kind, level):
+    """Mengedit satu level kriteria; baris override asesmen dibuat saat pertama kali diedit."""
+    if kind not in ('probability', 'impact'):
+        return jsonify({"msg": "Jenis kriteria tidak dikenal."}), 404
+
+    current_user_id = int(get_jwt_identity())
+    assessment = MadyaAssessment.query.get_or_404(assessment_id)
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    if assessment.user_id != current_user_id and not is_admin:
+        return jsonify({"msg": "Akses ditolak. Anda bukan pemilik asesmen ini."}), 403
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"msg": "Data tidak boleh kosong."}), 400
+
+    criteria_entry = materialize_criteria_override(assessment, kind, level)
+    if criteria_entry is None:
+        return jsonify({"msg": f"Level kriteria {level} tidak ditemukan."}), 404
+
+    apply_criteria_update(criteria_entry, kind, data)
+    db.session.commit()
+    label = "probabilitas" if kind == 'probability' else "dampak"
+    return jsonify({"msg": f"Kriteria {label} berhasil diperbarui.", "id": criteria_entry.id})
+
 @risk_management_levels_bp.route('/structure-entries/<int:entry_id>', methods=['PUT', 'DELETE'])
 @jwt_required()
 def manage_structure_entry(entry_id):
@@ -1780,7 +1353,8 @@ def parse_int_or_none(value):
 
 #     return calculated
 
-def calculate_scores_from_template(data, template_id):
+def calculate_scores_from_template(data, template_id, version_id=None):
+    """Skor inheren & residual; memakai matriks versi template asesmen jika tersedia."""
     inherent_p = parse_int_or_none(data.get('inherent_probabilitas'))
     inherent_i = parse_int_or_none(data.get('inherent_dampak'))
     residual_p = parse_int_or_none(data.get('residual_probabilitas'))
@@ -1788,6 +1362,12 @@ def calculate_scores_from_template(data, template_id):
 
     scores = {'inherent_skor': None, 'residual_skor': None}
 
+    if version_id is not None:
+        matrix = get_version_matrix(version_id)
+        scores['inherent_skor'] = lookup_score(matrix, inherent_p, inherent_i)
+        scores['residual_skor'] = lookup_score(matrix, residual_p, residual_i)
+        return scores
+
     def get_score(p, i):
         if p is not None and i is not None and template_id is not None:
             score_entry = RiskMapScore.query.filter_by(
@@ -1809,36 +1389,8 @@ def format_risk_input_entry(entry):
     """Mengubah objek RiskInputMadya menjadi dictionary yang JSON-friendly."""
     if not entry:
         return None
-    entry_dict = {c.name: getattr(entry, c.name) for c in entry.__table__.columns}
-
-    for date_field in ['tanggal_identifikasi', 'jadwal_mulai_penanganan', 'jadwal_selesai_penanganan', 'tanggal_review']:
-        date_value = getattr(entry, date_field)
-        entry_dict[date_field] = date_value.isoformat() if date_value else None
-
-    # Pastikan field angka adalah float/int atau null (termasuk konversi dari Decimal jika ada)
-    for num_field in [
-        'inherent_probabilitas', 'inherent_dampak', 'inherent_skor',
-        'inherent_prob_kualitatif', 'inherent_dampak_finansial', 'inherent_nilai_bersih',
-        'biaya_penanganan',
-        'residual_probabilitas', 'residual_dampak', 'residual_skor',
-        'residual_prob_kualitatif', 'residual_dampak_finansial', 'residual_nilai_bersih',
-        'sasaran_id'
-    ]:
-        value = getattr(entry, num_field)
-        if isinstance(value, decimal.Decimal):
-             entry_dict[num_field] = float(value)
-        elif value is not None:
-             try:
-                 if '.' in str(value): 
-                     entry_dict[num_field] = float(value)
-                 else:
-                     entry_dict[num_field] = int(value)
-             except (ValueError, TypeError):
-                 entry_dict[num_field] = None
-        else:
-            entry_dict[num_field] = None
-
-    return entry_dict
+    # Tanggal & angka (termasuk Decimal) dikonversi oleh JSON provider aplikasi
+    return get_serializer(RiskInputMadya).from_object(entry)
 
 def format_sasaran_entry(entry):
     """Mengubah objek SasaranOrganisasiKPI menjadi dictionary."""
@@ -1854,7 +1406,7 @@ def format_sasaran_entry(entry):
     }
 
 def update_sasaran_kpi_scores(sasaran_id):
-    """Menghitung dan memperbarui skor inheren & residual tertinggi untuk Sasaran/KPI."""
+    """Menghitung ulang skor inheren & residual tertinggi untuk Sasaran/KPI (agregasi penuh)."""
     if not sasaran_id:
         return
 
@@ -1862,25 +1414,108 @@ def update_sasaran_kpi_scores(sasaran_id):
     if not sasaran_entry:
         return
 
-    # Cari skor inheren tertinggi dari semua risk input yang terkait
-    max_inherent_score = db.session.query(func.max(RiskInputMadya.inherent_skor))\
-        .filter(RiskInputMadya.sasaran_id == sasaran_id)\
-        .scalar()
-
-    # Cari skor residual tertinggi dari semua risk input yang terkait
-    # Pastikan hanya menghitung jika residual_skor tidak null
-    max_residual_score = db.session.query(func.max(RiskInputMadya.residual_skor))\
-        .filter(RiskInputMadya.sasaran_id == sasaran_id, RiskInputMadya.residual_skor.isnot(None))\
-        .scalar()
+    # Satu query agregat untuk kedua skor (MAX mengabaikan NULL)
+    max_inherent_score, max_residual_score = db.session.query(
+        func.max(RiskInputMadya.inherent_skor),
+        func.max(RiskInputMadya.residual_skor)
+    ).filter(RiskInputMadya.sasaran_id == sasaran_id).one()
 
     sasaran_entry.inherent_risk_score = max_inherent_score
-    # Set residual score ke null jika tidak ada risk input dengan residual score
-    sasaran_entry.residual_risk_score = max_residual_score if max_residual_score is not None else None
+    sasaran_entry.residual_risk_score = max_residual_score
 
     # Tidak perlu db.session.add() karena objek sudah ada
     # db.session.commit() akan dipanggil di fungsi utama (add/update risk input)
     print(f"Updated scores for SasaranKPI ID {sasaran_id}: Inherent={max_inherent_score}, Residual={max_residual_score}")
 
+def apply_sasaran_score_change(sasaran_id, old_scores=None, new_scores=None):
+    """
+    Memelihara skor maksimum Sasaran/KPI secara inkremental.
+
+    old_scores / new_scores adalah tuple (inherent_skor, residual_skor) dari satu risk input
+    sebelum dan sesudah perubahan. Gunakan None untuk old_scores jika risk input baru masuk
+    ke sasaran ini, dan None untuk new_scores jika risk input dihapus/dipindah dari sasaran ini.
+
+    Skor yang naik cukup dibandingkan dengan maksimum tersimpan (O(1)). Agregasi ulang
+    hanya dijalankan jika nilai maksimum saat ini dihapus atau diturunkan.
+    Baris Sasaran dikunci (FOR UPDATE) sampai commit agar dua request yang menaikkan
+    skor bersamaan tidak saling menimpa dengan maksimum yang lebih rendah.
+    """
+    if not sasaran_id:
+        return
+
+    # populate_existing: baca ulang nilai terbaru setelah kunci didapat (bukan dari identity map)
+    sasaran_entry = SasaranOrganisasiKPI.query.filter_by(id=sasaran_id)\
+        .with_for_update().populate_existing().first()
+    if not sasaran_entry:
+        return
+
+    needs_recompute = False
+    for index, field in enumerate(('inherent_risk_score', 'residual_risk_score')):
+        current_max = getattr(sasaran_entry, field)
+        old_value = old_scores[index] if old_scores else None
+        new_value = new_scores[index] if new_scores else None
+
+        if new_value is not None and (current_max is None or new_value > current_max):
+            setattr(sasaran_entry, field, new_value)
+        elif old_value is not None and current_max is not None and old_value >= current_max \
+                and (new_value is None or new_value < old_value):
+            # Nilai maksimum hilang/turun -> kandidat pengganti tidak diketahui
+            needs_recompute = True
+
+    if needs_recompute:
+        update_sasaran_kpi_scores(sasaran_id)
+
+def recompute_sasaran_scores_for_assessment(assessment_id):
+    """
+    Menghitung ulang skor maksimum SEMUA Sasaran/KPI dalam satu asesmen
+    dengan satu query GROUP BY + bulk UPDATE (untuk impor / rescoring massal).
+    Mengembalikan jumlah Sasaran/KPI yang diperbarui.
+    """
+    grouped_scores = db.session.query(
+        RiskInputMadya.sasaran_id,
+        func.max(RiskInputMadya.inherent_skor),
+        func.max(RiskInputMadya.residual_skor)
+    ).filter(
+        RiskInputMadya.assessment_id == assessment_id,
+        RiskInputMadya.sasaran_id.isnot(None)
+    ).group_by(RiskInputMadya.sasaran_id).all()
+
+    maxima = {sasaran_id: (inherent, residual) for sasaran_id, inherent, residual in grouped_scores}
+    sasaran_ids = [row.id for row in db.session.query(SasaranOrganisasiKPI.id).filter_by(assessment_id=assessment_id)]
+
+    mappings = [{
+        "id": sasaran_id,
+        "inherent_risk_score": maxima.get(sasaran_id, (None, None))[0],
+        "residual_risk_score": maxima.get(sasaran_id, (None, None))[1]
+    } for sasaran_id in sasaran_ids]
+
+    if mappings:
+        db.session.bulk_update_mappings(SasaranOrganisasiKPI, mappings)
+        touch_export_stamps(MadyaAssessment, [assessment_id])
+    return len(mappings)
+
+@risk_management_levels_bp.route('/madya-assessments/<int:assessment_id>/sasaran-kpi/recompute', methods=['POST'])
+@jwt_required()
+def recompute_sasaran_kpi_scores(assessment_id):
+    """Menghitung ulang skor semua Sasaran/KPI asesmen sekaligus (misal setelah impor massal)."""
+    current_user_id = int(get_jwt_identity())
+    assessment = MadyaAssessment.query.get_or_404(assessment_id)
+
+    user = User.query.get(current_user_id)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    if assessment.user_id != current_user_id and not is_admin:
+        return jsonify({"msg": "Akses ditolak. Asesmen bukan milik Anda."}), 403
+
+    updated_count = recompute_sasaran_scores_for_assessment(assessment.id)
+    db.session.commit()
+
+    sasaran_entries = SasaranOrganisasiKPI.query.filter_by(assessment_id=assessment.id).order_by(SasaranOrganisasiKPI.id).all()
+    return jsonify({
+        "msg": f"Skor {updated_count} Sasaran/KPI berhasil dihitung ulang.",
+        "entries": [format_sasaran_entry(entry) for entry in sasaran_entries]
+    })
+
 @risk_management_levels_bp.route('/madya-assessments/<int:assessment_id>/risk-inputs', methods=['POST'])
 @jwt_required()
 def add_risk_input(assessment_id):
@@ -1915,7 +1550,8 @@ def add_risk_input(assessment_id):
     biaya_penanganan = parse_float_or_none(data.get('biaya_penanganan'))
 
     # 2. Hitung Skor menggunakan template
-    calculated_scores = calculate_scores_from_template(data, assessment.risk_map_template_id)
+    risk_map_version = resolve_assessment_version(assessment)
+    calculated_scores = calculate_scores_from_template(data, assessment.risk_map_template_id, risk_map_version.id if risk_map_version else None)
     inherent_skor = calculated_scores.get('inherent_skor')
     residual_skor = calculated_scores.get('residual_skor')
 
@@ -1983,10 +1619,7 @@ def add_risk_input(assessment_id):
     )
 
     db.session.add(new_risk_input)
-    db.session.commit()
-    db.session.refresh(new_risk_input)
-    
-    update_sasaran_kpi_scores(new_risk_input.sasaran_id)
+    apply_sasaran_score_change(new_risk_input.sasaran_id, new_scores=(inherent_skor, residual_skor))
     db.session.commit()
     
     updated_sasaran_entry = SasaranOrganisasiKPI.query.get(new_risk_input.sasaran_id) if new_risk_input.sasaran_id else None
@@ -2006,17 +1639,13 @@ def get_risk_inputs(assessment_id):
     current_user_id = int(get_jwt_identity())
     assessment = MadyaAssessment.query.filter_by(id=assessment_id, user_id=current_user_id).first_or_404("Asesmen Madya tidak ditemukan atau bukan milik Anda.")
 
-    risk_entries = RiskInputMadya.query.filter_by(assessment_id=assessment.id).order_by(RiskInputMadya.id).all()
+    # Ambil sebagai tuple kolom (tanpa objek ORM) lalu format dengan serializer terkompilasi
+    serializer = get_serializer(RiskInputMadya)
+    rows = serializer.query(RiskInputMadya.query)\
+        .filter(RiskInputMadya.assessment_id == assessment.id)\
+        .order_by(RiskInputMadya.id).all()
 
-    result = [format_risk_input_entry(entry) for entry in risk_entries]
-    # for entry in risk_entries:
-    #     entry_dict = {c.name: getattr(entry, c.name) for c in entry.__table__.columns}
-    #     for date_field in ['tanggal_identifikasi', 'jadwal_mulai_penanganan', 'jadwal_selesai_penanganan', 'tanggal_review']:
-    #         if entry_dict.get(date_field):
-    #             entry_dict[date_field] = entry_dict[date_field].isoformat()
-    #     result.append(entry_dict)
-
-    return jsonify(result)
+    return jsonify(serializer.many_rows(rows))
 
 @risk_management_levels_bp.route('/risk-inputs/<int:risk_input_id>', methods=['PUT'])
 @jwt_required()
@@ -2038,6 +1667,10 @@ def update_risk_input(risk_input_id):
 
     # calculated_values = calculate_risk_values(data, assessment.risk_map_template_id)
 
+    # Simpan nilai lama untuk pemeliharaan skor Sasaran/KPI secara inkremental
+    old_sasaran_id = risk_input.sasaran_id
+    old_scores = (risk_input.inherent_skor, risk_input.residual_skor)
+
 # 1. Parse semua input numerik yang relevan dari data BARU atau data LAMA
     inherent_p = parse_int_or_none(data.get('inherent_probabilitas', risk_input.inherent_probabilitas))
     inherent_i = parse_int_or_none(data.get('inherent_dampak', risk_input.inherent_dampak))
@@ -2053,7 +1686,8 @@ def update_risk_input(risk_input_id):
         'inherent_probabilitas': inherent_p, 'inherent_dampak': inherent_i,
         'residual_probabilitas': residual_p, 'residual_dampak': residual_i
     }
-    calculated_scores = calculate_scores_from_template(score_data_for_calc, assessment.risk_map_template_id)
+    risk_map_version = resolve_assessment_version(assessment)
+    calculated_scores = calculate_scores_from_template(score_data_for_calc, assessment.risk_map_template_id, risk_map_version.id if risk_map_version else None)
     inherent_skor = calculated_scores.get('inherent_skor')
     residual_skor = calculated_scores.get('residual_skor')
 
@@ -2114,10 +1748,13 @@ def update_risk_input(risk_input_id):
     risk_input.residual_nilai_bersih = residual_nilai_bersih
     risk_input.tanggal_review = parse_date_or_none(data.get('tanggal_review')) or risk_input.tanggal_review
 
-    db.session.commit()
-    db.session.refresh(risk_input)
-    
-    update_sasaran_kpi_scores(risk_input.sasaran_id)
+    new_scores = (inherent_skor, residual_skor)
+    if old_sasaran_id == risk_input.sasaran_id:
+        apply_sasaran_score_change(risk_input.sasaran_id, old_scores, new_scores)
+    else:
+        # Risk input dipindah: keluar dari sasaran lama, masuk ke sasaran baru
+        apply_sasaran_score_change(old_sasaran_id, old_scores=old_scores)
+        apply_sasaran_score_change(risk_input.sasaran_id, new_scores=new_scores)
     db.session.commit()
     
     updated_sasaran_entry = SasaranOrganisasiKPI.query.get(risk_input.sasaran_id) if risk_input.sasaran_id else None
@@ -2149,7 +1786,11 @@ def delete_risk_input(risk_input_id):
     if assessment.user_id != current_user_id and not is_admin:
         return jsonify({"msg": "Akses ditolak."}), 403
 
+    sasaran_id = risk_input.sasaran_id
+    old_scores = (risk_input.inherent_skor, risk_input.residual_skor)
+
     db.session.delete(risk_input)
+    apply_sasaran_score_change(sasaran_id, old_scores=old_scores)
     db.session.commit()
     return jsonify({"msg": "Risk Input berhasil dihapus."})
 
@@ -2162,35 +1803,13 @@ def get_all_risk_inputs_global():
     """
     current_user_id = int(get_jwt_identity())
     
-    # 1. Ambil semua MadyaAssessment milik user
-    user_assessments = MadyaAssessment.query.filter_by(user_id=current_user_id).all()
-    assessment_ids = [a.id for a in user_assessments]
-    
-    if not assessment_ids:
-        return jsonify([])
-
-    # 2. Ambil semua RiskInputMadya yang terkait
-    all_risks = RiskInputMadya.query.filter(
-        RiskInputMadya.assessment_id.in_(assessment_ids)
-    ).all()
-
-    # 3. Format data manual agar field-nya LENGKAP
-    result = []
-    for r in all_risks:
-        result.append({
-            "id": r.id,
-            "kode_risiko": r.kode_risiko,
-            "deskripsi_risiko": r.deskripsi_risiko,
-            "unit_kerja": r.unit_kerja,
-            "residual_skor": r.residual_skor,
-            "residual_probabilitas": r.residual_probabilitas,
-            "residual_dampak": r.residual_dampak,
-            "inherent_probabilitas": r.inherent_probabilitas,
-            "inherent_dampak": r.inherent_dampak,
-            "rencana_penanganan": r.rencana_penanganan,
-            "status_penanganan": r.status_penanganan,
-            "madya_assessment_id": r.assessment_id,
-            "type": "Madya"
-        })
+    # Ambil semua RiskInputMadya dari asesmen milik user dalam satu query kolom
+    serializer = get_serializer(RiskInputMadya, 'dashboard')
+    user_assessment_ids = db.session.query(MadyaAssessment.id).filter(MadyaAssessment.user_id == current_user_id)
+    rows = serializer.query(RiskInputMadya.query)\
+        .filter(RiskInputMadya.assessment_id.in_(user_assessment_ids.scalar_subquery()))\
+        .order_by(RiskInputMadya.id).all()
+
+    result = serializer.many_rows(rows)
     
     return jsonify(result), 200
\ No newline at end of file
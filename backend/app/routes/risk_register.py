@@ -3,12 +3,17 @@ from flask import request, jsonify, Blueprint
 from app.models import MainRiskRegister, User
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.db_engine import read_replica
+from sqlalchemy import func
+from app.excel_export import send_export
+from app.export_specs import MAIN_RISK_REGISTER_EXPORT
 
 # Membuat Blueprint untuk Main Risk Register
 risk_register_bp = Blueprint('risk_register_bp', __name__)
 
 @risk_register_bp.route('/risk-register', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_main_risk_register():
     """Mengambil semua risiko dari register utama milik pengguna."""
     current_user_id = int(get_jwt_identity())
@@ -38,6 +43,30 @@ def get_main_risk_register():
     return jsonify(risk_list)
 
 
+@risk_register_bp.route('/risk-register/export', methods=['GET'])
+@jwt_required()
+@read_replica
+def export_main_risk_register():
+    """Mengirim file Excel Main Risk Register milik pengguna (dari cache jika belum berubah)."""
+    current_user_id = int(get_jwt_identity())
+    # Stempel register: jumlah item + waktu perubahan terakhir (hapus mengubah jumlah)
+    count, last_updated = db.session.query(
+        func.count(MainRiskRegister.id),
+        func.max(func.coalesce(MainRiskRegister.updated_at, MainRiskRegister.created_at))
+    ).filter(MainRiskRegister.user_id == current_user_id).one()
+
+    def context():
+        risks = MainRiskRegister.query.filter_by(user_id=current_user_id)\
+            .order_by(MainRiskRegister.created_at.desc()).all()
+        return {"risks": risks}
+
+    return send_export(
+        MAIN_RISK_REGISTER_EXPORT, context,
+        key_parts=(current_user_id, count, str(last_updated)),
+        download_name="Main_Risk_Register.xlsx"
+    )
+
+
 @risk_register_bp.route('/risk-register/<int:risk_id>', methods=['PUT'])
 @jwt_required()
 def update_main_risk_register_item(risk_id):
@@ -5,8 +5,13 @@ from app.models import db, User, Department, RscaCycle, RscaQuestionnaire, RscaA
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from app.ai_services import analyze_rsca_answers_with_gemini
+from app.db_engine import release_db_connection
 from app.routes.admin import RscaAnswerSchema
 from app.routes.auth import permission_required
+from app.tenancy import tenant_required
+from sqlalchemy import update, insert
+
+RSCA_ANSWER_FIELDS = ('jawaban', 'catatan', 'control_effectiveness_rating', 'risk_register_id')
 
 rsca_bp = Blueprint('rsca_bp', __name__)
 
@@ -83,6 +88,7 @@ def create_rsca_cycle():
 
 @rsca_bp.route('/my-rsca-tasks', methods=['GET'])
 @jwt_required()
+@tenant_required()
 def get_my_rsca_tasks():
     """Mengambil daftar siklus RSCA yang ditugaskan ke departemen pengguna."""
     current_user_id = int(get_jwt_identity())
@@ -109,6 +115,7 @@ def get_my_rsca_tasks():
 
 @rsca_bp.route('/my-submitted-risks', methods=['GET'])
 @jwt_required()
+@tenant_required()
 def get_my_submitted_risks():
     """
     Mengambil daftar 'Ajuan Risiko' (Bottom-Up) yang telah dikirim
@@ -191,6 +198,7 @@ def get_my_action_plan_tasks():
 
 @rsca_bp.route('/rsca-cycles/<int:cycle_id>/questionnaire', methods=['GET'])
 @jwt_required()
+@tenant_required()
 def get_rsca_questionnaire(cycle_id):
     """
     Mengambil detail siklus dan daftar pertanyaannya.
@@ -252,6 +260,7 @@ def get_rsca_questionnaire(cycle_id):
     
 @rsca_bp.route('/rsca-cycles/<int:cycle_id>/my-answers', methods=['GET'])
 @jwt_required()
+@tenant_required()
 def get_my_rsca_answers(cycle_id):
     """
     Mengambil jawaban yang sudah ada dari departemen pengguna
@@ -277,10 +286,85 @@ def get_my_rsca_answers(cycle_id):
     
     return RscaAnswerSchema(many=True).dump(answers), 200
 
+def upsert_rsca_answers(cycle_id, department_id, answers_data_list, partial=False):
+    """
+    Upsert jawaban RSCA secara set-based untuk satu (siklus, departemen).
+
+    partial=False: semua field jawaban ditimpa (field yang tidak dikirim menjadi NULL).
+    partial=True (autosave): hanya field yang ada di payload yang ditulis.
+    PostgreSQL memakai INSERT ... ON CONFLICT; dialek lain memuat jawaban lama
+    dalam satu query lalu melakukan bulk UPDATE/INSERT.
+    Mengembalikan jumlah jawaban yang diproses.
+    """
+    # Jawaban terakhir untuk pertanyaan yang sama dalam satu batch yang dipakai
+    rows_by_question = {}
+    for answer_data in answers_data_list:
+        try:
+            questionnaire_id = int(answer_data.get('questionnaire_id'))
+        except (TypeError, ValueError):
+            continue
+        if partial:
+            values = {field: answer_data[field] for field in RSCA_ANSWER_FIELDS if field in answer_data}
+        else:
+            values = {field: answer_data.get(field) for field in RSCA_ANSWER_FIELDS}
+        rows_by_question[questionnaire_id] = values
+
+    # Hanya pertanyaan milik siklus ini yang diterima (satu query)
+    valid_ids = {row.id for row in db.session.query(RscaQuestionnaire.id).filter(
+        RscaQuestionnaire.cycle_id == cycle_id,
+        RscaQuestionnaire.id.in_(list(rows_by_question.keys()))
+    )} if rows_by_question else set()
+    rows_by_question = {qid: values for qid, values in rows_by_question.items() if qid in valid_ids}
+    if not rows_by_question:
+        return 0
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        # Kelompokkan berdasarkan himpunan field agar baris parsial tidak menimpa field lain
+        groups = {}
+        for questionnaire_id, values in rows_by_question.items():
+            groups.setdefault(tuple(sorted(values)), []).append({
+                "cycle_id": cycle_id, "department_id": department_id,
+                "questionnaire_id": questionnaire_id, **values
+            })
+        for fields, rows in groups.items():
+            stmt = pg_insert(RscaAnswer).values(rows)
+            conflict_target = ['cycle_id', 'questionnaire_id', 'department_id']
+            if fields:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=conflict_target,
+                    set_={field: stmt.excluded[field] for field in fields}
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=conflict_target)
+            db.session.execute(stmt)
+        return len(rows_by_question)
+
+    existing = dict(db.session.query(RscaAnswer.questionnaire_id, RscaAnswer.id).filter(
+        RscaAnswer.cycle_id == cycle_id,
+        RscaAnswer.department_id == department_id,
+        RscaAnswer.questionnaire_id.in_(list(rows_by_question.keys()))
+    ).all())
+
+    updates = [{"id": existing[qid], **values} for qid, values in rows_by_question.items() if qid in existing and values]
+    inserts = [{"cycle_id": cycle_id, "department_id": department_id, "questionnaire_id": qid, **values}
+               for qid, values in rows_by_question.items() if qid not in existing]
+
+    # executemany per himpunan field yang sama
+    for fields in {tuple(sorted(row)) for row in updates}:
+        db.session.execute(update(RscaAnswer), [row for row in updates if tuple(sorted(row)) == fields])
+    for fields in {tuple(sorted(row)) for row in inserts}:
+        db.session.execute(insert(RscaAnswer), [row for row in inserts if tuple(sorted(row)) == fields])
+    return len(rows_by_question)
+
 @rsca_bp.route('/rsca-cycles/<int:cycle_id>/answers', methods=['POST'])
 @jwt_required()
+@tenant_required()
 def submit_rsca_answers(cycle_id):
-    """Menerima jawaban kuesioner dari departemen pengguna."""
+    """
+    Menerima jawaban kuesioner dari departemen pengguna.
+    Kirim "autosave": true untuk menyimpan sebagian jawaban/field saja (draft otomatis).
+    """
     current_user_id = int(get_jwt_identity())
     user = User.query.get(current_user_id)
     
@@ -303,36 +387,17 @@ def submit_rsca_answers(cycle_id):
         cycle.status = 'Berjalan'
         db.session.add(cycle)
 
-    for answer_data in answers_data_list:
-        existing_answer = RscaAnswer.query.filter_by(
-            cycle_id=cycle_id,
-            questionnaire_id=answer_data.get('questionnaire_id'),
-            department_id=user.department_id
-        ).first()
-        
-        if existing_answer:
-            # Jika ada, UPDATE jawaban yang ada
-            existing_answer.jawaban = answer_data.get('jawaban')
-            existing_answer.catatan = answer_data.get('catatan')
-            existing_answer.control_effectiveness_rating = answer_data.get('control_effectiveness_rating')
-            existing_answer.risk_register_id = answer_data.get('risk_register_id')
-        else:
-            new_answer = RscaAnswer(
-                jawaban=answer_data.get('jawaban'),
-                catatan=answer_data.get('catatan'),
-                control_effectiveness_rating=answer_data.get('control_effectiveness_rating'), # Simpan data baru
-                risk_register_id=answer_data.get('risk_register_id'), # Simpan data baru
-                cycle_id=cycle_id,
-                questionnaire_id=answer_data.get('questionnaire_id'),
-                department_id=user.department_id
-            )
-            db.session.add(new_answer)
-    
+    is_autosave = bool(data.get('autosave'))
+    saved_count = upsert_rsca_answers(cycle_id, user.department_id, answers_data_list, partial=is_autosave)
+
     db.session.commit()
-    return jsonify({"msg": "Jawaban berhasil disimpan."}), 201
+    if is_autosave:
+        return jsonify({"msg": "Draft jawaban tersimpan.", "saved": saved_count}), 200
+    return jsonify({"msg": "Jawaban berhasil disimpan.", "saved": saved_count}), 201
 
 @rsca_bp.route('/rsca-cycles/<int:cycle_id>/submit-risk', methods=['POST'])
 @jwt_required()
+@tenant_required()
 def submit_new_risk(cycle_id):
     """
     Menerima 'Ajuan Risiko' (Bottom-Up) baru dari Staf
@@ -388,6 +453,7 @@ def submit_new_risk(cycle_id):
 @rsca_bp.route('/rsca-cycles/<int:cycle_id>/analyze', methods=['POST'])
 @jwt_required()
 @permission_required('manage_rsca_cycles')
+@tenant_required()
 def analyze_rsca_cycle(cycle_id):
     """Memicu analisis AI pada semua jawaban dari sebuah siklus RSCA."""
     # Dapatkan API Key
@@ -427,7 +493,8 @@ def analyze_rsca_cycle(cycle_id):
             full_text_for_ai += f"Catatan: {ans.catatan}\n"
         full_text_for_ai += "---\n"
 
-    # Panggil fungsi analisis AI
+    # Panggil fungsi analisis AI (koneksi DB dilepas dulu; cycle dimuat ulang saat disimpan)
+    release_db_connection()
     ai_result = analyze_rsca_answers_with_gemini(full_text_for_ai)
 
     if not ai_result:
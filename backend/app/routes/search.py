@@ -0,0 +1,44 @@
+# backend/app/routes/search.py
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import db, User
+from app.search import search_index, SEARCH_SOURCES
+
+search_bp = Blueprint('search_bp', __name__)
+
+@search_bp.route('/search', methods=['GET'])
+@jwt_required()
+def unified_search():
+    """
+    Pencarian full-text lintas modul (regulasi, risk register, risk input madya, BPR, RSCA).
+    Query param: q, types (dipisah koma), page, per_page.
+    """
+    current_user_id = int(get_jwt_identity())
+    user = User.query.get(current_user_id)
+    if not user:
+        return jsonify({"msg": "User tidak ditemukan"}), 404
+
+    query_text = request.args.get('q', '').strip()
+    if len(query_text) < 2:
+        return jsonify({"msg": "Parameter 'q' minimal 2 karakter."}), 400
+
+    types_param = request.args.get('types')
+    sources = [t.strip() for t in types_param.split(',') if t.strip()] if types_param else None
+    if sources:
+        invalid = [t for t in sources if t not in SEARCH_SOURCES]
+        if invalid:
+            return jsonify({"msg": f"Tipe pencarian tidak dikenal: {', '.join(invalid)}"}), 400
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    is_admin = any(r.name == 'Admin' for r in user.roles)
+
+    try:
+        result = search_index(query_text, user, is_admin=is_admin, sources=sources, page=page, per_page=per_page)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error di unified_search: {e}")
+        return jsonify({"msg": "Gagal melakukan pencarian."}), 500
+
+    result["query"] = query_text  # page/per_page dari search_index (sudah dibatasi)
+    return jsonify(result), 200
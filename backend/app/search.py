@@ -0,0 +1,246 @@
+# backend/app/search.py
+"""
+Subsistem pencarian full-text lintas modul.
+
+- PostgreSQL: kolom `search_vector` (tsvector GENERATED ... STORED) + index GIN
+  pada setiap tabel sumber (lihat migrasi `add_full_text_search_vectors`).
+- SQLite (run lokal): tabel virtual FTS5 external-content `<tabel>_fts` yang
+  dibuat otomatis beserta trigger sinkronisasinya saat pencarian pertama.
+
+Semua sumber digabung dalam satu query UNION ALL, diurutkan berdasarkan rank
+dan dipaginasi di database.
+"""
+import re
+import threading
+
+from sqlalchemy import select, literal, literal_column, func, cast, union_all, Integer, Text, Float, table, column
+
+from app import db
+from app.models import (
+    Regulation, MainRiskRegister, RiskInputMadya, MadyaAssessment,
+    BprRisk, BprNode, BprDocument, Department, SubmittedRisk
+)
+
+TS_CONFIG = 'simple'  # Konten campuran Indonesia/Inggris -> tanpa stemming
+MAX_PER_PAGE = 50
+SNIPPET_LENGTH = 240
+
+# Bobot kolom: A (paling penting) .. C
+SQLITE_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 1.0}
+
+
+def _regulation_scope(user, is_admin):
+    return [], []
+
+def _main_risk_scope(user, is_admin):
+    if is_admin:
+        return [], []
+    return [], [MainRiskRegister.user_id == user.id]
+
+def _madya_risk_scope(user, is_admin):
+    joins = [(MadyaAssessment, MadyaAssessment.id == RiskInputMadya.assessment_id)]
+    if is_admin:
+        return joins, []
+    return joins, [MadyaAssessment.user_id == user.id]
+
+def _bpr_risk_scope(user, is_admin):
+    joins = [
+        (BprNode, BprNode.id == BprRisk.node_id),
+        (BprDocument, BprDocument.id == BprNode.document_id),
+    ]
+    if is_admin:
+        return joins, []
+    joins.append((Department, Department.id == BprDocument.department_id))
+    return joins, [Department.institution == user.institution]
+
+def _submitted_risk_scope(user, is_admin):
+    if is_admin:
+        return [], []
+    return [], [SubmittedRisk.institution == user.institution]
+
+
+# source -> konfigurasi. 'fields' berisi (bobot, nama_kolom) sesuai urutan kolom FTS.
+SEARCH_SOURCES = {
+    'regulation': {
+        'model': Regulation,
+        'fields': [('A', 'name'), ('B', 'description')],
+        'title': lambda: Regulation.name,
+        'snippet': lambda: Regulation.description,
+        'parent_id': lambda: cast(None, Integer),
+        'scope': _regulation_scope,
+    },
+    'main_risk': {
+        'model': MainRiskRegister,
+        'fields': [('A', 'title'), ('A', 'kode_risiko'), ('B', 'deskripsi_risiko'), ('B', 'objective'),
+                   ('C', 'risk_causes'), ('C', 'risk_impacts'), ('C', 'mitigation_plan')],
+        'title': lambda: func.coalesce(MainRiskRegister.title, MainRiskRegister.kode_risiko),
+        'snippet': lambda: MainRiskRegister.deskripsi_risiko,
+        'parent_id': lambda: MainRiskRegister.source_assessment_id,
+        'scope': _main_risk_scope,
+    },
+    'madya_risk': {
+        'model': RiskInputMadya,
+        'fields': [('A', 'kode_risiko'), ('A', 'deskripsi_risiko'), ('B', 'akar_penyebab'),
+                   ('B', 'deskripsi_dampak'), ('C', 'internal_control'), ('C', 'rencana_penanganan')],
+        'title': lambda: func.coalesce(RiskInputMadya.kode_risiko, RiskInputMadya.kategori_risiko),
+        'snippet': lambda: RiskInputMadya.deskripsi_risiko,
+        'parent_id': lambda: RiskInputMadya.assessment_id,
+        'scope': _madya_risk_scope,
+    },
+    'bpr_risk': {
+        'model': BprRisk,
+        'fields': [('A', 'risk_code'), ('A', 'risk_description'), ('B', 'risk_cause'),
+                   ('B', 'risk_impact'), ('C', 'existing_control')],
+        'title': lambda: func.coalesce(BprRisk.risk_code, BprDocument.name),
+        'snippet': lambda: BprRisk.risk_description,
+        'parent_id': lambda: BprNode.document_id,
+        'scope': _bpr_risk_scope,
+    },
+    'submitted_risk': {
+        'model': SubmittedRisk,
+        'fields': [('A', 'risk_description'), ('B', 'potential_cause'), ('B', 'potential_impact')],
+        'title': lambda: func.substr(SubmittedRisk.risk_description, 1, 120),
+        'snippet': lambda: SubmittedRisk.potential_impact,
+        'parent_id': lambda: SubmittedRisk.cycle_id,
+        'scope': _submitted_risk_scope,
+    },
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_sqlite_ready = False
+_sqlite_lock = threading.Lock()
+
+
+def tokenize_query(text):
+    """Memecah query user menjadi token aman (huruf/angka saja)."""
+    return [t.lower() for t in _TOKEN_RE.findall(text or '')][:12]
+
+
+def _pg_match(model, tokens):
+    vector = literal_column(f"{model.__tablename__}.search_vector")
+    # Prefix match per token, semua token wajib ada (AND)
+    ts_query = func.to_tsquery(TS_CONFIG, ' & '.join(f"{t}:*" for t in tokens))
+    return vector.op('@@')(ts_query), func.ts_rank_cd(vector, ts_query), []
+
+
+def _sqlite_match(model, tokens, fields):
+    fts_name = f"{model.__tablename__}_fts"
+    fts = table(fts_name, column('rowid'))
+    fts_query = ' '.join(f'"{t}"*' for t in tokens)
+    weights = [SQLITE_WEIGHTS[weight] for weight, _ in fields]
+    # bm25() FTS5: makin kecil makin relevan -> dinegasikan agar searah dengan ts_rank
+    rank = -func.bm25(literal_column(fts_name), *weights)
+    join = (fts, fts.c.rowid == model.id)
+    return literal_column(fts_name).op('MATCH')(fts_query), rank, [join]
+
+
+def ensure_sqlite_search_index():
+    """Membuat tabel FTS5 + trigger sinkronisasi untuk run lokal dengan SQLite (idempoten)."""
+    global _sqlite_ready
+    if _sqlite_ready:
+        return
+    with _sqlite_lock:
+        if _sqlite_ready:
+            return
+        connection = db.session.connection()
+        for spec in SEARCH_SOURCES.values():
+            base = spec['model'].__tablename__
+            fts_name = f"{base}_fts"
+            columns = [name for _, name in spec['fields']]
+            cols = ', '.join(columns)
+            new_cols = ', '.join(f"new.{c}" for c in columns)
+            old_cols = ', '.join(f"old.{c}" for c in columns)
+
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts_name,)
+            ).first()
+            if exists:
+                continue
+
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {fts_name} USING fts5({cols}, content='{base}', content_rowid='id')"
+            )
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER {fts_name}_ai AFTER INSERT ON {base} BEGIN "
+                f"INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            )
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER {fts_name}_ad AFTER DELETE ON {base} BEGIN "
+                f"INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+            )
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER {fts_name}_au AFTER UPDATE ON {base} BEGIN "
+                f"INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                f"INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            )
+            connection.exec_driver_sql(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')")
+        db.session.commit()
+        _sqlite_ready = True
+
+
+def search_index(query_text, user, is_admin=False, sources=None, page=1, per_page=20):
+    """
+    Mencari di semua sumber (atau subset `sources`) dan mengembalikan
+    dict {total, items, page, per_page} yang sudah diurutkan berdasarkan relevansi
+    (page/per_page setelah dibatasi ke MAX_PER_PAGE, untuk paginasi di client).
+    """
+    per_page = max(1, min(int(per_page), MAX_PER_PAGE))
+    page = max(1, int(page))
+
+    tokens = tokenize_query(query_text)
+    selected = [s for s in (sources or SEARCH_SOURCES.keys()) if s in SEARCH_SOURCES]
+    if not tokens or not selected:
+        return {"total": 0, "items": [], "page": page, "per_page": per_page}
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        ensure_sqlite_search_index()
+
+    selects = []
+    for source in selected:
+        spec = SEARCH_SOURCES[source]
+        model = spec['model']
+        if dialect == 'postgresql':
+            match, rank, extra_joins = _pg_match(model, tokens)
+        else:
+            match, rank, extra_joins = _sqlite_match(model, tokens, spec['fields'])
+
+        scope_joins, scope_filters = spec['scope'](user, is_admin)
+
+        stmt = select(
+            literal(source).label('source'),
+            model.id.label('id'),
+            cast(spec['parent_id'](), Integer).label('parent_id'),
+            cast(spec['title'](), Text).label('title'),
+            func.substr(func.coalesce(cast(spec['snippet'](), Text), ''), 1, SNIPPET_LENGTH).label('snippet'),
+            cast(rank, Float).label('rank'),
+        ).select_from(model)
+        for target, on_clause in extra_joins + scope_joins:
+            stmt = stmt.join(target, on_clause)
+        stmt = stmt.where(match, *scope_filters)
+        selects.append(stmt)
+
+    hits = union_all(*selects).subquery('hits')
+    paged = select(hits, func.count().over().label('total'))\
+        .order_by(hits.c.rank.desc(), hits.c.source, hits.c.id)\
+        .limit(per_page).offset((page - 1) * per_page)
+
+    rows = db.session.execute(paged).all()
+    total = rows[0].total if rows else 0
+    if not rows and page > 1:
+        # Halaman melewati batas -> tetap laporkan total yang benar
+        total = db.session.execute(select(func.count()).select_from(hits)).scalar() or 0
+
+    return {
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "items": [{
+            "source": row.source,
+            "id": row.id,
+            "parent_id": row.parent_id,
+            "title": row.title,
+            "snippet": row.snippet,
+            "rank": round(row.rank or 0, 6),
+        } for row in rows]
+    }
@@ -391,6 +391,11 @@ def _create_default_template(name, description, level_definitions_data, matrix_s
             print(f"  Error: Invalid format for matrix_scores_data for '{name}'. Expected list of lists (5x5) or dict.")
             raise ValueError("Invalid matrix score data format") # Stop the process if format is wrong
 
+        # 5. Versi 1 dari isi di atas (endpoint baca tidak membuat versi)
+        from .risk_map_versions import get_current_version
+        db.session.flush()
+        get_current_version(template)
+
         # Commit only after all parts of the template are added
         # db.session.commit() # Moved commit outside this helper
         print(f"Default template '{name}' prepared for commit.")
@@ -0,0 +1,144 @@
+# backend/app/serializers.py
+"""
+Registry serializer baris (model -> dict) yang dikompilasi sekali saat startup.
+
+Daftar field per model ditentukan di awal (bukan refleksi `__table__.columns`
+per baris) dan diambil sekaligus lewat `operator.attrgetter`, sehingga
+list ribuan baris cukup memanggil satu fungsi per baris. Serializer yang
+sama bisa dipakai untuk objek ORM (`from_object`) maupun tuple hasil
+`query.with_entities(*serializer.columns)` (`from_row`), yang jauh lebih
+ringan karena tidak membuat objek ORM / identity map.
+
+Konversi tanggal & Decimal dilakukan JSON provider aplikasi; converter di
+sini hanya untuk kolom yang butuh perlakuan khusus per field.
+"""
+import decimal
+from operator import attrgetter
+
+from sqlalchemy import Numeric
+
+_specs = {}     # (model, nama) -> kwargs register_serializer
+_compiled = {}  # (model, nama) -> RowSerializer
+
+
+def _to_float(value):
+    return float(value) if isinstance(value, decimal.Decimal) else value
+
+
+class RowSerializer:
+    """Serializer hasil kompilasi untuk satu model + subset field."""
+
+    def __init__(self, model, fields, rename=None, converters=None, extra=None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.keys = tuple((rename or {}).get(name, name) for name in self.fields)
+        self.columns = tuple(getattr(model, name) for name in self.fields)
+        self.extra = dict(extra or {})
+        self._getter = attrgetter(*self.fields)
+        # Converter per posisi field (None = nilai apa adanya)
+        self._converters = tuple((converters or {}).get(name) for name in self.fields)
+        self._has_converters = any(self._converters)
+        if len(self.fields) == 1:
+            getter = self._getter
+            self._getter = lambda obj: (getter(obj),)
+
+    def _build(self, values):
+        if self._has_converters:
+            values = [conv(v) if conv and v is not None else v for conv, v in zip(self._converters, values)]
+        data = dict(zip(self.keys, values))
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def from_object(self, obj):
+        if obj is None:
+            return None
+        return self._build(self._getter(obj))
+
+    def from_row(self, row):
+        """Tuple/Row hasil `with_entities(*self.columns)` (urutan field sama)."""
+        return self._build(tuple(row))
+
+    def many(self, objects):
+        return [self._build(self._getter(obj)) for obj in objects]
+
+    def many_rows(self, rows):
+        return [self._build(tuple(row)) for row in rows]
+
+    def query(self, base_query):
+        """Mengubah query ORM menjadi query kolom sesuai field serializer."""
+        return base_query.with_entities(*self.columns)
+
+
+def register_serializer(model, name='default', fields=None, exclude=(), rename=None, converters=None, extra=None):
+    """
+    Mendaftarkan spesifikasi serializer (dikompilasi oleh `init_serializers`).
+
+    fields: daftar atribut (default: semua kolom tabel, urut definisi).
+    exclude: kolom yang tidak ikut dikirim.
+    rename: {atribut: key_json} untuk nama key berbeda.
+    converters: {atribut: fungsi} konversi tambahan per field.
+    extra: key konstan yang ditambahkan ke setiap dict.
+    """
+    _specs[(model, name)] = dict(fields=fields, exclude=tuple(exclude), rename=rename,
+                                 converters=converters, extra=extra)
+    _compiled.pop((model, name), None)
+
+
+def _compile(model, name):
+    spec = _specs.get((model, name))
+    if spec is None:
+        raise KeyError(f"Serializer '{name}' untuk {model.__name__} belum didaftarkan")
+    fields = spec['fields'] or [
+        column.name for column in model.__table__.columns
+        if column.name not in spec['exclude']
+    ]
+    converters = dict(spec['converters'] or {})
+    for field in fields:
+        column = model.__table__.columns.get(field)
+        # Kolom Numeric non-float (Decimal dari DB) -> float
+        if column is not None and isinstance(column.type, Numeric) and column.type.asdecimal:
+            converters.setdefault(field, _to_float)
+    return RowSerializer(model, fields, rename=spec['rename'], converters=converters, extra=spec['extra'])
+
+
+def get_serializer(model, name='default'):
+    serializer = _compiled.get((model, name))
+    if serializer is None:
+        serializer = _compiled[(model, name)] = _compile(model, name)
+    return serializer
+
+
+def init_serializers(app=None):
+    """Mengompilasi semua serializer terdaftar (dipanggil sekali di create_app)."""
+    for model, name in list(_specs.keys()):
+        get_serializer(model, name)
+    return len(_compiled)
+
+
+def _register_defaults():
+    from app.models import (
+        RiskInputMadya, MadyaCriteriaImpact, MadyaCriteriaProbability,
+        MadyaCriteriaSetImpact, MadyaCriteriaSetProbability
+    )
+
+    register_serializer(RiskInputMadya)
+    # Ringkasan untuk dashboard (Top Risks & Matrix)
+    register_serializer(RiskInputMadya, 'dashboard', fields=[
+        'id', 'kode_risiko', 'deskripsi_risiko', 'unit_kerja',
+        'residual_skor', 'residual_probabilitas', 'residual_dampak',
+        'inherent_probabilitas', 'inherent_dampak',
+        'rencana_penanganan', 'status_penanganan', 'assessment_id',
+    ], rename={'assessment_id': 'madya_assessment_id'}, extra={'type': 'Madya'})
+    register_serializer(MadyaCriteriaImpact, exclude=('assessment_id',))
+    register_serializer(MadyaCriteriaProbability, fields=[
+        'id', 'level', 'parameter', 'kemungkinan', 'frekuensi', 'persentase',
+    ])
+    # Isi set kriteria bersama (tanpa id/set_id, disalin ke override saat diedit)
+    register_serializer(MadyaCriteriaSetImpact, exclude=('id', 'set_id'))
+    register_serializer(MadyaCriteriaSetProbability, fields=[
+        'level', 'parameter', 'kemungkinan', 'frekuensi', 'persentase',
+    ])
+
+
+_register_defaults()
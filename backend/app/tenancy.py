@@ -0,0 +1,138 @@
+# backend/app/tenancy.py
+"""
+Lapisan scoping multi-tenant (tenant = kolom `institution`).
+
+- Model yang memakai `TenantScopedMixin` otomatis mendapat predikat
+  `institution = <tenant aktif>` pada setiap SELECT ORM (termasuk join dan
+  eager load) selama request berjalan di dalam `tenant_required()`.
+- Tenant aktif disimpan di `flask.g`; di luar request (worker, CLI, seed)
+  tidak ada filter sehingga perilaku lama tetap sama.
+- Pengecekan institusi manual di route tetap dipertahankan sebagai lapisan
+  pengaman kedua; filter ini memastikan query baru tidak pernah memindai
+  data institusi lain.
+"""
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import event, false
+from sqlalchemy.orm import with_loader_criteria
+
+from app import db
+
+_UNSET = object()
+SKIP_OPTION = 'skip_tenant_filter'
+
+
+class TenantScopedMixin:
+    """Penanda model yang dipartisi per institusi (wajib punya kolom `institution`)."""
+    __tenant_column__ = 'institution'
+
+
+def get_current_tenant():
+    """Institusi aktif untuk request ini, atau _UNSET jika tidak ada scoping."""
+    if not has_app_context():
+        return _UNSET
+    return g.get('tenant_institution', _UNSET)
+
+
+def is_tenant_scoped():
+    return get_current_tenant() is not _UNSET
+
+
+def current_tenant_name():
+    """Nama institusi aktif (None jika tidak di-scope atau user tanpa institusi)."""
+    tenant = get_current_tenant()
+    return None if tenant is _UNSET else tenant
+
+
+def _set_tenant(value):
+    if value is _UNSET:
+        g.pop('tenant_institution', None)
+    else:
+        g.tenant_institution = value
+
+
+@contextmanager
+def tenant_scope(institution):
+    """Menjalankan blok kode dengan filter institusi tertentu (mis. di job background)."""
+    previous = get_current_tenant()
+    _set_tenant(institution)
+    try:
+        yield
+    finally:
+        _set_tenant(previous)
+
+
+@contextmanager
+def tenant_unscoped():
+    """Menonaktifkan filter tenant sementara (mis. cek keunikan global)."""
+    previous = get_current_tenant()
+    _set_tenant(_UNSET)
+    try:
+        yield
+    finally:
+        _set_tenant(previous)
+
+
+def resolve_tenant_for_user(user):
+    """
+    Menentukan tenant dari user login:
+    - Admin: tanpa scoping, kecuali memilih institusi lewat ?institution=
+    - Lainnya: selalu institusi sendiri (None -> tidak melihat data tenant apa pun)
+    """
+    if user is None:
+        return None
+    is_admin = any(r.name.lower() == 'admin' for r in user.roles)
+    if is_admin:
+        requested = request.args.get('institution')
+        return requested if requested else _UNSET
+    return user.institution
+
+
+def tenant_required():
+    """
+    Decorator route: mengaktifkan filter institusi otomatis untuk request ini.
+    Pasang di bawah @jwt_required() (dan decorator permission).
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            from app.models import User
+            verify_jwt_in_request()
+            user = User.query.get(int(get_jwt_identity()))
+            with tenant_scope(resolve_tenant_for_user(user)):
+                return fn(*args, **kwargs)
+        return decorator
+    return wrapper
+
+
+def _tenant_models():
+    return [cls for cls in TenantScopedMixin.__subclasses__() if hasattr(cls, '__table__')]
+
+
+def _apply_tenant_filter(orm_execute_state):
+    if not orm_execute_state.is_select:
+        return
+    if orm_execute_state.is_column_load or orm_execute_state.is_relationship_load:
+        return  # Objek induk sudah tersaring; jangan sembunyikan atribut/relasinya
+    if orm_execute_state.execution_options.get(SKIP_OPTION, False):
+        return
+
+    tenant = get_current_tenant()
+    if tenant is _UNSET:
+        return
+
+    options = []
+    for model in _tenant_models():
+        column = getattr(model, model.__tenant_column__)
+        # User tanpa institusi: jangan sampai cocok dengan baris ber-institusi NULL
+        criteria = false() if tenant is None else column == tenant
+        options.append(with_loader_criteria(model, criteria, include_aliases=True))
+    orm_execute_state.statement = orm_execute_state.statement.options(*options)
+
+def init_tenancy(app):
+    """Mendaftarkan filter tenant pada session SQLAlchemy."""
+    if not event.contains(db.session, 'do_orm_execute', _apply_tenant_filter):
+        event.listen(db.session, 'do_orm_execute', _apply_tenant_filter)
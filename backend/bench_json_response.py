@@ -0,0 +1,131 @@
+"""
+Benchmark pipeline response JSON: serialisasi (json standar vs FastJSONProvider)
+dan ukuran payload (mentah vs gzip vs brotli).
+
+Data sintetis berbentuk baris RiskInputMadya (format_risk_input_entry) sehingga
+tidak butuh koneksi database. Jalankan dari folder backend:
+
+    python bench_json_response.py [jumlah_baris] [ulangan]
+"""
+import gzip
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+
+from app.json_provider import FastJSONProvider, orjson
+from app.compression import brotli
+
+TEXT = "Keterlambatan pengiriman bahan baku dari pemasok utama akibat gangguan logistik regional. "
+
+
+def make_rows(count):
+    rng = random.Random(42)
+    base = date(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": i + 1,
+            "assessment_id": 7,
+            "kode_risiko": f"RM-{i + 1:04d}",
+            "status_risiko": rng.choice(["Risiko Aktif", "Risiko Baru", "Risiko Tidak Aktif"]),
+            "peluang_ancaman": rng.choice(["Ancaman", "Peluang"]),
+            "kategori_risiko": rng.choice(["Risiko Operasional", "Risiko Strategis", "Risiko Kepatuhan"]),
+            "unit_kerja": "Divisi Operasional",
+            "sasaran_id": rng.randint(1, 20),
+            "tanggal_identifikasi": base + timedelta(days=i % 365),
+            "deskripsi_risiko": TEXT * 2,
+            "akar_penyebab": TEXT,
+            "indikator_risiko": "Persentase keterlambatan > 10%",
+            "internal_control": "SOP pengadaan dan pemantauan vendor bulanan",
+            "deskripsi_dampak": TEXT,
+            "inherent_probabilitas": rng.randint(1, 5),
+            "inherent_dampak": rng.randint(1, 5),
+            "inherent_skor": rng.randint(1, 25),
+            "inherent_prob_kualitatif": Decimal(f"{rng.random():.4f}"),
+            "inherent_dampak_finansial": Decimal(f"{rng.uniform(1e6, 5e9):.2f}"),
+            "inherent_nilai_bersih": Decimal(f"{rng.uniform(1e5, 1e9):.2f}"),
+            "pemilik_risiko": "Kepala Divisi",
+            "jabatan_pemilik": "Manajer",
+            "kontak_pemilik_hp": "08123456789",
+            "kontak_pemilik_email": "pemilik@example.com",
+            "strategi": "Mitigasi",
+            "rencana_penanganan": TEXT,
+            "biaya_penanganan": Decimal(f"{rng.uniform(1e6, 1e8):.2f}"),
+            "penanganan_dilakukan": TEXT,
+            "status_penanganan": "Dalam Proses",
+            "jadwal_mulai_penanganan": base + timedelta(days=30),
+            "jadwal_selesai_penanganan": base + timedelta(days=120),
+            "pic_penanganan": "Tim Pengadaan",
+            "residual_probabilitas": rng.randint(1, 5),
+            "residual_dampak": rng.randint(1, 5),
+            "residual_skor": rng.randint(1, 25),
+            "residual_prob_kualitatif": Decimal(f"{rng.random():.4f}"),
+            "residual_dampak_finansial": Decimal(f"{rng.uniform(1e6, 5e9):.2f}"),
+            "residual_nilai_bersih": Decimal(f"{rng.uniform(1e5, 1e9):.2f}"),
+            "tanggal_review": datetime(2025, 6, 30, 9, 0),
+        })
+    return rows
+
+
+def legacy_format(row):
+    """Salinan logika konversi manual format_risk_input_entry sebelum JSON provider."""
+    entry = dict(row)
+    for field in ['tanggal_identifikasi', 'jadwal_mulai_penanganan', 'jadwal_selesai_penanganan', 'tanggal_review']:
+        entry[field] = entry[field].isoformat() if entry[field] else None
+    for field, value in row.items():
+        if isinstance(value, Decimal):
+            entry[field] = float(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            entry[field] = float(value) if '.' in str(value) else int(value)
+    return entry
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rows = make_rows(count)
+
+    app = Flask(__name__)
+    provider = FastJSONProvider(app)
+
+    before_time, before_body = timed(
+        lambda: json.dumps([legacy_format(r) for r in rows], separators=(',', ':')).encode('utf-8'), repeat)
+    after_time, after_body = timed(lambda: provider.dumps_bytes(rows), repeat)
+
+    print(f"Baris: {count}, ulangan: {repeat}, backend JSON: {provider.backend}")
+    print("\n-- Serialisasi (terbaik dari ulangan) --")
+    print(f"Sebelum (konversi manual + json)  : {before_time * 1000:8.1f} ms")
+    print(f"Sesudah (FastJSONProvider)        : {after_time * 1000:8.1f} ms  ({before_time / after_time:.1f}x)")
+
+    print("\n-- Ukuran payload --")
+    print(f"Mentah            : {len(after_body):>10,} byte")
+    gzipped = gzip.compress(after_body, compresslevel=6, mtime=0)
+    print(f"gzip (level 6)    : {len(gzipped):>10,} byte  ({len(gzipped) / len(after_body):.1%})")
+    if brotli is not None:
+        compressed = brotli.compress(after_body, quality=5)
+        print(f"brotli (quality 5): {len(compressed):>10,} byte  ({len(compressed) / len(after_body):.1%})")
+    else:
+        print("brotli            : modul brotli tidak terpasang")
+    if orjson is None:
+        print("\nCatatan: orjson tidak terpasang, FastJSONProvider memakai json standar.")
+    if len(before_body) != len(after_body):
+        print(f"\nCatatan: ukuran output berbeda ({len(before_body):,} vs {len(after_body):,} byte) karena escape non-ASCII.")
+
+
+if __name__ == '__main__':
+    main()
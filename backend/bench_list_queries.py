@@ -0,0 +1,222 @@
+"""
+Benchmark endpoint list riwayat: kolom yang ditransfer dari database dan latensi
+per panggilan, sebelum vs sesudah kolom berat dibuat deferred + proyeksi list.
+
+- Asesmen AI   : GET /assessments        (assessment_list_query di risk_ai)
+- Horizon Scan : GET /horizon/history    (scan_history_query di horizon)
+- QRC          : GET /qrc/my-history     (assessment_list_query di qrc)
+
+"Sebelum" memuat entity penuh (undefer semua grup, risk register lazy per asesmen)
+seperti perilaku lama. Byte dihitung dari nilai kolom yang dikembalikan setiap
+SELECT (perkiraan payload wire protocol). Default memakai SQLite in-memory; set
+BENCH_DATABASE_URL untuk mengukur ke PostgreSQL (tabel dibuat & dihapus lagi).
+Jalankan dari folder backend:
+
+    python bench_list_queries.py [jumlah_riwayat] [ulangan]
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import undefer_group
+
+from app import db
+from app.models import User, RiskAssessment, RiskRegister, HorizonScanResult, QrcAssessment
+from app.routes.risk_ai import assessment_list_query as ai_list_query
+from app.routes.horizon import scan_history_query
+from app.routes.qrc import assessment_list_query as qrc_list_query, assessment_summary
+
+TEXT = "Gangguan rantai pasok regional meningkatkan risiko keterlambatan proyek dan biaya tambahan. "
+
+
+def seed(count):
+    rng = random.Random(42)
+    user = User(email='bench@example.com', password_hash='x', nama_lengkap='Bench', institution='Bench Corp')
+    db.session.add(user)
+    db.session.flush()
+    base = datetime(2025, 1, 1)
+    for i in range(count):
+        assessment = RiskAssessment(
+            nama_asesmen=f"Asesmen {i + 1}", tanggal_mulai=date(2025, 1, 1) + timedelta(days=i % 365),
+            company_industry="Manufaktur", company_type="BUMN", currency="IDR", risk_limit=1e9,
+            risk_categories=json.dumps(["Operasional", "Keuangan"]),
+            project_objective=TEXT * 5, relevant_regulations=TEXT * 3, involved_departments="Operasional, Keuangan",
+            completed_actions=TEXT * 3, additional_risk_context=TEXT * 5,
+            ai_executive_summary=TEXT * 10, ai_risk_profile_analysis=json.dumps({"analisis": TEXT * 15}),
+            ai_immediate_priorities=json.dumps([TEXT * 2] * 5), ai_critical_risks_discussion=json.dumps([TEXT * 3] * 5),
+            ai_implementation_plan=json.dumps([TEXT * 2] * 6), ai_next_steps=TEXT * 4, user_id=user.id
+        )
+        db.session.add(assessment)
+        for j in range(5):
+            assessment.risk_register_entries.append(RiskRegister(
+                kode_risiko=f"AI-{i + 1}-{j + 1}", title=f"Risiko {j + 1}", objective=TEXT, risk_type="Operasional",
+                deskripsi_risiko=TEXT * 2, risk_causes=TEXT, risk_impacts=TEXT, existing_controls=TEXT,
+                control_effectiveness="Cukup", mitigation_plan=TEXT * 2,
+                inherent_likelihood=rng.randint(1, 5), inherent_impact=rng.randint(1, 5),
+                residual_likelihood=rng.randint(1, 5), residual_impact=rng.randint(1, 5)
+            ))
+        db.session.add(HorizonScanResult(
+            user_id=user.id, sector="Perbankan", generated_title=f"Scan {i + 1}",
+            executive_summary="<p>" + TEXT * 60 + "</p>",
+            raw_news_data=json.dumps([{"title": f"Berita {k}", "snippet": TEXT * 2, "link": f"https://example.com/{k}"}
+                                      for k in range(30)]),
+            created_at=base + timedelta(hours=i)
+        ))
+        db.session.add(QrcAssessment(
+            user_id=user.id, assessment_type=rng.choice(["standard", "essay"]), status="completed",
+            submission_date=base + timedelta(hours=i), risk_score=rng.uniform(0, 100), risk_level="Menengah",
+            answers_data={f"q{k}": TEXT if k % 2 else 10 for k in range(1, 21)},
+            consultant_notes=TEXT * 5, ai_generated_analysis=TEXT * 40, final_report_content=TEXT * 40
+        ))
+    db.session.commit()
+    return user.id
+
+
+# --- Perilaku lama (entity penuh) ---
+
+def ai_list_before(user_id):
+    assessments = RiskAssessment.query.options(undefer_group('context'), undefer_group('ai_analysis'))\
+        .filter_by(user_id=user_id).order_by(RiskAssessment.tanggal_mulai.desc()).all()
+    return [{
+        "id": a.id,
+        "nama_asesmen": a.nama_asesmen,
+        "tanggal_mulai": a.tanggal_mulai.isoformat(),
+        "tanggal_selesai": a.tanggal_selesai.isoformat() if a.tanggal_selesai else None,
+        "company_industry": a.company_industry,
+        "risks": [{"inherent_likelihood": r.inherent_likelihood, "inherent_impact": r.inherent_impact}
+                  for r in a.risk_register_entries]
+    } for a in assessments]
+
+
+def horizon_list_before(user_id):
+    history = HorizonScanResult.query.options(undefer_group('report'))\
+        .filter_by(user_id=user_id).order_by(HorizonScanResult.created_at.desc()).all()
+    return [{
+        "id": item.id, "title": item.generated_title, "sector": item.sector,
+        "created_at": item.created_at.isoformat(),
+        "summary_preview": item.executive_summary[:100] + "..." if item.executive_summary else ""
+    } for item in history]
+
+
+def qrc_list_before(user_id):
+    items = QrcAssessment.query.options(undefer_group('content'))\
+        .filter_by(user_id=user_id).order_by(QrcAssessment.submission_date.desc()).all()
+    return [item.to_dict() for item in items]
+
+
+# --- Sesudah (proyeksi list) ---
+
+def ai_list_after(user_id):
+    return [{
+        "id": a.id,
+        "nama_asesmen": a.nama_asesmen,
+        "tanggal_mulai": a.tanggal_mulai.isoformat(),
+        "tanggal_selesai": a.tanggal_selesai.isoformat() if a.tanggal_selesai else None,
+        "company_industry": a.company_industry,
+        "risks": [{"inherent_likelihood": r.inherent_likelihood, "inherent_impact": r.inherent_impact}
+                  for r in a.risk_register_entries]
+    } for a in ai_list_query(user_id).all()]
+
+
+def horizon_list_after(user_id):
+    return [{
+        "id": item.id, "title": item.generated_title, "sector": item.sector,
+        "created_at": item.created_at.isoformat(),
+        "summary_preview": item.summary_preview + "..." if item.summary_preview else ""
+    } for item in scan_history_query(user_id).all()]
+
+
+def qrc_list_after(user_id):
+    query = qrc_list_query().filter(QrcAssessment.user_id == user_id).order_by(QrcAssessment.submission_date.desc())
+    return [assessment_summary(row) for row in query.all()]
+
+
+def value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return len(str(value).encode('utf-8'))
+
+
+class QueryMeter:
+    """Mencatat setiap SELECT selama satu panggilan list lalu mengukur byte hasilnya."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def measure(self, fn, user_id):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        try:
+            fn(user_id)
+            db.session.rollback()
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', self._record)
+        total = 0
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for statement, parameters in self.statements:
+                cursor.execute(statement, parameters)
+                total += sum(value_size(v) for row in cursor.fetchall() for v in row)
+        finally:
+            raw.close()
+        return len(self.statements), total
+
+
+def timed(fn, user_id, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expire_all()
+        start = time.perf_counter()
+        fn(user_id)
+        elapsed = time.perf_counter() - start
+        db.session.rollback()
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('BENCH_DATABASE_URL', 'sqlite://')
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        try:
+            user_id = seed(count)
+            meter = QueryMeter(db.engine)
+            print(f"Riwayat per user: {count}, ulangan: {repeat}, database: {db.engine.dialect.name}")
+            cases = [
+                ("Asesmen AI", ai_list_before, ai_list_after),
+                ("Horizon Scan", horizon_list_before, horizon_list_after),
+                ("QRC", qrc_list_before, qrc_list_after),
+            ]
+            for name, before, after in cases:
+                before_queries, before_bytes = meter.measure(before, user_id)
+                after_queries, after_bytes = meter.measure(after, user_id)
+                before_time = timed(before, user_id, repeat)
+                after_time = timed(after, user_id, repeat)
+                print(f"\n-- {name} --")
+                print(f"Sebelum : {before_queries:>5} query  {before_bytes:>12,} byte  {before_time * 1000:8.1f} ms")
+                print(f"Sesudah : {after_queries:>5} query  {after_bytes:>12,} byte  {after_time * 1000:8.1f} ms"
+                      f"  ({before_bytes / max(after_bytes, 1):.0f}x lebih kecil, {before_time / after_time:.1f}x lebih cepat)")
+        finally:
+            db.session.rollback()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Profil waktu startup aplikasi dengan `python -X importtime`.
+
+Mengukur `create_app()` mode penuh (worker web) dan mode minimal (skrip/CLI:
+run_seeds.py, cleanup.py, `APP_MINIMAL=true flask db ...`) di proses baru,
+lalu menampilkan total waktu, modul top-level termahal, dan dependency berat
+yang ikut termuat. Jalankan dari folder backend:
+
+    python bench_startup.py [ulangan] [jumlah_modul_teratas]
+
+DATABASE_URL tidak wajib (default SQLite sementara; tidak ada koneksi yang dibuka).
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = [
+    'google.generativeai', 'openpyxl', 'bs4', 'deep_translator', 'requests',
+    'marshmallow', 'PIL.Image', 'alembic',
+]
+
+SNIPPET = "from app import create_app; create_app(minimal={minimal})"
+
+
+def run_once(minimal, importtime=True):
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'bench_startup.db'))
+    env.setdefault('SECRET_KEY', 'bench-startup')
+    args = [sys.executable]
+    if importtime:
+        args += ['-X', 'importtime']
+    args += ['-c', SNIPPET.format(minimal=minimal)]
+    start = time.perf_counter()
+    proc = subprocess.run(args, env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return elapsed, proc.stderr
+
+
+def parse_importtime(stderr):
+    """-> {modul: (self_us, cumulative_us, kedalaman)} dari output -X importtime."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, rest = line.split(':', 1)
+        self_us, cumulative_us, name = rest.split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def report(label, minimal, repeat, top):
+    wall = min(run_once(minimal, importtime=False)[0] for _ in range(repeat))
+    # Profil import dari ulangan tercepat (mengurangi noise cache disk)
+    runs = [parse_importtime(run_once(minimal)[1]) for _ in range(repeat)]
+    totals = [sum(self_us for self_us, _, _ in modules.values()) for modules in runs]
+    total_import = min(totals)
+    modules = runs[totals.index(total_import)]
+
+    print(f"\n== {label} ==")
+    print(f"Proses (python + create_app, terbaik dari {repeat}): {wall * 1000:8.0f} ms")
+    print(f"Total waktu import                                : {total_import / 1000:8.0f} ms ({len(modules)} modul)")
+    print(f"\nModul top-level termahal (kumulatif):")
+    roots = sorted(((cum, name) for name, (_, cum, depth) in modules.items() if depth == 0), reverse=True)
+    for cumulative_us, name in roots[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    print(f"\nDependency berat termuat: {', '.join(loaded) if loaded else '-'}")
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    report("Mode penuh (worker web)", False, repeat, top)
+    report("Mode minimal (skrip / CLI)", True, repeat, top)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 from app import create_app, db
 from app.models import RiskMapTemplate
 
-app = create_app()
+app = create_app(minimal=True)
 
 with app.app_context():
     print("Mencari template default yang lama...")
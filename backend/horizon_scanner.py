@@ -1,9 +1,8 @@
 # backend/horizon_scanner.py
-import requests
-from bs4 import BeautifulSoup
+# requests / BeautifulSoup / deep_translator diimpor di dalam fungsi scraping:
+# modul ini ikut dimuat saat startup (SECTOR_KEYWORDS) tanpa biaya import tersebut.
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from deep_translator import GoogleTranslator
 import urllib.parse
 import os
 
@@ -45,6 +44,7 @@ DEFAULT_KEYWORDS = ["bisnis", "ekonomi", "risiko usaha"]
 
 def translate_text(text, target_lang='id'):
     """Menerjemahkan teks ke Bahasa Indonesia."""
+    from deep_translator import GoogleTranslator
     try:
         return GoogleTranslator(source='auto', target=target_lang).translate(text[:1000]) 
     except Exception as e:
@@ -76,6 +76,8 @@ class NewsScraper:
         Fungsi Generik untuk mengambil berita via Google News RSS.
         Metode ini jauh lebih stabil & cepat daripada scraping HTML website langsung.
         """
+        import requests
+        from bs4 import BeautifulSoup
         results = []
         try:
             # Query format: "site:namamedia.com keyword"
@@ -0,0 +1,34 @@
+"""Create horizon sector briefings table
+
+Revision ID: 2f6b8d0a94e1
+Revises: c9a1d47e5b06
+Create Date: 2026-10-19 17:58:26.731904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f6b8d0a94e1'
+down_revision = 'c9a1d47e5b06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('horizon_sector_briefings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sector', sa.String(length=100), nullable=False),
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=True),
+    sa.Column('report_html', sa.Text(), nullable=False),
+    sa.Column('news_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sector', 'window_start', name='uq_horizon_briefing_sector_window')
+    )
+
+
+def downgrade():
+    op.drop_table('horizon_sector_briefings')
@@ -0,0 +1,136 @@
+"""Shared versioned madya criteria sets with copy-on-write overrides
+
+Revision ID: 4a7d2c9e1f38
+Revises: 8e3c1a5f7d24
+Create Date: 2026-10-19 19:12:41.550318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a7d2c9e1f38'
+down_revision = '8e3c1a5f7d24'
+branch_labels = None
+depends_on = None
+
+IMPACT_FIELDS = [
+    'kriteriaDampak', 'rangeFinansial', 'deskripsiDampak1', 'stra_dampak', 'hukum_pelanggaran',
+    'kepat_pelanggaran', 'reput_keluhan', 'reput_berita', 'reput_saing', 'sdm_keluhan',
+    'sdm_turnover', 'sdm_regretted_turnover', 'sistem_gangguan', 'sistem_siber',
+    'sistem_platform', 'ops_sla', 'hsse_fatality_1', 'hsse_fatality_2', 'hsse_fatality_3',
+    'hsse_kerusakan_lingkungan', 'hsse_penurunan_esg', 'pmn_tunda', 'bank_fraud',
+    'asuransi_aset_rating', 'asuransi_aset_peringkat', 'aktu_rasio'
+]
+
+
+def upgrade():
+    op.create_table('madya_criteria_sets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('checksum', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('checksum'),
+    sa.UniqueConstraint('name', 'version', name='uq_madya_criteria_set_version')
+    )
+    op.create_table('madya_criteria_set_probability',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('set_id', sa.Integer(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('parameter', sa.String(length=255), nullable=True),
+    sa.Column('kemungkinan', sa.Text(), nullable=True),
+    sa.Column('frekuensi', sa.Text(), nullable=True),
+    sa.Column('persentase', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['set_id'], ['madya_criteria_sets.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('madya_criteria_set_probability', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_madya_criteria_set_probability_set_id'), ['set_id'], unique=False)
+
+    op.create_table('madya_criteria_set_impact',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('set_id', sa.Integer(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('kriteriaDampak', sa.String(length=255), nullable=True),
+    sa.Column('rangeFinansial', sa.Text(), nullable=True),
+    sa.Column('deskripsiDampak1', sa.Text(), nullable=True),
+    sa.Column('stra_dampak', sa.Text(), nullable=True),
+    sa.Column('hukum_pelanggaran', sa.Text(), nullable=True),
+    sa.Column('kepat_pelanggaran', sa.Text(), nullable=True),
+    sa.Column('reput_keluhan', sa.Text(), nullable=True),
+    sa.Column('reput_berita', sa.Text(), nullable=True),
+    sa.Column('reput_saing', sa.Text(), nullable=True),
+    sa.Column('sdm_keluhan', sa.Text(), nullable=True),
+    sa.Column('sdm_turnover', sa.Text(), nullable=True),
+    sa.Column('sdm_regretted_turnover', sa.Text(), nullable=True),
+    sa.Column('sistem_gangguan', sa.Text(), nullable=True),
+    sa.Column('sistem_siber', sa.Text(), nullable=True),
+    sa.Column('sistem_platform', sa.Text(), nullable=True),
+    sa.Column('ops_sla', sa.Text(), nullable=True),
+    sa.Column('hsse_fatality_1', sa.Text(), nullable=True),
+    sa.Column('hsse_fatality_2', sa.Text(), nullable=True),
+    sa.Column('hsse_fatality_3', sa.Text(), nullable=True),
+    sa.Column('hsse_kerusakan_lingkungan', sa.Text(), nullable=True),
+    sa.Column('hsse_penurunan_esg', sa.Text(), nullable=True),
+    sa.Column('pmn_tunda', sa.Text(), nullable=True),
+    sa.Column('bank_fraud', sa.Text(), nullable=True),
+    sa.Column('asuransi_aset_rating', sa.Text(), nullable=True),
+    sa.Column('asuransi_aset_peringkat', sa.Text(), nullable=True),
+    sa.Column('aktu_rasio', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['set_id'], ['madya_criteria_sets.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('madya_criteria_set_impact', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_madya_criteria_set_impact_set_id'), ['set_id'], unique=False)
+
+    with op.batch_alter_table('madya_assessments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('criteria_set_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_madya_assessments_criteria_set_id', 'madya_criteria_sets', ['criteria_set_id'], ['id'])
+
+    # Asesmen lama tetap memakai salinan lengkapnya (criteria_set_id NULL)
+    with op.batch_alter_table('madya_criteria_probability', schema=None) as batch_op:
+        batch_op.create_index('ix_madya_criteria_probability_assessment_level', ['assessment_id', 'level'], unique=False)
+
+    with op.batch_alter_table('madya_criteria_impact', schema=None) as batch_op:
+        batch_op.create_index('ix_madya_criteria_impact_assessment_level', ['assessment_id', 'level'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('madya_criteria_impact', schema=None) as batch_op:
+        batch_op.drop_index('ix_madya_criteria_impact_assessment_level')
+
+    with op.batch_alter_table('madya_criteria_probability', schema=None) as batch_op:
+        batch_op.drop_index('ix_madya_criteria_probability_assessment_level')
+
+    # Materialisasi kembali level yang belum di-override dari set bersama
+    bind = op.get_bind()
+    for table, fields in (
+        ('madya_criteria_probability', ['parameter', 'kemungkinan', 'frekuensi', 'persentase']),
+        ('madya_criteria_impact', IMPACT_FIELDS),
+    ):
+        set_table = table.replace('madya_criteria_', 'madya_criteria_set_')
+        columns = ', '.join(['level'] + [f'"{name}"' for name in fields])
+        set_columns = ', '.join(['s.level'] + [f's."{name}"' for name in fields])
+        bind.execute(sa.text(
+            f'INSERT INTO {table} (assessment_id, {columns}) '
+            f'SELECT a.id, {set_columns} FROM madya_assessments a '
+            f'JOIN {set_table} s ON s.set_id = a.criteria_set_id '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {table} o WHERE o.assessment_id = a.id AND o.level = s.level)'
+        ))
+
+    with op.batch_alter_table('madya_assessments', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_madya_assessments_criteria_set_id', type_='foreignkey')
+        batch_op.drop_column('criteria_set_id')
+
+    with op.batch_alter_table('madya_criteria_set_impact', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_madya_criteria_set_impact_set_id'))
+
+    op.drop_table('madya_criteria_set_impact')
+    with op.batch_alter_table('madya_criteria_set_probability', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_madya_criteria_set_probability_set_id'))
+
+    op.drop_table('madya_criteria_set_probability')
+    op.drop_table('madya_criteria_sets')
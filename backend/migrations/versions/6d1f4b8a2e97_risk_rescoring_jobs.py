@@ -0,0 +1,48 @@
+"""Risk rescoring jobs
+
+Revision ID: 6d1f4b8a2e97
+Revises: b3e9f1a6c852
+Create Date: 2026-10-19 20:12:41.305517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d1f4b8a2e97'
+down_revision = 'b3e9f1a6c852'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('risk_rescoring_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('version_id', sa.Integer(), nullable=False),
+    sa.Column('assessment_ids', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_inputs', sa.Integer(), nullable=True),
+    sa.Column('processed_inputs', sa.Integer(), nullable=False),
+    sa.Column('updated_inputs', sa.Integer(), nullable=False),
+    sa.Column('updated_sasaran', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['risk_map_templates.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['version_id'], ['risk_map_template_versions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('risk_rescoring_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_risk_rescoring_jobs_template_id'), ['template_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('risk_rescoring_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_risk_rescoring_jobs_template_id'))
+
+    op.drop_table('risk_rescoring_jobs')
@@ -0,0 +1,53 @@
+"""Add tenant composite indexes
+
+Revision ID: 7d2e4b91a6c3
+Revises: 3b7c5e19d4a8
+Create Date: 2026-10-19 16:05:12.447820
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e4b91a6c3'
+down_revision = '3b7c5e19d4a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Index komposit (institution, ...) agar filter tenant tidak memindai seluruh tabel
+    with op.batch_alter_table('rsca_cycles', schema=None) as batch_op:
+        batch_op.create_index('ix_rsca_cycles_institution_status', ['institution', 'status'], unique=False)
+
+    with op.batch_alter_table('submitted_risks', schema=None) as batch_op:
+        batch_op.create_index('ix_submitted_risks_institution_status', ['institution', 'status'], unique=False)
+        batch_op.create_index('ix_submitted_risks_institution_cycle', ['institution', 'cycle_id'], unique=False)
+
+    with op.batch_alter_table('action_plans', schema=None) as batch_op:
+        batch_op.create_index('ix_action_plans_institution_department', ['institution', 'assigned_department_id'], unique=False)
+
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.create_index('ix_departments_institution_name', ['institution', 'name'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_institution_department', ['institution', 'department_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_institution_department')
+
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.drop_index('ix_departments_institution_name')
+
+    with op.batch_alter_table('action_plans', schema=None) as batch_op:
+        batch_op.drop_index('ix_action_plans_institution_department')
+
+    with op.batch_alter_table('submitted_risks', schema=None) as batch_op:
+        batch_op.drop_index('ix_submitted_risks_institution_cycle')
+        batch_op.drop_index('ix_submitted_risks_institution_status')
+
+    with op.batch_alter_table('rsca_cycles', schema=None) as batch_op:
+        batch_op.drop_index('ix_rsca_cycles_institution_status')
@@ -0,0 +1,212 @@
+"""Normalize horizon scan articles and compress raw news blobs
+
+Revision ID: 8e3c1a5f7d24
+Revises: 2f6b8d0a94e1
+Create Date: 2026-10-19 18:34:57.208113
+
+"""
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3c1a5f7d24'
+down_revision = '2f6b8d0a94e1'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+entries = sa.table('horizon_scan_entries',
+    sa.column('id', sa.Integer),
+    sa.column('title', sa.String),
+    sa.column('source_url', sa.String),
+    sa.column('url_hash', sa.String),
+    sa.column('published_date', sa.DateTime),
+    sa.column('original_summary', sa.Text),
+    sa.column('source_name', sa.String),
+    sa.column('original_title', sa.String),
+    sa.column('language', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('last_seen_at', sa.DateTime),
+)
+results = sa.table('horizon_scan_results',
+    sa.column('id', sa.Integer),
+    sa.column('raw_news_data', sa.Text),
+    sa.column('raw_news_blob', sa.LargeBinary),
+)
+articles = sa.table('horizon_scan_articles',
+    sa.column('scan_id', sa.Integer),
+    sa.column('entry_id', sa.Integer),
+    sa.column('position', sa.Integer),
+)
+
+
+def _url_hash(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _parse_published(value):
+    try:
+        parsed = parsedate_to_datetime(value)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    except (TypeError, ValueError, IndexError):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return datetime.utcnow()
+
+
+def _table_bytes(bind, table_name):
+    if bind.dialect.name == 'postgresql':
+        return bind.execute(sa.text("SELECT pg_total_relation_size(:t)"), {"t": table_name}).scalar() or 0
+    return None
+
+
+def _backfill(bind):
+    # 1. Hash URL untuk artikel yang sudah ada
+    rows = bind.execute(sa.select(entries.c.id, entries.c.source_url).where(entries.c.url_hash.is_(None))).all()
+    if rows:
+        bind.execute(
+            entries.update().where(entries.c.id == sa.bindparam('_id')).values(url_hash=sa.bindparam('_hash')),
+            [{"_id": row.id, "_hash": _url_hash(row.source_url)} for row in rows]
+        )
+
+    known = {row.url_hash: row.id for row in bind.execute(sa.select(entries.c.id, entries.c.url_hash)).all()}
+    text_bytes_before = 0
+    blob_bytes_after = 0
+    migrated = 0
+    last_id = 0
+
+    # 2. Pecah raw_news_data per scan menjadi referensi artikel (per batch agar memori tetap kecil)
+    while True:
+        batch = bind.execute(
+            sa.select(results.c.id, results.c.raw_news_data)
+            .where(results.c.id > last_id, results.c.raw_news_data.isnot(None))
+            .order_by(results.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+
+        for scan in batch:
+            last_id = scan.id
+            text_bytes_before += len(scan.raw_news_data.encode('utf-8'))
+            try:
+                news = json.loads(scan.raw_news_data) or []
+            except ValueError:
+                news = []
+
+            links, leftovers, seen = [], [], set()
+            now = datetime.utcnow()
+            for position, item in enumerate(news if isinstance(news, list) else []):
+                url = (item.get('url') or '').strip() if isinstance(item, dict) else ''
+                if not url or url == '#' or len(url) > 500:
+                    leftovers.append(item)
+                    continue
+                digest = _url_hash(url)
+                if digest not in known:
+                    known[digest] = bind.execute(entries.insert().values(
+                        title=(item.get('title') or 'No Title')[:300],
+                        source_url=url,
+                        url_hash=digest,
+                        published_date=_parse_published(item.get('published_at')),
+                        original_summary=item.get('summary') or '',
+                        source_name=(item.get('source') or '')[:150] or None,
+                        original_title=(item.get('original_title') or '')[:300] or None,
+                        language=item.get('language'),
+                        created_at=now,
+                        last_seen_at=now,
+                    ).returning(entries.c.id)).scalar()
+                entry_id = known[digest]
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    links.append({"scan_id": scan.id, "entry_id": entry_id, "position": position})
+
+            if links:
+                bind.execute(articles.insert(), links)
+            blob = gzip.compress(json.dumps(leftovers, ensure_ascii=False, separators=(',', ':')).encode('utf-8')) if leftovers else None
+            blob_bytes_after += len(blob or b'')
+            bind.execute(results.update().where(results.c.id == scan.id).values(raw_news_data=None, raw_news_blob=blob))
+            migrated += 1
+
+    return migrated, text_bytes_before, blob_bytes_after
+
+
+def upgrade():
+    bind = op.get_bind()
+    size_before = _table_bytes(bind, 'horizon_scan_results')
+
+    with op.batch_alter_table('horizon_scan_entries', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('url_hash', sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table('horizon_scan_results', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('raw_news_blob', sa.LargeBinary(), nullable=True))
+
+    op.create_table('horizon_scan_articles',
+    sa.Column('scan_id', sa.Integer(), nullable=False),
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['entry_id'], ['horizon_scan_entries.id'], ),
+    sa.ForeignKeyConstraint(['scan_id'], ['horizon_scan_results.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('scan_id', 'entry_id')
+    )
+    with op.batch_alter_table('horizon_scan_articles', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_horizon_scan_articles_entry_id'), ['entry_id'], unique=False)
+
+    migrated, text_bytes, blob_bytes = _backfill(bind)
+
+    with op.batch_alter_table('horizon_scan_entries', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_horizon_scan_entries_url_hash', ['url_hash'])
+
+    # Laporan pengurangan ukuran
+    print(f"[horizon] {migrated} scan di-backfill: raw_news_data {text_bytes:,} byte -> blob sisa {blob_bytes:,} byte")
+    if size_before is not None:
+        # Ruang baris lama baru kembali setelah VACUUM (tidak bisa dijalankan di dalam transaksi migrasi)
+        print(f"[horizon] horizon_scan_results: {size_before:,} byte sebelum, "
+              f"{_table_bytes(bind, 'horizon_scan_results'):,} byte sesudah backfill (sebelum VACUUM); "
+              f"horizon_scan_articles: {_table_bytes(bind, 'horizon_scan_articles'):,} byte")
+
+
+def downgrade():
+    bind = op.get_bind()
+    # Kembalikan JSON polos per scan sebelum tabel referensi dihapus
+    scan_ids = [row.id for row in bind.execute(sa.select(results.c.id)).all()]
+    for scan_id in scan_ids:
+        rows = bind.execute(
+            sa.select(entries, articles.c.position)
+            .select_from(articles.join(entries, entries.c.id == articles.c.entry_id))
+            .where(articles.c.scan_id == scan_id).order_by(articles.c.position)
+        ).all()
+        blob = bind.execute(sa.select(results.c.raw_news_blob).where(results.c.id == scan_id)).scalar()
+        news = [{
+            "source": row.source_name, "title": row.title, "original_title": row.original_title,
+            "url": row.source_url, "image": None, "summary": row.original_summary,
+            "published_at": row.published_date.isoformat() if row.published_date else None,
+            "language": row.language or "id",
+        } for row in rows]
+        if blob and bytes(blob).startswith(b'\x1f\x8b'):  # Blob zstd (runtime) tidak bisa dipulihkan di sini
+            news.extend(json.loads(gzip.decompress(bytes(blob)).decode('utf-8')))
+        if news:
+            bind.execute(results.update().where(results.c.id == scan_id).values(raw_news_data=json.dumps(news)))
+
+    with op.batch_alter_table('horizon_scan_entries', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_horizon_scan_entries_url_hash', type_='unique')
+
+    with op.batch_alter_table('horizon_scan_articles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_horizon_scan_articles_entry_id'))
+
+    op.drop_table('horizon_scan_articles')
+
+    with op.batch_alter_table('horizon_scan_results', schema=None) as batch_op:
+        batch_op.drop_column('raw_news_blob')
+
+    with op.batch_alter_table('horizon_scan_entries', schema=None) as batch_op:
+        batch_op.drop_column('url_hash')
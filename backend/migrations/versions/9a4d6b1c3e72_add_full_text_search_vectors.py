@@ -0,0 +1,58 @@
+"""Add full text search vectors
+
+Revision ID: 9a4d6b1c3e72
+Revises: 5c1e8a7d2f90
+Create Date: 2026-10-19 11:40:05.227913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4d6b1c3e72'
+down_revision = '5c1e8a7d2f90'
+branch_labels = None
+depends_on = None
+
+# tabel -> [(bobot, kolom)], harus sejalan dengan SEARCH_SOURCES di app/search.py
+SEARCH_VECTORS = {
+    'regulations': [('A', 'name'), ('B', 'description')],
+    'main_risk_register': [('A', 'title'), ('A', 'kode_risiko'), ('B', 'deskripsi_risiko'), ('B', 'objective'),
+                           ('C', 'risk_causes'), ('C', 'risk_impacts'), ('C', 'mitigation_plan')],
+    'risk_input_madya': [('A', 'kode_risiko'), ('A', 'deskripsi_risiko'), ('B', 'akar_penyebab'),
+                         ('B', 'deskripsi_dampak'), ('C', 'internal_control'), ('C', 'rencana_penanganan')],
+    'bpr_risks': [('A', 'risk_code'), ('A', 'risk_description'), ('B', 'risk_cause'),
+                  ('B', 'risk_impact'), ('C', 'existing_control')],
+    'submitted_risks': [('A', 'risk_description'), ('B', 'potential_cause'), ('B', 'potential_impact')],
+}
+
+
+def _vector_expression(fields):
+    return ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce({column}, '')), '{weight}')"
+        for weight, column in fields
+    )
+
+
+def upgrade():
+    # tsvector + GIN hanya untuk PostgreSQL; SQLite memakai FTS5 yang dibuat saat runtime
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table_name, fields in SEARCH_VECTORS.items():
+        op.execute(
+            f"ALTER TABLE {table_name} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS ({_vector_expression(fields)}) STORED"
+        )
+        op.create_index(f'ix_{table_name}_search_vector', table_name, ['search_vector'],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table_name in SEARCH_VECTORS:
+        op.drop_index(f'ix_{table_name}_search_vector', table_name=table_name)
+        op.drop_column(table_name, 'search_vector')
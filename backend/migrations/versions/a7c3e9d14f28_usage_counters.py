@@ -0,0 +1,50 @@
+"""Atomic per-user quota counters
+
+Revision ID: a7c3e9d14f28
+Revises: e58c2a4f9b61
+Create Date: 2026-10-19 21:12:47.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d14f28'
+down_revision = 'e58c2a4f9b61'
+branch_labels = None
+depends_on = None
+
+# resource -> (tabel, filter tambahan) sesuai definisi di app.quota
+BACKFILL = {
+    'dasar': ('basic_assessments', ''),
+    'madya': ('madya_assessments', ''),
+    'ai': ('risk_assessments', ''),
+    'template_peta': ('risk_map_templates', 'AND is_default = false'),
+    'horizon': ('horizon_scan_results', ''),
+    'qrc_standard': ('qrc_assessments', "AND COALESCE(assessment_type, 'standard') <> 'essay'"),
+    'qrc_essay': ('qrc_assessments', "AND assessment_type = 'essay'"),
+}
+
+
+def upgrade():
+    op.create_table('usage_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=50), nullable=False),
+    sa.Column('used', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'resource')
+    )
+
+    # Pemakaian awal = jumlah data yang sudah ada (sama seperti hasil COUNT lama)
+    for resource, (table_name, extra_filter) in BACKFILL.items():
+        op.execute(
+            f"INSERT INTO usage_counters (user_id, resource, used, updated_at) "
+            f"SELECT user_id, '{resource}', COUNT(*), CURRENT_TIMESTAMP FROM {table_name} "
+            f"WHERE user_id IS NOT NULL {extra_filter} GROUP BY user_id"
+        )
+
+
+def downgrade():
+    op.drop_table('usage_counters')
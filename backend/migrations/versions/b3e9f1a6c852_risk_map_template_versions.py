@@ -0,0 +1,127 @@
+"""Immutable risk map template versions pinned by madya assessments
+
+Revision ID: b3e9f1a6c852
+Revises: 4a7d2c9e1f38
+Create Date: 2026-10-19 19:47:08.913240
+
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e9f1a6c852'
+down_revision = '4a7d2c9e1f38'
+branch_labels = None
+depends_on = None
+
+MATRIX_SIZE = 5
+
+templates = sa.table('risk_map_templates',
+    sa.column('id', sa.Integer),
+    sa.column('current_version', sa.Integer),
+)
+versions = sa.table('risk_map_template_versions',
+    sa.column('id', sa.Integer),
+    sa.column('template_id', sa.Integer),
+    sa.column('version', sa.Integer),
+    sa.column('likelihood_labels', sa.JSON),
+    sa.column('impact_labels', sa.JSON),
+    sa.column('level_definitions', sa.JSON),
+    sa.column('score_matrix', sa.JSON),
+    sa.column('checksum', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+assessments = sa.table('madya_assessments',
+    sa.column('id', sa.Integer),
+    sa.column('risk_map_template_id', sa.Integer),
+    sa.column('risk_map_version_id', sa.Integer),
+)
+
+
+def _template_content(bind, template_id):
+    likelihood = [{"level": r.level, "label": r.label} for r in bind.execute(sa.text(
+        "SELECT level, label FROM risk_map_likelihood_labels WHERE template_id = :t ORDER BY level"), {"t": template_id})]
+    impact = [{"level": r.level, "label": r.label} for r in bind.execute(sa.text(
+        "SELECT level, label FROM risk_map_impact_labels WHERE template_id = :t ORDER BY level"), {"t": template_id})]
+    definitions = [{
+        "level_name": r.level_name, "color_hex": r.color_hex, "min_score": r.min_score, "max_score": r.max_score
+    } for r in bind.execute(sa.text(
+        "SELECT level_name, color_hex, min_score, max_score FROM risk_map_level_definitions "
+        "WHERE template_id = :t ORDER BY id"), {"t": template_id})]
+    scores = bind.execute(sa.text(
+        "SELECT likelihood_level, impact_level, score FROM risk_map_scores WHERE template_id = :t"), {"t": template_id}).all()
+
+    rows = max([MATRIX_SIZE] + [l['level'] for l in likelihood] + [s.likelihood_level for s in scores])
+    cols = max([MATRIX_SIZE] + [i['level'] for i in impact] + [s.impact_level for s in scores])
+    matrix = [[None] * cols for _ in range(rows)]
+    for s in scores:
+        if s.likelihood_level >= 1 and s.impact_level >= 1:
+            matrix[s.likelihood_level - 1][s.impact_level - 1] = s.score
+    return {
+        "likelihood_labels": likelihood,
+        "impact_labels": impact,
+        "level_definitions": definitions,
+        "score_matrix": matrix,
+    }
+
+
+def upgrade():
+    op.create_table('risk_map_template_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('likelihood_labels', sa.JSON(), nullable=False),
+    sa.Column('impact_labels', sa.JSON(), nullable=False),
+    sa.Column('level_definitions', sa.JSON(), nullable=False),
+    sa.Column('score_matrix', sa.JSON(), nullable=False),
+    sa.Column('checksum', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['risk_map_templates.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('template_id', 'version', name='uq_risk_map_template_version')
+    )
+    with op.batch_alter_table('risk_map_template_versions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_risk_map_template_versions_template_id'), ['template_id'], unique=False)
+
+    with op.batch_alter_table('risk_map_templates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_version', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('madya_assessments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('risk_map_version_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('risk_map_auto_upgrade', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.create_foreign_key('fk_madya_assessments_risk_map_version_id', 'risk_map_template_versions', ['risk_map_version_id'], ['id'])
+
+    # Versi 1 untuk setiap template dari tabel anak, lalu pasang asesmen yang memakainya
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    for template_id in [row.id for row in bind.execute(sa.select(templates.c.id)).all()]:
+        content = _template_content(bind, template_id)
+        checksum = hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')).hexdigest()
+        version_id = bind.execute(versions.insert().values(
+            template_id=template_id, version=1, checksum=checksum, created_at=now, **content
+        ).returning(versions.c.id)).scalar()
+        bind.execute(templates.update().where(templates.c.id == template_id).values(current_version=1))
+        bind.execute(assessments.update().where(assessments.c.risk_map_template_id == template_id)
+                     .values(risk_map_version_id=version_id))
+
+
+def downgrade():
+    with op.batch_alter_table('madya_assessments', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_madya_assessments_risk_map_version_id', type_='foreignkey')
+        batch_op.drop_column('risk_map_auto_upgrade')
+        batch_op.drop_column('risk_map_version_id')
+
+    with op.batch_alter_table('risk_map_templates', schema=None) as batch_op:
+        batch_op.drop_column('current_version')
+
+    with op.batch_alter_table('risk_map_template_versions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_risk_map_template_versions_template_id'))
+
+    op.drop_table('risk_map_template_versions')
@@ -0,0 +1,28 @@
+"""Add qrc assessment statistics indexes
+
+Revision ID: b58f0e3c21d7
+Revises: 7d2e4b91a6c3
+Create Date: 2026-10-19 16:48:03.519274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b58f0e3c21d7'
+down_revision = '7d2e4b91a6c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('qrc_assessments', schema=None) as batch_op:
+        batch_op.create_index('ix_qrc_assessments_user_type', ['user_id', 'assessment_type'], unique=False)
+        batch_op.create_index('ix_qrc_assessments_status_type_archived', ['status', 'assessment_type', 'is_archived'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('qrc_assessments', schema=None) as batch_op:
+        batch_op.drop_index('ix_qrc_assessments_status_type_archived')
+        batch_op.drop_index('ix_qrc_assessments_user_type')
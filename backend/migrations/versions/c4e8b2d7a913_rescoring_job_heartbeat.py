@@ -0,0 +1,31 @@
+"""Heartbeat column for rescoring jobs
+
+Revision ID: c4e8b2d7a913
+Revises: a7c3e9d14f28
+Create Date: 2026-10-20 09:14:05.512730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8b2d7a913'
+down_revision = 'a7c3e9d14f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('risk_rescoring_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_risk_rescoring_jobs_status', ['status'], unique=False)
+
+    # Job yang sedang 'running' saat migrasi dianggap terakhir hidup saat mulai
+    op.execute("UPDATE risk_rescoring_jobs SET heartbeat_at = started_at WHERE status = 'running'")
+
+
+def downgrade():
+    with op.batch_alter_table('risk_rescoring_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_risk_rescoring_jobs_status')
+        batch_op.drop_column('heartbeat_at')
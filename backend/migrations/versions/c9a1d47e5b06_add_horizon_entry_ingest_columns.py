@@ -0,0 +1,36 @@
+"""Add horizon entry ingest columns
+
+Revision ID: c9a1d47e5b06
+Revises: b58f0e3c21d7
+Create Date: 2026-10-19 17:20:41.063158
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9a1d47e5b06'
+down_revision = 'b58f0e3c21d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('horizon_scan_entries', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sector', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('source_name', sa.String(length=150), nullable=True))
+        batch_op.add_column(sa.Column('original_title', sa.String(length=300), nullable=True))
+        batch_op.add_column(sa.Column('language', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_horizon_scan_entries_sector_seen', ['sector', 'last_seen_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('horizon_scan_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_horizon_scan_entries_sector_seen')
+        batch_op.drop_column('last_seen_at')
+        batch_op.drop_column('language')
+        batch_op.drop_column('original_title')
+        batch_op.drop_column('source_name')
+        batch_op.drop_column('sector')
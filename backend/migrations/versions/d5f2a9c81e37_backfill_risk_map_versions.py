@@ -0,0 +1,103 @@
+"""Backfill risk map versions for templates and assessments created without one
+
+Revision ID: d5f2a9c81e37
+Revises: c4e8b2d7a913
+Create Date: 2026-10-20 13:02:41.208315
+
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f2a9c81e37'
+down_revision = 'c4e8b2d7a913'
+branch_labels = None
+depends_on = None
+
+MATRIX_SIZE = 5
+
+templates = sa.table('risk_map_templates',
+    sa.column('id', sa.Integer),
+    sa.column('current_version', sa.Integer),
+)
+versions = sa.table('risk_map_template_versions',
+    sa.column('id', sa.Integer),
+    sa.column('template_id', sa.Integer),
+    sa.column('version', sa.Integer),
+    sa.column('likelihood_labels', sa.JSON),
+    sa.column('impact_labels', sa.JSON),
+    sa.column('level_definitions', sa.JSON),
+    sa.column('score_matrix', sa.JSON),
+    sa.column('checksum', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+assessments = sa.table('madya_assessments',
+    sa.column('id', sa.Integer),
+    sa.column('risk_map_template_id', sa.Integer),
+    sa.column('risk_map_version_id', sa.Integer),
+)
+
+
+def _template_content(bind, template_id):
+    likelihood = [{"level": r.level, "label": r.label} for r in bind.execute(sa.text(
+        "SELECT level, label FROM risk_map_likelihood_labels WHERE template_id = :t ORDER BY level"), {"t": template_id})]
+    impact = [{"level": r.level, "label": r.label} for r in bind.execute(sa.text(
+        "SELECT level, label FROM risk_map_impact_labels WHERE template_id = :t ORDER BY level"), {"t": template_id})]
+    definitions = [{
+        "level_name": r.level_name, "color_hex": r.color_hex, "min_score": r.min_score, "max_score": r.max_score
+    } for r in bind.execute(sa.text(
+        "SELECT level_name, color_hex, min_score, max_score FROM risk_map_level_definitions "
+        "WHERE template_id = :t ORDER BY id"), {"t": template_id})]
+    scores = bind.execute(sa.text(
+        "SELECT likelihood_level, impact_level, score FROM risk_map_scores WHERE template_id = :t"), {"t": template_id}).all()
+
+    rows = max([MATRIX_SIZE] + [l['level'] for l in likelihood] + [s.likelihood_level for s in scores])
+    cols = max([MATRIX_SIZE] + [i['level'] for i in impact] + [s.impact_level for s in scores])
+    matrix = [[None] * cols for _ in range(rows)]
+    for s in scores:
+        if s.likelihood_level >= 1 and s.impact_level >= 1:
+            matrix[s.likelihood_level - 1][s.impact_level - 1] = s.score
+    return {
+        "likelihood_labels": likelihood,
+        "impact_labels": impact,
+        "level_definitions": definitions,
+        "score_matrix": matrix,
+    }
+
+
+def upgrade():
+    # Template yang dibuat seed setelah b3e9f1a6c852 belum punya versi; dulu versi 1
+    # dibuat lazily oleh endpoint GET. Sekarang endpoint baca tidak menulis lagi.
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    pending = bind.execute(sa.select(templates.c.id).where(templates.c.current_version.is_(None))).all()
+    for template_id in [row.id for row in pending]:
+        content = _template_content(bind, template_id)
+        checksum = hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')).hexdigest()
+        latest = bind.execute(sa.select(sa.func.max(versions.c.version))
+                              .where(versions.c.template_id == template_id)).scalar() or 0
+        bind.execute(versions.insert().values(
+            template_id=template_id, version=latest + 1, checksum=checksum, created_at=now, **content
+        ))
+        bind.execute(templates.update().where(templates.c.id == template_id).values(current_version=latest + 1))
+
+    # Asesmen lama tanpa versi dipasang ke versi aktif templatenya
+    current_version_id = sa.select(versions.c.id).where(
+        versions.c.template_id == assessments.c.risk_map_template_id,
+        versions.c.version == sa.select(templates.c.current_version)
+        .where(templates.c.id == assessments.c.risk_map_template_id).scalar_subquery()
+    ).scalar_subquery()
+    bind.execute(assessments.update().where(
+        assessments.c.risk_map_template_id.isnot(None),
+        assessments.c.risk_map_version_id.is_(None)
+    ).values(risk_map_version_id=current_version_id))
+
+
+def downgrade():
+    # Backfill data saja; versi yang dibuat tetap valid untuk skema sebelumnya
+    pass
@@ -0,0 +1,35 @@
+"""Updated-at stamps for cached Excel exports
+
+Revision ID: e58c2a4f9b61
+Revises: 6d1f4b8a2e97
+Create Date: 2026-10-19 20:38:15.604129
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58c2a4f9b61'
+down_revision = '6d1f4b8a2e97'
+branch_labels = None
+depends_on = None
+
+STAMPED_TABLES = ('basic_assessments', 'madya_assessments', 'risk_assessments', 'main_risk_register')
+
+
+def upgrade():
+    for table_name in STAMPED_TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Baris lama: stempel awal = waktu dibuat (risk_assessments tidak punya created_at)
+    for table_name in ('basic_assessments', 'madya_assessments', 'main_risk_register'):
+        op.execute(f"UPDATE {table_name} SET updated_at = created_at WHERE updated_at IS NULL")
+    op.execute("UPDATE risk_assessments SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+
+def downgrade():
+    for table_name in reversed(STAMPED_TABLES):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
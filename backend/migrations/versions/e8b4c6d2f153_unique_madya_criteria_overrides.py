@@ -0,0 +1,38 @@
+"""Unique (assessment_id, level) for madya criteria overrides
+
+Revision ID: e8b4c6d2f153
+Revises: d5f2a9c81e37
+Create Date: 2026-10-20 14:21:37.640912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b4c6d2f153'
+down_revision = 'd5f2a9c81e37'
+branch_labels = None
+depends_on = None
+
+TABLES = ('madya_criteria_probability', 'madya_criteria_impact')
+
+
+def upgrade():
+    bind = op.get_bind()
+    for table in TABLES:
+        # Duplikat dari materialisasi bersamaan: simpan baris terakhir per level
+        bind.execute(sa.text(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM {table} GROUP BY assessment_id, level) AS latest)"
+        ))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_assessment_level')
+            batch_op.create_index(f'ix_{table}_assessment_level', ['assessment_id', 'level'], unique=True)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_assessment_level')
+            batch_op.create_index(f'ix_{table}_assessment_level', ['assessment_id', 'level'], unique=False)
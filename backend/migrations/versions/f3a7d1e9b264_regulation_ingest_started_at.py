@@ -0,0 +1,26 @@
+"""Track when regulation ingestion started so orphaned runs can be resumed
+
+Revision ID: f3a7d1e9b264
+Revises: e8b4c6d2f153
+Create Date: 2026-10-20 15:08:52.417093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7d1e9b264'
+down_revision = 'e8b4c6d2f153'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('regulations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ingest_started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('regulations', schema=None) as batch_op:
+        batch_op.drop_column('ingest_started_at')
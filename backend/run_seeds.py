@@ -8,8 +8,8 @@ from app.seeds import seed_admin, seed_master_data, seed_default_risk_map, seed_
 
 print("Preparing to run database seeds...")
 
-# Membuat instance aplikasi untuk mendapatkan konteks
-app = create_app()
+# Membuat instance aplikasi untuk mendapatkan konteks (mode minimal: tanpa blueprint & dependency berat)
+app = create_app(minimal=True)
 
 # Menggunakan konteks aplikasi untuk berinteraksi dengan database
 with app.app_context():
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from app.image_pipeline import ImageUploadError, prepare_image_upload
+
+
+def _png_upload(width, height):
+    buffer = io.BytesIO()
+    Image.new('1', (width, height)).save(buffer, format='PNG')
+    buffer.seek(0)
+    return FileStorage(stream=buffer, filename='struktur.png', content_type='image/png')
+
+
+def test_prepare_image_upload_encodes_variants():
+    prepared = prepare_image_upload(_png_upload(640, 480), prefix='struktur')
+
+    master_filename, master_bytes = prepared["master"]
+    assert master_filename.startswith('struktur_') and master_filename.endswith('.png')
+    assert prepared["preview"][0] == master_filename[:-4] + '_preview.webp'
+    assert Image.open(io.BytesIO(master_bytes)).size == (640, 480)
+
+
+def test_decompression_bomb_is_rejected_with_413(monkeypatch):
+    # Pillow melempar DecompressionBombError (bukan OSError) di atas 2x MAX_IMAGE_PIXELS;
+    # batasnya diperkecil agar test tidak perlu membuat gambar 20000x20000
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+
+    with pytest.raises(ImageUploadError) as excinfo:
+        prepare_image_upload(_png_upload(100, 100), prefix='struktur')
+
+    assert excinfo.value.status_code == 413
+
+
+def test_invalid_image_is_rejected_with_400():
+    upload = FileStorage(stream=io.BytesIO(b'bukan gambar'), filename='struktur.png')
+
+    with pytest.raises(ImageUploadError) as excinfo:
+        prepare_image_upload(upload, prefix='struktur')
+
+    assert excinfo.value.status_code == 400
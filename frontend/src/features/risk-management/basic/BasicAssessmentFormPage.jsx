@@ -208,19 +208,31 @@ function BasicAssessmentFormPage() {
     });
   };
 
+  // Simpan ID database hasil save ke state (index array sama dengan payload yang dikirim)
+  const applySavedIds = (changes) => {
+    if (!changes) return;
+    const withIds = (items, ids) => items.map((item, index) => (ids?.[index] ? { ...item, id: ids[index] } : item));
+    setContexts((current) => withIds(current, changes.context_ids));
+    setRisks((current) => withIds(current, changes.risk_ids));
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setIsLoading(true);
-    const payload = { ...formData, contexts: contexts.map((c) => ({ external: c.external, internal: c.internal })), risks, analyses };
+    // 'id' konteks & risiko wajib ikut agar server meng-update baris yang sama (bukan hapus & buat ulang)
+    const payload = { ...formData, contexts: contexts.map((c) => ({ id: c.id, external: c.external, internal: c.internal })), risks, analyses };
     try {
       if (isEditMode) {
-        await apiClient.put(`/basic-assessments/${assessmentId}`, payload);
+        const response = await apiClient.put(`/basic-assessments/${assessmentId}`, payload);
+        applySavedIds(response.data.changes);
         toast.success("Asesmen berhasil diperbarui!");
       } else {
-        await apiClient.post("/basic-assessments", payload);
+        const response = await apiClient.post("/basic-assessments", payload);
+        applySavedIds(response.data.changes);
         toast.success("Asesmen berhasil disimpan!");
+        // Lanjut di mode edit: simpan berikutnya memakai PUT dengan ID yang sama
+        navigate(`/risk-management/dasar/edit/${response.data.id}`, { replace: true });
       }
-      navigate("/risk-management/dasar");
     } catch (error) {
       toast.error("Gagal menyimpan: " + (error.response?.data?.msg || "Terjadi kesalahan."));
     } finally {
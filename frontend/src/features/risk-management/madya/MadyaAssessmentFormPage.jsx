@@ -317,7 +317,7 @@ function MadyaAssessmentFormPage() {
               <Button type="button" variant="light" icon={isCriteriaFullscreen ? FiMinimize : FiMaximize} onClick={toggleCriteriaFullscreen} title={isCriteriaFullscreen ? "Exit Fullscreen" : "Fullscreen"} />
             </div>
           </div>
-          <MadyaCriteriaReference probabilityCriteria={probabilityCriteria} impactCriteria={impactCriteria} onCriteriaSave={refreshCriteriaData} readOnly={false} />
+          <MadyaCriteriaReference assessmentId={assessmentId} probabilityCriteria={probabilityCriteria} impactCriteria={impactCriteria} onCriteriaSave={refreshCriteriaData} readOnly={false} />
         </Card>
 
         {/* Card 3: Sasaran/KPI */}
@@ -12,7 +12,7 @@ const cellClassName = "align-middle text-center whitespace-normal border border-
 const headerClassName = "align-middle text-center whitespace-normal border border-slate-300";
 const columnStyle = "w-[180px]";
 
-function MadyaCriteriaReference({ probabilityCriteria = [], impactCriteria = [], onCriteriaSave, readOnly = false }) {
+function MadyaCriteriaReference({ assessmentId, probabilityCriteria = [], impactCriteria = [], onCriteriaSave, readOnly = false }) {
   const [criteriaData, setCriteriaData] = useState(initialProbabilityData);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [formData, setFormData] = useState({
@@ -48,10 +48,11 @@ function MadyaCriteriaReference({ probabilityCriteria = [], impactCriteria = [],
     }));
   };
   const handleSave = async () => {
-    if (!formData.id) return;
+    if (!assessmentId && !formData.id) return;
     try {
-      // Panggil API PUT baru kita
-      await apiClient.put(`/madya-assessments/criteria/probability/${formData.id}`, formData);
+      // Edit per level: backend membuat salinan kriteria asesmen saat pertama kali diedit
+      const url = assessmentId ? `/madya-assessments/${assessmentId}/criteria/probability/${formData.level}` : `/madya-assessments/criteria/probability/${formData.id}`;
+      await apiClient.put(url, formData);
       setIsModalOpen(false);
       if (onCriteriaSave) onCriteriaSave(); // Panggil refresh parent
       toast.success("Kriteria probabilitas berhasil diperbarui.");
@@ -71,10 +72,11 @@ function MadyaCriteriaReference({ probabilityCriteria = [], impactCriteria = [],
   };
 
   const handleImpactSave = async () => {
-    if (!impactFormData || !impactFormData.id) return;
+    if (!impactFormData || (!assessmentId && !impactFormData.id)) return;
     try {
-      // Panggil API PUT baru kita
-      await apiClient.put(`/madya-assessments/criteria/impact/${impactFormData.id}`, impactFormData);
+      // Edit per level: backend membuat salinan kriteria asesmen saat pertama kali diedit
+      const url = assessmentId ? `/madya-assessments/${assessmentId}/criteria/impact/${impactFormData.level}` : `/madya-assessments/criteria/impact/${impactFormData.id}`;
+      await apiClient.put(url, impactFormData);
       setIsImpactModalOpen(false);
       setImpactFormData(null);
       if (onCriteriaSave) onCriteriaSave(); // Panggil refresh parent
@@ -53,6 +53,12 @@ function RiskMapVisualization({ risks = [], templateData, type = "inherent", ris
     }
   });
 
+  // Skor & warna per sel sudah dihitung server (templateData.cells); fallback hitung lokal untuk respons lama
+  const precomputedCells = {};
+  (templateData.cells || []).forEach((c) => {
+    precomputedCells[`${c.likelihood_level}-${c.impact_level}`] = c;
+  });
+
   const sortedLikelihoodLabels = [...templateData.likelihood_labels].sort((a, b) => b.level - a.level);
   const sortedImpactLabels = [...templateData.impact_labels].sort((a, b) => a.level - b.level);
 
@@ -75,6 +81,11 @@ function RiskMapVisualization({ risks = [], templateData, type = "inherent", ris
             const i_level = i_label.level;
             const key = `${l_level}-${i_level}`;
 
+            const precomputed = precomputedCells[key];
+            if (precomputed) {
+              return <MatrixCell key={key} scoreValue={precomputed.score} color={precomputed.level_name ? precomputed.color_hex : undefined} risks={matrixCellsData[key] || []} riskLabels={riskLabels} />;
+            }
+
             const scoreEntry = templateData.scores.find((s) => s.likelihood_level === l_level && s.impact_level === i_level);
             let scoreValue = scoreEntry ? scoreEntry.score : null;
             if (scoreValue === null || scoreValue === undefined) {